@@ -6,36 +6,53 @@
 
 from common.profiledesign import profile_get_medeleg_mask
 from common.spike import calibrate_spikespeed
-from cascade.fuzzfromdescriptor import gen_fuzzerstate_elf_expectedvals, gen_new_test_instance
+from common.scheduler import JOB_STATUS_DONE, JOB_STATUS_FAILED
+from common.designcontext import gen_design_job_scheduler
+from common.scratch import release_scratch_file
+from cascade.fuzzfromdescriptor import gen_fuzzerstates_elfs_expectedvals_batch, gen_new_test_instance
 
-import multiprocessing as mp
 import os
 import random
 import shutil
 from tqdm import tqdm
 
 
-# @param in_tuple: instance_id: int, memsize: int, design_name: str, check_pc_spike_again: bool, randseed: int, nmax_bbs: int, authorize_privileges: bool, outdir_path: str
-def __gen_elf_worker(in_tuple):
-    instance_id, memsize, design_name, randseed, nmax_bbs, authorize_privileges, check_pc_spike_again, outdir_path = in_tuple
-    fuzzerstate, elfpath, _, _, _, _ = gen_fuzzerstate_elf_expectedvals(memsize, design_name, randseed, nmax_bbs, authorize_privileges, check_pc_spike_again)
-    # Move the file from elfpath to outdir_path, and name it after the design name and instance id.
-    shutil.move(elfpath, os.path.join(outdir_path, f"{design_name}_{instance_id}.elf"))
-
-    # Write the end address (where spike will fail), for further analysis.
-    with open(os.path.join(outdir_path, f"{design_name}_{instance_id}_finaladdr.txt"), "w") as f:
-        f.write(hex(fuzzerstate.final_bb_base_addr))
-
-    # Count the instructions
-    num_instrs = len(fuzzerstate.final_bb)
-    for bb in fuzzerstate.instr_objs_seq:
-        num_instrs += len(bb)
-    with open(os.path.join(outdir_path, f"{design_name}_{instance_id}_numinstrs.txt"), "w") as f:
-        f.write(hex(num_instrs))
-
-    # Save the tuple for debug purposes
-    with open(os.path.join(outdir_path, f"{design_name}_{instance_id}_tuple.txt"), "w") as f:
-        f.write('(' + ', '.join(map(str, [memsize, design_name, randseed, nmax_bbs, authorize_privileges])) + ')')
+# The number of ELFs that a worker generates together, so that their Spike resolutions run as one batch.
+GEN_MANY_ELFS_BATCH_SIZE = 16
+
+# @param in_tuples: a list of tuples instance_id: int, memsize: int, design_name: str, randseed: int, nmax_bbs: int, authorize_privileges: bool, check_pc_spike_again: bool, outdir_path: str. They all have the same check_pc_spike_again.
+# @return the number of generated ELFs.
+def __gen_elf_worker(in_tuples):
+    check_pc_spike_again = in_tuples[0][6]
+    gen_results = gen_fuzzerstates_elfs_expectedvals_batch([(memsize, design_name, randseed, nmax_bbs, authorize_privileges) for _, memsize, design_name, randseed, nmax_bbs, authorize_privileges, _, _ in in_tuples], check_pc_spike_again)
+    for in_tuple_id, (in_tuple, gen_result) in enumerate(zip(in_tuples, gen_results)):
+        instance_id, memsize, design_name, randseed, nmax_bbs, authorize_privileges, _, outdir_path = in_tuple
+        if isinstance(gen_result, Exception):
+            # The generation stops at the first failure, hence release the ELFs of the next programs of the batch.
+            for next_gen_result in gen_results[in_tuple_id+1:]:
+                if not isinstance(next_gen_result, Exception):
+                    release_scratch_file(next_gen_result[1])
+            raise Exception(f"ELF generation failed for the workload {instance_id}: {type(gen_result).__name__}: {gen_result}") from gen_result
+        fuzzerstate, elfpath, _, _, _, _ = gen_result
+        # Move the file from elfpath to outdir_path, and name it after the design name and instance id. The scratch file is released explicitly to free its quota.
+        shutil.copyfile(elfpath, os.path.join(outdir_path, f"{design_name}_{instance_id}.elf"))
+        release_scratch_file(elfpath)
+
+        # Write the end address (where spike will fail), for further analysis.
+        with open(os.path.join(outdir_path, f"{design_name}_{instance_id}_finaladdr.txt"), "w") as f:
+            f.write(hex(fuzzerstate.final_bb_base_addr))
+
+        # Count the instructions
+        num_instrs = len(fuzzerstate.final_bb)
+        for bb in fuzzerstate.instr_objs_seq:
+            num_instrs += len(bb)
+        with open(os.path.join(outdir_path, f"{design_name}_{instance_id}_numinstrs.txt"), "w") as f:
+            f.write(hex(num_instrs))
+
+        # Save the tuple for debug purposes
+        with open(os.path.join(outdir_path, f"{design_name}_{instance_id}_tuple.txt"), "w") as f:
+            f.write('(' + ', '.join(map(str, [memsize, design_name, randseed, nmax_bbs, authorize_privileges])) + ')')
+    return len(in_tuples)
 
 
 def gen_many_elfs(design_name: str, num_cores: int, num_elfs: int, outdir_path, verbose: bool = True):
@@ -47,17 +64,22 @@ def gen_many_elfs(design_name: str, num_cores: int, num_elfs: int, outdir_path,
     # Gen the program descriptors.
     memsizes, _, randseeds, num_bbss, authorize_privilegess = tuple(zip(*[gen_new_test_instance(design_name, i, True) for i in range(num_elfs)]))
     workloads = [(i, memsizes[i], design_name, randseeds[i], num_bbss[i], authorize_privilegess[i], False, outdir_path) for i in range(num_elfs)]
+    workload_batches = [workloads[batch_start:batch_start+GEN_MANY_ELFS_BATCH_SIZE] for batch_start in range(0, num_elfs, GEN_MANY_ELFS_BATCH_SIZE)]
 
     calibrate_spikespeed()
     profile_get_medeleg_mask(design_name)
 
     print(f"Starting ELF generation on {num_cores} processes.")
     progress_bar = tqdm(total=num_elfs)
-    with mp.Pool(num_cores) as pool:
-        results = pool.imap(__gen_elf_worker, workloads)
-
-        for result in results:
-            if verbose:
-                progress_bar.update(1)
+    def on_result(job_result):
+        # A failed batch names its failing workload. A batch that timed out or crashed does not tell which of its workloads is responsible.
+        if job_result.status == JOB_STATUS_FAILED:
+            raise Exception(job_result.error_str)
+        if job_result.status != JOB_STATUS_DONE:
+            raise Exception(f"ELF generation {job_result.status} for one of the workloads {[in_tuple[0] for in_tuple in job_result.args[0]]}: {job_result.error_str}")
+        if verbose:
+            progress_bar.update(job_result.ret)
+        return False
+    gen_design_job_scheduler(__gen_elf_worker, design_name, num_cores).run(lambda batch_id: (workload_batches[batch_id],) if batch_id < len(workload_batches) else None, on_result)
 
     progress_bar.close()
@@ -0,0 +1,34 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module contains the ELF files of the historical toolchain path, recorded by record_elf_writer_fixtures in elfwriterperf.py.
+# Recorded with `objcopy` (GNU objcopy (GNU Binutils for Debian) 2.40), targets elf32-little and elf64-little.
+
+# Tuples (start_addr, section_addr, is_64bit, content size, base64 of the zlib-compressed output of objcopy).
+ELF_WRITER_FIXTURES = [
+    (0x0, None, False, 64, 'eNqrd/VxY2RkZIABJiCG8UyAeA2crQAU12BgBqoAyYcwIIADFLMDMQsQ826JZloZ8H2e65vJVg879K/VqpwukjyQzrc1hnlV4I/5bm+nWD/qNLhep3qmWOpgBv+2WJbVQT8XuL+bavO4y/BGvRqDXnFGcUlRSWISg15JakWJXmZeZgkD8YAb6gc2KD8E6j4YYIHSIDXMSOJTgFgMiQ8LBwBmkCvG'),
+    (0x0, None, False, 1000, 'eNqrd/VxY2RkZIABJiCG8UyAOIQFxlYAimswMANVgORDGBDgBTMEswPZIOW8W6KZVgZ8n+f6ZrLVww79a7Uqp4skD6TzbY1hXhX4Y77b2ynWjzoNrtepnimWOpjBvy2WZXXQzwXu76baPO4yvFGvdrZE+lCmwPY41jXBvxZ6vJ9m+6Tb6GaD+rlSmcNZgjvi2daG/F7k+WG63dMe41uNGufLZI9kC+1MYF8X+mex18cZ9s96TW43aV4olzuaI7wrkWN92N8l3p9mOjzvM73TrHWxQv5YrsjuJM4N4f+W+nye5fii3+xui/alSoXjeaJ7krk2Rvxf5vtlttPLCeb3WnUuVymeyBfbm8K9KZJhud/XOc6vJlrcb9O9Uq10skB8XyrP5ijGFf7f5rq8nmT5oF3vao3yqUKJ/Wmj/h/1/0jwP4NecUZxSVFJYhKDXklqRYleZl5mCQPxgBta1rBB+SHQsgQGoEUPWA2SMIMNUEIMiQ8rrwCUPQBZ'),
+    (0x40, None, False, 64, 'eNqrd/VxY2RkZIABJiAG8RyA2ASI10DFTRgUgOIaDMxAFSD5EKgaZMwOxCxAzLslmmllwPd5rm8mWz3s0L9Wq3K6SPJAOt/WGOZVgT/mu72dYv2o0+B6neqZYqmDGfzbYllWB/1c4P5uqs3jLsMb9WoMesUZxSVFJYlJDHolqRUlepl5mSUMxANuqB/YoO6CuRUGWKA0SA0zkvgUIBZD4sNCBQAtnyzG'),
+    (0x40, None, False, 1000, 'eNqrd/VxY2RkZIABJiAG8RyA2ASIQ1gg4iYMCkBxDQZmoAqQfAhUDQi/YIZgdiAbpJx3SzTTyoDv81zfTLZ62KF/rVbldJHkgXS+rTHMqwJ/zHd7O8X6UafB9TrVM8VSBzP4t8WyrA76ucD93VSbx12GN+rVzpZIH8oU2B7Huib410KP99Nsn3Qb3WxQP1cqczhLcEc829qQ34s8P0y3e9pjfKtR43yZ7JFsoZ0J7OtC/yz2+jjD/lmvye0mzQvlckdzhHclcqwP+7vE+9NMh+d9pneatS5WyB/LFdmdxLkh/N9Sn8+zHF/0m91t0b5UqXA8T3RPMtfGiP/LfL/Mdno5wfxeq87lKsUT+WJ7U7g3RTIs9/s6x/nVRIv7bbpXqpVOFojvS+XZHMW4wv/bXJfXkywftOtdrVE+VSixP23U/6P+Hwn+Z9ArziguKSpJTGLQK0mtKNHLzMssYSAecEPLGjZoORICLUtgAFr0gNUgCTPYACXEkPiw0gsAGXkBWQ=='),
+    (0x0, 0x80000000, False, 64, 'eNqrd/VxY2RkZIABJiCG8UyAeA2crQAU12BgBqoAyYdAhBtA2AFIgDA7ELMAMe+WaKaVAd/nub6ZbPWwQ/9arcrpIskD6XxbY5hXBf6Y7/Z2ivWjToPrdapniqUOZvBvi2VZHfRzgfu7qTaPuwxv1Ksx6BVnFJcUlSQmMeiVpFaU6GXmZZYwEA+4oX5gg7oxBOo+GGCB0iA1zEjiU4BYDIkPCwcAah8tRg=='),
+    (0x0, 0x80000000, False, 1000, 'eNqrd/VxY2RkZIABJiCG8UyAOIQFxlYAimswMANVgORDIMINIPyCmYEBhNmBHJBy3i3RTCsDvs9zfTPZ6mGH/rValdNFkgfS+bbGMK8K/DHf7e0U60edBtfrVM8USx3M4N8Wy7I66OcC93dTbR53Gd6oVztbIn0oU2B7HOua4F8LPd5Ps33SbXSzQf1cqczhLMEd8WxrQ34v8vww3e5pj/GtRo3zZbJHsoV2JrCvC/2z2OvjDPtnvSa3mzQvlMsdzRHelcixPuzvEu9PMx2e95neada6WCF/LFdkdxLnhvB/S30+z3J80W92t0X7UqXC8TzRPclcGyP+L/P9Mtvp5QTze606l6sUT+SL7U3h3hTJsNzv6xznVxMt7rfpXqlWOlkgvi+VZ3MU4wr/b3NdXk+yfNCud7VG+VShxP60Uf+P+n8k+J9BrzijuKSoJDGJQa8ktaJELzMvs4SBeMANLWvYoGUJqEwBlSMwAC16wGqQhBlsgBJiSHxYeQUAQAgB2Q=='),
+    (0x40, 0x80000000, False, 64, 'eNqrd/VxY2RkZIABJiAG8RyA2ASI10DFTRgUgOIaDMxAFSD5EIhwAwg7QNWzAzELEPNuiWZaGfB9nuubyVYPO/Sv1aqcLpI8kM63NYZ5VeCP+W5vp1g/6jS4Xqd6pljqYAb/tliW1UE/F7i/m2rzuMvwRr0ag15xRnFJUUliEoNeSWpFiV5mXmYJA/GAG+oHNqgbQ6DugwEWKA1Sw4wkPgWIxZD4sFABAK0fLYY='),
+    (0x40, 0x80000000, False, 1000, 'eNqrd/VxY2RkZIABJiAG8RyA2ASIQ1gg4iYMCkBxDQZmoAqQfAhEuAGEXzAzMIAwO5ADUs67JZppZcD3ea5vJls97NC/VqtyukjyQDrf1hjmVYE/5ru9nWL9qNPgep3qmWKpgxn822JZVgf9XOD+bqrN4y7DG/VqZ0ukD2UKbI9jXRP8a6HH+2m2T7qNbjaonyuVOZwluCOebW3I70WeH6bbPe0xvtWocb5M9ki20M4E9nWhfxZ7fZxh/6zX5HaT5oVyuaM5wrsSOdaH/V3i/Wmmw/M+0zvNWhcr5I/liuxO4twQ/m+pz+dZji/6ze62aF+qVDieJ7onmWtjxP9lvl9mO72cYH6vVedyleKJfLG9KdybIhmW+32d4/xqosX9Nt0r1UonC8T3pfJsjmJc4f9trsvrSZYP2vWu1iifKpTYnzbq/1H/jwT/M+gVZxSXFJUkJjHolaRWlOhl5mWWMBAPuKFlDRu0LAGVKaByBAagRQ9YDZIwgw1QQgyJDyu9AG0XAhk='),
+    (0x0, 0x1000, False, 64, 'eNqrd/VxY2RkZIABJiCG8UyAeA2crQAU12BgBqoAyYeABAUg2IEBgtmBmAWIebdEM60M+D7P9c1kq4cd+tdqVU4XSR5I59saw7wq8Md8t7dTrB91GlyvUz1TLHUwg39bLMvqoJ8L3N9NtXncZXijXo1BrzijuKSoJDGJQa8ktaJELzMvs4SBeMAN9QMb1I0hUPfBAAuUBqlhRhKfAsRiSHxYOAAAh2Ar9g=='),
+    (0x0, 0x1000, False, 1000, 'eNqrd/VxY2RkZIABJiCG8UyAOIQFxlYAimswMANVgORDQIICEPyCGYLZgVyQct4t0UwrA77Pc30z2ephh/61WpXTRZIH0vm2xjCvCvwx3+3tFOtHnQbX61TPFEsdzODfFsuyOujnAvd3U20edxneqFc7WyJ9KFNgexzrmuBfCz3eT7N90m10s0H9XKnM4SzBHfFsa0N+L/L8MN3uaY/xrUaN82WyR7KFdiawrwv9s9jr4wz7Z70mt5s0L5TLHc0R3pXIsT7s7xLvTzMdnveZ3mnWulghfyxXZHcS54bwf0t9Ps9yfNFvdrdF+1KlwvE80T3JXBsj/i/z/TLb6eUE83utOperFE/ki+1N4d4UybDc7+sc51cTLe636V6pVjpZIL4vlWdzFOMK/29zXV5PsnzQrne1RvlUocT+tFH/j/p/JPifQa84o7ikqCQxiUGvJLWiRC8zL7OEgXjADS1r2KBlCahMAZUjMAAtesBqkIQZbIASYkh8WHkFACocAIk='),
+    (0x40, 0x1000, False, 64, 'eNqrd/VxY2RkZIABJiAG8RyA2ASI10DFTRgUgOIaDMxAFSD5EJCgAAQ7QNWzAzELEPNuiWZaGfB9nuubyVYPO/Sv1aqcLpI8kM63NYZ5VeCP+W5vp1g/6jS4Xqd6pljqYAb/tliW1UE/F7i/m2rzuMvwRr0ag15xRnFJUUliEoNeSWpFiV5mXmYJA/GAG+oHNqgbQ6DugwEWKA1Sw4wkPgWIxZD4sFABAMpgLDY='),
+    (0x40, 0x1000, False, 1000, 'eNqrd/VxY2RkZIABJiAG8RyA2ASIQ1gg4iYMCkBxDQZmoAqQfAhIUACCXzBDMDuQC1LOuyWaaWXA93mubyZbPezQv1arcrpI8kA639YY5lWBP+a7vZ1i/ajT4Hqd6pliqYMZ/NtiWVYH/Vzg/m6qzeMuwxv1amdLpA9lCmyPY10T/Guhx/tptk+6jW42qJ8rlTmcJbgjnm1tyO9Fnh+m2z3tMb7VqHG+TPZIttDOBPZ1oX8We32cYf+s1+R2k+aFcrmjOcK7EjnWh/1d4v1ppsPzPtM7zVoXK+SP5YrsTuLcEP5vqc/nWY4v+s3utmhfqlQ4nie6J5lrY8T/Zb5fZju9nGB+r1XncpXiiXyxvSncmyIZlvt9neP8aqLF/TbdK9VKJwvE96XybI5iXOH/ba7L60mWD9r1rtYonyqU2J826v9R/48E/zPoFWcUlxSVJCYx6JWkVpToZeZlljAQD7ihZQ0btCwBlSmgcgQGoEUPWA2SMIMNUEIMiQ8rvQBXKwDJ'),
+    (0x0, None, True, 64, 'eNqrd/VxY2JkZIABJiBG8BgYHKD0BRQxC6AaBwZmoGqQWnYgrmDADhzQaBYozbslmmllwPd5rm8mWz3s0L9Wq3K6SPJAOt/WGOZVgT/mu72dYv2o0+B6neqZYqmDGfzbYllWB/1c4P5uqs3jLsMb9WoMesUZxSVFJYlJDHolqRUlepl5mSUMlANuqP/Z0MQr0PzBgOYfGADpZcZi7g4oLYZFPTIAALTHLJ8='),
+    (0x0, None, True, 1000, 'eNqrd/VxY2JkZIABJiBG8BgYHKB0BQuymAVQjQMDM1A1SC07SJ4BO3jBjErDjOHdEs20MuD7PNc3k60eduhfq1U5XSR5IJ1vawzzqsAf893eTrF+1GlwvU71TLHUwQz+bbEsq4N+LnB/N9XmcZfhjXq1syXShzIFtsexrgn+tdDj/TTbJ91GNxvUz5XKHM4S3BHPtjbk9yLPD9PtnvYY32rUOF8meyRbaGcC+7rQP4u9Ps6wf9ZrcrtJ80K53NEc4V2JHOvD/i7x/jTT4Xmf6Z1mrYsV8sdyRXYncW4I/7fU5/Msxxf9ZndbtC9VKhzPE92TzLUx4v8y3y+znV5OML/XqnO5SvFEvtjeFO5NkQzL/b7OcX410eJ+m+6VaqWTBeL7Unk2RzGu8P821+X1JMsH7XpXa5RPFUrsTxv1/6j/R4L/GfSKM4pLikoSkxj0SlIrSvQy8zJLGCgH3NByig1NvAKt3IEBFjR1IL3MWMxNgCoUw6IeGQAAtoYBMg=='),
+    (0x40, None, True, 64, 'eNqrd/VxY2JkZIABJiAG8RygfBh9gQEBHBgsgGocGJiBqkFq2YG4Ak09LpoFSvNuiWZaGfB9nuubyVYPO/Sv1aqcLpI8kM63NYZ5VeCP+W5vp1g/6jS4Xqd6pljqYAb/tliW1UE/F7i/m2rzuMvwRr0ag15xRnFJUUliEoNeSWpFiV5mXmYJA+WAG+p/NjR3o/uPAc0/MADSy4zF3B1QWgyLemQAAMzWLZ8='),
+    (0x40, None, True, 1000, 'eNqrd/VxY2JkZIABJiAG8RygfBhdwQJXAhSzAKpxYGAGqgapZQfJo6mH0S+YUWmYMbxboplWBnyf5/pmstXDDv1rtSqniyQPpPNtjWFeFfhjvtvbKdaPOg2u16meKZY6mMG/LZZlddDPBe7vpto87jK8Ua92tkT6UKbA9jjWNcG/Fnq8n2b7pNvoZoP6uVKZw1mCO+LZ1ob8XuT5Ybrd0x7jW40a58tkj2QL7UxgXxf6Z7HXxxn2z3pNbjdpXiiXO5ojvCuRY33Y3yXen2Y6PO8zvdOsdbFC/liuyO4kzg3h/5b6fJ7l+KLf7G6L9qVKheN5onuSuTZG/F/m+2W208sJ5vdadS5XKZ7IF9ubwr0pkmG539c5zq8mWtxv071SrXSyQHxfKs/mKMYV/t/muryeZPmgXe9qjfKpQon9aaP+H/X/SPA/g15xRnFJUUliEoNeSWpFiV5mXmYJA+WAG1pOsaGXU2jlDgywoOkH6WXGYm4CVKEYFvXIAACMwgIy'),
+    (0x0, 0x80000000, True, 64, 'eNqrd/VxY2JkZIABJiBG8BgYHKD0BRQxC6AaBwZmoGqQWnYgrkBINyDTDmjmsEBp3i3RTCsDvs9zfTPZ6mGH/rValdNFkgfS+bbGMK8K/DHf7e0U60edBtfrVM8USx3M4N8Wy7I66OcC93dTbR53Gd6oV2PQK84oLikqSUxi0CtJrSjRy8zLLGGgHHBD/c+G5p8KNH8woPkHBkB6mbGYuwNKi2FRjwwAJGUuHw=='),
+    (0x0, 0x80000000, True, 1000, 'eNqrd/VxY2JkZIABJiBG8BgYHKB0BQuymAVQjQMDM1A1SC07SB4h3YBMv2CGcGA0zBjeLdFMKwO+z3N9M9nqYYf+tVqV00WSB9L5tsYwrwr8Md/t7RTrR50G1+tUzxRLHczg3xbLsjro5wL3d1NtHncZ3qhXO1sifShTYHsc65rgXws93k+zfdJtdLNB/VypzOEswR3xbGtDfi/y/DDd7mmP8a1GjfNlskeyhXYmsK8L/bPY6+MM+2e9JrebNC+Uyx3NEd6VyLE+7O8S708zHZ73md5p1rpYIX8sV2R3EueG8H9LfT7PcnzRb3a3RftSpcLxPNE9yVwbI/4v8/0y2+nlBPN7rTqXqxRP5IvtTeHeFMmw3O/rHOdXEy3ut+leqVY6WSC+L5VncxTjCv9vc11eT7J80K53tUb5VKHE/rRR/4/6fyT4n0GvOKO4pKgkMYlBryS1okQvMy+zhIFywA0tp9jQyh1YOQQrb2CABU0/SC8zFnMToArFsKhHBgDOUQKy'),
+    (0x40, 0x80000000, True, 64, 'eNqrd/VxY2JkZIABJiAG8RygfBh9gQEBHBgsgGocGJiBqkFq2YG4AiHdgEyjm8MCpXm3RDOtDPg+z/XNZKuHHfrXalVOF0keSOfbGsO8KvDHfLe3U6wfdRpcr1M9Uyx1MIN/WyzL6qCfC9zfTbV53GV4o16NQa84o7ikqCQxiUGvJLWiRC8zL7OEgXLADfU/G5p/KtD8wYDmHxgA6WXGYu4OKC2GRT0yAACCZS5f'),
+    (0x40, 0x80000000, True, 1000, 'eNqrd/VxY2JkZIABJiAG8RygfBhdwQJXAhSzAKpxYGAGqgapZQfJI6QbkOkXzBAOjIYZw7slmmllwPd5rm8mWz3s0L9Wq3K6SPJAOt/WGOZVgT/mu72dYv2o0+B6neqZYqmDGfzbYllWB/1c4P5uqs3jLsMb9WpnS6QPZQpsj2NdE/xrocf7abZPuo1uNqifK5U5nCW4I55tbcjvRZ4fpts97TG+1ahxvkz2SLbQzgT2daF/Fnt9nGH/rNfkdpPmhXK5oznCuxI51of9XeL9aabD8z7TO81aFyvkj+WK7E7i3BD+b6nP51mOL/rN7rZoX6pUOJ4nuieZa2PE/2W+X2Y7vZxgfq9V53KV4ol8sb0p3JsiGZb7fZ3j/Gqixf023SvVSicLxPel8myOYlzh/22uy+tJlg/a9a7WKJ8qlNifNur/Uf+PBP8z6BVnFJcUlSQmMeiVpFaU6GXmZZYwUA64oeUUG1q5AyuHYOUNDLCg6QfpZcZibgJUoRgW9cgAABZvAvI='),
+    (0x0, 0x1000, True, 64, 'eNqrd/VxY2JkZIABJiBG8BgYHKD0BRQxC6AaBwZmoGqQWnYgroBJCqDSDmjmsEBp3i3RTCsDvs9zfTPZ6mGH/rValdNFkgfS+bbGMK8K/DHf7e0U60edBtfrVM8USx3M4N8Wy7I66OcC93dTbR53Gd6oV2PQK84oLikqSUxi0CtJrSjRy8zLLGGgHHBD/c+G5p8KNH8woPkHBkB6mbGYuwNKi2FRjwwA4xcszw=='),
+    (0x0, 0x1000, True, 1000, 'eNqrd/VxY2JkZIABJiBG8BgYHKB0BQuymAVQjQMDM1A1SC07SB4mKYBKv2BGpWHG8G6JZloZ8H2e65vJVg879K/VqpwukjyQzrc1hnlV4I/5bm+nWD/qNLhep3qmWOpgBv+2WJbVQT8XuL+bavO4y/BGvdrZEulDmQLb41jXBP9a6PF+mu2TbqObDernSmUOZwnuiGdbG/J7keeH6XZPe4xvNWqcL5M9ki20M4F9XeifxV4fZ9g/6zW53aR5oVzuaI7wrkSO9WF/l3h/munwvM/0TrPWxQr5Y7kiu5M4N4T/W+rzeZbji36zuy3alyoVjueJ7knm2hjxf5nvl9lOLyeY32vVuVyleCJfbG8K96ZIhuV+X+c4v5pocb9N90q10skC8X2pPJujGFf4f5vr8nqS5YN2vas1yqcKJfanjfp/1P8jwf8MesUZxSVFJYlJDHolqRUlepl5mSUMlANuaDnFhlbuwMohWHkDAyxo+kF6mbGYmwBVKIZFPTIAAFnlAWI='),
+    (0x40, 0x1000, True, 64, 'eNqrd/VxY2JkZIABJiAG8RygfBh9gQEBHBgsgGocGJiBqkFq2YG4AiYpgEqjm8MCpXm3RDOtDPg+z/XNZKuHHfrXalVOF0keSOfbGsO8KvDHfLe3U6wfdRpcr1M9Uyx1MIN/WyzL6qCfC9zfTbV53GV4o16NQa84o7ikqCQxiUGvJLWiRC8zL7OEgXLADfU/G5p/KtD8wYDmHxgA6WXGYu4OKC2GRT0yAABBJi0P'),
+    (0x40, 0x1000, True, 1000, 'eNqrd/VxY2JkZIABJiAG8RygfBhdwQJXAhSzAKpxYGAGqgapZQfJwyQFUOkXzKg0zBjeLdFMKwO+z3N9M9nqYYf+tVqV00WSB9L5tsYwrwr8Md/t7RTrR50G1+tUzxRLHczg3xbLsjro5wL3d1NtHncZ3qhXO1sifShTYHsc65rgXws93k+zfdJtdLNB/VypzOEswR3xbGtDfi/y/DDd7mmP8a1GjfNlskeyhXYmsK8L/bPY6+MM+2e9JrebNC+Uyx3NEd6VyLE+7O8S708zHZ73md5p1rpYIX8sV2R3EueG8H9LfT7PcnzRb3a3RftSpcLxPNE9yVwbI/4v8/0y2+nlBPN7rTqXqxRP5IvtTeHeFMmw3O/rHOdXEy3ut+leqVY6WSC+L5VncxTjCv9vc11eT7J80K53tUb5VKHE/rRR/4/6fyT4n0GvOKO4pKgkMYlBryS1okQvMy+zhIFywA0tp9jQyh1YOQQrb2CABU0/SC8zFnMToArFsKhHBgCh9AGi'),
+]
@@ -0,0 +1,136 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module checks that the native ELF writer produces the same loadable images as the historical toolchain path, and measures its throughput.
+# The historical path wrote an ELF32 with makeelf, then relocated the section and widened the file to ELF64 with objcopy. The outputs of objcopy are recorded in elfwriterfixtures.py (see record_elf_writer_fixtures), so that the check needs neither makeelf nor objcopy.
+# The two paths do not lay out the headers identically, hence the comparison is done byte-for-byte on what the loaders consume: ELF class, entry point, and the address and content of the loadable segments.
+
+from params.runparams import PATH_TO_TMP, NO_REMOVE_TMPFILES
+from common.bytestoelf import gen_elf, parse_elf_load_segments, read_elf_load_segments
+from benchmarking.elfwriterfixtures import ELF_WRITER_FIXTURES
+
+import base64
+import json
+import os
+import random
+import subprocess
+import time
+import zlib
+
+ELFWRITERPERF_SECTION_ADDRS = [None, 0x80000000, 0x1000]
+ELF_WRITER_FIXTURE_START_ADDRS = [0, 0x40]
+ELF_WRITER_FIXTURE_SIZES = [64, 1000]
+
+# @return a list of argument tuples (inbytes, start_addr, section_addr, is_64bit).
+def _gen_elf_writer_inputs(num_elfs: int, elf_size: int, seed: int):
+    random.seed(seed)
+    ret = []
+    for _ in range(num_elfs):
+        inbytes = random.randbytes(elf_size)
+        section_addr = random.choice(ELFWRITERPERF_SECTION_ADDRS)
+        start_addr = 4*random.randrange(elf_size // 4)
+        ret.append((inbytes, start_addr, section_addr, bool(random.getrandbits(1))))
+    return ret
+
+###
+# Fixtures
+###
+
+# @return the section content of the fixtures of the given size.
+def _gen_elf_writer_fixture_content(content_size: int) -> bytes:
+    return bytes((byte_id * 167 + 13) & 0xff for byte_id in range(content_size))
+
+# @brief records the outputs of objcopy for the historical relocation and widening commands, and writes them to elfwriterfixtures.py.
+# The ELF32 inputs of objcopy, which makeelf used to write with the section at the entry point, are written by gen_elf.
+# @param objcopy_path an objcopy that reads and writes little-endian ELF files, e.g., riscv64-unknown-elf-objcopy, or the objcopy of the host with its generic targets.
+# @param elf32_target, elf64_target the names of the ELF targets of objcopy_path, e.g., elf32-littleriscv and elf64-littleriscv for riscv64-unknown-elf-objcopy.
+# @return the path to the fixture module.
+def record_elf_writer_fixtures(objcopy_path: str = 'objcopy', elf32_target: str = 'elf32-little', elf64_target: str = 'elf64-little') -> str:
+    objcopy_version = subprocess.run([objcopy_path, '--version'], capture_output=True, text=True, check=True).stdout.splitlines()[0]
+    toolchain_in_path = os.path.join(PATH_TO_TMP, 'elfwriterfixture_in.elf')
+    toolchain_out_path = os.path.join(PATH_TO_TMP, 'elfwriterfixture_out.elf')
+    fixture_lines = []
+    for is_64bit in (False, True):
+        for section_addr in ELFWRITERPERF_SECTION_ADDRS:
+            for start_addr in ELF_WRITER_FIXTURE_START_ADDRS:
+                for content_size in ELF_WRITER_FIXTURE_SIZES:
+                    gen_elf(_gen_elf_writer_fixture_content(content_size), start_addr, None, toolchain_in_path, False)
+                    # Same commands as the historical path.
+                    objcopy_cmd = [objcopy_path, '-I', elf32_target]
+                    if section_addr is not None:
+                        objcopy_cmd += ['--change-section-address', f".text.init={hex(section_addr)}"]
+                    if is_64bit:
+                        objcopy_cmd += ['-O', elf64_target]
+                    subprocess.run(objcopy_cmd + [toolchain_in_path, toolchain_out_path], check=True)
+                    with open(toolchain_out_path, 'rb') as f:
+                        toolchain_elf_str = base64.b64encode(zlib.compress(f.read(), 9)).decode()
+                    fixture_lines.append(f"    ({hex(start_addr)}, {hex(section_addr) if section_addr is not None else None}, {is_64bit}, {content_size}, '{toolchain_elf_str}'),")
+    if not NO_REMOVE_TMPFILES:
+        os.remove(toolchain_in_path)
+        os.remove(toolchain_out_path)
+
+    fixtures_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'elfwriterfixtures.py')
+    with open(fixtures_path, 'w') as f:
+        f.write('\n'.join([
+            "# Copyright 2023 Flavien Solt, ETH Zurich.",
+            "# Licensed under the General Public License, Version 3.0, see LICENSE for details.",
+            "# SPDX-License-Identifier: GPL-3.0-only",
+            "",
+            "# This module contains the ELF files of the historical toolchain path, recorded by record_elf_writer_fixtures in elfwriterperf.py.",
+            f"# Recorded with `{objcopy_path}` ({objcopy_version}), targets {elf32_target} and {elf64_target}.",
+            "",
+            "# Tuples (start_addr, section_addr, is_64bit, content size, base64 of the zlib-compressed output of objcopy).",
+            "ELF_WRITER_FIXTURES = [",
+        ] + fixture_lines + ["]", ""]))
+    print(f"Recorded {len(fixture_lines)} ELF writer fixtures to {fixtures_path}.")
+    return fixtures_path
+
+###
+# Checks
+###
+
+# @brief checks that the native ELF writer produces ELF files equivalent to the recorded toolchain outputs.
+# @return the number of checked fixtures.
+def check_elf_writer_equivalence() -> int:
+    native_path = os.path.join(PATH_TO_TMP, 'elfwriterequiv_native.elf')
+    for start_addr, section_addr, is_64bit, content_size, toolchain_elf_str in ELF_WRITER_FIXTURES:
+        gen_elf(_gen_elf_writer_fixture_content(content_size), start_addr, section_addr, native_path, is_64bit)
+        native_elf = read_elf_load_segments(native_path)
+        toolchain_elf = parse_elf_load_segments(zlib.decompress(base64.b64decode(toolchain_elf_str)))
+        assert native_elf == toolchain_elf, f"ELF writer mismatch for start_addr={hex(start_addr)}, section_addr={hex(section_addr) if section_addr is not None else None}, is_64bit={is_64bit}, content_size={content_size}."
+    if not NO_REMOVE_TMPFILES:
+        os.remove(native_path)
+    return len(ELF_WRITER_FIXTURES)
+
+###
+# Benchmark
+###
+
+# @return the number of ELF files written per second by the given writer.
+def _measure_elfs_per_second(elf_writer, all_inputs: list, elfpath: str) -> float:
+    start_time = time.time()
+    for inbytes, start_addr, section_addr, is_64bit in all_inputs:
+        elf_writer(inbytes, start_addr, section_addr, elfpath, is_64bit)
+    ret = len(all_inputs) / (time.time() - start_time)
+    if not NO_REMOVE_TMPFILES:
+        os.remove(elfpath)
+    return ret
+
+# @return the path to the json file containing the results.
+def benchmark_elf_writer(num_elfs: int, elf_size: int, seed: int = 0):
+    print(f"Checked the native ELF writer against {check_elf_writer_equivalence()} recorded toolchain outputs.")
+
+    all_inputs = _gen_elf_writer_inputs(num_elfs, elf_size, seed)
+    results = {
+        'num_elfs': num_elfs,
+        'elf_size': elf_size,
+        'native_elfs_per_second': _measure_elfs_per_second(gen_elf, all_inputs, os.path.join(PATH_TO_TMP, 'elfwriterperf_native.elf')),
+    }
+    print(f"Native writer: {results['native_elfs_per_second']:.2f} ELFs/s")
+
+    json_path = os.path.join(PATH_TO_TMP, f"elfwriterperf_{num_elfs}_{elf_size}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved ELF writer performance results to', json_path)
+    return json_path
@@ -7,13 +7,17 @@
 from params.runparams import PATH_TO_TMP
 from common.spike import calibrate_spikespeed
 from common.profiledesign import profile_get_medeleg_mask
-from cascade.fuzzfromdescriptor import run_rtl
+from cascade.fuzzfromdescriptor import run_rtl_batch
+from common.scheduler import JOB_STATUS_DONE
+from common.designcontext import gen_design_job_scheduler
 from top.fuzzdesign import gen_new_test_instance
 
-import multiprocessing as mp
 import json
 import os
 
+# The number of programs per round, whose Spike resolutions run as one batch.
+FUZZPERF_BATCH_SIZE = 16
+
 def _time_measurement_worker(design_name: str, worker_randseed: int, expected_run_duration_seconds_per_worker: float):
     assert expected_run_duration_seconds_per_worker > 0
     assert worker_randseed >= 0
@@ -25,20 +29,24 @@ def _time_measurement_worker(design_name: str, worker_randseed: int, expected_ru
 
     round_id = 0
     while cumul_time_seconds_spent_in_gen_bbs + cumul_time_seconds_spent_in_spike_resol + cumul_time_seconds_spent_in_gen_elf + cumul_time_seconds_spent_in_rtl_sim < expected_run_duration_seconds_per_worker:
-        curr_seed = 1000000 * worker_randseed + round_id
-        memsize, _, _, nmax_bbs, authorize_privileges = gen_new_test_instance(design_name, curr_seed, True)
-
-        try:
-            time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf, time_seconds_spent_in_rtl_sim = run_rtl(memsize, design_name, curr_seed, nmax_bbs, authorize_privileges, False)
-        except Exception as e:
-            print('Exception in time-measuring process with design', design_name, 'randseed', worker_randseed, 'and round id', round_id, ':', e)
-            continue
-
-        cumul_time_seconds_spent_in_gen_bbs += time_seconds_spent_in_gen_bbs
-        cumul_time_seconds_spent_in_spike_resol += time_seconds_spent_in_spike_resol
-        cumul_time_seconds_spent_in_gen_elf += time_seconds_spent_in_gen_elf
-        cumul_time_seconds_spent_in_rtl_sim += time_seconds_spent_in_rtl_sim
-        round_id += 1
+        # The programs of a round share one batch of Spike resolutions.
+        test_descriptors = []
+        for _ in range(FUZZPERF_BATCH_SIZE):
+            curr_seed = 1000000 * worker_randseed + round_id
+            memsize, _, _, nmax_bbs, authorize_privileges = gen_new_test_instance(design_name, curr_seed, True)
+            test_descriptors.append((memsize, design_name, curr_seed, nmax_bbs, authorize_privileges))
+            round_id += 1
+
+        for (_, _, curr_seed, _, _), gathered_times in zip(test_descriptors, run_rtl_batch(test_descriptors, False)):
+            if isinstance(gathered_times, Exception):
+                print('Exception in time-measuring process with design', design_name, 'randseed', worker_randseed, 'and round id', curr_seed - 1000000 * worker_randseed, ':', gathered_times)
+                continue
+            time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf, time_seconds_spent_in_rtl_sim = gathered_times
+
+            cumul_time_seconds_spent_in_gen_bbs += time_seconds_spent_in_gen_bbs
+            cumul_time_seconds_spent_in_spike_resol += time_seconds_spent_in_spike_resol
+            cumul_time_seconds_spent_in_gen_elf += time_seconds_spent_in_gen_elf
+            cumul_time_seconds_spent_in_rtl_sim += time_seconds_spent_in_rtl_sim
         # print(cumul_time_seconds_spent_in_gen_bbs + cumul_time_seconds_spent_in_spike_resol + cumul_time_seconds_spent_in_gen_elf + cumul_time_seconds_spent_in_rtl_sim, '/', expected_run_duration_seconds_per_worker)
     return cumul_time_seconds_spent_in_gen_bbs, cumul_time_seconds_spent_in_spike_resol, cumul_time_seconds_spent_in_gen_elf, cumul_time_seconds_spent_in_rtl_sim
 
@@ -63,15 +71,20 @@ def benchmark_collect_construction_performance(num_workers: int):
     cumul_time_seconds_spent_in_rtl_sim = dict()
 
     for design_name in design_names_for_fuzzperf:
-        worker_instances = ((design_name, i, TOTAL_DURATION_PER_DESIGN_SECONDS/num_workers) for i in range(num_workers))
+        worker_instances = [(design_name, i, TOTAL_DURATION_PER_DESIGN_SECONDS/num_workers) for i in range(num_workers)]
 
         calibrate_spikespeed()
         profile_get_medeleg_mask(design_name)
 
         print(f"Starting performance testing of `{design_name}` on {num_workers} processes.")
 
-        with mp.Pool(num_workers) as p:
-            results = p.starmap(_time_measurement_worker, worker_instances)
+        results = []
+        def on_result(job_result):
+            if job_result.status != JOB_STATUS_DONE:
+                raise Exception(f"Time-measuring worker failed with design {design_name}: {job_result.error_str}")
+            results.append(job_result.ret)
+            return False
+        gen_design_job_scheduler(_time_measurement_worker, design_name, num_workers).run(lambda worker_id: worker_instances[worker_id] if worker_id < num_workers else None, on_result)
 
         cumul_time_seconds_spent_in_gen_bbs[design_name]     = sum(map(lambda s: s[0], results))
         cumul_time_seconds_spent_in_spike_resol[design_name] = sum(map(lambda s: s[1], results))
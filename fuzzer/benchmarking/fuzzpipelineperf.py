@@ -0,0 +1,78 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module measures the throughput, in tests per hour, of the monolithic workers of fuzzdesign against its pipelined mode, for the same number of processes and the same test instances.
+# For the pipelined mode, it also reports the occupancy of the generation and simulation stages, to choose the number of generators.
+
+from params.runparams import PATH_TO_TMP
+from common.spike import calibrate_spikespeed
+from common.profiledesign import profile_get_medeleg_mask
+from common.scheduler import JOB_STATUS_DONE
+from common.designcontext import gen_design_job_scheduler, gen_design_pipeline
+from cascade.fuzzfromdescriptor import gen_new_test_instance, fuzz_single_from_descriptor, gen_test_for_pipeline, run_test_for_pipeline, MAX_RTL_ELF_SIZE_BYTES
+
+import json
+import os
+import random
+import time
+
+# @return a list of num_tests descriptors (memsize, design_name, randseed, nmax_bbs, authorize_privileges), identical for all the setups.
+def _gen_test_descriptors(design_name: str, num_tests: int, seed_offset: int):
+    ret = []
+    for randseed in range(seed_offset, seed_offset + num_tests):
+        random.seed(randseed)
+        ret.append(gen_new_test_instance(design_name, randseed, True))
+    return ret
+
+# @param num_generators 0 for the monolithic workers.
+# @return a pair (tests per hour, occupancy statistics or None).
+def _measure_setup(design_name: str, num_cores: int, num_generators: int, test_descriptors: list, seed_offset: int):
+    num_done_tests = 0
+    def on_result(job_result):
+        nonlocal num_done_tests
+        num_done_tests += job_result.status == JOB_STATUS_DONE
+        return False
+    def gen_job_args(job_id: int):
+        if job_id - seed_offset >= len(test_descriptors):
+            return None
+        if num_generators:
+            return test_descriptors[job_id - seed_offset] + (True,)
+        return test_descriptors[job_id - seed_offset] + (None, True)
+
+    start_time = time.time()
+    if num_generators:
+        pipeline = gen_design_pipeline(gen_test_for_pipeline, run_test_for_pipeline, design_name, num_generators, num_cores - num_generators, MAX_RTL_ELF_SIZE_BYTES)
+        num_tests = pipeline.run(gen_job_args, on_result, seed_offset)
+        occupancy_stats = pipeline.get_occupancy_stats()
+    else:
+        num_tests = gen_design_job_scheduler(fuzz_single_from_descriptor, design_name, num_cores).run(gen_job_args, on_result, seed_offset)
+        occupancy_stats = None
+    duration = time.time() - start_time
+    if num_done_tests < num_tests:
+        print(f"  Warning: {num_tests - num_done_tests}/{num_tests} tests did not complete.")
+    return 3600 * num_tests / duration, occupancy_stats
+
+# @param num_generators_list the numbers of generator processes of the pipelined setups.
+# @return the path to the json file containing the results.
+def benchmark_fuzz_pipeline(design_name: str, num_cores: int, num_tests: int, num_generators_list: list = None, seed_offset: int = 0):
+    if num_generators_list is None:
+        num_generators_list = sorted(set(filter(lambda num_generators: 0 < num_generators < num_cores, (num_cores // 4, num_cores // 2, (3 * num_cores) // 4))))
+    calibrate_spikespeed()
+    profile_get_medeleg_mask(design_name)
+    test_descriptors = _gen_test_descriptors(design_name, num_tests, seed_offset)
+
+    results = dict()
+    for num_generators in [0] + list(num_generators_list):
+        setup_name = 'monolithic' if num_generators == 0 else f"pipeline_{num_generators}gen_{num_cores - num_generators}sim"
+        tests_per_hour, occupancy_stats = _measure_setup(design_name, num_cores, num_generators, test_descriptors, seed_offset)
+        results[setup_name] = {'tests_per_hour': tests_per_hour, 'occupancy': occupancy_stats}
+        print(f"{setup_name}: {tests_per_hour:.0f} tests per hour.")
+        if occupancy_stats:
+            print(f"  Generators: {100*occupancy_stats['producer_busy']:.1f}% busy, {100*occupancy_stats['producer_blocked']:.1f}% blocked. Simulators: {100*occupancy_stats['consumer_busy']:.1f}% busy, {100*occupancy_stats['consumer_blocked']:.1f}% starved. Queue: {occupancy_stats['queue_mean_num_ready']:.2f}/{occupancy_stats['queue_num_slots']}.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"fuzzpipelineperf_{design_name}_{num_cores}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved fuzz pipeline performance results to', json_path)
+    return json_path
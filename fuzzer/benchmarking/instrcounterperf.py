@@ -0,0 +1,65 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module measures the basic block generation time depending on the maximal number of instructions, with the incremental instruction counter and with the previous full recount.
+
+from params.runparams import PATH_TO_TMP
+from params.fuzzparams import get_max_num_instructions_upperbound
+from common.designcfgs import get_design_boot_addr
+from common.profiledesign import profile_get_medeleg_mask
+from cascade.basicblock import gen_basicblocks
+from cascade.fuzzfromdescriptor import gen_new_test_instance
+from cascade.fuzzerstate import FuzzerState
+
+import json
+import os
+import random
+import time
+
+# The previous instruction count, which sums the lengths of all the basic blocks at each call, as a reference.
+class _RecountingFuzzerState(FuzzerState):
+    def get_num_fuzzing_instructions_sofar(self):
+        return self._count_fuzzing_instructions()
+
+# @return a pair (generation duration in seconds, number of generated instructions).
+def _measure_gen_basicblocks(fuzzerstate_class, design_name: str, randseed: int, nmax_instructions: int):
+    # Same parameters as the micro-benchmark of programs with few instructions
+    memsize, nmax_bbs = 1 << 20, 10000
+    random.seed(randseed)
+    memsize, _, _, _, authorize_privileges = gen_new_test_instance(design_name, randseed, True, memsize, nmax_bbs)
+    random.seed(randseed)
+    start_time = time.time()
+    fuzzerstate = fuzzerstate_class(get_design_boot_addr(design_name), design_name, memsize, randseed, nmax_bbs, authorize_privileges, nmax_instructions)
+    gen_basicblocks(fuzzerstate)
+    return time.time() - start_time, fuzzerstate.get_num_fuzzing_instructions_sofar()
+
+# @param max_num_instructions the largest instruction upper bound. By default, taken from the MAX_NUM_INSTRUCTIONS_UPPERBOUND environment variable, or 100000.
+# @return the path to the json file containing the results.
+def benchmark_instr_counter(design_name: str, num_programs: int = 5, max_num_instructions: int = None):
+    if max_num_instructions is None:
+        max_num_instructions = get_max_num_instructions_upperbound()
+        if max_num_instructions is None:
+            max_num_instructions = 100000
+    profile_get_medeleg_mask(design_name)
+
+    results = dict()
+    nmax_instructions = 1
+    while nmax_instructions <= max_num_instructions:
+        cumul_seconds = {'recount': 0.0, 'incremental': 0.0}
+        cumul_num_instrs = 0
+        for randseed in range(num_programs):
+            for counter_name, fuzzerstate_class in (('recount', _RecountingFuzzerState), ('incremental', FuzzerState)):
+                gen_seconds, num_instrs = _measure_gen_basicblocks(fuzzerstate_class, design_name, randseed, nmax_instructions)
+                cumul_seconds[counter_name] += gen_seconds
+            # Both counters generate the same program
+            cumul_num_instrs += num_instrs
+        results[nmax_instructions] = {'num_instrs': cumul_num_instrs / num_programs, 'recount_seconds': cumul_seconds['recount'] / num_programs, 'incremental_seconds': cumul_seconds['incremental'] / num_programs}
+        print(f"MAX_NUM_INSTRUCTIONS_UPPERBOUND={nmax_instructions}: {results[nmax_instructions]['num_instrs']:.0f} instructions, {results[nmax_instructions]['recount_seconds']:.3f} s with the recount, {results[nmax_instructions]['incremental_seconds']:.3f} s with the incremental counter.")
+        nmax_instructions *= 10
+
+    json_path = os.path.join(PATH_TO_TMP, f"instrcounterperf_{design_name}_{max_num_instructions}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved instruction counter performance results to', json_path)
+    return json_path
@@ -0,0 +1,144 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module checks the template-based instruction encoding against the encoder functions of the rv modules, and measures the memory footprint and encoding throughput of the instruction objects.
+
+from params.runparams import PATH_TO_TMP
+from params.fuzzparams import MAX_NUM_PICKABLE_REGS
+from rv.util import INSTRUCTION_IDS, PARAM_SIZES_BITS_64, PARAM_IS_SIGNED
+from rv.encodingtemplates import get_encoder_fn
+from cascade.cfinstructionclasses import *
+
+import json
+import os
+import random
+import statistics
+import time
+import tracemalloc
+
+# The throughputs are medians over this number of repetitions, since a single run is sensitive to the load of the machine.
+INSTRENCODINGPERF_NUM_REPS = 7
+
+# For each concrete instruction class: a function that builds an instance from an instruction string, random registers, a rounding mode and an immediate,
+# and the names of the attributes in the order in which the encoder functions of the rv modules expect them.
+__INSTR_CLASS_DESCS = {
+    R12DInstruction:        (lambda s, r, rm, imm: R12DInstruction(s, r[0], r[1], r[2]),                             ('rd', 'rs1', 'rs2')),
+    ImmRdInstruction:       (lambda s, r, rm, imm: ImmRdInstruction(s, r[0], imm, True),                             ('rd', 'imm')),
+    RegImmInstruction:      (lambda s, r, rm, imm: RegImmInstruction(s, r[0], r[1], imm, True),                      ('rd', 'rs1', 'imm')),
+    BranchInstruction:      (lambda s, r, rm, imm: BranchInstruction(s, r[0], r[1], imm, bool(rm & 1), True),        ('rs1', 'rs2', 'imm')),
+    JALInstruction:         (lambda s, r, rm, imm: JALInstruction(s, r[0], imm),                                     ('rd', 'imm')),
+    JALRInstruction:        (lambda s, r, rm, imm: JALRInstruction(s, r[0], r[1], imm, 0, True),                     ('rd', 'rs1', 'imm')),
+    SpecialInstruction:     (lambda s, r, rm, imm: SpecialInstruction(s, r[0], r[1]),                                ('rd', 'rs1')),
+    EcallEbreakInstruction: (lambda s, r, rm, imm: EcallEbreakInstruction(s),                                        ()),
+    IntLoadInstruction:     (lambda s, r, rm, imm: IntLoadInstruction(s, r[0], r[1], imm, 0, True),                  ('rd', 'rs1', 'imm')),
+    IntStoreInstruction:    (lambda s, r, rm, imm: IntStoreInstruction(s, r[0], r[1], imm, 0, True),                 ('rs1', 'rs2', 'imm')),
+    FloatLoadInstruction:   (lambda s, r, rm, imm: FloatLoadInstruction(s, r[0], r[1], imm, 0, True),                ('frd', 'rs1', 'imm')),
+    FloatStoreInstruction:  (lambda s, r, rm, imm: FloatStoreInstruction(s, r[0], r[1], imm, 0, True),               ('rs1', 'frs2', 'imm')),
+    FloatToIntInstruction:  (lambda s, r, rm, imm: FloatToIntInstruction(s, r[0], r[1], rm, True),                   ('rd', 'frs1', 'rm')),
+    IntToFloatInstruction:  (lambda s, r, rm, imm: IntToFloatInstruction(s, r[0], r[1], rm, True),                   ('frd', 'rs1', 'rm')),
+    Float4Instruction:      (lambda s, r, rm, imm: Float4Instruction(s, r[0], r[1], r[2], r[3], rm, True),           ('frd', 'frs1', 'frs2', 'frs3', 'rm')),
+    Float3Instruction:      (lambda s, r, rm, imm: Float3Instruction(s, r[0], r[1], r[2], rm, True),                 ('frd', 'frs1', 'frs2', 'rm')),
+    Float3NoRmInstruction:  (lambda s, r, rm, imm: Float3NoRmInstruction(s, r[0], r[1], r[2], True),                 ('frd', 'frs1', 'frs2')),
+    Float2Instruction:      (lambda s, r, rm, imm: Float2Instruction(s, r[0], r[1], rm, True),                       ('frd', 'frs1', 'rm')),
+    FloatIntRd2Instruction: (lambda s, r, rm, imm: FloatIntRd2Instruction(s, r[0], r[1], r[2], True),                ('rd', 'frs1', 'frs2')),
+    FloatIntRd1Instruction: (lambda s, r, rm, imm: FloatIntRd1Instruction(s, r[0], r[1], True),                      ('rd', 'frs1')),
+    FloatIntRs1Instruction: (lambda s, r, rm, imm: FloatIntRs1Instruction(s, r[0], r[1], True),                      ('frd', 'rs1')),
+    CSRRegInstruction:      (lambda s, r, rm, imm: CSRRegInstruction(s, r[0], r[1], imm & 0xfff),                    ('rd', 'rs1', 'csr_id')),
+    CSRImmInstruction:      (lambda s, r, rm, imm: CSRImmInstruction(s, r[0], r[1] & 0x1f, imm & 0xfff),             ('rd', 'uimm', 'csr_id')),
+}
+
+# @return the pairs (instruction class, instruction string) for all the instruction strings supported by the instruction classes.
+def _get_all_instr_strs():
+    return [(instr_class, instr_str) for instr_class in __INSTR_CLASS_DESCS for instr_str in instr_class.authorized_instr_strs]
+
+# @return a random immediate that fits the last parameter of the given instruction string.
+def _gen_random_imm(instr_str: str) -> int:
+    instr_id = INSTRUCTION_IDS[instr_str]
+    if not PARAM_SIZES_BITS_64[instr_id]:
+        return 0
+    imm_size = PARAM_SIZES_BITS_64[instr_id][-1]
+    if PARAM_IS_SIGNED[instr_id][-1]:
+        imm = random.choice((-(1 << (imm_size-1)), (1 << (imm_size-1)) - 1, random.randrange(-(1 << (imm_size-1)), 1 << (imm_size-1))))
+    else:
+        imm = random.choice((0, (1 << imm_size) - 1, random.randrange(1 << imm_size)))
+    # Jumps and branches have even offsets.
+    if instr_str in ('jal', 'beq', 'bne', 'blt', 'bge', 'bltu', 'bgeu'):
+        imm &= ~1
+    return imm
+
+def _gen_random_instr(instr_class, instr_str: str):
+    regs = [random.randrange(MAX_NUM_PICKABLE_REGS) for _ in range(4)]
+    return __INSTR_CLASS_DESCS[instr_class][0](instr_str, regs, random.randrange(8), _gen_random_imm(instr_str))
+
+# @return the encoding of the instruction by the encoder function of the rv modules, as the historical string dispatch did.
+def _gen_reference_bytecode(instr) -> int:
+    return get_encoder_fn(instr.instr_str)(*[getattr(instr, attr_name) for attr_name in __INSTR_CLASS_DESCS[type(instr)][1]])
+
+# @brief checks the encoding of every instruction string supported by the instruction classes, for random operands.
+# @return the number of checked instructions.
+def check_instr_encoding_equivalence(num_instrs_per_instr_str: int = 1000, seed: int = 0) -> int:
+    random.seed(seed)
+    num_checked = 0
+    for instr_class, instr_str in _get_all_instr_strs():
+        for _ in range(num_instrs_per_instr_str):
+            instr = _gen_random_instr(instr_class, instr_str)
+            assert not hasattr(instr, '__dict__'), f"Instruction class {instr_class.__name__} has a __dict__. All the classes of the hierarchy must declare __slots__."
+            bytecode, ref_bytecode = instr.gen_bytecode_int(False), _gen_reference_bytecode(instr)
+            assert bytecode == ref_bytecode, f"Encoding mismatch for `{instr_str}` ({instr_class.__name__}): {hex(bytecode)} instead of {hex(ref_bytecode)}."
+            num_checked += 1
+
+    # The batch encoder must match the per-instruction encoder.
+    instrs = [_gen_random_instr(instr_class, instr_str) for instr_class, instr_str in _get_all_instr_strs()]
+    for is_spike_resolution in (False, True):
+        bytecode_array = gen_bytecode_array(instrs, is_spike_resolution)
+        assert bytecode_array.tobytes() == b''.join(map(lambda instr: instr.gen_bytecode_int(is_spike_resolution).to_bytes(4, 'little'), instrs))
+    return num_checked
+
+# @return the number of bytes per instruction object, including the objects that it references exclusively.
+def _measure_bytes_per_instr(instr_class, instr_str: str, num_instrs: int) -> float:
+    tracemalloc.start()
+    start_size = tracemalloc.get_traced_memory()[0]
+    instrs = [_gen_random_instr(instr_class, instr_str) for _ in range(num_instrs)]
+    end_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Subtract the list itself
+    return (end_size - start_size) / num_instrs - 8
+
+# @param encode_fn a function that encodes num_instrs instructions.
+# @return the median number of encoded instructions per second of CPU time.
+def _measure_instrs_per_second(encode_fn, num_instrs: int) -> float:
+    all_durations = []
+    for _ in range(INSTRENCODINGPERF_NUM_REPS):
+        start_time = time.process_time()
+        encode_fn()
+        all_durations.append(time.process_time() - start_time)
+    return num_instrs / statistics.median(all_durations)
+
+# @return the path to the json file containing the results.
+def benchmark_instr_encoding(num_instrs: int = 200000, seed: int = 0):
+    num_checked = check_instr_encoding_equivalence(seed=seed)
+    print(f"Encoding equivalence checked on {num_checked} instructions ({len(_get_all_instr_strs())} instruction strings).")
+
+    random.seed(seed)
+    results = {'bytes_per_instr': dict()}
+    for instr_class in __INSTR_CLASS_DESCS:
+        results['bytes_per_instr'][instr_class.__name__] = _measure_bytes_per_instr(instr_class, instr_class.authorized_instr_strs[0], 10000)
+        print(f"  {instr_class.__name__}: {results['bytes_per_instr'][instr_class.__name__]:.1f} bytes per instruction")
+
+    # A mix of all the instruction strings, split into basic blocks
+    all_instr_strs = _get_all_instr_strs()
+    instrs = [_gen_random_instr(*random.choice(all_instr_strs)) for _ in range(num_instrs)]
+    bbs = [instrs[bb_start:bb_start+100] for bb_start in range(0, num_instrs, 100)]
+
+    results['reference_instrs_per_second'] = _measure_instrs_per_second(lambda: [_gen_reference_bytecode(instr).to_bytes(4, 'little') for instr in instrs], num_instrs)
+    results['instrs_per_second'] = _measure_instrs_per_second(lambda: [instr.gen_bytecode_int(False).to_bytes(4, 'little') for instr in instrs], num_instrs)
+    results['batch_instrs_per_second'] = _measure_instrs_per_second(lambda: [gen_bytecode_array(bb, False).tobytes() for bb in bbs], num_instrs)
+
+    print(f"Encoded instructions per second: {results['reference_instrs_per_second']:.0f} with the encoder functions, {results['instrs_per_second']:.0f} with the templates, {results['batch_instrs_per_second']:.0f} with the batch encoder.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"instrencodingperf_{num_instrs}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved instruction encoding performance results to', json_path)
+    return json_path
@@ -0,0 +1,99 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module evaluates the integer interpreter (cascade/intinterpreter) that replaces Spike in the spike resolution of the supported programs.
+# - check_int_interpreter_equivalence compares the interpreted register dumps and final registers against the full Spike dumps.
+# - benchmark_int_interpreter reports the fraction of supported programs and the resolution latency, with the interpreter and, if Spike is installed, with Spike.
+
+from params.runparams import PATH_TO_TMP, NO_REMOVE_TMPFILES
+from common.designcfgs import get_design_march_flags_nocompressed
+from common.profiledesign import profile_get_medeleg_mask
+from common.scratch import release_scratch_file
+from common.spike import SPIKE_STARTADDR, calibrate_spikespeed, run_trace_regs_at_pc_locs
+from cascade.genelf import gen_elf_from_bbs, gen_program_image
+from cascade.intinterpreter import interpret_spike_resolution
+from cascade.spikeresolution import gen_regdump_reqs
+from benchmarking.programimageperf import _gen_program_without_spike
+
+import json
+import os
+import shutil
+import time
+
+# @return a pair (the register values of regdump_reqs, the final integer register values) dumped by Spike.
+def _run_spike_full_resolution(fuzzerstate, image, regdump_reqs):
+    elfpath = gen_elf_from_bbs(fuzzerstate, True, 'intinterpreterperf', fuzzerstate.instance_to_str(), SPIKE_STARTADDR, image)
+    regvals, (finalintregvals, _) = run_trace_regs_at_pc_locs(fuzzerstate.instance_to_str(), elfpath, get_design_march_flags_nocompressed(fuzzerstate.design_name), SPIKE_STARTADDR, regdump_reqs, True, fuzzerstate.final_bb_base_addr+SPIKE_STARTADDR, 0, fuzzerstate.design_has_fpud)
+    if not NO_REMOVE_TMPFILES:
+        release_scratch_file(elfpath)
+    return regvals, finalintregvals
+
+# @brief checks that the interpreter agrees with Spike on all the programs that it supports. Requires Spike.
+# @return the number of programs supported by the interpreter.
+def check_int_interpreter_equivalence(design_name: str, num_programs: int = 10000, seed_offset: int = 0) -> int:
+    if shutil.which('spike') is None:
+        raise Exception("Spike is required to check the integer interpreter.")
+    calibrate_spikespeed()
+    profile_get_medeleg_mask(design_name)
+
+    num_supported = 0
+    for randseed in range(seed_offset, seed_offset + num_programs):
+        fuzzerstate = _gen_program_without_spike(design_name, randseed)
+        image = gen_program_image(fuzzerstate, True)
+        regdump_reqs = gen_regdump_reqs(fuzzerstate)
+        interpreted_resolution = interpret_spike_resolution(fuzzerstate, image, regdump_reqs)
+        if interpreted_resolution is None:
+            continue
+        num_supported += 1
+        interpreted_regvals, interpreted_finalintregvals = interpreted_resolution
+        spike_regvals, spike_finalintregvals = _run_spike_full_resolution(fuzzerstate, image, regdump_reqs)
+        for req_id, (interpreted_regval, spike_regval) in enumerate(zip(interpreted_regvals, spike_regvals)):
+            assert interpreted_regval == spike_regval, f"Register dump mismatch for x{regdump_reqs[req_id][2]} at address {hex(SPIKE_STARTADDR + regdump_reqs[req_id][0])} on program {fuzzerstate.instance_to_str()}: interpreted `{hex(interpreted_regval)}`, Spike dumped `{hex(spike_regval)}`."
+        assert len(interpreted_regvals) == len(spike_regvals)
+        for reg_id in range(1, fuzzerstate.num_pickable_regs):
+            assert interpreted_finalintregvals[reg_id] == spike_finalintregvals[reg_id], f"Final register mismatch for x{reg_id} on program {fuzzerstate.instance_to_str()}: interpreted `{hex(interpreted_finalintregvals[reg_id])}`, Spike dumped `{hex(spike_finalintregvals[reg_id])}`."
+
+    print(f"The integer interpreter matches Spike on the {num_supported} supported programs out of {num_programs}.")
+    return num_supported
+
+# @return the path to the json file containing the results.
+def benchmark_int_interpreter(design_name: str, num_programs: int = 1000, seed_offset: int = 0):
+    has_spike = shutil.which('spike') is not None
+    if has_spike:
+        calibrate_spikespeed()
+    else:
+        print("Spike is not installed, skipping the Spike latency measurements.")
+    profile_get_medeleg_mask(design_name)
+
+    results = {'is_supported': [], 'interpreter_ms': [], 'spike_ms': []}
+    for randseed in range(seed_offset, seed_offset + num_programs):
+        fuzzerstate = _gen_program_without_spike(design_name, randseed)
+        image = gen_program_image(fuzzerstate, True)
+        regdump_reqs = gen_regdump_reqs(fuzzerstate)
+
+        start_time = time.time()
+        interpreted_resolution = interpret_spike_resolution(fuzzerstate, image, regdump_reqs)
+        interpreter_seconds = time.time() - start_time
+        results['is_supported'].append(interpreted_resolution is not None)
+        if interpreted_resolution is None:
+            continue
+        results['interpreter_ms'].append(1000*interpreter_seconds)
+
+        if has_spike:
+            start_time = time.time()
+            _run_spike_full_resolution(fuzzerstate, image, regdump_reqs)
+            results['spike_ms'].append(1000*(time.time() - start_time))
+
+    num_supported = sum(results['is_supported'])
+    print(f"{num_supported}/{num_programs} programs are supported by the integer interpreter.")
+    if num_supported:
+        print(f"Resolution latency per supported program: {sum(results['interpreter_ms'])/num_supported:.2f} ms with the interpreter.")
+        if has_spike:
+            print(f"Resolution latency per supported program: {sum(results['spike_ms'])/num_supported:.2f} ms with Spike.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"intinterpreterperf_{design_name}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved integer interpreter performance results to', json_path)
+    return json_path
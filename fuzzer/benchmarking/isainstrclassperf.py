@@ -0,0 +1,83 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module checks that the compiled ISA class tables generate the same programs as the per-instruction filtering, and measures the per-instruction sampling cost inside gen_basicblocks.
+
+from params.runparams import PATH_TO_TMP
+from common.designcfgs import get_design_boot_addr
+from common.profiledesign import profile_get_medeleg_mask
+from cascade.fuzzfromdescriptor import gen_new_test_instance
+import cascade.basicblock as basicblock
+import cascade.randomize.pickisainstrclass as pickisainstrclass
+
+import json
+import os
+import random
+import time
+
+# @brief generates one program and measures the time spent in gen_next_isainstrclass.
+# @return a triple (program summary, number of picked instruction classes, seconds spent picking them).
+def _gen_program_and_time_isainstrclass(design_name: str, randseed: int, use_compiled_tables: bool):
+    from cascade.fuzzerstate import FuzzerState
+    pickisainstrclass.USE_COMPILED_ISAINSTRCLASS_TABLES = use_compiled_tables
+
+    num_picks = 0
+    pick_seconds = 0.0
+    orig_gen_next_isainstrclass = basicblock.gen_next_isainstrclass
+    def timed_gen_next_isainstrclass(fuzzerstate):
+        nonlocal num_picks, pick_seconds
+        start_time = time.perf_counter()
+        ret = orig_gen_next_isainstrclass(fuzzerstate)
+        pick_seconds += time.perf_counter() - start_time
+        num_picks += 1
+        return ret
+
+    random.seed(randseed)
+    memsize, _, _, nmax_bbs, authorize_privileges = gen_new_test_instance(design_name, randseed, True)
+    random.seed(randseed)
+    fuzzerstate = FuzzerState(get_design_boot_addr(design_name), design_name, memsize, randseed, nmax_bbs, authorize_privileges)
+    basicblock.gen_next_isainstrclass = timed_gen_next_isainstrclass
+    try:
+        basicblock.gen_basicblocks(fuzzerstate)
+    finally:
+        basicblock.gen_next_isainstrclass = orig_gen_next_isainstrclass
+
+    program_summary = (fuzzerstate.bb_start_addr_seq, [[(type(instr).__name__, getattr(instr, "instr_str", None)) for instr in bb] for bb in fuzzerstate.instr_objs_seq], random.getstate())
+    return program_summary, num_picks, pick_seconds
+
+# @brief checks that both sampling methods generate identical programs, which implies identical distributions, and compares their costs.
+# @return the path to the json file containing the results.
+def benchmark_isainstrclass_tables(design_name: str, num_programs: int, seed_offset: int = 0):
+    profile_get_medeleg_mask(design_name)
+
+    num_picks = 0
+    ref_pick_seconds = 0.0
+    compiled_pick_seconds = 0.0
+    num_tables = 0
+    for randseed in range(seed_offset, seed_offset+num_programs):
+        ref_program, ref_num_picks, curr_ref_pick_seconds = _gen_program_and_time_isainstrclass(design_name, randseed, False)
+        compiled_program, compiled_num_picks, curr_compiled_pick_seconds = _gen_program_and_time_isainstrclass(design_name, randseed, True)
+        assert ref_program == compiled_program, f"The compiled ISA class tables generate a different program for seed {randseed}."
+        assert ref_num_picks == compiled_num_picks
+        num_picks += ref_num_picks
+        ref_pick_seconds += curr_ref_pick_seconds
+        compiled_pick_seconds += curr_compiled_pick_seconds
+    pickisainstrclass.USE_COMPILED_ISAINSTRCLASS_TABLES = True
+
+    results = {
+        'design_name': design_name,
+        'num_programs': num_programs,
+        'num_picks': num_picks,
+        'ref_us_per_pick': 1e6 * ref_pick_seconds / num_picks,
+        'compiled_us_per_pick': 1e6 * compiled_pick_seconds / num_picks,
+    }
+    print(f"Identical programs for {num_programs} seeds ({num_picks} instruction class picks).")
+    print(f"Per-instruction filtering: {results['ref_us_per_pick']:.2f} us/pick")
+    print(f"Compiled tables:           {results['compiled_us_per_pick']:.2f} us/pick")
+
+    json_path = os.path.join(PATH_TO_TMP, f"isainstrclassperf_{design_name}_{num_programs}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved ISA class table performance results to', json_path)
+    return json_path
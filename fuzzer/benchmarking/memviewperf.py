@@ -0,0 +1,156 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module checks the interval-indexed MemoryView against the previous list-based implementation, and measures how both scale with fragmentation.
+
+from params.runparams import PATH_TO_TMP
+from cascade.memview import MemoryView, MEMVIEW_ALLOC_MAX_ATTEMPTS
+
+import json
+import os
+import random
+import time
+
+# The previous implementation of MemoryView, as a reference.
+class _ListMemoryView:
+    def __init__(self, memsize: int):
+        self.freepairs = [(0, memsize)]
+        self.memsize = memsize
+
+    def is_mem_free(self, addr: int):
+        for curr_pair in self.freepairs:
+            if addr < curr_pair[1]:
+                return curr_pair[0] <= addr
+        return False
+
+    def is_mem_range_free(self, start: int, end: int):
+        for curr_pair in self.freepairs:
+            if start < curr_pair[1]:
+                return start >= curr_pair[0] and end <= curr_pair[1]
+        return False
+
+    def get_available_contig_space(self, addr: int):
+        for curr_pair in self.freepairs:
+            if addr < curr_pair[1]:
+                if (addr >= curr_pair[0]):
+                    return curr_pair[1] - addr
+                else:
+                    return 0
+        return 0
+
+    def alloc_mem_range(self, start: int, alloc_size: int):
+        end = start + alloc_size
+        for curr_pair_id, curr_pair in enumerate(self.freepairs):
+            if start < curr_pair[1]:
+                assert start >= curr_pair[0] and end <= curr_pair[1], "The memory range to allocate is not free."
+                if start == curr_pair[0] and end == curr_pair[1]:
+                    self.freepairs = self.freepairs[:curr_pair_id] + self.freepairs[curr_pair_id+1:]
+                elif start == curr_pair[0]:
+                    self.freepairs = self.freepairs[:curr_pair_id] + [(end, curr_pair[1])] + self.freepairs[curr_pair_id+1:]
+                elif end == curr_pair[1]:
+                    self.freepairs = self.freepairs[:curr_pair_id] + [(curr_pair[0], start)] + self.freepairs[curr_pair_id+1:]
+                else:
+                    self.freepairs = self.freepairs[:curr_pair_id] + [(curr_pair[0], start)] + [(end, curr_pair[1])] + self.freepairs[curr_pair_id+1:]
+                return
+        raise ValueError("Trying to allocate a memory range that was already not free.")
+
+    def gen_random_free_addr(self, alignment_bits: int, min_space: int, left_bound: int, right_bound: int, max_attempts: int = MEMVIEW_ALLOC_MAX_ATTEMPTS):
+        left_bound  = max(left_bound, 0)
+        right_bound = min(right_bound, self.memsize)
+        for _ in range(max_attempts):
+            picked_addr = random.randrange((left_bound+(1 << alignment_bits)-1) >> alignment_bits, ((right_bound-min_space) >> alignment_bits)) << alignment_bits
+            if min_space == 0 or self.is_mem_range_free(picked_addr, picked_addr+min_space):
+                return picked_addr
+        return None
+
+    def get_allocated_ratio(self):
+        free_sum = sum(map(lambda p: p[1] - p[0], self.freepairs))
+        return (self.memsize - free_sum)/self.memsize
+
+# @brief allocates a random free range in both memory views, if possible.
+def _alloc_random_range(memviews: list, max_alloc_size: int):
+    start = random.randrange(memviews[0].memsize)
+    alloc_size = min(random.randint(1, max_alloc_size), memviews[0].get_available_contig_space(start))
+    if alloc_size:
+        for memview in memviews:
+            memview.alloc_mem_range(start, alloc_size)
+
+# @brief checks on random scenarios that the new and the reference memory views agree on every query, including the random streams of gen_random_free_addr.
+# Also checks that the exact sampling only returns suitable addresses, and that it reaches all of them on small memories.
+# @return the number of checked scenarios.
+def check_memview_equivalence(num_scenarios: int, seed: int = 0) -> int:
+    random.seed(seed)
+    for _ in range(num_scenarios):
+        memsize = 1 << random.randint(6, 12)
+        memview, ref_memview = MemoryView(memsize), _ListMemoryView(memsize)
+        for _ in range(random.randint(0, memsize // 8)):
+            _alloc_random_range([memview, ref_memview], 16)
+        assert memview.freepairs == ref_memview.freepairs
+        assert memview.get_allocated_ratio() == ref_memview.get_allocated_ratio()
+
+        for addr in range(-2, memsize+2):
+            assert memview.is_mem_free(addr) == ref_memview.is_mem_free(addr), f"is_mem_free mismatch for addr {addr} in {memview.to_string()}"
+            assert memview.get_available_contig_space(addr) == ref_memview.get_available_contig_space(addr), f"get_available_contig_space mismatch for addr {addr} in {memview.to_string()}"
+            range_end = addr + random.randint(1, 16)
+            assert memview.is_mem_range_free(addr, range_end) == ref_memview.is_mem_range_free(addr, range_end), f"is_mem_range_free mismatch for range [{addr}, {range_end}) in {memview.to_string()}"
+
+        alignment_bits = random.randint(0, 3)
+        min_space = random.randint(0, 16)
+        left_bound = random.randrange(-4, memsize // 2)
+        right_bound = random.randrange(memsize // 2 + 32, memsize + 4)
+        for _ in range(8):
+            rand_state = random.getstate()
+            picked_addr = memview.gen_random_free_addr(alignment_bits, min_space, left_bound, right_bound, 16)
+            random.setstate(rand_state)
+            assert picked_addr == ref_memview.gen_random_free_addr(alignment_bits, min_space, left_bound, right_bound, 16), "gen_random_free_addr does not preserve the random stream."
+
+        # Exact sampling: all the suitable addresses, and only them, must be reachable.
+        suitable_addrs = set(filter(lambda addr: addr % (1 << alignment_bits) == 0 and addr + min_space < right_bound + (1 << alignment_bits) and (min_space == 0 or memview.is_mem_range_free(addr, addr+min_space)), range(((max(left_bound, 0)+(1 << alignment_bits)-1) >> alignment_bits) << alignment_bits, ((min(right_bound, memsize)-min_space) >> alignment_bits) << alignment_bits, 1 << alignment_bits)))
+        reached_addrs = set()
+        for _ in range(20*len(suitable_addrs)+1):
+            picked_addr = memview.gen_random_free_addr_exact(alignment_bits, min_space, left_bound, right_bound)
+            if picked_addr is None:
+                break
+            reached_addrs.add(picked_addr)
+        assert reached_addrs <= suitable_addrs, f"Exact sampling returned unsuitable addresses: {sorted(reached_addrs - suitable_addrs)}"
+        assert bool(reached_addrs) == bool(suitable_addrs)
+        if len(suitable_addrs) <= 64:
+            assert reached_addrs == suitable_addrs, f"Exact sampling did not reach {sorted(suitable_addrs - reached_addrs)}"
+    return num_scenarios
+
+# @return the average time in microseconds of an allocation and of a sampling, after num_allocs random allocations.
+def _measure_memview(memview_class, memsize: int, num_allocs: int, seed: int):
+    random.seed(seed)
+    memview = memview_class(memsize)
+    start_time = time.time()
+    for _ in range(num_allocs):
+        _alloc_random_range([memview], 16)
+    alloc_us = 1e6 * (time.time() - start_time) / num_allocs
+    start_time = time.time()
+    for _ in range(num_allocs):
+        memview.gen_random_free_addr(2, 4, 0, memsize)
+    sampling_us = 1e6 * (time.time() - start_time) / num_allocs
+    return alloc_us, sampling_us
+
+# @brief measures the cost of allocating and sampling against the number of allocations, for memsizes up to 2^20.
+# @return the path to the json file containing the results.
+def benchmark_memview(max_memsize_log2: int = 20, num_equivalence_scenarios: int = 200):
+    print(f"Checked the equivalence of the memory views on {check_memview_equivalence(num_equivalence_scenarios)} scenarios.")
+
+    results = []
+    for memsize_log2 in range(12, max_memsize_log2+1, 2):
+        memsize = 1 << memsize_log2
+        for num_allocs in (memsize >> 10, memsize >> 8, memsize >> 6):
+            if num_allocs == 0:
+                continue
+            new_alloc_us, new_sampling_us = _measure_memview(MemoryView, memsize, num_allocs, memsize_log2)
+            ref_alloc_us, ref_sampling_us = _measure_memview(_ListMemoryView, memsize, num_allocs, memsize_log2)
+            results.append({'memsize': memsize, 'num_allocs': num_allocs, 'new_alloc_us': new_alloc_us, 'new_sampling_us': new_sampling_us, 'ref_alloc_us': ref_alloc_us, 'ref_sampling_us': ref_sampling_us})
+            print(f"memsize 2^{memsize_log2}, {num_allocs:6} allocations: alloc {ref_alloc_us:8.2f} -> {new_alloc_us:6.2f} us, sampling {ref_sampling_us:8.2f} -> {new_sampling_us:6.2f} us")
+
+    json_path = os.path.join(PATH_TO_TMP, f"memviewperf_{max_memsize_log2}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved MemoryView performance results to', json_path)
+    return json_path
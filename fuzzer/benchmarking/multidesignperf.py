@@ -0,0 +1,99 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module measures the time spent in the generation and in Spike per simulated test, for a group of compatible designs:
+#   - per_design: each design is fuzzed separately, as with fuzzdesign, hence each program is generated and resolved once per design.
+#   - shared:     the program is generated and resolved once, and simulated on each design, as with fuzzmultidesign.
+# Both setups simulate the same test instances on the same designs.
+
+from params.runparams import PATH_TO_TMP
+from common.spike import calibrate_spikespeed
+from common.profiledesign import profile_get_medeleg_mask
+from common.scheduler import JOB_STATUS_DONE
+from common.designcontext import gen_design_job_scheduler, gen_multidesign_job_scheduler
+from cascade.fuzzfromdescriptor import gen_new_test_instance, fuzz_single_from_descriptor
+from cascade.multidesign import profile_get_medeleg_masks, check_designs_compatible, fuzz_single_from_descriptor_multidesign, MultiDesignStats
+
+import json
+import os
+import random
+import time
+
+# @return a list of num_tests descriptors (memsize, randseed, nmax_bbs, authorize_privileges), identical for all the setups and designs.
+def _gen_test_descriptors(design_name: str, num_tests: int, seed_offset: int):
+    ret = []
+    for randseed in range(seed_offset, seed_offset + num_tests):
+        random.seed(randseed)
+        memsize, _, _, nmax_bbs, authorize_privileges = gen_new_test_instance(design_name, randseed, True)
+        ret.append((memsize, randseed, nmax_bbs, authorize_privileges))
+    return ret
+
+# @return a dict of the measurements of the per_design setup.
+def _measure_per_design(design_names: tuple, num_cores: int, test_descriptors: list, seed_offset: int):
+    gen_seconds, spike_seconds, num_simulated = 0, 0, 0
+    def on_result(job_result):
+        nonlocal gen_seconds, spike_seconds, num_simulated
+        if job_result.status == JOB_STATUS_DONE:
+            time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf, _ = job_result.ret
+            gen_seconds += time_seconds_spent_in_gen_bbs + time_seconds_spent_in_gen_elf
+            spike_seconds += time_seconds_spent_in_spike_resol
+            num_simulated += 1
+        return False
+
+    start_time = time.time()
+    for design_name in design_names:
+        # The profiled medeleg mask is per process, and the workers inherit it.
+        profile_get_medeleg_mask(design_name)
+        def gen_job_args(job_id: int):
+            if job_id - seed_offset >= len(test_descriptors):
+                return None
+            memsize, randseed, nmax_bbs, authorize_privileges = test_descriptors[job_id - seed_offset]
+            return (memsize, design_name, randseed, nmax_bbs, authorize_privileges, None, True)
+        gen_design_job_scheduler(fuzz_single_from_descriptor, design_name, num_cores).run(gen_job_args, on_result, seed_offset)
+    duration = time.time() - start_time
+    return {'num_simulated': num_simulated, 'gen_seconds': gen_seconds, 'spike_seconds': spike_seconds, 'duration_seconds': duration}
+
+# @return a dict of the measurements of the shared setup.
+def _measure_shared(design_names: tuple, num_cores: int, test_descriptors: list, seed_offset: int):
+    profile_get_medeleg_masks(design_names)
+    stats = MultiDesignStats(design_names)
+    def on_result(job_result):
+        stats.add_result(job_result.ret if job_result.status == JOB_STATUS_DONE else None)
+        return False
+    def gen_job_args(job_id: int):
+        if job_id - seed_offset >= len(test_descriptors):
+            return None
+        memsize, randseed, nmax_bbs, authorize_privileges = test_descriptors[job_id - seed_offset]
+        return (memsize, design_names, randseed, nmax_bbs, authorize_privileges, True)
+
+    start_time = time.time()
+    gen_multidesign_job_scheduler(fuzz_single_from_descriptor_multidesign, design_names, num_cores).run(gen_job_args, on_result, seed_offset)
+    duration = time.time() - start_time
+    return {'num_simulated': stats.get_num_simulated(), 'gen_seconds': stats.gen_seconds, 'spike_seconds': stats.spike_seconds, 'duration_seconds': duration}
+
+# @param design_names a group of compatible designs, see cascade/multidesign.py.
+# @return the path to the json file containing the results.
+def benchmark_multidesign(design_names: list, num_cores: int, num_tests: int, seed_offset: int = 0):
+    design_names = tuple(design_names)
+    calibrate_spikespeed()
+    check_designs_compatible(design_names, profile_get_medeleg_masks(design_names))
+    test_descriptors = _gen_test_descriptors(design_names[0], num_tests, seed_offset)
+
+    results = dict()
+    for setup_name, measure_fn in (('per_design', _measure_per_design), ('shared', _measure_shared)):
+        results[setup_name] = measure_fn(design_names, num_cores, test_descriptors, seed_offset)
+        num_simulated = results[setup_name]['num_simulated']
+        if num_simulated < num_tests * len(design_names):
+            print(f"  Warning: {num_tests * len(design_names) - num_simulated}/{num_tests * len(design_names)} tests were not simulated.")
+        if num_simulated:
+            results[setup_name]['gen_seconds_per_simulated_test'] = results[setup_name]['gen_seconds'] / num_simulated
+            results[setup_name]['spike_seconds_per_simulated_test'] = results[setup_name]['spike_seconds'] / num_simulated
+            results[setup_name]['simulated_tests_per_hour'] = 3600 * num_simulated / results[setup_name]['duration_seconds']
+            print(f"{setup_name}: {1000*results[setup_name]['gen_seconds_per_simulated_test']:.1f} ms of generation and {1000*results[setup_name]['spike_seconds_per_simulated_test']:.1f} ms of Spike per simulated test, {results[setup_name]['simulated_tests_per_hour']:.0f} simulated tests per hour.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"multidesignperf_{'_'.join(design_names)}_{num_cores}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved multi-design performance results to', json_path)
+    return json_path
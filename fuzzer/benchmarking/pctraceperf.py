@@ -0,0 +1,217 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module checks the PC tracing from the instruction log of Spike (run_trace_all_pcs_instr_log) against the per-step tracing (run_trace_all_pcs_per_step), and measures both from 10^2 to 10^6 instructions.
+# - On Spike output fixtures, generated like the outputs of the per-step debug commands, it compares the parsers, and measures their time and peak memory.
+# - If Spike is installed, it also compares both backends on the programs of a design, and measures their end-to-end trace time on a loop.
+
+from params.runparams import PATH_TO_TMP, NO_REMOVE_TMPFILES
+from common.designcfgs import get_design_boot_addr, get_design_march_flags_nocompressed
+from common.scratch import get_scratch_path, release_scratch_file
+from common.spike import SPIKE_STARTADDR, FPREG_ABINAMES, calibrate_spikespeed, run_trace_all_pcs_per_step, run_trace_all_pcs_instr_log, _parse_trace_all_pcs_out, _parse_trace_pcs_instr_log_tail, _InstrLogPcTraceParser, _run_trace_pcs_streaming
+from common.bytestoelf import gen_elf
+from common.profiledesign import profile_get_medeleg_mask
+from rv.rv32i import rv32i_addi, rv32i_jal
+
+import json
+import os
+import random
+import shutil
+import subprocess
+import time
+import tracemalloc
+
+INTREG_ABINAMES = ['zero', 'ra', 'sp', 'gp', 'tp', 't0', 't1', 't2', 's0', 's1', 'a0', 'a1', 'a2', 'a3', 'a4', 'a5', 'a6', 'a7', 's2', 's3', 's4', 's5', 's6', 's7', 's8', 's9', 's10', 's11', 't3', 't4', 't5', 't6']
+
+###
+# Fixtures
+###
+
+# @param proba_exception the probability that an instruction traps, in which case Spike prints an exception and a trap value line after it.
+# @param proba_symbol the probability that an instruction is at a symbol of the ELF, in which case Spike prints the symbol name before it.
+# @return a pair (the Spike output of the per-step debug commands, the expected result of run_trace_all_pcs with dump_final_reg_vals).
+def _gen_trace_pcs_fixture(numinstrs: int, is_design_64bit: bool, num_fp_regs: int, has_fpdouble_support: bool, proba_exception: float = 0.01, proba_symbol: float = 0):
+    num_digits = 16 if is_design_64bit else 8
+    lines = ["warning: tohost and fromhost symbols not in ELF; can't communicate with target"]
+    pcs = []
+    curr_pc = SPIKE_STARTADDR
+    # The extra instruction is the one executed before the final register dump.
+    for instr_id in range(numinstrs+1):
+        if random.random() < proba_symbol:
+            lines.append(f"core   0: >>>>  {random.choice(['_start', 'write_tohost'])}")
+        lines.append(f"core   0: 0x{curr_pc:0{num_digits}x} (0x{random.getrandbits(32):08x}) addi    a0, a0, 1")
+        if instr_id < numinstrs:
+            pcs.append(curr_pc)
+        if random.random() < proba_exception:
+            lines.append(f"core   0: exception trap_illegal_instruction, epc 0x{curr_pc:0{num_digits}x}")
+            lines.append(f"core   0:           tval 0x{random.getrandbits(32):0{num_digits}x}")
+            curr_pc = SPIKE_STARTADDR + (random.randrange(1 << 16) << 2)
+        else:
+            curr_pc += 4
+
+    int_regvals = [0] + [random.getrandbits(4*num_digits) for _ in range(31)]
+    for row_id in range(8):
+        lines.append(''.join(f"{INTREG_ABINAMES[reg_id]:>4}: 0x{int_regvals[reg_id]:0{num_digits}x}" for reg_id in range(4*row_id, 4*row_id+4)))
+    fp_regvals = []
+    for fp_reg_id in range(num_fp_regs):
+        # The values are NaN-boxed to 128 bits.
+        if has_fpdouble_support:
+            fp_regvals.append(random.getrandbits(64))
+            lines.append(f"0x{'f'*16}{fp_regvals[-1]:016x}")
+        else:
+            fp_regvals.append(random.getrandbits(32))
+            lines.append(f"0x{'f'*24}{fp_regvals[-1]:08x}")
+    return ('\n'.join(lines) + '\n').encode(), (pcs, (int_regvals, fp_regvals))
+
+# @return the path to the fixture file.
+def _write_trace_pcs_fixture(spike_out: bytes, fixture_name: str) -> str:
+    fixture_path = os.path.join(PATH_TO_TMP, 'pctracefixtures', fixture_name)
+    os.makedirs(os.path.dirname(fixture_path), exist_ok=True)
+    with open(fixture_path, 'wb') as f:
+        f.write(spike_out)
+    return fixture_path
+
+# @brief parses a fixture as run_trace_all_pcs_instr_log, feeding it in chunks of random sizes.
+def _parse_trace_pcs_instr_log_chunked(spike_out: bytes, numinstrs: int, is_design_64bit: bool, num_fp_regs: int, has_fpdouble_support: bool):
+    parser = _InstrLogPcTraceParser(numinstrs, is_design_64bit)
+    chunk_start = 0
+    while chunk_start < len(spike_out):
+        chunk_end = chunk_start + random.choice([1, 7, 100, 4096, 1 << 16])
+        parser.feed(spike_out[chunk_start:chunk_end])
+        chunk_start = chunk_end
+    return parser.get_pcs(), _parse_trace_pcs_instr_log_tail(parser.get_tail(), is_design_64bit, num_fp_regs, has_fpdouble_support)
+
+# @brief parses a fixture as run_trace_all_pcs_instr_log, streamed from a process that prints it.
+def _parse_trace_pcs_instr_log_streamed(fixture_path: str, numinstrs: int, is_design_64bit: bool, num_fp_regs: int, has_fpdouble_support: bool):
+    parser = _InstrLogPcTraceParser(numinstrs, is_design_64bit)
+    # The fixture is printed to stderr, as Spike does.
+    _run_trace_pcs_streaming(('sh', '-c', f"cat {fixture_path} 1>&2"), parser, 60)
+    return parser.get_pcs(), _parse_trace_pcs_instr_log_tail(parser.get_tail(), is_design_64bit, num_fp_regs, has_fpdouble_support)
+
+def _to_comparable(trace_result):
+    pcs, (int_regvals, fp_regvals) = trace_result
+    return list(map(int, pcs)), (list(int_regvals), list(fp_regvals))
+
+###
+# Checks
+###
+
+# @brief checks that both parsers agree on the fixtures, and with the values that generated them.
+# @return the number of checked fixtures.
+def check_pc_trace_parser_equivalence(num_fixtures: int = 200, seed: int = 0) -> int:
+    random.seed(seed)
+    for fixture_id in range(num_fixtures):
+        numinstrs = random.choice([1, 10, 100, 1000, 20000])
+        is_design_64bit = random.random() < 0.5
+        has_fpdouble_support = random.random() < 0.5
+        num_fp_regs = random.choice([0, 1, 8, len(FPREG_ABINAMES)])
+        rvflags = 'rv64g' if is_design_64bit else 'rv32imf'
+        spike_out, expected_result = _gen_trace_pcs_fixture(numinstrs, is_design_64bit, num_fp_regs, has_fpdouble_support, random.choice([0, 0.01, 0.3]), random.choice([0, 0.01]))
+
+        ref_result = _to_comparable(_parse_trace_all_pcs_out(spike_out, rvflags, numinstrs, True, num_fp_regs, has_fpdouble_support))
+        assert ref_result == expected_result, f"Per-step parser mismatch with the fixture values on fixture {fixture_id}."
+        assert _to_comparable(_parse_trace_pcs_instr_log_chunked(spike_out, numinstrs, is_design_64bit, num_fp_regs, has_fpdouble_support)) == ref_result, f"Instruction log parser mismatch on fixture {fixture_id}."
+        if fixture_id % 10 == 0:
+            fixture_path = _write_trace_pcs_fixture(spike_out, 'equivalence')
+            assert _to_comparable(_parse_trace_pcs_instr_log_streamed(fixture_path, numinstrs, is_design_64bit, num_fp_regs, has_fpdouble_support)) == ref_result, f"Streamed instruction log parser mismatch on fixture {fixture_id}."
+    return num_fixtures
+
+# @brief checks that both backends agree on the RTL ELFs of the design, as traced by spike_resolution when check_pc_spike_again is set. Requires Spike.
+# @return the number of checked programs.
+def check_pc_trace_backend_equivalence(design_name: str, num_programs: int = 20, seed_offset: int = 0) -> int:
+    from cascade.fuzzerstate import FuzzerState
+    from cascade.basicblock import gen_basicblocks
+    from cascade.genelf import gen_elf_from_bbs
+    from cascade.spikeresolution import spike_resolution
+    from cascade.fuzzfromdescriptor import gen_new_test_instance
+
+    calibrate_spikespeed()
+    profile_get_medeleg_mask(design_name)
+    rvflags = get_design_march_flags_nocompressed(design_name)
+    for randseed in range(seed_offset, seed_offset+num_programs):
+        memsize, _, _, nmax_bbs, authorize_privileges = gen_new_test_instance(design_name, randseed, True)
+        random.seed(randseed)
+        fuzzerstate = FuzzerState(get_design_boot_addr(design_name), design_name, memsize, randseed, nmax_bbs, authorize_privileges)
+        gen_basicblocks(fuzzerstate)
+        spike_resolution(fuzzerstate, False)
+        rtl_spike_elfpath = gen_elf_from_bbs(fuzzerstate, False, 'pctraceperf', fuzzerstate.instance_to_str(), SPIKE_STARTADDR)
+        trace_args = (fuzzerstate.instance_to_str(), rtl_spike_elfpath, rvflags, sum(map(len, fuzzerstate.instr_objs_seq))+1, SPIKE_STARTADDR, True, fuzzerstate.num_pickable_floating_regs if fuzzerstate.design_has_fpu else 0, fuzzerstate.design_has_fpud, fuzzerstate)
+        ref_result = _to_comparable(run_trace_all_pcs_per_step(*trace_args))
+        assert _to_comparable(run_trace_all_pcs_instr_log(*trace_args)) == ref_result, f"PC trace backend mismatch on program {fuzzerstate.instance_to_str()}."
+        if not NO_REMOVE_TMPFILES:
+            release_scratch_file(rtl_spike_elfpath)
+    return num_programs
+
+###
+# Benchmark
+###
+
+# @return the minimal duration in seconds of the call, over num_reps calls.
+def _measure_seconds(num_reps: int, fn, *args) -> float:
+    ret = None
+    for _ in range(num_reps):
+        start_time = time.time()
+        fn(*args)
+        duration = time.time() - start_time
+        ret = duration if ret is None else min(ret, duration)
+    return ret
+
+# @return the peak of the Python memory allocated during the call, in bytes. Measured separately from the duration, as tracing the allocations slows the call down.
+def _measure_peak_bytes(fn, *args) -> int:
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak_bytes
+
+def _parse_fixture_per_step(fixture_path: str, numinstrs: int):
+    spike_out = subprocess.run(('cat', fixture_path), capture_output=True).stdout
+    return _parse_trace_all_pcs_out(spike_out, 'rv64g', numinstrs, True, len(FPREG_ABINAMES), True)
+
+# @return the path of an ELF that loops over a block of addi instructions, on which Spike executes any number of instructions.
+def _gen_loop_elf() -> str:
+    num_loop_addis = 63
+    loop_bytes = b''.join(rv32i_addi(1, 1, 1).to_bytes(4, 'little') for _ in range(num_loop_addis)) + rv32i_jal(0, -4*num_loop_addis).to_bytes(4, 'little')
+    elfpath = get_scratch_path('pctraceperf_loop.elf')
+    gen_elf(loop_bytes, SPIKE_STARTADDR, SPIKE_STARTADDR, elfpath, True)
+    return elfpath
+
+# @param max_per_step_numinstrs the largest instruction count for which the per-step backend is measured with Spike, as it is very slow for long programs.
+# @return the path to the json file containing the results.
+def benchmark_pc_trace(numinstrs_log10_range: range = range(2, 7), max_per_step_numinstrs: int = 10**6, num_reps: int = 3):
+    random.seed(0)
+    results = {'parse': dict(), 'spike': dict()}
+    for numinstrs in map(lambda numinstrs_log10: 10**numinstrs_log10, numinstrs_log10_range):
+        spike_out, _ = _gen_trace_pcs_fixture(numinstrs, True, len(FPREG_ABINAMES), True)
+        fixture_path = _write_trace_pcs_fixture(spike_out, f"fixture_{numinstrs}.log")
+        del spike_out
+        per_step_seconds = _measure_seconds(num_reps, _parse_fixture_per_step, fixture_path, numinstrs)
+        per_step_peak_bytes = _measure_peak_bytes(_parse_fixture_per_step, fixture_path, numinstrs)
+        instr_log_seconds = _measure_seconds(num_reps, _parse_trace_pcs_instr_log_streamed, fixture_path, numinstrs, True, len(FPREG_ABINAMES), True)
+        instr_log_peak_bytes = _measure_peak_bytes(_parse_trace_pcs_instr_log_streamed, fixture_path, numinstrs, True, len(FPREG_ABINAMES), True)
+        results['parse'][numinstrs] = {'per_step_ms': 1000*per_step_seconds, 'per_step_peak_bytes': per_step_peak_bytes, 'instr_log_ms': 1000*instr_log_seconds, 'instr_log_peak_bytes': instr_log_peak_bytes}
+        print(f"Parse {numinstrs} instructions: {1000*per_step_seconds:.1f} ms, {per_step_peak_bytes/(1<<20):.1f} MiB -> {1000*instr_log_seconds:.1f} ms, {instr_log_peak_bytes/(1<<20):.1f} MiB.")
+
+    if shutil.which('spike') is None:
+        print("Spike is not installed, skipping the end-to-end measurements.")
+    else:
+        calibrate_spikespeed()
+        elfpath = _gen_loop_elf()
+        for numinstrs in map(lambda numinstrs_log10: 10**numinstrs_log10, numinstrs_log10_range):
+            trace_args = ('pctraceperf', elfpath, 'rv64i', numinstrs, SPIKE_STARTADDR, True, 0, False, None)
+            results['spike'][numinstrs] = dict()
+            if numinstrs <= max_per_step_numinstrs:
+                results['spike'][numinstrs]['per_step_ms'] = 1000*_measure_seconds(num_reps, run_trace_all_pcs_per_step, *trace_args)
+            results['spike'][numinstrs]['instr_log_ms'] = 1000*_measure_seconds(num_reps, run_trace_all_pcs_instr_log, *trace_args)
+            print(f"Trace {numinstrs} instructions with Spike: " + ', '.join(f"{backend_name} {duration_ms:.1f} ms" for backend_name, duration_ms in results['spike'][numinstrs].items()) + '.')
+        if not NO_REMOVE_TMPFILES:
+            release_scratch_file(elfpath)
+
+    json_path = os.path.join(PATH_TO_TMP, 'pctraceperf.json')
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved PC trace performance results to', json_path)
+    return json_path
@@ -0,0 +1,66 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module measures the startup time of the fuzzing campaigns over repeated invocations, with and without the persistent profiling cache.
+# Each invocation is a fresh Python process that runs the startup of do_fuzzdesign.py or do_timetobug.py, i.e., the imports, the Spike speed calibration and the medeleg profiling.
+# do_timetobug.py profiles the design again for each scenario, which is reproduced here.
+
+from params.runparams import PATH_TO_TMP
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+# The number of scenarios per bug in do_timetobug.py.
+NUM_TIMETOBUG_SCENARIOS = 5
+
+# @return the code of a process that runs the startup of the given toplevel.
+def _gen_startup_code(toplevel_name: str, design_name: str, use_profiling_cache: bool) -> str:
+    ret = "import common.profilingcache as profilingcache\n"
+    ret += f"profilingcache.USE_PROFILING_CACHE = {use_profiling_cache}\n"
+    if toplevel_name == 'fuzzdesign':
+        ret += "from top.fuzzdesign import calibrate_spikespeed, profile_get_medeleg_mask\n"
+        ret += f"calibrate_spikespeed()\nprofile_get_medeleg_mask('{design_name}')\n"
+    elif toplevel_name == 'timetobug':
+        ret += "from top.fuzzdesigntiming import calibrate_spikespeed, profile_get_medeleg_mask\n"
+        ret += f"for _ in range({NUM_TIMETOBUG_SCENARIOS}):\n    calibrate_spikespeed()\n    profile_get_medeleg_mask('{design_name}')\n"
+    else:
+        raise ValueError(f"Unknown toplevel `{toplevel_name}`.")
+    return ret
+
+# @return the duration of the process, in seconds.
+def _measure_startup_seconds(startup_code: str, datadir: str) -> float:
+    my_env = os.environ.copy()
+    # A separate data directory, so that the cache of the user is neither used nor modified.
+    my_env['CASCADE_DATADIR'] = datadir
+    start_time = time.time()
+    subprocess.run([sys.executable, '-c', startup_code], env=my_env, check=True, capture_output=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return time.time() - start_time
+
+# @param num_invocations the number of successive invocations per setup. With the cache, the first invocation starts with an empty cache.
+# @return the path to the json file containing the results.
+def benchmark_profiling_cache(design_name: str, num_invocations: int = 5):
+    results = dict()
+    for toplevel_name in ('fuzzdesign', 'timetobug'):
+        results[toplevel_name] = dict()
+        for use_profiling_cache in (False, True):
+            datadir = os.path.join(PATH_TO_TMP, 'profilingcacheperf', f"{toplevel_name}_{int(use_profiling_cache)}")
+            shutil.rmtree(datadir, ignore_errors=True)
+            os.makedirs(datadir)
+            startup_code = _gen_startup_code(toplevel_name, design_name, use_profiling_cache)
+            results[toplevel_name]['cache' if use_profiling_cache else 'nocache'] = [_measure_startup_seconds(startup_code, datadir) for _ in range(num_invocations)]
+            shutil.rmtree(datadir, ignore_errors=True)
+
+        nocache_seconds, cache_seconds = results[toplevel_name]['nocache'], results[toplevel_name]['cache']
+        mean_warm_seconds = sum(cache_seconds[1:]) / max(len(cache_seconds) - 1, 1)
+        print(f"{toplevel_name}: startup {sum(nocache_seconds)/len(nocache_seconds):.2f} s per invocation without the cache, {cache_seconds[0]:.2f} s with an empty cache, {mean_warm_seconds:.2f} s on the following invocations.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"profilingcacheperf_{design_name}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved profiling cache performance results to', json_path)
+    return json_path
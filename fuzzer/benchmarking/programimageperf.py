@@ -0,0 +1,96 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module checks the program images built in place by gen_program_image against the previous per-byte dictionary construction, and measures the image build latency depending on the memory size.
+
+from params.runparams import PATH_TO_TMP
+from common.designcfgs import get_design_boot_addr
+from common.profiledesign import profile_get_medeleg_mask
+from cascade.basicblock import gen_basicblocks
+from cascade.finalblock import finalblock_spike_resolution
+from cascade.fuzzfromdescriptor import gen_new_test_instance
+from cascade.genelf import gen_program_image
+from cascade.spikeresolution import _transmit_addrs_to_producers_for_spike_resolution
+from cascade.cfinstructionclasses import PlaceholderProducerInstr0, PlaceholderProducerInstr1
+
+from collections import defaultdict
+import json
+import os
+import random
+import time
+
+# The previous image construction, as a reference.
+def _gen_program_image_dict(fuzzerstate, is_spike_resolution: bool) -> bytearray:
+    addr_instrs = defaultdict(bytes)
+    def add_words(base_addr, words, word_size):
+        for word_id, word in enumerate(words):
+            for curr_byte_id, curr_byte in enumerate(word.to_bytes(word_size, 'little')):
+                curr_addr = base_addr + word_size*word_id + curr_byte_id
+                assert curr_addr not in addr_instrs, f"Trying to write twice to the same address: {hex(curr_addr)}"
+                addr_instrs[curr_addr] = curr_byte
+
+    for bb_start_addr, bb_instrs in zip(fuzzerstate.bb_start_addr_seq, fuzzerstate.instr_objs_seq):
+        add_words(bb_start_addr, [instr_obj.gen_bytecode_int(is_spike_resolution) for instr_obj in bb_instrs], 4)
+    add_words(fuzzerstate.ctxsv_bb_base_addr, [instr_obj.gen_bytecode_int(is_spike_resolution) for instr_obj in fuzzerstate.ctxsv_bb], 4)
+    add_words(fuzzerstate.initial_reg_data_addr, fuzzerstate.initial_reg_data_content, 8)
+    final_block = finalblock_spike_resolution() if is_spike_resolution else fuzzerstate.final_bb
+    add_words(fuzzerstate.final_bb_base_addr, [instr_obj.gen_bytecode_int(is_spike_resolution) for instr_obj in final_block], 4)
+    add_words(fuzzerstate.random_data_block_start_addr, fuzzerstate.random_block_content4by4bytes, 4)
+
+    ret = bytearray(fuzzerstate.memsize)
+    for curr_addr, curr_byte in addr_instrs.items():
+        ret[curr_addr] = curr_byte
+    return ret
+
+# @brief generates a program and sets the producer offsets as the spike resolution would, so that both images can be built without running Spike.
+# @param fixed_nmax_bbs if not None, then overrides the number of basic blocks of the descriptor.
+# @return the fuzzerstate.
+def _gen_program_without_spike(design_name: str, randseed: int, fixed_memsize: int = None, fixed_nmax_bbs: int = None):
+    from cascade.fuzzerstate import FuzzerState
+    random.seed(randseed)
+    memsize, _, _, nmax_bbs, authorize_privileges = gen_new_test_instance(design_name, randseed, True, fixed_memsize)
+    if fixed_nmax_bbs is not None:
+        nmax_bbs = fixed_nmax_bbs
+    random.seed(randseed)
+    fuzzerstate = FuzzerState(get_design_boot_addr(design_name), design_name, memsize, randseed, nmax_bbs, authorize_privileges)
+    gen_basicblocks(fuzzerstate)
+    _transmit_addrs_to_producers_for_spike_resolution(fuzzerstate)
+    for bb_instrs in fuzzerstate.instr_objs_seq:
+        for bb_instr in bb_instrs:
+            if isinstance(bb_instr, PlaceholderProducerInstr0) or isinstance(bb_instr, PlaceholderProducerInstr1):
+                bb_instr.rtl_offset = bb_instr.spike_resolution_offset
+    return fuzzerstate
+
+# @brief checks that both image constructions produce the same bytes, for the spike resolution and for the RTL simulation.
+# @return the number of checked seeds.
+def check_program_image_equivalence(design_name: str, num_seeds: int, first_seed: int = 0) -> int:
+    profile_get_medeleg_mask(design_name)
+    for randseed in range(first_seed, first_seed + num_seeds):
+        fuzzerstate = _gen_program_without_spike(design_name, randseed)
+        for is_spike_resolution in (True, False):
+            assert gen_program_image(fuzzerstate, is_spike_resolution).tobytes() == _gen_program_image_dict(fuzzerstate, is_spike_resolution), f"Image mismatch for design `{design_name}`, seed `{randseed}`, spike resolution: `{is_spike_resolution}`."
+    return num_seeds
+
+# @return the path to the json file containing the results.
+def benchmark_program_image(design_name: str, num_programs_per_memsize: int = 10, min_memsize_log2: int = 14, max_memsize_log2: int = 20):
+    profile_get_medeleg_mask(design_name)
+    results = dict()
+    for memsize_log2 in range(min_memsize_log2, max_memsize_log2+1):
+        cumul_dict_seconds, cumul_inplace_seconds = 0.0, 0.0
+        for randseed in range(num_programs_per_memsize):
+            fuzzerstate = _gen_program_without_spike(design_name, randseed, 1 << memsize_log2)
+            start_time = time.time()
+            _gen_program_image_dict(fuzzerstate, False)
+            cumul_dict_seconds += time.time() - start_time
+            start_time = time.time()
+            gen_program_image(fuzzerstate, False)
+            cumul_inplace_seconds += time.time() - start_time
+        results[1 << memsize_log2] = {'dict_ms': 1000*cumul_dict_seconds/num_programs_per_memsize, 'inplace_ms': 1000*cumul_inplace_seconds/num_programs_per_memsize}
+        print(f"memsize 2^{memsize_log2}: {results[1 << memsize_log2]['dict_ms']:.2f} ms per image with the dictionary, {results[1 << memsize_log2]['inplace_ms']:.2f} ms in place.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"programimageperf_{design_name}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved program image performance results to', json_path)
+    return json_path
@@ -0,0 +1,77 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module checks that the reduction probe cache does not change the reduced programs, and measures its hit rate and the reduction durations with a cold and a warm cache.
+# It is supposed to be preceded by find_n_failing_descriptors.
+
+from params.runparams import PATH_TO_TMP
+from cascade.reduce import reduce_program
+import cascade.reduceprobecache as reduceprobecache
+from common.profiledesign import profile_get_medeleg_mask
+from common.spike import calibrate_spikespeed
+
+import hashlib
+import json
+import os
+import time
+
+# Without the cache, with an empty cache, and with the cache filled by the previous run.
+__CACHE_SETUPS = ('nocache', 'cold', 'warm')
+
+# @return a pair of digests of the reduced programs in target_dir.
+def _get_reduced_elf_digests(target_dir: str) -> tuple:
+    return tuple(hashlib.sha256(open(os.path.join(target_dir, elf_name), 'rb').read()).hexdigest() if os.path.exists(os.path.join(target_dir, elf_name)) else None for elf_name in ('app_buggy.elf', 'app_ok.elf'))
+
+# @return the path to the json file containing the results.
+def check_reduction_probe_cache(design_name: str, num_testcases: int):
+    calibrate_spikespeed()
+    profile_get_medeleg_mask(design_name)
+
+    # Read the failing program descriptors, as eval_reduction does
+    json_path = os.path.join(PATH_TO_TMP, f"failinginstances_{design_name}_{2*num_testcases}.json")
+    workloads = json.load(open(json_path, 'r'))
+    workloads = [(memsize, design_name, process_instance_id, num_bbs, authorize_privileges, True) for memsize, design_name, process_instance_id, num_bbs, authorize_privileges in workloads][:num_testcases]
+
+    # Start from an empty cache file, so that the cold run does not benefit from earlier runs.
+    cache_path = os.path.join(PATH_TO_TMP, f"reduceprobecacheperf_{design_name}.sqlite")
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(cache_path + suffix):
+            os.remove(cache_path + suffix)
+
+    prev_use_cache, prev_cache_path = reduceprobecache.USE_REDUCTION_PROBE_CACHE, reduceprobecache.REDUCTION_PROBE_CACHE_PATH
+    results = {cache_setup: {'durations': [], 'stats': []} for cache_setup in __CACHE_SETUPS}
+    try:
+        reduceprobecache.REDUCTION_PROBE_CACHE_PATH = cache_path
+        for cache_setup in __CACHE_SETUPS:
+            reduceprobecache.USE_REDUCTION_PROBE_CACHE = cache_setup != 'nocache'
+            for workload_id, workload in enumerate(workloads):
+                target_dir = os.path.join(PATH_TO_TMP, 'reduceprobecacheperf', f"{workload_id}_{cache_setup}")
+                probe_cache = reduceprobecache.get_reduction_probe_cache()
+                if probe_cache is not None:
+                    probe_cache.reset_stats()
+                start_time = time.time()
+                reduce_program(*workload, quiet=True, target_dir=target_dir)
+                results[cache_setup]['durations'].append(time.time() - start_time)
+                results[cache_setup]['stats'].append(None if probe_cache is None else probe_cache.get_stats())
+
+                # The cached outcomes must lead to the same reduced programs.
+                assert _get_reduced_elf_digests(target_dir) == _get_reduced_elf_digests(os.path.join(PATH_TO_TMP, 'reduceprobecacheperf', f"{workload_id}_nocache")), f"Reduced programs differ with the `{cache_setup}` cache for tuple {workload}."
+    finally:
+        reduceprobecache.USE_REDUCTION_PROBE_CACHE, reduceprobecache.REDUCTION_PROBE_CACHE_PATH = prev_use_cache, prev_cache_path
+
+    for cache_setup in __CACHE_SETUPS:
+        total_seconds = sum(results[cache_setup]['durations'])
+        if cache_setup == 'nocache':
+            print(f"Reduction without cache: {total_seconds:.1f} s in total.")
+        else:
+            num_probes = sum(stats['num_probes'] for stats in results[cache_setup]['stats'])
+            num_hits = sum(stats['num_probe_hits'] + stats['num_outcome_hits'] for stats in results[cache_setup]['stats'])
+            results[cache_setup]['hit_rate'] = num_hits / num_probes if num_probes else 0.0
+            print(f"Reduction with a {cache_setup} cache: {total_seconds:.1f} s in total, hit rate {100*results[cache_setup]['hit_rate']:.1f}% over {num_probes} probes.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"reduceprobecacheperf_{design_name}_{num_testcases}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved reduction probe cache results to', json_path)
+    return json_path
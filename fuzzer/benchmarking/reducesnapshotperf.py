@@ -0,0 +1,123 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module checks the fuzzerstate forks used by the reduction probes against the previous deep copies, and measures the per-probe preparation time and memory.
+
+from params.runparams import PATH_TO_TMP
+from common.profiledesign import profile_get_medeleg_mask
+from cascade.cfinstructionclasses import JALInstruction
+from cascade.contextreplay import SavedContext, gen_context_setter
+from cascade.genelf import gen_program_image
+from cascade.privilegestate import PrivilegeStateEnum
+from cascade.reduce import _gen_reduced_fuzzerstate_tail
+from benchmarking.programimageperf import _gen_program_without_spike
+
+from copy import deepcopy
+import json
+import multiprocessing as mp
+import os
+import random
+import resource
+import time
+
+# The previous preparation of the reduced fuzzerstate, as a reference.
+def _gen_reduced_fuzzerstate_tail_deepcopy(fuzzerstate, max_bb_id_to_consider: int, max_instr_id_except_cf: int):
+    test_fuzzerstate = deepcopy(fuzzerstate)
+    test_fuzzerstate.intregpickstate.restore_state(test_fuzzerstate.saved_reg_states[max_bb_id_to_consider])
+    if max_instr_id_except_cf < len(test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider]):
+        curr_addr = test_fuzzerstate.bb_start_addr_seq[max_bb_id_to_consider] + (max_instr_id_except_cf+1) * 4 # NO_COMPRESSED
+        test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider][max_instr_id_except_cf+1] = JALInstruction("jal", 0, test_fuzzerstate.final_bb_base_addr-curr_addr)
+    else:
+        curr_addr = test_fuzzerstate.bb_start_addr_seq[max_bb_id_to_consider] + (len(test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider])-1) * 4 # NO_COMPRESSED
+        test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider][-1] = JALInstruction("jal", 0, test_fuzzerstate.final_bb_base_addr-curr_addr)
+    return test_fuzzerstate
+
+# @brief modifies the reduced fuzzerstate as _save_ctx_and_jump_to_pillar_specific_instr does, with an arbitrary context instead of the one dumped by Spike.
+def _jump_to_pillar(test_fuzzerstate, index_first_bb_to_consider: int, index_first_instr_to_consider: int):
+    saved_context = SavedContext(0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, PrivilegeStateEnum.MACHINE, dict(), [0]*test_fuzzerstate.num_pickable_floating_regs, [0]*test_fuzzerstate.num_pickable_regs)
+    gen_context_setter(test_fuzzerstate, saved_context, test_fuzzerstate.bb_start_addr_seq[index_first_bb_to_consider] + index_first_instr_to_consider * 4) # NO_COMPRESSED
+    test_fuzzerstate.instr_objs_seq[0][-1] = JALInstruction("jal", 0, test_fuzzerstate.ctxsv_bb_base_addr - 4*(len(test_fuzzerstate.instr_objs_seq[0])-1)) # NO_COMPRESSED
+
+# @return a fingerprint of everything that the reduced ELF and the RTL check depend on.
+def _get_fuzzerstate_fingerprint(fuzzerstate) -> tuple:
+    return gen_program_image(fuzzerstate, False).tobytes(), tuple(str(fuzzerstate.intregpickstate.get_regstate(reg_id)) for reg_id in range(1, fuzzerstate.num_pickable_regs)), fuzzerstate.get_num_fuzzing_instructions_sofar()
+
+# @return a random cut (max_bb_id_to_consider, max_instr_id_except_cf, index_first_bb_to_consider, index_first_instr_to_consider).
+def _gen_random_cut(fuzzerstate) -> tuple:
+    max_bb_id_to_consider = random.randrange(1, len(fuzzerstate.instr_objs_seq))
+    # As in the reduction, either some instructions are replaced by the jump to the final block, or the control flow instruction is replaced.
+    max_instr_id_except_cf = random.choice(list(range(-1, len(fuzzerstate.instr_objs_seq[max_bb_id_to_consider])-1)) + [len(fuzzerstate.instr_objs_seq[max_bb_id_to_consider])])
+    index_first_bb_to_consider = random.randint(1, max_bb_id_to_consider)
+    index_first_instr_to_consider = random.randrange(len(fuzzerstate.instr_objs_seq[index_first_bb_to_consider])) if index_first_bb_to_consider < max_bb_id_to_consider else 0
+    return max_bb_id_to_consider, max_instr_id_except_cf, index_first_bb_to_consider, index_first_instr_to_consider
+
+# @brief checks that the forks produce the same reduced programs as the deep copies, and leave the original fuzzerstate untouched.
+# @return the number of checked probes.
+def check_reduced_fuzzerstate_equivalence(design_name: str, num_seeds: int, num_probes_per_seed: int = 20, nmax_bbs: int = 100) -> int:
+    profile_get_medeleg_mask(design_name)
+    for randseed in range(num_seeds):
+        fuzzerstate = _gen_program_without_spike(design_name, randseed, fixed_nmax_bbs=nmax_bbs)
+        ref_fingerprint = _get_fuzzerstate_fingerprint(fuzzerstate)
+        random.seed(randseed)
+        for _ in range(num_probes_per_seed):
+            max_bb_id_to_consider, max_instr_id_except_cf, index_first_bb_to_consider, index_first_instr_to_consider = _gen_random_cut(fuzzerstate)
+            test_fuzzerstates = [_gen_reduced_fuzzerstate_tail(fuzzerstate, max_bb_id_to_consider, max_instr_id_except_cf), _gen_reduced_fuzzerstate_tail_deepcopy(fuzzerstate, max_bb_id_to_consider, max_instr_id_except_cf)]
+            if index_first_bb_to_consider > 1 or index_first_instr_to_consider > 0:
+                for test_fuzzerstate in test_fuzzerstates:
+                    _jump_to_pillar(test_fuzzerstate, index_first_bb_to_consider, index_first_instr_to_consider)
+            assert _get_fuzzerstate_fingerprint(test_fuzzerstates[0]) == _get_fuzzerstate_fingerprint(test_fuzzerstates[1]), f"Fork and deep copy differ for design `{design_name}`, seed `{randseed}`, cut {(max_bb_id_to_consider, max_instr_id_except_cf, index_first_bb_to_consider, index_first_instr_to_consider)}."
+            assert _get_fuzzerstate_fingerprint(fuzzerstate) == ref_fingerprint, f"The fork modified the original fuzzerstate for design `{design_name}`, seed `{randseed}`."
+    return num_seeds * num_probes_per_seed
+
+# @brief prepares num_probes_alive probes at the same time, as the parallel probes of a reduction, and reports the peak RSS increase through the queue.
+def _measure_probe_rss_worker(fuzzerstate, cuts: list, use_fork: bool, queue):
+    start_maxrss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    prepare_fn = _gen_reduced_fuzzerstate_tail if use_fork else _gen_reduced_fuzzerstate_tail_deepcopy
+    test_fuzzerstates = [prepare_fn(fuzzerstate, *cut) for cut in cuts]
+    queue.put(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_maxrss_kb)
+    del test_fuzzerstates
+
+# @return the path to the json file containing the results.
+def benchmark_reduced_fuzzerstate(design_name: str, num_programs: int = 5, num_probes_per_program: int = 50, num_probes_alive: int = 16, nmax_bbs_list: list = None):
+    if nmax_bbs_list is None:
+        nmax_bbs_list = [100, 200, 400]
+    profile_get_medeleg_mask(design_name)
+    mp_context = mp.get_context('fork')
+    results = dict()
+    for nmax_bbs in nmax_bbs_list:
+        cumul_seconds = {'deepcopy': 0.0, 'fork': 0.0}
+        cumul_rss_kb = {'deepcopy': 0, 'fork': 0}
+        num_instrs = 0
+        for randseed in range(num_programs):
+            fuzzerstate = _gen_program_without_spike(design_name, randseed, fixed_nmax_bbs=nmax_bbs)
+            num_instrs += sum(map(len, fuzzerstate.instr_objs_seq))
+            random.seed(randseed)
+            cuts = [_gen_random_cut(fuzzerstate)[:2] for _ in range(num_probes_per_program)]
+            for approach, prepare_fn in (('deepcopy', _gen_reduced_fuzzerstate_tail_deepcopy), ('fork', _gen_reduced_fuzzerstate_tail)):
+                start_time = time.time()
+                for cut in cuts:
+                    prepare_fn(fuzzerstate, *cut)
+                cumul_seconds[approach] += time.time() - start_time
+
+                # Measure the memory in a fresh process, so that the peak RSS of the previous measurements does not hide it.
+                queue = mp_context.Queue()
+                process = mp_context.Process(target=_measure_probe_rss_worker, args=(fuzzerstate, cuts[:num_probes_alive], approach == 'fork', queue))
+                process.start()
+                cumul_rss_kb[approach] += queue.get()
+                process.join()
+
+        results[nmax_bbs] = {
+            'mean_num_instrs': num_instrs / num_programs,
+            'deepcopy_ms_per_probe': 1000*cumul_seconds['deepcopy'] / (num_programs*num_probes_per_program),
+            'fork_ms_per_probe': 1000*cumul_seconds['fork'] / (num_programs*num_probes_per_program),
+            'deepcopy_peak_rss_kb_per_probe': cumul_rss_kb['deepcopy'] / (num_programs*num_probes_alive),
+            'fork_peak_rss_kb_per_probe': cumul_rss_kb['fork'] / (num_programs*num_probes_alive),
+        }
+        print(f"{nmax_bbs} basic blocks ({results[nmax_bbs]['mean_num_instrs']:.0f} instructions): {results[nmax_bbs]['deepcopy_ms_per_probe']:.2f} ms and {results[nmax_bbs]['deepcopy_peak_rss_kb_per_probe']:.0f} kB per probe with deep copies, {results[nmax_bbs]['fork_ms_per_probe']:.2f} ms and {results[nmax_bbs]['fork_peak_rss_kb_per_probe']:.0f} kB with forks.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"reducesnapshotperf_{design_name}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved reduction snapshot performance results to', json_path)
+    return json_path
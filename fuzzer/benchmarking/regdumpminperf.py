@@ -0,0 +1,78 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module measures the register dump minimization of the spike resolution (cascade/regdumpanalysis) on the programs of a design.
+# - It reports the number of register dump requests, full and irreducible, and the duration of the analysis.
+# - If Spike is installed, it also measures the latency of the resolution with the full and with the irreducible requests, and checks that the reconstructed dumps match the full dumps.
+
+from params.runparams import PATH_TO_TMP, NO_REMOVE_TMPFILES
+from common.designcfgs import get_design_march_flags_nocompressed
+from common.profiledesign import profile_get_medeleg_mask
+from common.scratch import release_scratch_file
+from common.spike import SPIKE_STARTADDR, calibrate_spikespeed, run_trace_regs_at_pc_locs
+from cascade.genelf import gen_elf_from_bbs, gen_program_image
+from cascade.regdumpanalysis import RegdumpMinimizer
+from cascade.spikeresolution import gen_regdump_reqs
+from benchmarking.programimageperf import _gen_program_without_spike
+
+import json
+import os
+import shutil
+import time
+
+# @return the path to the json file containing the results.
+def benchmark_regdump_minimization(design_name: str, num_programs: int = 1000, seed_offset: int = 0):
+    has_spike = shutil.which('spike') is not None
+    if has_spike:
+        calibrate_spikespeed()
+    else:
+        print("Spike is not installed, skipping the latency measurements and the correctness check.")
+    profile_get_medeleg_mask(design_name)
+    rvflags = get_design_march_flags_nocompressed(design_name)
+
+    results = {'num_reqs_full': [], 'num_reqs_irreducible': [], 'analysis_ms': [], 'resolution_full_ms': [], 'resolution_minimized_ms': []}
+    for randseed in range(seed_offset, seed_offset + num_programs):
+        fuzzerstate = _gen_program_without_spike(design_name, randseed)
+        image = gen_program_image(fuzzerstate, True)
+        regdump_reqs = gen_regdump_reqs(fuzzerstate)
+
+        start_time = time.time()
+        regdump_minimizer = RegdumpMinimizer(fuzzerstate, image, regdump_reqs)
+        irreducible_reqs = regdump_minimizer.get_irreducible_reqs()
+        analysis_seconds = time.time() - start_time
+        results['num_reqs_full'].append(len(regdump_reqs))
+        results['num_reqs_irreducible'].append(len(irreducible_reqs))
+        results['analysis_ms'].append(1000*analysis_seconds)
+
+        if not has_spike:
+            continue
+        elfpath = gen_elf_from_bbs(fuzzerstate, True, 'regdumpminperf', fuzzerstate.instance_to_str(), SPIKE_STARTADDR, image)
+        trace_args = (fuzzerstate.instance_to_str(), elfpath, rvflags, SPIKE_STARTADDR)
+        final_args = (True, fuzzerstate.final_bb_base_addr+SPIKE_STARTADDR, fuzzerstate.num_pickable_floating_regs if fuzzerstate.design_has_fpu else 0, fuzzerstate.design_has_fpud)
+
+        start_time = time.time()
+        full_regvals, full_finalregvals = run_trace_regs_at_pc_locs(*trace_args, regdump_reqs, *final_args)
+        results['resolution_full_ms'].append(1000*(time.time() - start_time))
+
+        start_time = time.time()
+        irreducible_regvals, minimized_finalregvals = run_trace_regs_at_pc_locs(*trace_args, irreducible_reqs, *final_args)
+        reconstructed_regvals = regdump_minimizer.reconstruct_regdumps(irreducible_regvals)
+        results['resolution_minimized_ms'].append(1000*(time.time() - start_time + analysis_seconds))
+
+        assert reconstructed_regvals == full_regvals, f"Reconstructed register dumps mismatch on program {fuzzerstate.instance_to_str()}."
+        assert minimized_finalregvals == full_finalregvals, f"Final register values mismatch on program {fuzzerstate.instance_to_str()}."
+        if not NO_REMOVE_TMPFILES:
+            release_scratch_file(elfpath)
+
+    num_reqs_full, num_reqs_irreducible = sum(results['num_reqs_full']), sum(results['num_reqs_irreducible'])
+    print(f"{num_programs} programs: {num_reqs_full} -> {num_reqs_irreducible} register dump requests ({100*(1 - num_reqs_irreducible/max(num_reqs_full, 1)):.1f}% fewer), {sum(results['analysis_ms'])/num_programs:.2f} ms of analysis per program.")
+    if has_spike:
+        print(f"Reconstructed dumps match the full dumps on {num_programs} programs.")
+        print(f"Resolution latency per program: {sum(results['resolution_full_ms'])/num_programs:.1f} ms -> {sum(results['resolution_minimized_ms'])/num_programs:.1f} ms.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"regdumpminperf_{design_name}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved register dump minimization performance results to', json_path)
+    return json_path
@@ -0,0 +1,123 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module measures the throughput of the integer register pick state, and checks that changes to the generator keep the generated programs bit-identical.
+# To check a change, record the program digests before the change, and check them after the change.
+
+from params.runparams import PATH_TO_TMP
+from params.fuzzparams import MAX_NUM_PICKABLE_REGS
+from common.designcfgs import get_design_boot_addr
+from common.profiledesign import profile_get_medeleg_mask
+from cascade.fuzzfromdescriptor import gen_new_test_instance
+from cascade.basicblock import gen_basicblocks
+from cascade.randomize.pickreg import IntRegPickState
+from cascade.util import IntRegIndivState
+
+import hashlib
+import json
+import numpy as np
+import os
+import random
+import time
+
+# @return a representation of an attribute value that does not depend on the memory layout of the process.
+def _attr_to_str(attr_val) -> str:
+    if attr_val is None or isinstance(attr_val, (bool, int, float, str, np.generic)):
+        return repr(attr_val)
+    return type(attr_val).__name__
+
+# @return the attribute values of an instruction object, whether it uses __dict__ or __slots__.
+def _instr_to_tuple(instr):
+    attr_names = set(getattr(instr, '__dict__', {}).keys())
+    for curr_class in type(instr).__mro__:
+        attr_names |= set(filter(lambda attr_name: hasattr(instr, attr_name), getattr(curr_class, '__slots__', ())))
+    return (type(instr).__name__,) + tuple((attr_name, _attr_to_str(getattr(instr, attr_name))) for attr_name in sorted(attr_names))
+
+# @return a digest of the program generated from the given seed, together with the random state at the end of the generation.
+def gen_program_digest(design_name: str, randseed: int) -> str:
+    from cascade.fuzzerstate import FuzzerState
+    random.seed(randseed)
+    memsize, _, _, nmax_bbs, authorize_privileges = gen_new_test_instance(design_name, randseed, True)
+    random.seed(randseed)
+    fuzzerstate = FuzzerState(get_design_boot_addr(design_name), design_name, memsize, randseed, nmax_bbs, authorize_privileges)
+    gen_basicblocks(fuzzerstate)
+    program_repr = repr((fuzzerstate.bb_start_addr_seq, [[_instr_to_tuple(instr) for instr in bb] for bb in fuzzerstate.instr_objs_seq], random.getstate()))
+    return hashlib.sha256(program_repr.encode('ascii')).hexdigest()
+
+def _get_program_digests_path(design_name: str, num_programs: int) -> str:
+    return os.path.join(PATH_TO_TMP, f"programdigests_{design_name}_{num_programs}.json")
+
+# @brief records the digests of the programs generated from the seeds 0 to num_programs-1.
+# @return the path to the json file containing the digests.
+def record_program_digests(design_name: str, num_programs: int):
+    profile_get_medeleg_mask(design_name)
+    digests = [gen_program_digest(design_name, randseed) for randseed in range(num_programs)]
+    json_path = _get_program_digests_path(design_name, num_programs)
+    with open(json_path, 'w') as f:
+        json.dump(digests, f)
+    print(f"Recorded {num_programs} program digests to", json_path)
+    return json_path
+
+# @brief checks that the programs generated from the seeds 0 to num_programs-1 match the recorded digests.
+# @return the list of mismatching seeds.
+def check_program_digests(design_name: str, num_programs: int):
+    profile_get_medeleg_mask(design_name)
+    with open(_get_program_digests_path(design_name, num_programs), 'r') as f:
+        recorded_digests = json.load(f)
+    mismatching_seeds = [randseed for randseed in range(num_programs) if gen_program_digest(design_name, randseed) != recorded_digests[randseed]]
+    if mismatching_seeds:
+        print(f"{len(mismatching_seeds)}/{num_programs} programs differ from the recorded ones, for example seed {mismatching_seeds[0]}.")
+    else:
+        print(f"All {num_programs} programs are identical to the recorded ones.")
+    return mismatching_seeds
+
+# @brief runs num_picks register picks, interleaved with the state transitions and saves/restores performed during the generation.
+# @return the path to the json file containing the results.
+def benchmark_regpick(num_picks: int = 1000000, seed: int = 0):
+    random.seed(seed)
+    intregpickstate = IntRegPickState(MAX_NUM_PICKABLE_REGS, False)
+    saved_states = [intregpickstate.save_curr_state()]
+
+    start_time = time.time()
+    for pick_id in range(num_picks):
+        pick_type = pick_id & 7
+        if pick_type < 3:
+            intregpickstate.pick_int_inputreg()
+        elif pick_type == 3:
+            intregpickstate.pick_int_inputregs(2)
+        elif pick_type == 4:
+            intregpickstate.pick_int_outputreg()
+        elif pick_type == 5:
+            # Walk some register through the producer-consumer cycle.
+            if intregpickstate.exists_reg_in_state(IntRegIndivState.PRODUCED1):
+                intregpickstate.set_regstate(intregpickstate.pick_int_reg_in_state(IntRegIndivState.PRODUCED1), IntRegIndivState.CONSUMED)
+            elif intregpickstate.exists_reg_in_state(IntRegIndivState.PRODUCED0):
+                rd = intregpickstate.pick_int_reg_in_state(IntRegIndivState.PRODUCED0)
+                intregpickstate.set_regstate(rd, IntRegIndivState.PRODUCED1)
+                intregpickstate.set_producer1_location(rd, pick_id, 0)
+            else:
+                rd = intregpickstate.pick_int_outputreg_nonzero()
+                intregpickstate.set_regstate(rd, IntRegIndivState.PRODUCED0)
+                intregpickstate.set_producer_id(rd, pick_id)
+                intregpickstate.set_producer0_location(rd, pick_id, 0)
+        elif pick_type == 6:
+            if intregpickstate.exists_reg_in_state(IntRegIndivState.CONSUMED):
+                intregpickstate.set_regstate(intregpickstate.pick_int_reg_in_state(IntRegIndivState.CONSUMED), IntRegIndivState.FREE)
+        elif pick_id & 0xff == 7:
+            saved_states.append(intregpickstate.save_curr_state())
+        elif pick_id & 0xfff == 0xf:
+            intregpickstate.restore_state(saved_states[-1])
+    duration = time.time() - start_time
+
+    results = {
+        'num_picks': num_picks,
+        'picks_per_second': num_picks / duration,
+    }
+    print(f"Register pick state: {results['picks_per_second']:.0f} operations/s")
+
+    json_path = os.path.join(PATH_TO_TMP, f"regpickperf_{num_picks}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved register pick performance results to', json_path)
+    return json_path
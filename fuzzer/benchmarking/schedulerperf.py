@@ -0,0 +1,90 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module compares the event-driven job scheduler with the previous polling loop on synthetic short jobs, and measures the idle core time of both.
+
+from params.runparams import PATH_TO_TMP
+from common.scheduler import JobScheduler, JOB_STATUS_DONE
+
+import json
+import multiprocessing as mp
+import os
+import random
+import threading
+import time
+
+# @brief a synthetic job that occupies its worker for the given duration.
+def _synthetic_job(duration_seconds: float) -> float:
+    time.sleep(duration_seconds)
+    return duration_seconds
+
+# The previous polling loop, as a reference.
+# @return the wall time in seconds.
+def _run_polling_loop(durations: list, num_workers: int, poll_period_seconds: float) -> float:
+    callback_lock = threading.Lock()
+    num_finished = 0
+    newly_finished = 0
+    def done_callback(ret):
+        nonlocal num_finished, newly_finished
+        with callback_lock:
+            num_finished += 1
+            newly_finished += 1
+
+    start_time = time.time()
+    pool = mp.Pool(processes=num_workers)
+    next_job_id = 0
+    for _ in range(min(num_workers, len(durations))):
+        pool.apply_async(_synthetic_job, args=(durations[next_job_id],), callback=done_callback)
+        next_job_id += 1
+
+    while True:
+        time.sleep(poll_period_seconds)
+        with callback_lock:
+            if num_finished >= len(durations):
+                break
+            for _ in range(newly_finished):
+                if next_job_id < len(durations):
+                    pool.apply_async(_synthetic_job, args=(durations[next_job_id],), callback=done_callback)
+                    next_job_id += 1
+            newly_finished = 0
+    ret = time.time() - start_time
+    pool.close()
+    pool.terminate()
+    return ret
+
+# @return the wall time in seconds.
+def _run_scheduler(durations: list, num_workers: int) -> float:
+    num_done = 0
+    def on_result(job_result):
+        nonlocal num_done
+        assert job_result.status == JOB_STATUS_DONE, f"Synthetic job {job_result.job_id} did not complete: {job_result.error_str}"
+        num_done += 1
+        return False
+
+    start_time = time.time()
+    JobScheduler(_synthetic_job, num_workers).run(lambda job_id: (durations[job_id],) if job_id < len(durations) else None, on_result)
+    ret = time.time() - start_time
+    assert num_done == len(durations)
+    return ret
+
+# @param num_jobs the number of synthetic jobs.
+# @param min_job_seconds, max_job_seconds the bounds of the uniformly distributed job durations.
+# @return the path to the json file containing the results.
+def benchmark_scheduler(num_workers: int, num_jobs: int, min_job_seconds: float = 0.1, max_job_seconds: float = 2.0, poll_period_seconds: float = 2.0, seed: int = 0):
+    random.seed(seed)
+    durations = [random.uniform(min_job_seconds, max_job_seconds) for _ in range(num_jobs)]
+    busy_core_seconds = sum(durations)
+
+    results = {'num_workers': num_workers, 'num_jobs': num_jobs, 'busy_core_seconds': busy_core_seconds}
+    for scheduler_name, run_fn in (('polling', lambda: _run_polling_loop(durations, num_workers, poll_period_seconds)), ('eventdriven', lambda: _run_scheduler(durations, num_workers))):
+        wall_seconds = run_fn()
+        idle_core_seconds = wall_seconds*num_workers - busy_core_seconds
+        results[scheduler_name] = {'wall_seconds': wall_seconds, 'idle_core_seconds': idle_core_seconds, 'utilization': busy_core_seconds / (wall_seconds*num_workers)}
+        print(f"{scheduler_name}: {wall_seconds:.2f} s wall time, {idle_core_seconds:.2f} idle core-seconds, {100*results[scheduler_name]['utilization']:.1f}% utilization.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"schedulerperf_{num_workers}_{num_jobs}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved scheduler performance results to', json_path)
+    return json_path
@@ -0,0 +1,126 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module measures the filesystem operations and the latency of the temporary artifacts of each test: the spike resolution ELF, its debug command file and the RTL ELF.
+# The setups are:
+#   - tmpdir:        the artifacts are in PATH_TO_TMP, and the directory of the debug command files is re-created at each test, as previously.
+#   - scratch:       the artifacts are in the per-process scratch directory in RAM.
+#   - scratch_memfd: as scratch, but the debug command file is an anonymous in-memory file.
+# The filesystem operations are counted with audit hooks. Each setup is measured in a fresh forked process, so that the hooks and the scratch space of a setup do not affect the next ones.
+
+from params.runparams import PATH_TO_TMP
+from common import scratch
+from common.profiledesign import profile_get_medeleg_mask
+from common.scheduler import _MP_CONTEXT
+from common.spike import _gen_spike_dbgcmds_for_trace_regs_at_pc_locs, SPIKE_STARTADDR
+from cascade.genelf import gen_elf_from_bbs
+from cascade.spikeresolution import gen_regdump_reqs
+from benchmarking.programimageperf import _gen_program_without_spike
+
+from collections import Counter
+from pathlib import Path
+import json
+import os
+import sys
+import time
+
+# The audit events that correspond to filesystem operations.
+FS_AUDIT_EVENTS = ('open', 'os.remove', 'os.mkdir', 'os.listdir', 'os.scandir', 'os.rename', 'os.truncate', 'shutil.rmtree', 'shutil.copyfile')
+
+SCRATCH_SETUPS = ('tmpdir', 'scratch', 'scratch_memfd')
+
+# @brief creates, reads back as Spike would, and removes the artifacts of a single test.
+def _run_artifact_cycle(setup_name: str, fuzzerstate, dbgcmds_bytes: bytes):
+    identifier_str = fuzzerstate.instance_to_str()
+    spike_resolution_elfpath = gen_elf_from_bbs(fuzzerstate, True, 'spikeresol', identifier_str, SPIKE_STARTADDR)
+
+    debug_fd = None
+    if setup_name == 'tmpdir':
+        path_to_debug_file = os.path.join(PATH_TO_TMP, 'dbgcmds', f"cmds_trace_regs_at_pc_locs_{identifier_str}")
+        Path(os.path.dirname(path_to_debug_file)).mkdir(parents=True, exist_ok=True)
+        with open(path_to_debug_file, 'wb') as f:
+            f.write(dbgcmds_bytes)
+    elif setup_name == 'scratch':
+        path_to_debug_file = scratch.get_scratch_path(f"cmds_trace_regs_at_pc_locs_{identifier_str}", 'dbgcmds')
+        with open(path_to_debug_file, 'wb') as f:
+            f.write(dbgcmds_bytes)
+    elif setup_name == 'scratch_memfd':
+        debug_fd, path_to_debug_file = scratch.gen_memfd_path(f"cmds_trace_regs_at_pc_locs_{identifier_str}", dbgcmds_bytes)
+    else:
+        raise ValueError(f"Unknown setup `{setup_name}`.")
+
+    # Spike reads the ELF and the debug command file.
+    for path in (spike_resolution_elfpath, path_to_debug_file):
+        with open(path, 'rb') as f:
+            f.read()
+    if debug_fd is not None:
+        os.close(debug_fd)
+    elif setup_name == 'tmpdir':
+        os.remove(path_to_debug_file)
+    else:
+        scratch.release_scratch_file(path_to_debug_file)
+    scratch.release_scratch_file(spike_resolution_elfpath)
+
+    # The RTL ELF is read by the simulator.
+    rtl_elfpath = gen_elf_from_bbs(fuzzerstate, False, 'rtl', identifier_str, fuzzerstate.design_base_addr)
+    with open(rtl_elfpath, 'rb') as f:
+        f.read()
+    scratch.release_scratch_file(rtl_elfpath)
+
+# @return a pair (mean microseconds per test, dict of the number of filesystem operations per test).
+def _measure_setup(setup_name: str, programs, num_reps: int):
+    scratch.USE_RAM_SCRATCH = setup_name != 'tmpdir'
+    scratch.get_scratch_space()
+    # Warm up, e.g., to create the directories once.
+    for fuzzerstate, dbgcmds_bytes in programs:
+        _run_artifact_cycle(setup_name, fuzzerstate, dbgcmds_bytes)
+
+    event_counts = Counter()
+    is_counting = False
+    def audit_hook(event, _):
+        if is_counting and event in FS_AUDIT_EVENTS:
+            event_counts[event] += 1
+    sys.addaudithook(audit_hook)
+
+    is_counting = True
+    start_time = time.time()
+    for _ in range(num_reps):
+        for fuzzerstate, dbgcmds_bytes in programs:
+            _run_artifact_cycle(setup_name, fuzzerstate, dbgcmds_bytes)
+    duration = time.time() - start_time
+    is_counting = False
+
+    num_tests = num_reps * len(programs)
+    return 1e6 * duration / num_tests, {event: count / num_tests for event, count in sorted(event_counts.items())}
+
+def _measure_setup_in_child(setup_name: str, programs, num_reps: int, result_queue):
+    result_queue.put(_measure_setup(setup_name, programs, num_reps))
+
+# @return the path to the json file containing the results.
+def benchmark_scratch(design_name: str, num_programs: int = 20, num_reps: int = 10):
+    profile_get_medeleg_mask(design_name)
+    programs = []
+    for randseed in range(num_programs):
+        fuzzerstate = _gen_program_without_spike(design_name, randseed)
+        dbgcmds = _gen_spike_dbgcmds_for_trace_regs_at_pc_locs(SPIKE_STARTADDR, gen_regdump_reqs(fuzzerstate), True, fuzzerstate.final_bb_base_addr+SPIKE_STARTADDR, fuzzerstate.num_pickable_floating_regs if fuzzerstate.design_has_fpu else 0)
+        programs.append((fuzzerstate, '\n'.join(dbgcmds).encode()))
+
+    results = dict()
+    for setup_name in SCRATCH_SETUPS:
+        if setup_name == 'scratch_memfd' and not scratch.HAS_MEMFD:
+            print(f"{setup_name}: skipped, memfd_create is not supported.")
+            continue
+        result_queue = _MP_CONTEXT.Queue()
+        measuring_process = _MP_CONTEXT.Process(target=_measure_setup_in_child, args=(setup_name, programs, num_reps, result_queue))
+        measuring_process.start()
+        us_per_test, fs_ops_per_test = result_queue.get()
+        measuring_process.join()
+        results[setup_name] = {'us_per_test': us_per_test, 'fs_ops_per_test': fs_ops_per_test}
+        print(f"{setup_name}: {us_per_test:.1f} us per test, {sum(fs_ops_per_test.values()):.1f} filesystem operations per test ({', '.join(f'{event}: {count:.1f}' for event, count in fs_ops_per_test.items())}).")
+
+    json_path = os.path.join(PATH_TO_TMP, f"scratchperf_{design_name}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved scratch performance results to', json_path)
+    return json_path
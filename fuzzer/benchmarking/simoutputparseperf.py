@@ -0,0 +1,212 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module checks the streaming parser of the simulation outputs against the previous parsers, and measures the parse time and the end-to-end latency on simulation output fixtures.
+# The fixtures are either recorded simulation outputs, or generated like the outputs of the testbenches: ELF loading messages, register dumps, stop request and optionally the rfuzz coverage mask.
+
+from params.runparams import PATH_TO_TMP
+from params.fuzzparams import MAX_NUM_PICKABLE_REGS, MAX_NUM_PICKABLE_FLOATING_REGS
+from common import designcfgs
+from cascade.fuzzsim import SimOutputParser, SIM_STOP_MARKER, _parse_verilator_out, _run_sim_streaming
+
+import itertools
+import json
+import os
+import random
+import subprocess
+import time
+
+###
+# Previous parsers, as references
+###
+
+def _parse_verilator_out_ref(design_name, exec_stdout: str, num_int_regs: int, num_float_regs: int, get_rfuzz_coverage_mask: bool):
+    outlines = list(filter(lambda l: 'Writing ELF word to' not in l, exec_stdout.split('\n')))
+    is_stop_successful = 'Found a stop request.' in exec_stdout
+    if not is_stop_successful:
+        return False, None
+    ret_intregs = []
+    ret_floatregs = []
+    curr_index = 0
+    for reg_id in range(1, num_int_regs+1):
+        for row_id in itertools.count(curr_index):
+            if len(outlines[row_id]) >= 19 and outlines[row_id][:19] == f"Dump of reg x{reg_id:02}: 0x":
+                ret_intregs.append(int(outlines[row_id][19:35], 16))
+                curr_index = row_id + 1
+                break
+    if designcfgs.design_has_float_support(design_name):
+        for fp_reg_id in range(num_float_regs):
+            for row_id in itertools.count(curr_index):
+                if row_id >= len(outlines):
+                    ret_floatregs.append(None)
+                    curr_index = row_id + 1
+                    break
+                if len(outlines[row_id]) >= 19 and outlines[row_id][:19] == f"Dump of reg f{fp_reg_id:02}: 0x":
+                    ret_floatregs.append(int(outlines[row_id][19:35], 16))
+                    curr_index = row_id + 1
+                    break
+    if get_rfuzz_coverage_mask:
+        for row_id in range(curr_index, len(outlines)):
+            if len(outlines[row_id]) >= 21 and outlines[row_id][:21] == f"RFUZZ coverage mask: ":
+                rfuzz_coverage_mask = int(outlines[row_id][22:], 16)
+                return True, rfuzz_coverage_mask
+        raise Exception("Could not find the RFUZZ coverage mask.")
+    return True, (ret_intregs, ret_floatregs)
+
+def _parse_modelsim_out_ref(design_name, exec_stdout: str, num_int_regs: int, num_float_regs: int):
+    outlines = exec_stdout.split('\n')
+    outlines = list(map(lambda l: l[2:], filter(lambda l: 'Writing ELF word to SRAM addr' not in l, outlines)))
+    is_stop_successful = 'Found a stop request.' in exec_stdout
+    if not is_stop_successful:
+        return False, None
+    if num_int_regs == 0 and num_float_regs == 0:
+        return True, None
+    ret_intregs = []
+    ret_floatregs = []
+    curr_index = 0
+    for reg_id in range(1, num_int_regs+1):
+        for row_id in itertools.count(curr_index):
+            if len(outlines[row_id]) >= 19 and outlines[row_id][:19] == f"Dump of reg x{reg_id:02}: 0x" or outlines[row_id][:19] == f"Dump of reg x{reg_id: 2}: 0x":
+                ret_intregs.append(int(outlines[row_id][19:35], 16))
+                curr_index = row_id + 1
+                break
+    if designcfgs.design_has_float_support(design_name):
+        for fp_reg_id in range(num_float_regs):
+            for row_id in itertools.count(curr_index):
+                if row_id >= len(outlines):
+                    ret_floatregs.append(None)
+                    curr_index = row_id + 1
+                    break
+                if len(outlines[row_id]) >= 19 and outlines[row_id][:19] == f"Dump of reg f{fp_reg_id:02}: 0x" or outlines[row_id][:19] == f"Dump of reg f{fp_reg_id: 2}: 0x":
+                    ret_floatregs.append(int(outlines[row_id][19:35], 16))
+                    curr_index = row_id + 1
+                    break
+    return True, (ret_intregs, ret_floatregs)
+
+def _parse_modelsim_out(design_name, exec_stdout: str, num_int_regs: int, num_float_regs: int):
+    sim_output_parser = SimOutputParser(num_int_regs, num_float_regs, designcfgs.design_has_float_support(design_name), False, 2, True)
+    sim_output_parser.feed(exec_stdout)
+    is_stop_successful, received_regvals = sim_output_parser.get_result()
+    if not is_stop_successful:
+        return False, None
+    if num_int_regs == 0 and num_float_regs == 0:
+        return True, None
+    return True, received_regvals
+
+###
+# Fixtures
+###
+
+# @param variant one of 'complete', 'nostop', 'nofloats' (the FPU is disabled in the final block) and 'rfuzz'.
+# @return the simulation output, as a string.
+def _gen_sim_output_fixture(num_lines: int, num_int_regs: int, num_float_regs: int, variant: str, is_modelsim: bool) -> str:
+    lines = [f"Loading RAM ELF: /tmp/app.elf"]
+    dump_lines = [f"Dump of reg x{reg_id:02}: 0x{random.getrandbits(64):016x}" for reg_id in range(1, num_int_regs+1)]
+    if variant != 'nofloats':
+        dump_lines += [f"Dump of reg f{fp_reg_id:02}: 0x{random.getrandbits(64):016x}" for fp_reg_id in range(num_float_regs)]
+    num_noise_lines = max(num_lines - len(dump_lines) - 4, 0)
+    lines += [f"Writing ELF word to SRAM addr {word_id:x}: {random.getrandbits(64):016x}" for word_id in range(num_noise_lines)]
+    lines += dump_lines
+    if variant != 'nostop':
+        lines.append(SIM_STOP_MARKER)
+    if variant == 'rfuzz':
+        lines.append(f"RFUZZ coverage mask:  {random.getrandbits(256):x}")
+    lines.append("- top.sv:42: Verilog $finish")
+    if is_modelsim:
+        lines = ['# ' + curr_line for curr_line in lines]
+    return '\n'.join(lines) + '\n'
+
+# @return the path to the fixture file.
+def _write_sim_output_fixture(sim_output: str, fixture_name: str) -> str:
+    fixture_path = os.path.join(PATH_TO_TMP, 'simoutputfixtures', fixture_name)
+    os.makedirs(os.path.dirname(fixture_path), exist_ok=True)
+    with open(fixture_path, 'w') as f:
+        f.write(sim_output)
+    return fixture_path
+
+# @return the command line of a process that prints the fixture, and then keeps running for tail_seconds, as the testbench does after the stop request.
+def _get_fixture_cmdline(fixture_path: str, tail_seconds: float) -> list:
+    return ['sh', '-c', f"cat {fixture_path}; sleep {tail_seconds}"]
+
+###
+# Checks and benchmark
+###
+
+# @brief checks that the streaming parser returns the same results as the previous parsers, on the full outputs and on the outputs streamed from a process.
+# @return the number of checked fixtures.
+def check_sim_output_parser_equivalence(design_name: str, num_fixtures: int = 200, seed: int = 0) -> int:
+    random.seed(seed)
+    has_float_support = designcfgs.design_has_float_support(design_name)
+    for fixture_id in range(num_fixtures):
+        num_lines = random.choice([10, 100, 1000, 20000])
+        num_int_regs = random.randint(1, MAX_NUM_PICKABLE_REGS-1)
+        num_float_regs = random.randint(0, MAX_NUM_PICKABLE_FLOATING_REGS) if has_float_support else 0
+        variant = random.choice(['complete', 'nostop', 'nofloats', 'rfuzz'])
+        is_modelsim = variant != 'rfuzz' and random.random() < 0.5
+
+        sim_output = _gen_sim_output_fixture(num_lines, num_int_regs, num_float_regs, variant, is_modelsim)
+        if is_modelsim:
+            ref_result = _parse_modelsim_out_ref(design_name, sim_output, num_int_regs, num_float_regs)
+            assert _parse_modelsim_out(design_name, sim_output, num_int_regs, num_float_regs) == ref_result, f"Parser mismatch on Modelsim fixture {fixture_id}."
+        else:
+            ref_result = _parse_verilator_out_ref(design_name, sim_output, num_int_regs, num_float_regs, variant == 'rfuzz')
+            assert _parse_verilator_out(design_name, sim_output, num_int_regs, num_float_regs, variant == 'rfuzz') == ref_result, f"Parser mismatch on Verilator fixture {fixture_id}."
+
+        # The streamed output is split at arbitrary positions.
+        fixture_path = _write_sim_output_fixture(sim_output, 'equivalence')
+        for stop_on_complete in (False, True):
+            sim_output_parser = SimOutputParser(num_int_regs, num_float_regs, has_float_support, variant == 'rfuzz', 2*int(is_modelsim), is_modelsim)
+            streamed_result = _run_sim_streaming(_get_fixture_cmdline(fixture_path, 0), None, sim_output_parser, 60, stop_on_complete)
+            if is_modelsim and streamed_result[0] and num_int_regs == 0 and num_float_regs == 0:
+                streamed_result = (True, None)
+            assert streamed_result == ref_result, f"Streamed parser mismatch on fixture {fixture_id}, stop_on_complete: {stop_on_complete}."
+    return num_fixtures
+
+# @param fixture_paths if not None, then a list of recorded Verilator outputs, used instead of the generated fixtures. Their registers are parsed with the maximal numbers of registers.
+# @param tail_seconds the time for which the fixture processes keep running after printing the output, as the testbench does after the stop request.
+# @return the path to the json file containing the results.
+def benchmark_sim_output_parser(design_name: str, fixture_paths: list = None, tail_seconds: float = 0.2, num_reps: int = 5):
+    has_float_support = designcfgs.design_has_float_support(design_name)
+    num_int_regs, num_float_regs = MAX_NUM_PICKABLE_REGS-1, MAX_NUM_PICKABLE_FLOATING_REGS if has_float_support else 0
+    if fixture_paths is None:
+        random.seed(0)
+        fixture_paths = [_write_sim_output_fixture(_gen_sim_output_fixture(10**num_lines_log10, num_int_regs, num_float_regs, 'complete', False), f"fixture_{10**num_lines_log10}.log") for num_lines_log10 in range(3, 7)]
+
+    results = dict()
+    for fixture_path in fixture_paths:
+        with open(fixture_path, 'r') as f:
+            sim_output = f.read()
+        num_lines = sim_output.count('\n')
+
+        start_time = time.time()
+        for _ in range(num_reps):
+            ref_result = _parse_verilator_out_ref(design_name, sim_output, num_int_regs, num_float_regs, False)
+        ref_parse_seconds = (time.time() - start_time) / num_reps
+        start_time = time.time()
+        for _ in range(num_reps):
+            result = _parse_verilator_out(design_name, sim_output, num_int_regs, num_float_regs, False)
+        parse_seconds = (time.time() - start_time) / num_reps
+        assert result == ref_result, f"Parser mismatch on fixture `{fixture_path}`."
+
+        # End to end, from the process start to the parsed registers
+        cmdline = _get_fixture_cmdline(fixture_path, tail_seconds)
+        start_time = time.time()
+        for _ in range(num_reps):
+            exec_out = subprocess.run(cmdline, check=True, text=True, capture_output=True)
+            _parse_verilator_out_ref(design_name, exec_out.stdout, num_int_regs, num_float_regs, False)
+        ref_latency_seconds = (time.time() - start_time) / num_reps
+        start_time = time.time()
+        for _ in range(num_reps):
+            sim_output_parser = SimOutputParser(num_int_regs, num_float_regs, has_float_support, False)
+            _run_sim_streaming(cmdline, None, sim_output_parser, 60, True)
+        latency_seconds = (time.time() - start_time) / num_reps
+
+        results[fixture_path] = {'num_lines': num_lines, 'ref_parse_ms': 1000*ref_parse_seconds, 'parse_ms': 1000*parse_seconds, 'ref_latency_ms': 1000*ref_latency_seconds, 'latency_ms': 1000*latency_seconds}
+        print(f"{num_lines} lines: parse {1000*ref_parse_seconds:.2f} ms -> {1000*parse_seconds:.2f} ms, end-to-end {1000*ref_latency_seconds:.1f} ms -> {1000*latency_seconds:.1f} ms.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"simoutputparseperf_{design_name}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved simulation output parsing performance results to', json_path)
+    return json_path
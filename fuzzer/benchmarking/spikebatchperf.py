@@ -0,0 +1,70 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module measures the spike resolution throughput of run_trace_regs_at_pc_locs_batch depending on the batch size.
+
+from params.runparams import PATH_TO_TMP, NO_REMOVE_TMPFILES
+from common.designcfgs import get_design_boot_addr, get_design_march_flags_nocompressed
+from common.spike import SPIKE_STARTADDR, calibrate_spikespeed, run_trace_regs_at_pc_locs_batch
+from cascade.basicblock import gen_basicblocks
+from cascade.genelf import gen_elf_from_bbs
+from cascade.spikeresolution import gen_regdump_reqs, _transmit_addrs_to_producers_for_spike_resolution
+from cascade.fuzzfromdescriptor import gen_new_test_instance
+
+import json
+import os
+import random
+import time
+
+SPIKE_BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+# @return a list of argument tuples for run_trace_regs_at_pc_locs, one per program.
+def _gen_spike_resolution_inputs(design_name: str, num_programs: int, seed_offset: int):
+    from cascade.fuzzerstate import FuzzerState
+    ret = []
+    for randseed in range(seed_offset, seed_offset+num_programs):
+        memsize, _, _, nmax_bbs, authorize_privileges = gen_new_test_instance(design_name, randseed, True)
+        random.seed(randseed)
+        fuzzerstate = FuzzerState(get_design_boot_addr(design_name), design_name, memsize, randseed, nmax_bbs, authorize_privileges)
+        gen_basicblocks(fuzzerstate)
+        _transmit_addrs_to_producers_for_spike_resolution(fuzzerstate)
+        elfpath = gen_elf_from_bbs(fuzzerstate, True, 'spikebatchperf', fuzzerstate.instance_to_str(), SPIKE_STARTADDR)
+        ret.append((fuzzerstate.instance_to_str(), elfpath, get_design_march_flags_nocompressed(design_name), SPIKE_STARTADDR, gen_regdump_reqs(fuzzerstate), True, fuzzerstate.final_bb_base_addr+SPIKE_STARTADDR, fuzzerstate.num_pickable_floating_regs if fuzzerstate.design_has_fpu else 0, fuzzerstate.design_has_fpud))
+    return ret
+
+# @brief resolves the same programs with each batch size, and checks that all the batch sizes agree.
+# @return the path to the json file containing the results.
+def benchmark_spike_batch(design_name: str, num_programs: int = 256, seed_offset: int = 0):
+    calibrate_spikespeed()
+    print(f"Generating {num_programs} programs for `{design_name}`.")
+    all_inputs = _gen_spike_resolution_inputs(design_name, num_programs, seed_offset)
+
+    results = {'design_name': design_name, 'num_programs': num_programs, 'batch_sizes': SPIKE_BATCH_SIZES, 'programs_per_second': []}
+    reference_outputs = None
+    for batch_size in SPIKE_BATCH_SIZES:
+        start_time = time.time()
+        batch_outputs = []
+        for batch_start in range(0, num_programs, batch_size):
+            batch_outputs += run_trace_regs_at_pc_locs_batch(all_inputs[batch_start:batch_start+batch_size])
+        duration = time.time() - start_time
+
+        for curr_inputs, curr_output in zip(all_inputs, batch_outputs):
+            if isinstance(curr_output, Exception):
+                raise Exception(f"Spike resolution failed with batch size {batch_size} for identifier str: {curr_inputs[0]}.") from curr_output
+        if reference_outputs is None:
+            reference_outputs = batch_outputs
+        assert batch_outputs == reference_outputs, f"The Spike resolutions with batch size {batch_size} disagree with batch size {SPIKE_BATCH_SIZES[0]}."
+
+        results['programs_per_second'].append(num_programs / duration)
+        print(f"Batch size {batch_size:>3}: {results['programs_per_second'][-1]:.2f} programs/s")
+
+    if not NO_REMOVE_TMPFILES:
+        for curr_inputs in all_inputs:
+            os.remove(curr_inputs[1])
+
+    json_path = os.path.join(PATH_TO_TMP, f"spikebatchperf_{design_name}_{num_programs}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved Spike batch performance results to', json_path)
+    return json_path
@@ -0,0 +1,140 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module checks the vectorized parser of the register dumps of Spike (parse_trace_regs_at_pc_locs_out_arrays) against the scalar parser, and measures their throughput in MB/s.
+# - The fixtures are generated in the formats of the debug console: `reg` dumps of RV32 and RV64, 128-bit `freg` dumps, `priv` dumps, exception lines, and the final `reg 0` and `freg` dumps.
+# - If Spike is installed, the parsers are also compared on the outputs of Spike for the programs of a design.
+
+from params.runparams import PATH_TO_TMP, NO_REMOVE_TMPFILES
+from common.profiledesign import profile_get_medeleg_mask
+from common.spike import FPREG_ABINAMES, calibrate_spikespeed, _run_spike_for_trace_regs_at_pc_locs, _parse_trace_regs_at_pc_locs_out, _parse_trace_regs_at_pc_locs_out_scalar, _get_all_regs_from_spike_out_scalar, get_all_regs_array_from_spike_out, parse_trace_regs_at_pc_locs_out_arrays
+from benchmarking.pctraceperf import INTREG_ABINAMES, _measure_seconds
+
+import json
+import os
+import random
+
+###
+# Fixtures
+###
+
+# @param proba_priv, proba_float the probabilities that a request dumps the privilege or a floating-point register.
+# @param proba_exception the probability that an exception line precedes a dump.
+# @return a tuple (the Spike output of the debug commands of _gen_spike_dbgcmds_for_trace_regs_at_pc_locs, the register dump requests, the expected result of run_trace_regs_at_pc_locs).
+def _gen_trace_regs_fixture(num_reqs: int, is_design_64bit: bool, dump_final_reg_vals: bool, num_fp_regs: int, has_fpdouble_support: bool, proba_priv: float = 0.05, proba_float: float = 0.05, proba_exception: float = 0.01):
+    num_digits = 16 if is_design_64bit else 8
+    lines = ["warning: tohost and fromhost symbols not in ELF; can't communicate with target"]
+    regdump_reqs = []
+    regvals = []
+    for req_id in range(num_reqs):
+        if random.random() < proba_exception:
+            lines.append(f"core   0: exception trap_illegal_instruction, epc 0x{random.getrandbits(4*num_digits):0{num_digits}x}")
+        req_type = random.random()
+        if req_type < proba_priv:
+            regdump_reqs.append((4*req_id, False, 'priv'))
+            regvals.append(random.choice('MSU'))
+            lines.append(regvals[-1])
+        elif req_type < proba_priv + proba_float:
+            # The floating-point values are NaN-boxed to 128 bits.
+            regdump_reqs.append((4*req_id, True, random.choice(FPREG_ABINAMES)))
+            regvals.append(((1 << 64) - 1) << 64 | random.getrandbits(64))
+            lines.append(f"0x{regvals[-1]:032x}")
+        else:
+            regdump_reqs.append((4*req_id, False, random.choice(INTREG_ABINAMES[1:])))
+            regvals.append(random.getrandbits(4*num_digits))
+            lines.append(f"0x{regvals[-1]:0{num_digits}x}")
+    if not dump_final_reg_vals:
+        return '\n'.join(lines).encode() + b'\n', regdump_reqs, regvals
+
+    int_regvals = [0] + [random.getrandbits(4*num_digits) for _ in range(31)]
+    for row_id in range(8):
+        lines.append(''.join(f"{INTREG_ABINAMES[reg_id]:>4}: 0x{int_regvals[reg_id]:0{num_digits}x}" for reg_id in range(4*row_id, 4*row_id+4)))
+    fp_regvals = []
+    for fp_reg_id in range(num_fp_regs):
+        if has_fpdouble_support:
+            fp_regvals.append(random.getrandbits(64))
+            lines.append(f"0x{'f'*16}{fp_regvals[-1]:016x}")
+        else:
+            fp_regvals.append(random.getrandbits(32))
+            lines.append(f"0x{'f'*24}{fp_regvals[-1]:08x}")
+    return '\n'.join(lines).encode() + b'\n', regdump_reqs, (regvals, (int_regvals, fp_regvals))
+
+# @return the result of the parser, or the type and message of the exception that it raises.
+def _parse_or_exception(parser_fn, *args):
+    try:
+        return parser_fn(*args)
+    except Exception as e:
+        return type(e), str(e)
+
+###
+# Checks
+###
+
+# @brief checks that the vectorized parser agrees with the scalar parser on the fixtures, and with the values that generated them. The truncated outputs check that the vectorized parser falls back to the scalar parser.
+# @return the number of checked fixtures.
+def check_spike_out_parser_equivalence(num_fixtures: int = 500, seed: int = 0) -> int:
+    random.seed(seed)
+    for fixture_id in range(num_fixtures):
+        num_reqs = random.choice([0, 1, 10, 100, 1000, 20000])
+        is_design_64bit = random.random() < 0.5
+        rvflags = 'rv64g' if is_design_64bit else 'rv32imf'
+        dump_final_reg_vals = random.random() < 0.8
+        has_fpdouble_support = random.random() < 0.5
+        num_fp_regs = random.choice([0, 1, 8, len(FPREG_ABINAMES)])
+        spike_out, regdump_reqs, expected_result = _gen_trace_regs_fixture(num_reqs, is_design_64bit, dump_final_reg_vals, num_fp_regs, has_fpdouble_support, random.choice([0, 0.05, 0.5]), random.choice([0, 0.05, 0.5]), random.choice([0, 0.01, 0.3]))
+        parser_args = (rvflags, regdump_reqs, dump_final_reg_vals, num_fp_regs, has_fpdouble_support)
+
+        assert parse_trace_regs_at_pc_locs_out_arrays(spike_out, is_design_64bit, len(regdump_reqs), dump_final_reg_vals, num_fp_regs, has_fpdouble_support) is not None, f"The vectorized parser does not recognize fixture {fixture_id}."
+        ref_result = _parse_trace_regs_at_pc_locs_out_scalar(spike_out, *parser_args)
+        assert ref_result == expected_result, f"Scalar parser mismatch with the fixture values on fixture {fixture_id}."
+        assert _parse_trace_regs_at_pc_locs_out(spike_out, *parser_args) == ref_result, f"Vectorized parser mismatch on fixture {fixture_id}."
+        if dump_final_reg_vals:
+            assert get_all_regs_array_from_spike_out(spike_out, is_design_64bit).tolist() == _get_all_regs_from_spike_out_scalar(spike_out, is_design_64bit), f"Vectorized final register parser mismatch on fixture {fixture_id}."
+
+        truncated_spike_out = spike_out[:random.randrange(len(spike_out)+1)]
+        assert _parse_or_exception(_parse_trace_regs_at_pc_locs_out, truncated_spike_out, *parser_args) == _parse_or_exception(_parse_trace_regs_at_pc_locs_out_scalar, truncated_spike_out, *parser_args), f"Vectorized parser mismatch on truncated fixture {fixture_id}."
+    return num_fixtures
+
+# @brief checks that both parsers agree on the outputs of Spike for the spike resolution of the programs of the design. Requires Spike.
+# @return the number of checked programs.
+def check_spike_out_parser_on_spike(design_name: str, num_programs: int = 20, seed_offset: int = 0) -> int:
+    from benchmarking.spikebatchperf import _gen_spike_resolution_inputs
+
+    calibrate_spikespeed()
+    profile_get_medeleg_mask(design_name)
+    for identifier_str, elfpath, rvflags, startpc, regdump_reqs, dump_final_reg_vals, final_addr, num_fp_regs, has_fpdouble_support in _gen_spike_resolution_inputs(design_name, num_programs, seed_offset):
+        spike_out = _run_spike_for_trace_regs_at_pc_locs(identifier_str, elfpath, rvflags, startpc, regdump_reqs, dump_final_reg_vals, final_addr, num_fp_regs)
+        parser_args = (rvflags, regdump_reqs, dump_final_reg_vals, num_fp_regs, has_fpdouble_support)
+        assert parse_trace_regs_at_pc_locs_out_arrays(spike_out, '64' in rvflags, len(regdump_reqs), dump_final_reg_vals, num_fp_regs, has_fpdouble_support) is not None, f"The vectorized parser does not recognize the output of Spike for program {identifier_str}."
+        assert _parse_trace_regs_at_pc_locs_out(spike_out, *parser_args) == _parse_trace_regs_at_pc_locs_out_scalar(spike_out, *parser_args), f"Vectorized parser mismatch on the output of Spike for program {identifier_str}."
+        if not NO_REMOVE_TMPFILES:
+            os.remove(elfpath)
+    return num_programs
+
+###
+# Benchmark
+###
+
+# @return the path to the json file containing the results.
+def benchmark_spike_out_parser(num_reqs_log10_range: range = range(2, 6), num_reps: int = 5):
+    random.seed(0)
+    results = dict()
+    for is_design_64bit in (False, True):
+        rvflags = 'rv64g' if is_design_64bit else 'rv32imf'
+        for num_reqs in map(lambda num_reqs_log10: 10**num_reqs_log10, num_reqs_log10_range):
+            spike_out, regdump_reqs, _ = _gen_trace_regs_fixture(num_reqs, is_design_64bit, True, len(FPREG_ABINAMES), True)
+            parser_args = (spike_out, rvflags, regdump_reqs, True, len(FPREG_ABINAMES), True)
+            num_mb = len(spike_out) / 1e6
+
+            scalar_seconds = _measure_seconds(num_reps, _parse_trace_regs_at_pc_locs_out_scalar, *parser_args)
+            dispatched_seconds = _measure_seconds(num_reps, _parse_trace_regs_at_pc_locs_out, *parser_args)
+            arrays_seconds = _measure_seconds(num_reps, parse_trace_regs_at_pc_locs_out_arrays, spike_out, is_design_64bit, num_reqs, True, len(FPREG_ABINAMES), True)
+            results[f"{rvflags}_{num_reqs}"] = {'num_bytes': len(spike_out), 'scalar_mb_per_s': num_mb / scalar_seconds, 'dispatched_mb_per_s': num_mb / dispatched_seconds, 'arrays_mb_per_s': num_mb / arrays_seconds}
+            print(f"{rvflags}, {num_reqs} dumps ({num_mb:.2f} MB): scalar {num_mb/scalar_seconds:.1f} MB/s -> dispatched {num_mb/dispatched_seconds:.1f} MB/s, vectorized to typed arrays {num_mb/arrays_seconds:.1f} MB/s.")
+
+    json_path = os.path.join(PATH_TO_TMP, "spikeoutparseperf.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved Spike output parsing performance results to', json_path)
+    return json_path
@@ -9,6 +9,7 @@ from cascade.reduce import reduce_program
 from common.profiledesign import profile_get_medeleg_mask
 from common.spike import calibrate_spikespeed
 
+import hashlib
 import json
 import os
 import time
@@ -44,7 +45,34 @@ def reduce_program_worker(size: int, design_name: str, randseed: int, nmax_bbs:
         print(f"Exception in reduce_program_worker for tuple: ({size}, '{design_name}', {randseed}, {nmax_bbs})")
         return None
 
-def eval_reduction(design_name: str, num_testcases: int, num_workers: int):
+# @brief reduces the test cases one after the other, with each number of parallel probes, and checks that the reduced programs do not depend on it.
+# @return a dict num_parallel_probes: list of reduction durations in seconds (None for failed reductions).
+def _eval_reduction_speedup(workloads: list, nums_parallel_probes: list):
+    reduction_durations = dict()
+    reduced_elf_digests = dict()
+    for num_parallel_probes in nums_parallel_probes:
+        reduction_durations[num_parallel_probes] = []
+        for workload_id, workload in enumerate(workloads):
+            target_dir = os.path.join(PATH_TO_TMP, 'evalreductionspeedup', f"{workload_id}_{num_parallel_probes}")
+            start_time = time.time()
+            try:
+                reduce_program(*workload, target_dir=target_dir, num_parallel_probes=num_parallel_probes)
+            except Exception as e:
+                print(f"Exception when reducing tuple {workload} with {num_parallel_probes} parallel probes: {e}")
+                reduction_durations[num_parallel_probes].append(None)
+                continue
+            reduction_durations[num_parallel_probes].append(time.time() - start_time)
+
+            # The parallel searches must find the same bounds as the sequential one.
+            elf_digest = tuple(hashlib.sha256(open(os.path.join(target_dir, elf_name), 'rb').read()).hexdigest() if os.path.exists(os.path.join(target_dir, elf_name)) else None for elf_name in ('app_buggy.elf', 'app_ok.elf'))
+            if workload_id in reduced_elf_digests:
+                assert reduced_elf_digests[workload_id] == elf_digest, f"Reduced programs differ with {num_parallel_probes} parallel probes for tuple {workload}."
+            else:
+                reduced_elf_digests[workload_id] = elf_digest
+    return reduction_durations
+
+# @param nums_parallel_probes if not None, then additionally reduce the first num_testcases instances one after the other with each of these numbers of parallel probes per reduction, and report the wall-clock speedup against the first one.
+def eval_reduction(design_name: str, num_testcases: int, num_workers: int, nums_parallel_probes: list = None):
     global callback_lock
     global newly_completed_reductions_nb
     global all_reduction_results
@@ -99,11 +127,22 @@ def eval_reduction(design_name: str, num_testcases: int, num_workers: int):
     pool.close()
     pool.terminate()
 
+    # Wall-clock speedup against the number of cores dedicated to each reduction
+    if nums_parallel_probes:
+        reduction_durations = _eval_reduction_speedup(workloads[:num_testcases], nums_parallel_probes)
+        ref_total_seconds = sum(filter(None, reduction_durations[nums_parallel_probes[0]]))
+        reduction_speedups = dict()
+        for num_parallel_probes in nums_parallel_probes:
+            reduction_speedups[num_parallel_probes] = ref_total_seconds / sum(filter(None, reduction_durations[num_parallel_probes]))
+            print(f"Reduction with {num_parallel_probes} parallel probes: {sum(filter(None, reduction_durations[num_parallel_probes])):.1f} s in total, speedup {reduction_speedups[num_parallel_probes]:.2f}.")
+    else:
+        reduction_durations, reduction_speedups = None, None
+
     # Save the requested number of failing instances
     json_path = os.path.join(PATH_TO_TMP, f"evalreduction_{design_name}_{num_testcases}.json")
     print('Saving figure to', json_path)
     os.makedirs(PATH_TO_TMP, exist_ok=True)
-    json.dump({'all_reduction_results': all_reduction_results, 'num_failures': num_failures}, open(json_path, 'w'))
+    json.dump({'all_reduction_results': all_reduction_results, 'num_failures': num_failures, 'reduction_durations_per_num_parallel_probes': reduction_durations, 'reduction_speedups_per_num_parallel_probes': reduction_speedups}, open(json_path, 'w'))
 
 DESIGN_PRETTY_NAMES = {
     'picorv32': 'PicoRV32',
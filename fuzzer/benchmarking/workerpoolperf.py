@@ -0,0 +1,89 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module measures the task dispatch overhead and the first-task latency of the worker pools, with jobs that prepare a simulation as the fuzzing jobs do.
+# The jobs either re-derive the design paths and simulation environment at each task, as previously, or use the design context of the warm design workers.
+# Each setup is measured in a fresh forked process, so that the modules imported by a setup do not benefit the next ones.
+
+from params.runparams import PATH_TO_TMP
+from common import designcfgs
+from common.designcontext import get_design_context, gen_design_job_scheduler, get_verilator_sim_kind, _gen_verilator_executable_path
+from common.scheduler import JobScheduler, JOB_STATUS_DONE, _MP_CONTEXT
+from common.sim.commonsim import setup_sim_env
+
+import json
+import multiprocessing as mp
+import os
+import time
+
+# The previous derivation of the design path, which reads design_repos.json at each call, as a reference.
+def _get_design_cascade_path_ref(design_name: str) -> str:
+    designs_folder = os.getenv("CASCADE_DESIGN_PROCESSING_ROOT")
+    with open(os.path.join(designs_folder, designcfgs.DESIGN_REPOS_JSON_NAME), "r") as f:
+        return os.path.join(designs_folder, json.load(f)[design_name])
+
+# @brief prepares the environment and the executable path of a simulation, as runsim_verilator does.
+# @return the number of environment variables, so that the result is cheap to send back.
+def _sim_setup_job(design_name: str, use_design_context: bool) -> int:
+    import cascade.fuzzsim
+    if use_design_context:
+        design_context = get_design_context(design_name)
+        my_env = setup_sim_env('/dev/null', '/dev/null', '/dev/null', 1000, design_context.cascadedir, None, False, design_context.sim_base_env)
+        my_env['SIMEXEC'] = design_context.verilator_executable_paths[get_verilator_sim_kind(None, False)]
+    else:
+        cascadedir = _get_design_cascade_path_ref(design_name)
+        my_env = setup_sim_env('/dev/null', '/dev/null', '/dev/null', 1000, cascadedir, None, False)
+        my_env['SIMEXEC'] = _gen_verilator_executable_path(design_name, cascadedir, get_verilator_sim_kind(None, False))
+    return len(my_env)
+
+# @return a pair (first-task latency in seconds, dispatch seconds per task after the first one).
+def _measure_setup(setup_name: str, design_name: str, num_workers: int, num_tasks: int):
+    use_design_context = setup_name == 'designscheduler'
+    start_time = time.time()
+    result_times = []
+    if setup_name == 'pool':
+        with mp.Pool(num_workers) as pool:
+            for _ in pool.imap(_sim_setup_job_args, [(design_name, False)] * num_tasks):
+                result_times.append(time.time())
+    else:
+        def on_result(job_result):
+            assert job_result.status == JOB_STATUS_DONE, f"Job {job_result.job_id} did not complete: {job_result.error_str}"
+            result_times.append(time.time())
+            return False
+        gen_job_args = lambda job_id: (design_name, use_design_context) if job_id < num_tasks else None
+        if setup_name == 'scheduler':
+            JobScheduler(_sim_setup_job, num_workers).run(gen_job_args, on_result)
+        elif setup_name == 'designscheduler':
+            gen_design_job_scheduler(_sim_setup_job, design_name, num_workers).run(gen_job_args, on_result)
+        else:
+            raise ValueError(f"Unknown setup `{setup_name}`.")
+    return result_times[0] - start_time, (result_times[-1] - result_times[0]) / max(num_tasks - 1, 1)
+
+def _sim_setup_job_args(job_args: tuple) -> int:
+    return _sim_setup_job(*job_args)
+
+def _measure_setup_in_child(setup_name: str, design_name: str, num_workers: int, num_tasks: int, result_queue):
+    result_queue.put(_measure_setup(setup_name, design_name, num_workers, num_tasks))
+
+# @return the path to the json file containing the results.
+def benchmark_worker_pool(design_name: str, num_workers: int = 8, num_tasks: int = 2000, num_reps: int = 3):
+    results = dict()
+    for setup_name in ('pool', 'scheduler', 'designscheduler'):
+        setup_results = []
+        for _ in range(num_reps):
+            result_queue = _MP_CONTEXT.Queue()
+            measuring_process = _MP_CONTEXT.Process(target=_measure_setup_in_child, args=(setup_name, design_name, num_workers, num_tasks, result_queue))
+            measuring_process.start()
+            setup_results.append(result_queue.get())
+            measuring_process.join()
+        first_task_seconds = sum(map(lambda r: r[0], setup_results)) / num_reps
+        dispatch_seconds = sum(map(lambda r: r[1], setup_results)) / num_reps
+        results[setup_name] = {'first_task_ms': 1000*first_task_seconds, 'dispatch_us_per_task': 1e6*dispatch_seconds}
+        print(f"{setup_name}: first task after {1000*first_task_seconds:.1f} ms, then {1e6*dispatch_seconds:.1f} us per task.")
+
+    json_path = os.path.join(PATH_TO_TMP, f"workerpoolperf_{design_name}_{num_workers}.json")
+    with open(json_path, 'w') as f:
+        json.dump(results, f)
+    print('Saved worker pool performance results to', json_path)
+    return json_path
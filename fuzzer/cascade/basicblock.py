@@ -426,6 +426,8 @@ def gen_producer_id_to_tgtaddr(fuzzerstate, memop_addrs):
                         assert fuzzerstate.final_bb_base_addr is not None and fuzzerstate.final_bb_base_addr >= 0
                     curr_addr = fuzzerstate.bb_start_addr_seq[bb_id] + bb_instr_id * 4 # NO_COMPRESSED
                     bb_instr.imm = fuzzerstate.final_bb_base_addr - curr_addr
+                    # The operands are checked at construction, and this is the only immediate that is set afterwards.
+                    bb_instr.assert_imm_size()
                 index_in_bb_start_addr_seq += 1
 
     if DO_ASSERT:
@@ -520,8 +522,7 @@ def pop_last_bbs_to_connect_with_final_block(fuzzerstate):
             return True
         # else, in case the last block could not reach the final block, then we discard it and try with the previous one.
         popped_at_least_once = True
-        fuzzerstate.instr_objs_seq.pop()
-        fuzzerstate.bb_start_addr_seq.pop()
+        fuzzerstate.pop_last_bb()
         fuzzerstate.saved_reg_states.pop()
     return False
 
@@ -9,6 +9,7 @@ from params.runparams import DO_ASSERT
 from rv.csrids import CSR_IDS
 from rv.util import INSTRUCTION_IDS, PARAM_SIZES_BITS_32, PARAM_SIZES_BITS_64, PARAM_IS_SIGNED
 from rv.asmutil import li_into_reg, twos_complement, to_unsigned
+from rv.encodingtemplates import gen_encoding_template_table, imm_itype_bits, imm_stype_bits, imm_btype_bits, imm_utype_bits, RD_OFFSET, RM_OFFSET, RS1_OFFSET, RS2_OFFSET, RS3_OFFSET
 from rv.rvprivileged import rvprivileged_mret, rvprivileged_sret
 from rv.zifencei import *
 from rv.zicsr import *
@@ -21,6 +22,8 @@ from rv.rv64f import *
 from rv.rv64d import *
 from rv.rv64m import *
 
+import array
+import numpy as np
 import random
 
 # These classes are here for generating multi-instruction fuzzing programs.
@@ -30,6 +33,7 @@ import random
 ###
 
 class CFInstruction:
+    __slots__ = ('instr_str', 'iscompressed')
     # Could be any instruction
     authorized_instr_strs = range(len(INSTRUCTION_IDS))
 
@@ -44,12 +48,24 @@ class CFInstruction:
         assert not iscompressed, "Compressed instructions are not yet supported."
         self.assert_authorized_instr_strs()
 
+    # Checks that the operands fit in their fields. The encoding templates OR the operands without masking them, so an out-of-range operand would silently corrupt the neighboring fields.
+    # Called at construction, as assert_imm_size, since the registers are never reassigned afterwards.
+    # @param reg_ids the register ids, on 5 bits.
+    def assert_operand_fields(self, *reg_ids, rm: int = 0):
+        if DO_ASSERT:
+            for reg_id in reg_ids:
+                assert reg_id >= 0
+                assert reg_id < 32, f"Register id `{reg_id}` does not fit in its field for `{self.instr_str}`."
+            assert rm >= 0
+            assert rm < 8
+
     # @param is_spike_resolution: some rare instructions (typically offset management placeholders) are treated differently between spike resolution and the subsequent actual simulation.
     def gen_bytecode_int(self, is_spike_resolution: bool):
         raise ValueError('Cannot generate bytecode in the abstract instruction classes.')
 
 # Any instruction with an immediate
 class ImmInstruction(CFInstruction):
+    __slots__ = ('is_design_64bit', 'imm')
     # static
     authorized_instr_strs = ("lui", "auipc", "jal", "jalr", "beq", "bne", "blt", "bge", "bltu", "bgeu", "lb", "lh", "lw", "lbu", "lhu", "sb", "sh", "sw", "addi", "slti", "sltiu", "xori", "ori", "andi", "slli", "srli", "srai", "lwu", "ld", "sd", "addiw", "slliw", "srliw", "sraiw", "flw", "fsw", "fld", "fsd")
     # Checks the immediate size.
@@ -80,6 +96,8 @@ class ImmInstruction(CFInstruction):
 # Instructions with rs1, rs2 and rd
 R12DInstructions = ("add", "sub", "sll", "slt", "sltu", "xor", "srl", "sra", "or", "and", "addw", "subw", "sllw", "srlw", "sraw", "mul", "mulh", "mulhsu", "mulhu", "div", "divu", "rem", "remu", "mulw", "divw", "divuw", "remw", "remuw")
 class R12DInstruction(CFInstruction):
+    __slots__ = ('rs1', 'rs2', 'rd')
+    encoding_templates = gen_encoding_template_table(R12DInstructions)
     authorized_instr_strs = R12DInstructions
 
     def __init__(self, instr_str: str, rd: int, rs1: int, rs2: int, iscompressed: bool = False):
@@ -91,78 +109,19 @@ class R12DInstruction(CFInstruction):
             assert rs2 < MAX_NUM_PICKABLE_REGS or rs2 in (RELOCATOR_REGISTER_ID, MPP_BOTH_ENDIS_REGISTER_ID, MPP_TOP_ENDIS_REGISTER_ID)
             assert rd >= 0
             assert rd < MAX_NUM_PICKABLE_REGS or rd in (RELOCATOR_REGISTER_ID, MPP_BOTH_ENDIS_REGISTER_ID, MPP_TOP_ENDIS_REGISTER_ID)
+            self.assert_operand_fields(rd, rs1, rs2)
         self.rs1 = rs1
         self.rs2 = rs2
         self.rd =  rd
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32i
-        if self.instr_str == "add":
-            return rv32i_add(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "sub":
-            return rv32i_sub(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "sll":
-            return rv32i_sll(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "slt":
-            return rv32i_slt(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "sltu":
-            return rv32i_sltu(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "xor":
-            return rv32i_xor(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "srl":
-            return rv32i_srl(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "sra":
-            return rv32i_sra(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "or":
-            return rv32i_or(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "and":
-            return rv32i_and(self.rd, self.rs1, self.rs2)
-        # rv64i
-        elif self.instr_str == "addw":
-            return rv64i_addw(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "subw":
-            return rv64i_subw(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "sllw":
-            return rv64i_sllw(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "srlw":
-            return rv64i_srlw(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "sraw":
-            return rv64i_sraw(self.rd, self.rs1, self.rs2)
-        # rv32m
-        elif self.instr_str == "mul":
-            return rv32m_mul(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "mulh":
-            return rv32m_mulh(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "mulhsu":
-            return rv32m_mulhsu(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "mulhu":
-            return rv32m_mulhu(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "div":
-            return rv32m_div(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "divu":
-            return rv32m_divu(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "rem":
-            return rv32m_rem(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "remu":
-            return rv32m_remu(self.rd, self.rs1, self.rs2)
-        # rv64m
-        elif self.instr_str == "mulw":
-            return rv64m_mulw(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "divw":
-            return rv64m_divw(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "divuw":
-            return rv64m_divuw(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "remw":
-            return rv64m_remw(self.rd, self.rs1, self.rs2)
-        elif self.instr_str == "remuw":
-            return rv64m_remuw(self.rd, self.rs1, self.rs2)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rd << RD_OFFSET) | (self.rs1 << RS1_OFFSET) | (self.rs2 << RS2_OFFSET)
 
 # Instructions with imm and rd
 ImmRdInstructions = ("lui", "auipc")
 class ImmRdInstruction(ImmInstruction):
+    __slots__ = ('rd',)
+    encoding_templates = gen_encoding_template_table(ImmRdInstructions)
     authorized_instr_strs = ImmRdInstructions
 
     def __init__(self, instr_str: str, rd: int, imm: int, is_design_64bit: bool, iscompressed: bool = False, is_rd_nonpickable_ok: bool = False):
@@ -170,23 +129,19 @@ class ImmRdInstruction(ImmInstruction):
         if DO_ASSERT:
             assert rd >= 0
             assert is_rd_nonpickable_ok or rd < MAX_NUM_PICKABLE_REGS or rd in (RELOCATOR_REGISTER_ID, RDEP_MASK_REGISTER_ID, FPU_ENDIS_REGISTER_ID)
+            self.assert_operand_fields(rd)
         self.imm = imm
         self.rd =  rd
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32i
-        if self.instr_str == "lui":
-            return rv32i_lui(self.rd, self.imm)
-        elif self.instr_str == "auipc":
-            return rv32i_auipc(self.rd, self.imm)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rd << RD_OFFSET) | imm_utype_bits(self.imm)
 
 
 # Instructions with rs1, imm and rd
 RegImmInstructions = ("addi", "slti", "sltiu", "xori", "ori", "andi", "slli", "srli", "srai", "addiw", "slliw", "srliw", "sraiw")
 class RegImmInstruction(ImmInstruction):
+    __slots__ = ('rs1', 'rd')
+    encoding_templates = gen_encoding_template_table(RegImmInstructions)
     authorized_instr_strs = RegImmInstructions
 
     def __init__(self, instr_str: str, rd: int, rs1: int, imm: int, is_design_64bit: bool, iscompressed: bool = False, is_rd_nonpickable_ok: bool = False):
@@ -196,47 +151,20 @@ class RegImmInstruction(ImmInstruction):
             assert is_rd_nonpickable_ok or rs1 < MAX_NUM_PICKABLE_REGS or rs1 in (RELOCATOR_REGISTER_ID, RDEP_MASK_REGISTER_ID, FPU_ENDIS_REGISTER_ID, MPP_BOTH_ENDIS_REGISTER_ID, MPP_TOP_ENDIS_REGISTER_ID, SPP_ENDIS_REGISTER_ID), f"Got rs1 (select) =`{rs1}`"
             assert rd >= 0
             assert is_rd_nonpickable_ok or rd < MAX_NUM_PICKABLE_REGS or rd in (RELOCATOR_REGISTER_ID, RDEP_MASK_REGISTER_ID, FPU_ENDIS_REGISTER_ID, MPP_BOTH_ENDIS_REGISTER_ID, MPP_TOP_ENDIS_REGISTER_ID, SPP_ENDIS_REGISTER_ID), f"Got rd (select) =`{rd}`"
+            self.assert_operand_fields(rd, rs1)
         self.rs1 = rs1
         self.rd =  rd
         if self.instr_str == "sraiw" and self.imm < 0:
             assert False
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32i
-        if self.instr_str == "addi":
-            return rv32i_addi(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "slti":
-            return rv32i_slti(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "sltiu":
-            return rv32i_sltiu(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "xori":
-            return rv32i_xori(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "ori":
-            return rv32i_ori(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "andi":
-            return rv32i_andi(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "slli":
-            return rv32i_slli(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "srli":
-            return rv32i_srli(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "srai":
-            return rv32i_srai(self.rd, self.rs1, self.imm)
-        # rv64i
-        elif self.instr_str == "addiw":
-            return rv64i_addiw(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "slliw":
-            return rv64i_slliw(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "srliw":
-            return rv64i_srliw(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "sraiw":
-            return rv64i_sraiw(self.rd, self.rs1, self.imm)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rd << RD_OFFSET) | (self.rs1 << RS1_OFFSET) | imm_itype_bits(self.imm)
 
 # Branch instructions: with rs1, rs2 and an immediate
 BranchInstructions = ("beq", "bne", "blt", "bge", "bltu", "bgeu")
 class BranchInstruction(ImmInstruction):
+    __slots__ = ('rs1', 'rs2', 'plan_taken')
+    encoding_templates = gen_encoding_template_table(BranchInstructions)
     authorized_instr_strs = BranchInstructions
 
     # @param plan_taken is True iff the branch instruction is planned to be taken.
@@ -247,6 +175,7 @@ class BranchInstruction(ImmInstruction):
             assert rs1 < MAX_NUM_PICKABLE_REGS
             assert rs2 >= 0
             assert rs2 < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(rs1, rs2)
         self.rs1 = rs1
         self.rs2 = rs2
         self.plan_taken = plan_taken
@@ -279,26 +208,12 @@ class BranchInstruction(ImmInstruction):
             else:
                 return rv32i_addi(0, 0, 0) # Nop
         else:
-            # rv32i
-            if self.instr_str == "beq":
-                return rv32i_beq(self.rs1, self.rs2, self.imm)
-            elif self.instr_str == "bne":
-                return rv32i_bne(self.rs1, self.rs2, self.imm)
-            elif self.instr_str == "blt":
-                return rv32i_blt(self.rs1, self.rs2, self.imm)
-            elif self.instr_str == "bge":
-                return rv32i_bge(self.rs1, self.rs2, self.imm)
-            elif self.instr_str == "bltu":
-                return rv32i_bltu(self.rs1, self.rs2, self.imm)
-            elif self.instr_str == "bgeu":
-                return rv32i_bgeu(self.rs1, self.rs2, self.imm)
-            # Default case
-            else:
-                raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+            return self.encoding_templates[self.instr_str] | (self.rs1 << RS1_OFFSET) | (self.rs2 << RS2_OFFSET) | imm_btype_bits(self.imm)
 
 # The jal instruction
 JALInstructions = ("jal",)
 class JALInstruction(ImmInstruction):
+    __slots__ = ('rd',)
     authorized_instr_strs = JALInstructions
 
     def __init__(self, instr_str: str, rd: int, imm: int, iscompressed: bool = False):
@@ -316,6 +231,7 @@ class JALInstruction(ImmInstruction):
 # The jalr instruction
 JALRInstructions = ("jalr",)
 class JALRInstruction(ImmInstruction):
+    __slots__ = ('rd', 'rs1', 'producer_id')
     authorized_instr_strs = JALRInstructions
 
     def __init__(self, instr_str: str, rd: int, rs1: int, imm: int, producer_id: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -336,44 +252,37 @@ class JALRInstruction(ImmInstruction):
 # Instructions that create no information flow
 SpecialInstructions = ("fence", "fence.i")
 class SpecialInstruction(CFInstruction):
+    __slots__ = ('rd', 'rs1')
+    encoding_templates = gen_encoding_template_table(SpecialInstructions)
     authorized_instr_strs = SpecialInstructions
 
     def __init__(self, instr_str: str, rd: int = 0, rs1: int = 0, iscompressed: bool = False):
         super().__init__(instr_str, iscompressed)
         self.rd = rd
         self.rs1 = rs1
+        if DO_ASSERT:
+            self.assert_operand_fields(rd, rs1)
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32i
-        if self.instr_str == "fence":
-            return rv32i_fence(self.rd, self.rs1)
-        # zifencei
-        elif self.instr_str == "fence.i":
-            return zifencei_fencei(self.rd, self.rs1)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rd << RD_OFFSET) | (self.rs1 << RS1_OFFSET)
 
 EcallEbreakInstructions = ("ecall", "ebreak")
 class EcallEbreakInstruction(CFInstruction):
+    __slots__ = ()
+    encoding_templates = gen_encoding_template_table(EcallEbreakInstructions)
     authorized_instr_strs = EcallEbreakInstructions
 
     def __init__(self, instr_str: str, iscompressed: bool = False):
         super().__init__(instr_str, iscompressed)
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32i
-        if self.instr_str == "ecall":
-            return rv32i_ecall()
-        elif self.instr_str == "ebreak":
-            return rv32i_ebreak()
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str]
 
 # Integer load instructions
 IntLoadInstructions = ("lb", "lh", "lw", "lbu", "lhu", "lwu", "ld")
 class IntLoadInstruction(ImmInstruction):
+    __slots__ = ('rd', 'rs1', 'producer_id')
+    encoding_templates = gen_encoding_template_table(IntLoadInstructions)
     authorized_instr_strs = IntLoadInstructions
 
     def __init__(self, instr_str: str, rd: int, rs1: int, imm: int, producer_id: int, is_design_64bit: bool, iscompressed: bool = False, is_rd_nonpickable_ok: bool = False):
@@ -383,34 +292,19 @@ class IntLoadInstruction(ImmInstruction):
             assert rd < MAX_NUM_PICKABLE_REGS
             assert rs1 >= 0
             assert is_rd_nonpickable_ok or rs1 < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(rd, rs1)
         self.rd  = rd
         self.rs1 =  rs1
         self.producer_id = producer_id
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32i
-        if self.instr_str == "lb":
-            return rv32i_lb(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "lh":
-            return rv32i_lh(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "lw":
-            return rv32i_lw(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "lbu":
-            return rv32i_lbu(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "lhu":
-            return rv32i_lhu(self.rd, self.rs1, self.imm)
-        # rv64i
-        elif self.instr_str == "lwu":
-            return rv64i_lwu(self.rd, self.rs1, self.imm)
-        elif self.instr_str == "ld":
-            return rv64i_ld(self.rd, self.rs1, self.imm)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rd << RD_OFFSET) | (self.rs1 << RS1_OFFSET) | imm_itype_bits(self.imm)
 
 # Integer store instructions
 IntStoreInstructions = ("sb", "sh", "sw", "sd")
 class IntStoreInstruction(ImmInstruction):
+    __slots__ = ('rs1', 'rs2', 'producer_id')
+    encoding_templates = gen_encoding_template_table(IntStoreInstructions)
     authorized_instr_strs = IntStoreInstructions
 
     def __init__(self, instr_str: str, rs1: int, rs2: int, imm: int, producer_id: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -420,24 +314,13 @@ class IntStoreInstruction(ImmInstruction):
             assert rs1 < MAX_NUM_PICKABLE_REGS or rs1 in (RELOCATOR_REGISTER_ID, RDEP_MASK_REGISTER_ID)
             assert rs2 >= 0
             assert rs2 < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(rs1, rs2)
         self.rs1 =  rs1
         self.rs2  = rs2
         self.producer_id = producer_id
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32i
-        if self.instr_str == "sb":
-            return rv32i_sb(self.rs1, self.rs2, self.imm)
-        elif self.instr_str == "sh":
-            return rv32i_sh(self.rs1, self.rs2, self.imm)
-        elif self.instr_str == "sw":
-            return rv32i_sw(self.rs1, self.rs2, self.imm)
-        # rv64i
-        elif self.instr_str == "sd":
-            return rv64i_sd(self.rs1, self.rs2, self.imm)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rs1 << RS1_OFFSET) | (self.rs2 << RS2_OFFSET) | imm_stype_bits(self.imm)
 
 ###
 # Floating-point
@@ -446,6 +329,8 @@ class IntStoreInstruction(ImmInstruction):
 # Float load instructions
 FloatLoadInstructions = ("flw", "fld")
 class FloatLoadInstruction(ImmInstruction):
+    __slots__ = ('frd', 'rs1', 'producer_id')
+    encoding_templates = gen_encoding_template_table(FloatLoadInstructions)
     authorized_instr_strs = FloatLoadInstructions
 
     def __init__(self, instr_str: str, frd: int, rs1: int, imm: int, producer_id: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -455,24 +340,19 @@ class FloatLoadInstruction(ImmInstruction):
             assert frd < MAX_NUM_PICKABLE_REGS
             assert rs1 >= 0
             assert rs1 < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(frd, rs1)
         self.frd  = frd
         self.rs1 =  rs1
         self.producer_id = producer_id
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32f
-        if self.instr_str == "flw":
-            return rv32f_flw(self.frd, self.rs1, self.imm)
-        # rv32d
-        elif self.instr_str == "fld":
-            return rv32d_fld(self.frd, self.rs1, self.imm)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.frd << RD_OFFSET) | (self.rs1 << RS1_OFFSET) | imm_itype_bits(self.imm)
 
 # Float store instructions
 FloatStoreInstructions = ("fsw", "fsd")
 class FloatStoreInstruction(ImmInstruction):
+    __slots__ = ('rs1', 'frs2', 'producer_id')
+    encoding_templates = gen_encoding_template_table(FloatStoreInstructions)
     authorized_instr_strs = FloatStoreInstructions
 
     def __init__(self, instr_str: str, rs1: int, frs2: int, imm: int, producer_id: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -482,24 +362,19 @@ class FloatStoreInstruction(ImmInstruction):
             assert rs1 < MAX_NUM_PICKABLE_REGS or rs1 in (RELOCATOR_REGISTER_ID, RDEP_MASK_REGISTER_ID)
             assert frs2 >= 0
             assert frs2 < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(rs1, frs2)
         self.rs1  =  rs1
         self.frs2 = frs2
         self.producer_id = producer_id
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32f
-        if self.instr_str == "fsw":
-            return rv32f_fsw(self.rs1, self.frs2, self.imm)
-        # rv32d
-        elif self.instr_str == "fsd":
-            return rv32d_fsd(self.rs1, self.frs2, self.imm)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rs1 << RS1_OFFSET) | (self.frs2 << RS2_OFFSET) | imm_stype_bits(self.imm)
 
 # Float to int instructions
 FloatToIntInstructions = ("fcvt.w.s", "fcvt.wu.s", "fcvt.l.s", "fcvt.lu.s", "fcvt.w.d", "fcvt.wu.d", "fcvt.l.d", "fcvt.lu.d")
 class FloatToIntInstruction(CFInstruction):
+    __slots__ = ('rm', 'frs1', 'rd')
+    encoding_templates = gen_encoding_template_table(FloatToIntInstructions)
     authorized_instr_strs = FloatToIntInstructions
 
     def __init__(self, instr_str: str, rd: int, frs1: int, rm: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -511,40 +386,20 @@ class FloatToIntInstruction(CFInstruction):
             assert frs1 < MAX_NUM_PICKABLE_REGS
             assert rd >= 0
             assert rd < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(rd, frs1, rm=rm)
         self.rm   = rm
         self.frs1 = frs1
         self.rd   = rd
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32f
-        if self.instr_str == "fcvt.w.s":
-            return rv32f_fcvtws(self.rd, self.frs1, self.rm)
-        elif self.instr_str == "fcvt.wu.s":
-            return rv32f_fcvtwus(self.rd, self.frs1, self.rm)
-        # rv64f
-        elif self.instr_str == "fcvt.l.s":
-            return rv64f_fcvtls(self.rd, self.frs1, self.rm)
-        elif self.instr_str == "fcvt.lu.s":
-            return rv64f_fcvtlus(self.rd, self.frs1, self.rm)
-        # rv32d
-        elif self.instr_str == "fcvt.w.d":
-            return rv32d_fcvtwd(self.rd, self.frs1, self.rm)
-        # rv32d
-        elif self.instr_str == "fcvt.wu.d":
-            return rv32d_fcvtwud(self.rd, self.frs1, self.rm)
-        # rv64d
-        elif self.instr_str == "fcvt.l.d":
-            return rv64d_fcvtld(self.rd, self.frs1, self.rm)
-        elif self.instr_str == "fcvt.lu.d":
-            return rv64d_fcvtlud(self.rd, self.frs1, self.rm)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rd << RD_OFFSET) | (self.rm << RM_OFFSET) | (self.frs1 << RS1_OFFSET)
 
 
 # Int to float instructions
 IntToFloatInstructions = ("fcvt.s.w", "fcvt.s.wu", "fcvt.s.l", "fcvt.s.lu", "fcvt.d.w", "fcvt.d.wu", "fcvt.d.l", "fcvt.d.lu")
 class IntToFloatInstruction(CFInstruction):
+    __slots__ = ('rs1', 'frd', 'rm')
+    encoding_templates = gen_encoding_template_table(IntToFloatInstructions)
     authorized_instr_strs = IntToFloatInstructions
 
     def __init__(self, instr_str: str, frd: int, rs1: int, rm: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -556,38 +411,19 @@ class IntToFloatInstruction(CFInstruction):
             assert rs1 < MAX_NUM_PICKABLE_REGS
             assert frd >= 0
             assert frd < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(frd, rs1, rm=rm)
         self.rs1 = rs1
         self.frd = frd
         self.rm  = rm
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32f
-        if self.instr_str == "fcvt.s.w":
-            return rv32f_fcvtsw(self.frd, self.rs1, self.rm)
-        elif self.instr_str == "fcvt.s.wu":
-            return rv32f_fcvtswu(self.frd, self.rs1, self.rm)
-        # rv64f
-        elif self.instr_str == "fcvt.s.l":
-            return rv64f_fcvtsl(self.frd, self.rs1, self.rm)
-        elif self.instr_str == "fcvt.s.lu":
-            return rv64f_fcvtslu(self.frd, self.rs1, self.rm)
-        # rv32d
-        elif self.instr_str == "fcvt.d.w":
-            return rv32d_fcvtdw(self.frd, self.rs1, self.rm)
-        elif self.instr_str == "fcvt.d.wu":
-            return rv32d_fcvtdwu(self.frd, self.rs1, self.rm)
-        # rv64d
-        elif self.instr_str == "fcvt.d.l":
-            return rv64d_fcvtdl(self.frd, self.rs1, self.rm)
-        elif self.instr_str == "fcvt.d.lu":
-            return rv64d_fcvtdlu(self.frd, self.rs1, self.rm)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.frd << RD_OFFSET) | (self.rm << RM_OFFSET) | (self.rs1 << RS1_OFFSET)
 
 # Pure float instructions with frs1, frs2, frs3 and frd
 Float4Instructions = ("fmadd.s", "fmsub.s", "fnmsub.s", "fnmadd.s", "fmadd.d", "fmsub.d", "fnmsub.d", "fnmadd.d")
 class Float4Instruction(CFInstruction):
+    __slots__ = ('rm', 'frs1', 'frs2', 'frs3', 'frd')
+    encoding_templates = gen_encoding_template_table(Float4Instructions)
     authorized_instr_strs = Float4Instructions
 
     def __init__(self, instr_str: str, frd: int, frs1: int, frs2: int, frs3: int, rm: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -603,6 +439,7 @@ class Float4Instruction(CFInstruction):
             assert frs3 < MAX_NUM_PICKABLE_REGS
             assert frd >= 0
             assert frd < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(frd, frs1, frs2, frs3, rm=rm)
         self.rm   = rm
         self.frs1 = frs1
         self.frs2 = frs2
@@ -610,31 +447,13 @@ class Float4Instruction(CFInstruction):
         self.frd  = frd
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32f
-        if self.instr_str == "fmadd.s":
-            return rv32f_fmadds(self.frd, self.frs1, self.frs2, self.frs3, self.rm)
-        elif self.instr_str == "fmsub.s":
-            return rv32f_fmsubs(self.frd, self.frs1, self.frs2, self.frs3, self.rm)
-        elif self.instr_str == "fnmsub.s":
-            return rv32f_fnmsubs(self.frd, self.frs1, self.frs2, self.frs3, self.rm)
-        elif self.instr_str == "fnmadd.s":
-            return rv32f_fnmadds(self.frd, self.frs1, self.frs2, self.frs3, self.rm)
-        # rv32d
-        elif self.instr_str == "fmadd.d":
-            return rv32d_fmaddd(self.frd, self.frs1, self.frs2, self.frs3, self.rm)
-        elif self.instr_str == "fmsub.d":
-            return rv32d_fmsubd(self.frd, self.frs1, self.frs2, self.frs3, self.rm)
-        elif self.instr_str == "fnmsub.d":
-            return rv32d_fnmsubd(self.frd, self.frs1, self.frs2, self.frs3, self.rm)
-        elif self.instr_str == "fnmadd.d":
-            return rv32d_fnmaddd(self.frd, self.frs1, self.frs2, self.frs3, self.rm)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.frd << RD_OFFSET) | (self.rm << RM_OFFSET) | (self.frs1 << RS1_OFFSET) | (self.frs2 << RS2_OFFSET) | (self.frs3 << RS3_OFFSET)
 
 # Pure float instructions with frs1, frs2 and frd
 Float3Instructions = ("fadd.s", "fsub.s", "fmul.s", "fdiv.s", "fadd.d", "fsub.d", "fmul.d", "fdiv.d")
 class Float3Instruction(CFInstruction):
+    __slots__ = ('rm', 'frs1', 'frs2', 'frd')
+    encoding_templates = gen_encoding_template_table(Float3Instructions)
     authorized_instr_strs = Float3Instructions
 
     def __init__(self, instr_str: str, frd: int, frs1: int, frs2: int, rm: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -648,37 +467,20 @@ class Float3Instruction(CFInstruction):
             assert frs2 < MAX_NUM_PICKABLE_REGS
             assert frd >= 0
             assert frd < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(frd, frs1, frs2, rm=rm)
         self.rm   = rm
         self.frs1 = frs1
         self.frs2 = frs2
         self.frd  = frd
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32f
-        if self.instr_str == "fadd.s":
-            return rv32f_fadds(self.frd, self.frs1, self.frs2, self.rm)
-        elif self.instr_str == "fsub.s":
-            return rv32f_fsubs(self.frd, self.frs1, self.frs2, self.rm)
-        elif self.instr_str == "fmul.s":
-            return rv32f_fmuls(self.frd, self.frs1, self.frs2, self.rm)
-        elif self.instr_str == "fdiv.s":
-            return rv32f_fdivs(self.frd, self.frs1, self.frs2, self.rm)
-        # rv32d
-        elif self.instr_str == "fadd.d":
-            return rv32d_faddd(self.frd, self.frs1, self.frs2, self.rm)
-        elif self.instr_str == "fsub.d":
-            return rv32d_fsubd(self.frd, self.frs1, self.frs2, self.rm)
-        elif self.instr_str == "fmul.d":
-            return rv32d_fmuld(self.frd, self.frs1, self.frs2, self.rm)
-        elif self.instr_str == "fdiv.d":
-            return rv32d_fdivd(self.frd, self.frs1, self.frs2, self.rm)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.frd << RD_OFFSET) | (self.rm << RM_OFFSET) | (self.frs1 << RS1_OFFSET) | (self.frs2 << RS2_OFFSET)
 
 # Pure float instructions with frs1, frs2 and frd
 Float3NoRmInstructions = ("fsgnj.s", "fsgnjn.s", "fsgnjx.s", "fmin.s", "fmax.s", "fsgnj.d", "fsgnjn.d", "fsgnjx.d", "fmin.d", "fmax.d")
 class Float3NoRmInstruction(CFInstruction):
+    __slots__ = ('frs1', 'frs2', 'frd')
+    encoding_templates = gen_encoding_template_table(Float3NoRmInstructions)
     authorized_instr_strs = Float3NoRmInstructions
 
     def __init__(self, instr_str: str, frd: int, frs1: int, frs2: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -690,40 +492,19 @@ class Float3NoRmInstruction(CFInstruction):
             assert frs2 < MAX_NUM_PICKABLE_REGS
             assert frd >= 0
             assert frd < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(frd, frs1, frs2)
         self.frs1 = frs1
         self.frs2 = frs2
         self.frd  = frd
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32f
-        if  self.instr_str == "fsgnj.s":
-            return rv32f_fsgnjs(self.frd, self.frs1, self.frs2)
-        elif self.instr_str == "fsgnjn.s":
-            return rv32f_fsgnjns(self.frd, self.frs1, self.frs2)
-        elif self.instr_str == "fsgnjx.s":
-            return rv32f_fsgnjxs(self.frd, self.frs1, self.frs2)
-        elif self.instr_str == "fmin.s":
-            return rv32f_fmins(self.frd, self.frs1, self.frs2)
-        elif self.instr_str == "fmax.s":
-            return rv32f_fmaxs(self.frd, self.frs1, self.frs2)
-        # rv32d
-        if  self.instr_str == "fsgnj.d":
-            return rv32d_fsgnjd(self.frd, self.frs1, self.frs2)
-        elif self.instr_str == "fsgnjn.d":
-            return rv32d_fsgnjnd(self.frd, self.frs1, self.frs2)
-        elif self.instr_str == "fsgnjx.d":
-            return rv32d_fsgnjxd(self.frd, self.frs1, self.frs2)
-        elif self.instr_str == "fmin.d":
-            return rv32d_fmind(self.frd, self.frs1, self.frs2)
-        elif self.instr_str == "fmax.d":
-            return rv32d_fmaxd(self.frd, self.frs1, self.frs2)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.frd << RD_OFFSET) | (self.frs1 << RS1_OFFSET) | (self.frs2 << RS2_OFFSET)
 
 # Pure float instructions with frs1, and frd
 Float2Instructions = ("fsqrt.s", "fsqrt.d", "fcvt.d.s", "fcvt.s.d")
 class Float2Instruction(CFInstruction):
+    __slots__ = ('rm', 'frs1', 'frd')
+    encoding_templates = gen_encoding_template_table(Float2Instructions)
     authorized_instr_strs = Float2Instructions
 
     def __init__(self, instr_str: str, frd: int, frs1: int, rm: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -735,30 +516,19 @@ class Float2Instruction(CFInstruction):
             assert frs1 < MAX_NUM_PICKABLE_REGS
             assert frd >= 0
             assert frd < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(frd, frs1, rm=rm)
         self.rm   = rm
         self.frs1 = frs1
         self.frd  = frd
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32f
-        if self.instr_str == "fsqrt.s":
-            return rv32f_fsqrts(self.frd, self.frs1, self.rm)
-        # rv32d
-        elif self.instr_str == "fsqrt.d":
-            return rv32d_fsqrtd(self.frd, self.frs1, self.rm)
-        # rv32d
-        elif self.instr_str == "fcvt.d.s":
-            return rv32d_fcvtds(self.frd, self.frs1, self.rm)
-        # rv32d
-        elif self.instr_str == "fcvt.s.d":
-            return rv32d_fcvtsd(self.frd, self.frs1, self.rm)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.frd << RD_OFFSET) | (self.rm << RM_OFFSET) | (self.frs1 << RS1_OFFSET)
 
 # Flating point instructions of 2 source floats but an integer destination
 FloatIntRd2Instructions = ("feq.s", "flt.s", "fle.s", "feq.d", "flt.d", "fle.d")
 class FloatIntRd2Instruction(CFInstruction):
+    __slots__ = ('frs1', 'frs2', 'rd')
+    encoding_templates = gen_encoding_template_table(FloatIntRd2Instructions)
     authorized_instr_strs = FloatIntRd2Instructions
 
     def __init__(self, instr_str: str, rd: int, frs1: int, frs2: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -770,32 +540,19 @@ class FloatIntRd2Instruction(CFInstruction):
             assert frs2 < MAX_NUM_PICKABLE_REGS
             assert rd >= 0
             assert rd < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(rd, frs1, frs2)
         self.frs1 = frs1
         self.frs2 = frs2
         self.rd   = rd
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32f
-        if self.instr_str == "feq.s":
-            return rv32f_feqs(self.rd, self.frs1, self.frs2)
-        elif self.instr_str == "flt.s":
-            return rv32f_flts(self.rd, self.frs1, self.frs2)
-        elif self.instr_str == "fle.s":
-            return rv32f_fles(self.rd, self.frs1, self.frs2)
-        # rv32d
-        elif self.instr_str == "feq.d":
-            return rv32d_feqd(self.rd, self.frs1, self.frs2)
-        elif self.instr_str == "flt.d":
-            return rv32d_fltd(self.rd, self.frs1, self.frs2)
-        elif self.instr_str == "fle.d":
-            return rv32d_fled(self.rd, self.frs1, self.frs2)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rd << RD_OFFSET) | (self.frs1 << RS1_OFFSET) | (self.frs2 << RS2_OFFSET)
 
 # Flating point instructions of 1 source float but an integer destination
 FloatIntRd1Instructions = ("fmv.x.w", "fclass.s", "fclass.d", "fmv.x.d")
 class FloatIntRd1Instruction(CFInstruction):
+    __slots__ = ('frs1', 'rd')
+    encoding_templates = gen_encoding_template_table(FloatIntRd1Instructions)
     authorized_instr_strs = FloatIntRd1Instructions
 
     def __init__(self, instr_str: str, rd: int, frs1: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -805,28 +562,18 @@ class FloatIntRd1Instruction(CFInstruction):
             assert frs1 < MAX_NUM_PICKABLE_REGS
             assert rd >= 0
             assert rd < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(rd, frs1)
         self.frs1 = frs1
         self.rd   = rd
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32f
-        if self.instr_str == "fmv.x.w":
-            return rv32f_fmvxw(self.rd, self.frs1)
-        elif self.instr_str == "fclass.s":
-            return rv32f_fclasss(self.rd, self.frs1)
-        # rv32d
-        elif self.instr_str == "fclass.d":
-            return rv32d_fclassd(self.rd, self.frs1)
-        # rv64d
-        elif self.instr_str == "fmv.x.d":
-            return rv64d_fmvxd(self.rd, self.frs1)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rd << RD_OFFSET) | (self.frs1 << RS1_OFFSET)
 
 # Flating point instructions of 1 source int but a float destination
 FloatIntRs1Instructions = ("fmv.w.x", "fmv.d.x")
 class FloatIntRs1Instruction(CFInstruction):
+    __slots__ = ('rs1', 'frd')
+    encoding_templates = gen_encoding_template_table(FloatIntRs1Instructions)
     authorized_instr_strs = FloatIntRs1Instructions
 
     def __init__(self, instr_str: str, frd: int, rs1: int, is_design_64bit: bool, iscompressed: bool = False):
@@ -836,19 +583,12 @@ class FloatIntRs1Instruction(CFInstruction):
             assert rs1 < MAX_NUM_PICKABLE_REGS
             assert frd >= 0
             assert frd < MAX_NUM_PICKABLE_REGS
+            self.assert_operand_fields(frd, rs1)
         self.rs1 = rs1
         self.frd = frd
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32f
-        if self.instr_str == "fmv.w.x":
-            return rv32f_fmvwx(self.frd, self.rs1)
-        # rv64d
-        elif self.instr_str == "fmv.d.x":
-            return rv64d_fmvdx(self.frd, self.rs1)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.frd << RD_OFFSET) | (self.rs1 << RS1_OFFSET)
 
 ###
 # Atomic instructions
@@ -862,6 +602,7 @@ class FloatIntRs1Instruction(CFInstruction):
 
 # Any instruction with an immediate
 class CSRInstruction(CFInstruction):
+    __slots__ = ('csr_id',)
     # static
     authorized_instr_strs = ("csrrw", "csrrs", "csrrc", "csrrwi", "csrrsi", "csrrci")
     # Checks the immediate size.
@@ -879,6 +620,8 @@ class CSRInstruction(CFInstruction):
 # CSR operations without immediate
 CSRRegInstructions = "csrrw", "csrrs", "csrrc"
 class CSRRegInstruction(CSRInstruction):
+    __slots__ = ('rd', 'rs1')
+    encoding_templates = gen_encoding_template_table(CSRRegInstructions)
     authorized_instr_strs = CSRRegInstructions
 
     def __init__(self, instr_str: str, rd: int, rs1: int, csr_id: int, iscompressed: bool = False):
@@ -888,24 +631,18 @@ class CSRRegInstruction(CSRInstruction):
             assert rd < MAX_NUM_PICKABLE_REGS, f"rd: {rd}, MAX_NUM_PICKABLE_REGS: {MAX_NUM_PICKABLE_REGS}"
             assert rs1 >= 0
             assert rs1 < MAX_NUM_PICKABLE_REGS or rs1 in (FPU_ENDIS_REGISTER_ID, MPP_BOTH_ENDIS_REGISTER_ID, MPP_TOP_ENDIS_REGISTER_ID, SPP_ENDIS_REGISTER_ID), f"rs1: {rs1}, MAX_NUM_PICKABLE_REGS: {MAX_NUM_PICKABLE_REGS}"
+            self.assert_operand_fields(rd, rs1)
         self.rd  = rd
         self.rs1 =  rs1
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32i
-        if self.instr_str == "csrrw":
-            return zicsr_csrrw(self.rd, self.rs1, self.csr_id)
-        elif self.instr_str == "csrrs":
-            return zicsr_csrrs(self.rd, self.rs1, self.csr_id)
-        elif self.instr_str == "csrrc":
-            return zicsr_csrrc(self.rd, self.rs1, self.csr_id)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rd << RD_OFFSET) | (self.rs1 << RS1_OFFSET) | imm_itype_bits(self.csr_id)
 
 # CSR operations with immediate
 CSRImmInstructions = "csrrwi", "csrrsi", "csrrci"
 class CSRImmInstruction(CSRInstruction):
+    __slots__ = ('rd', 'uimm')
+    encoding_templates = gen_encoding_template_table(CSRImmInstructions)
     authorized_instr_strs = CSRImmInstructions
 
     def __init__(self, instr_str: str, rd: int, uimm: int, csr_id: int, iscompressed: bool = False):
@@ -915,20 +652,12 @@ class CSRImmInstruction(CSRInstruction):
             assert rd < MAX_NUM_PICKABLE_REGS
             assert uimm >= 0
             assert uimm < 1 << 5
+            self.assert_operand_fields(rd, uimm)
         self.rd   = rd
         self.uimm = uimm
 
     def gen_bytecode_int(self, is_spike_resolution: bool):
-        # rv32i
-        if self.instr_str == "csrrwi":
-            return zicsr_csrrwi(self.rd, self.uimm, self.csr_id)
-        elif self.instr_str == "csrrsi":
-            return zicsr_csrrsi(self.rd, self.uimm, self.csr_id)
-        elif self.instr_str == "csrrci":
-            return zicsr_csrrci(self.rd, self.uimm, self.csr_id)
-        # Default case
-        else:
-            raise ValueError(f"Unexpected instruction string: `{self.instr_str}`.")
+        return self.encoding_templates[self.instr_str] | (self.rd << RD_OFFSET) | (self.uimm << RS1_OFFSET) | imm_itype_bits(self.csr_id)
 
 
 ###
@@ -946,6 +675,7 @@ class CSRImmInstruction(CSRInstruction):
 
 # Does not inherit from CFInstruction.
 class PlaceholderProducerInstr0:
+    __slots__ = ('rd', 'producer_id', 'relocation_offset', 'spike_resolution_offset', 'rtl_offset', 'is_design_64bit')
     # When it is instantiated, the producer instructions do not know the offset yet, just the target address.
     def __init__(self, rd: int, producer_id: int, is_design_64bit: bool):
         self.rd = rd
@@ -968,6 +698,7 @@ class PlaceholderProducerInstr0:
 
 # Does not inherit from CFInstruction.
 class PlaceholderProducerInstr1:
+    __slots__ = ('rd', 'producer_id', 'relocation_offset', 'spike_resolution_offset', 'rtl_offset', 'is_design_64bit')
     # When it is instantiated, the producer instructions do not know the offset yet, just the target address.
     def __init__(self, rd: int, producer_id: int, is_design_64bit: bool):
         self.rd = rd
@@ -990,6 +721,7 @@ class PlaceholderProducerInstr1:
 
 # Does not inherit from CFInstruction.
 class PlaceholderPreConsumerInstr:
+    __slots__ = ('rdep',)
     # @param rdep: the register that creates the dependency
     def __init__(self, rdep: int):
         self.rdep = rdep
@@ -1000,6 +732,7 @@ class PlaceholderPreConsumerInstr:
 
 # Does not inherit from CFInstruction.
 class PlaceholderConsumerInstr:
+    __slots__ = ('rd', 'rdep', 'rprod', 'producer_id', 'dont_relocate_spike')
     # @param rd: the generated register, i.e., the target address for example
     # @param rdep: the register that creates the dependency
     # @param producer_id: is required to feed spike's feedback
@@ -1028,6 +761,7 @@ def is_placeholder(obj):
 ###
 
 class RawDataWord:
+    __slots__ = ('wordval',)
     # @param intentionally_signed: When unset, we expect a non-negative wordval
     def __init__(self, wordval: int, signed: bool = False):
         if DO_ASSERT:
@@ -1054,6 +788,7 @@ class RawDataWord:
 # Inheritance from ExceptionInstruction allows us to distinguish, for example, a real JAL form a JAL to a misaligned address that should cause an exception.
 # It also serves to abstract exception types in general parts of the codebase such as basicblock.py.
 class ExceptionInstruction:
+    __slots__ = ('instr_str', 'is_mtvec', 'producer_id')
     # @param producer_id: Used for exceptions (typically intentionally faulty jalr/loads/stores) that require a produced register for themselves in addition to the target address (held in the corresponding tvec). Keep None if none is needed.
     # @param is_mtvec: if the exception will be handled in machine mode. If false, then stvec.
     # Remargk: is_mtvec also determines which of mepc and sepc will be set.
@@ -1063,6 +798,7 @@ class ExceptionInstruction:
         self.producer_id = producer_id
 
 class SimpleIllegalInstruction(ExceptionInstruction):
+    __slots__ = ()
     def __init__(self, is_mtvec):
         super().__init__(is_mtvec, None)
     def gen_bytecode_int(self, is_spike_resolution: bool):
@@ -1070,6 +806,7 @@ class SimpleIllegalInstruction(ExceptionInstruction):
 
 # Exception that encapsulates an instruction that causes an exception, such as a misaligned JAL.
 class SimpleExceptionEncapsulator(ExceptionInstruction):
+    __slots__ = ('instr',)
     def __init__(self, is_mtvec, producer_id: int, instr):
         super().__init__(is_mtvec, producer_id)
         if DO_ASSERT:
@@ -1081,6 +818,7 @@ class SimpleExceptionEncapsulator(ExceptionInstruction):
 # This is a wrapper class for a misaligned load or store.
 # As opposed to usual load and store operations used above, this class chooses a consumed register by itself.
 class MisalignedMemInstruction(ExceptionInstruction):
+    __slots__ = ('misaligned_addr', 'meminstr')
     MISALIGNED_LH  = 0
     MISALIGNED_LW  = 1
     MISALIGNED_LHU = 2
@@ -1203,6 +941,7 @@ class MisalignedMemInstruction(ExceptionInstruction):
 # @remark we use a specific instruction for xtvec to find them easily when an exception occurs, to transmit back the expected value to the producer
 # @brief this instruction writes to mtvec or stvec
 class TvecWriterInstruction():
+    __slots__ = ('instr_str', 'producer_id', 'is_mtvec', 'csr_instr')
     def __init__(self, is_mtvec: bool, rd: int, rs1: int, producer_id: int):
         self.instr_str = 'TvecWriterInstruction'  # Just for compatibility with the fuzzer
 
@@ -1218,6 +957,7 @@ class TvecWriterInstruction():
 # @remark we use a specific instruction for xtvec to find them easily when an exception occurs, to transmit back the expected value to the producer
 # @brief this instruction writes to mepc or sepc
 class EPCWriterInstruction():
+    __slots__ = ('instr_str', 'producer_id', 'is_mepc', 'csr_instr')
     def __init__(self, is_mepc: bool, rd: int, rs1: int, producer_id: int):
         self.instr_str = 'EPCWriterInstruction'  # Just for compatibility with the fuzzer
 
@@ -1233,6 +973,7 @@ class EPCWriterInstruction():
 # @brief this instruction writes to mtvec or stvec
 # @The value written may differ between Spike and CPU
 class GenericCSRWriterInstruction():
+    __slots__ = ('instr_str', 'producer_id', 'val_to_write_spike', 'val_to_write_cpu', 'csr_instr')
     def __init__(self, csr_id: int, rd: int, rs1: int, producer_id: int, val_to_write_spike: int, val_to_write_cpu: int):
         if DO_ASSERT:
             assert csr_id in CSR_IDS
@@ -1252,6 +993,7 @@ class GenericCSRWriterInstruction():
         return self.csr_instr.gen_bytecode_int(is_spike_resolution)
 
 class PrivilegeDescentInstruction():
+    __slots__ = ('instr_str', 'is_mret')
     def __init__(self, is_mret: bool):
         self.instr_str = 'PrivilegeDescentInstruction' # Just for compatibility with the fuzzer
         self.is_mret = is_mret
@@ -1261,3 +1003,14 @@ class PrivilegeDescentInstruction():
             return rvprivileged_mret()
         else:
             return rvprivileged_sret()
+
+###
+# Batch encoding
+###
+
+# @brief encodes a sequence of instructions, typically a basic block, in a single call.
+# @param instr_objs a sequence of CFInstructions, placeholders or any other objects that implement gen_bytecode_int.
+# @return a numpy array of little-endian uint32, whose tobytes() is the memory content of the sequence.
+def gen_bytecode_array(instr_objs, is_spike_resolution: bool) -> np.ndarray:
+    # Filling an array.array from a list comprehension is faster than np.fromiter over a generator. The astype is a no-op on little-endian hosts.
+    return np.frombuffer(array.array('I', [instr_obj.gen_bytecode_int(is_spike_resolution) for instr_obj in instr_objs]), dtype=np.uint32).astype('<u4', copy=False)
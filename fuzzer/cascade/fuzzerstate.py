@@ -2,7 +2,7 @@
 # Licensed under the General Public License, Version 3.0, see LICENSE for details.
 # SPDX-License-Identifier: GPL-3.0-only
 
-from params.runparams import DO_ASSERT
+from params.runparams import DO_ASSERT, DO_EXPENSIVE_ASSERT
 from params.fuzzparams import RELOCATOR_REGISTER_ID, RDEP_MASK_REGISTER_ID, FPU_ENDIS_REGISTER_ID, MIN_NUM_PICKABLE_REGS, MAX_NUM_PICKABLE_REGS, MIN_NUM_PICKABLE_FLOATING_REGS, MAX_NUM_PICKABLE_FLOATING_REGS, MPP_BOTH_ENDIS_REGISTER_ID, MPP_TOP_ENDIS_REGISTER_ID, SPP_ENDIS_REGISTER_ID, MAX_NUM_STORE_LOCATIONS
 from common.designcfgs import is_design_32bit, design_has_float_support, design_has_double_support, design_has_muldiv_support, design_has_atop_support, design_has_misaligned_data_support, get_design_boot_addr, design_has_supervisor_mode, design_has_user_mode, design_has_compressed_support, design_has_pmp
 from common.spike import SPIKE_STARTADDR
@@ -16,6 +16,7 @@ from cascade.randomize.pickreg import IntRegPickState, FloatRegPickState
 from cascade.randomize.pickisainstrclass import ISAINSTRCLASS_INITIAL_BOOSTERS
 from cascade.randomize.pickexceptionop import EXCEPTION_OP_TYPE_INITIAL_BOOSTERS
 
+from copy import copy
 import random
 
 class FuzzerState:
@@ -67,6 +68,8 @@ class FuzzerState:
         self.instr_objs_seq = [] # List (queue) of (for each basic block) lists of instruction objects
         self.bb_start_addr_seq = [] # List (queue) of bb start addresses. Self-managed through init_new_bb.
         self.saved_reg_states = [] # List (queue) of register save objects, as saved by pickreg.py
+        # Number of instructions in self.instr_objs_seq[1:]. Maintained by add_instruction and pop_last_bb, or recomputed by recount_fuzzing_instructions.
+        self.num_fuzzing_instrs_sofar = 0
 
         # Strictly increasing when we create new producer0, to ensure uniqueness
         self.next_producer_id = 0
@@ -97,14 +100,51 @@ class FuzzerState:
         # Coordinates of the FPU enable/disable instructions. Only used in program reduction.
         self.fpuendis_coords = []
 
+    # @brief creates a structural copy of the fuzzerstate, for example to probe a variant of the program during reduction, instead of deep-copying it.
+    # The pick states, the memory views, the context setter and the lists of basic blocks are copied, as well as the basic blocks in mutable_bb_ids.
+    # The other basic blocks, the instruction objects, the saved register states and the initial and final data are shared with self.
+    # Hence, in the fork, they must be replaced rather than modified in place.
+    # @param mutable_bb_ids the ids of the basic blocks whose instructions may be replaced in the fork.
+    # @return the fork.
+    def fork(self, mutable_bb_ids = ()):
+        ret = copy(self)
+        ret.instr_objs_seq = list(self.instr_objs_seq)
+        for bb_id in mutable_bb_ids:
+            ret.instr_objs_seq[bb_id] = list(self.instr_objs_seq[bb_id])
+        ret.bb_start_addr_seq = list(self.bb_start_addr_seq)
+        ret.saved_reg_states = list(self.saved_reg_states)
+
+        ret.memview = self.memview.fork()
+        ret.memview_blacklist = self.memview_blacklist.fork()
+        ret.memstorestate = self.memstorestate.fork()
+        ret.intregpickstate = self.intregpickstate.fork()
+        ret.floatregpickstate = copy(self.floatregpickstate)
+        ret.privilegestate = copy(self.privilegestate)
+        ret.isainstrclass_tables = dict(self.isainstrclass_tables)
+
+        if self.producer_id_to_tgtaddr is not None:
+            ret.producer_id_to_tgtaddr = dict(self.producer_id_to_tgtaddr)
+        if self.producer_id_to_noreloc_spike is not None:
+            ret.producer_id_to_noreloc_spike = dict(self.producer_id_to_noreloc_spike)
+        ret.ctxsv_bb = list(self.ctxsv_bb)
+        ret.ctxdmp_bb = list(self.ctxdmp_bb)
+        ret.block_tail_instrs = list(self.block_tail_instrs)
+        ret.fpuendis_coords = list(self.fpuendis_coords)
+        return ret
+
     # @brief adds instruction(s) to the latest basic block 
     # @param new_instrobjs: List of instructions or single instruction to 
     # be added to the latest basic block
     def add_instruction(self, new_instrobjs):
         if isinstance(new_instrobjs, list):
             self.instr_objs_seq[-1].extend(new_instrobjs)
+            num_new_instrs = len(new_instrobjs)
         else:
-            self.instr_objs_seq[-1].append(new_instrobjs)            
+            self.instr_objs_seq[-1].append(new_instrobjs)
+            num_new_instrs = 1
+        # The initial block is not counted.
+        if len(self.instr_objs_seq) > 1:
+            self.num_fuzzing_instrs_sofar += num_new_instrs
     
     # @brief registers the coordinates of a FPU enable/disable instruction
     def add_fpu_coord(self):
@@ -115,10 +155,17 @@ class FuzzerState:
     # @brief removes the current basic block for the generated program and
     # restores registers to their states in the previous basic block
     def restore_previous_state(self):
-        self.instr_objs_seq.pop()
-        self.bb_start_addr_seq.pop()
+        self.pop_last_bb()
         self.intregpickstate.restore_state(self.saved_reg_states[-1])
 
+    # @brief removes the last basic block and its start address, without touching the register states.
+    def pop_last_bb(self):
+        popped_bb = self.instr_objs_seq.pop()
+        self.bb_start_addr_seq.pop()
+        # The initial block is not counted.
+        if self.instr_objs_seq:
+            self.num_fuzzing_instrs_sofar -= len(popped_bb)
+
     # @brief returns the current address for the next instruction to generate
     def get_current_addr(self):
         return self.curr_bb_start_addr + 4*len(self.instr_objs_seq[-1])
@@ -167,6 +214,9 @@ class FuzzerState:
             ISAInstrClass.DESCEND_PRV: (random.random() + 0.05) * ISAINSTRCLASS_INITIAL_BOOSTERS[ISAInstrClass.DESCEND_PRV],
             ISAInstrClass.SPECIAL:     (random.random() + 0.05) * ISAINSTRCLASS_INITIAL_BOOSTERS[ISAInstrClass.SPECIAL],
         }
+        # Filled by pickisainstrclass. The tables are only valid for the weights above, which are never assigned or modified outside of this function.
+        self.isainstrclass_tables = dict()
+        self.isainstrclass_tables_pickweights = copy(self.isapickweights) # Only used to check the tables when DO_ASSERT is set.
         self.exceptionoppickweights = {
             ExceptionCauseVal.ID_INSTR_ADDR_MISALIGNED:        (random.random() + 0.05) * EXCEPTION_OP_TYPE_INITIAL_BOOSTERS[ExceptionCauseVal.ID_INSTR_ADDR_MISALIGNED],
             ExceptionCauseVal.ID_INSTR_ACCESS_FAULT:           (random.random() + 0.05) * EXCEPTION_OP_TYPE_INITIAL_BOOSTERS[ExceptionCauseVal.ID_INSTR_ACCESS_FAULT],
@@ -236,6 +286,16 @@ class FuzzerState:
     # @brief counts the number of generated intruction, does not count the 
     # initial and final blocks
     def get_num_fuzzing_instructions_sofar(self):
+        if DO_EXPENSIVE_ASSERT:
+            assert self.num_fuzzing_instrs_sofar == self._count_fuzzing_instructions(), f"Instruction counter out of sync: {self.num_fuzzing_instrs_sofar} instead of {self._count_fuzzing_instructions()}."
+        return self.num_fuzzing_instrs_sofar
+
+    # @brief recomputes the number of generated instructions from the basic blocks.
+    def _count_fuzzing_instructions(self):
         if len(self.instr_objs_seq) <= 1:
             return 0
         return sum([len(bb) for bb in self.instr_objs_seq[1:]])
+
+    # @brief resynchronizes the instruction counter. Must be called after modifying the basic block lengths without add_instruction or pop_last_bb, typically during reduction.
+    def recount_fuzzing_instructions(self):
+        self.num_fuzzing_instrs_sofar = self._count_fuzzing_instructions()
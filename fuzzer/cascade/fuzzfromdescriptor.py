@@ -6,12 +6,13 @@
 
 from common.timeout import timeout
 from common.designcfgs import get_design_boot_addr
+from common.scratch import get_scratch_path, keep_failing_artifact, release_scratch_file
 from params.runparams import DO_ASSERT, NO_REMOVE_TMPFILES
 from params.fuzzparams import PROBA_AUTHORIZE_PRIVILEGES
 from cascade.basicblock import gen_basicblocks
-from cascade.fuzzsim import SimulatorEnum, runtest_simulator
+from cascade.fuzzsim import SimulatorEnum, gen_sim_test_descriptor, runtest_simulator, runtest_simulator_from_descriptor
 from cascade.genelf import gen_elf_from_bbs
-from cascade.spikeresolution import spike_resolution
+from cascade.spikeresolution import spike_resolution, prepare_spike_resolution, spike_resolution_batch
 
 import os
 import random
@@ -21,6 +22,8 @@ FUZZ_USE_MODELSIM = False
 
 LOG2_MEMSIZE_UPPERBOUND = 20
 NUM_MAX_BBS_UPPERBOUND = 100
+# An upper bound of the size of the RTL ELFs generated from gen_new_test_instance, i.e., the memory size plus the ELF headers and symbols.
+MAX_RTL_ELF_SIZE_BYTES = (1 << LOG2_MEMSIZE_UPPERBOUND) + 4096
 
 # Creates a new program descriptor.
 def gen_new_test_instance(design_name: str, randseed: int, can_authorize_privileges: bool, fixed_memsize: int = None, fixed_num_bbs: int = None):
@@ -50,24 +53,99 @@ def gen_fuzzerstate_elf_expectedvals(memsize: int, design_name: str, randseed: i
     time_seconds_spent_in_gen_elf = time.time() - start
     return fuzzerstate, rtl_elfpath, expected_regvals, time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf
 
+# Same as gen_fuzzerstate_elf_expectedvals for several programs, whose Spike resolutions run as one batch (see spike_resolution_batch).
+# The programs are the same as with gen_fuzzerstate_elf_expectedvals. The Spike resolution duration of the batch is shared equally among the programs that need Spike.
+# @param test_descriptors a list of tuples (memsize, design_name, randseed, nmax_bbs, authorize_privileges).
+# @return a list with, for each program, the return value of gen_fuzzerstate_elf_expectedvals, or the exception that it would raise.
+def gen_fuzzerstates_elfs_expectedvals_batch(test_descriptors: list, check_pc_spike_again: bool, max_num_inflight: int = None):
+    from cascade.fuzzerstate import FuzzerState
+
+    ret = [None] * len(test_descriptors)
+    pending_resolutions = []
+    pending_test_ids = []
+    time_seconds_spent_in_gen_bbs = [0] * len(test_descriptors)
+    time_seconds_spent_in_spike_resol = [0] * len(test_descriptors)
+    for test_id, (memsize, design_name, randseed, nmax_bbs, authorize_privileges) in enumerate(test_descriptors):
+        if DO_ASSERT:
+            assert nmax_bbs is None or nmax_bbs > 0
+        try:
+            start = time.time()
+            random.seed(randseed)
+            fuzzerstate = FuzzerState(get_design_boot_addr(design_name), design_name, memsize, randseed, nmax_bbs, authorize_privileges)
+            gen_basicblocks(fuzzerstate)
+            time_seconds_spent_in_gen_bbs[test_id] = time.time() - start
+
+            # The part of the spike resolution that consumes randomness must directly follow the basic block generation.
+            start = time.time()
+            pending_resolutions.append(prepare_spike_resolution(fuzzerstate))
+            pending_test_ids.append(test_id)
+            time_seconds_spent_in_spike_resol[test_id] = time.time() - start
+        except Exception as e:
+            ret[test_id] = e
+
+    start = time.time()
+    expected_regvals_batch = spike_resolution_batch(pending_resolutions, check_pc_spike_again, max_num_inflight)
+    num_spike_resolutions = sum(interpreted_resolution is None for _, interpreted_resolution, _, _ in pending_resolutions)
+    time_seconds_spent_in_spike_batch = (time.time() - start) / max(num_spike_resolutions, 1)
+
+    for test_id, (fuzzerstate, interpreted_resolution, _, _), expected_regvals in zip(pending_test_ids, pending_resolutions, expected_regvals_batch):
+        if isinstance(expected_regvals, Exception):
+            ret[test_id] = expected_regvals
+            continue
+        if interpreted_resolution is None:
+            time_seconds_spent_in_spike_resol[test_id] += time_seconds_spent_in_spike_batch
+        start = time.time()
+        try:
+            rtl_elfpath = gen_elf_from_bbs(fuzzerstate, False, 'rtl', fuzzerstate.instance_to_str(), fuzzerstate.design_base_addr)
+        except Exception as e:
+            ret[test_id] = e
+            continue
+        time_seconds_spent_in_gen_elf = time.time() - start
+        ret[test_id] = fuzzerstate, rtl_elfpath, expected_regvals, time_seconds_spent_in_gen_bbs[test_id], time_seconds_spent_in_spike_resol[test_id], time_seconds_spent_in_gen_elf
+    return ret
+
 ###
 # Exposed function
 ###
 
 def run_rtl(memsize: int, design_name: str, randseed: int, nmax_bbs: int, authorize_privileges: bool, check_pc_spike_again: bool, nmax_instructions: int = None, nodependencybias: bool = False, simulator=SimulatorEnum.VERILATOR):
-    fuzzerstate, rtl_elfpath, finalregvals_spikeresol, time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf = gen_fuzzerstate_elf_expectedvals(memsize, design_name, randseed, nmax_bbs, authorize_privileges, check_pc_spike_again, nmax_instructions, nodependencybias)
+    return _run_rtl_from_gen_result(gen_fuzzerstate_elf_expectedvals(memsize, design_name, randseed, nmax_bbs, authorize_privileges, check_pc_spike_again, nmax_instructions, nodependencybias), simulator)
+
+# Same as run_rtl for several programs, whose Spike resolutions run as one batch (see gen_fuzzerstates_elfs_expectedvals_batch).
+# @param test_descriptors a list of tuples (memsize, design_name, randseed, nmax_bbs, authorize_privileges).
+# @return a list with, for each program, the return value of run_rtl, or the exception that it would raise.
+def run_rtl_batch(test_descriptors: list, check_pc_spike_again: bool, simulator=SimulatorEnum.VERILATOR):
+    ret = []
+    for gen_result in gen_fuzzerstates_elfs_expectedvals_batch(test_descriptors, check_pc_spike_again):
+        if isinstance(gen_result, Exception):
+            ret.append(gen_result)
+            continue
+        try:
+            ret.append(_run_rtl_from_gen_result(gen_result, simulator))
+        except Exception as e:
+            ret.append(e)
+    return ret
+
+# @param gen_result the return value of gen_fuzzerstate_elf_expectedvals.
+# @return see run_rtl.
+def _run_rtl_from_gen_result(gen_result: tuple, simulator):
+    fuzzerstate, rtl_elfpath, finalregvals_spikeresol, time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf = gen_result
 
     start = time.time()
-    is_success, rtl_msg = runtest_simulator(fuzzerstate, rtl_elfpath, finalregvals_spikeresol, simulator=simulator)
+    is_success = False
+    try:
+        is_success, rtl_msg = runtest_simulator(fuzzerstate, rtl_elfpath, finalregvals_spikeresol, simulator=simulator)
+    finally:
+        # For debugging, potentially expose the ELF files
+        if NO_REMOVE_TMPFILES:
+            print('rtl elfpath', rtl_elfpath)
+        if not NO_REMOVE_TMPFILES:
+            if not is_success:
+                keep_failing_artifact(rtl_elfpath)
+            release_scratch_file(rtl_elfpath)
+            del rtl_elfpath
     time_seconds_spent_in_rtl_sim = time.time() - start
 
-    # For debugging, potentially expose the ELF files
-    if NO_REMOVE_TMPFILES:
-        print('rtl elfpath', rtl_elfpath)
-    if not NO_REMOVE_TMPFILES:
-        os.remove(rtl_elfpath)
-        del rtl_elfpath
-
     if not is_success:
         raise Exception(rtl_msg)
     return time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf, time_seconds_spent_in_rtl_sim
@@ -94,5 +172,56 @@ def fuzz_single_from_descriptor(memsize: int, design_name: str, randseed: int, n
             else:
                 loggers[random.randrange(len(loggers))].log(False, {'memsize': memsize, 'design_name': design_name, 'randseed': randseed, 'nmax_bbs': nmax_bbs, 'authorize_privileges': authorize_privileges}, False, emsg)
         else:
-            print(f"Failed test_run_rtl_single for params memsize: `{memsize}`, design_name: `{design_name}`, check_pc_spike_again: `{check_pc_spike_again}`, randseed: `{randseed}`, nmax_bbs: `{nmax_bbs}`, authorize_privileges: `{authorize_privileges}` -- ({memsize}, {design_name}, {randseed}, {nmax_bbs}, {authorize_privileges})\n{e}")
+            print(_gen_failed_test_message(memsize, design_name, randseed, nmax_bbs, authorize_privileges, check_pc_spike_again, e))
         return 0, 0, 0, 0
+
+def _gen_failed_test_message(memsize: int, design_name: str, randseed: int, nmax_bbs: int, authorize_privileges: bool, check_pc_spike_again: bool, e: Exception) -> str:
+    return f"Failed test_run_rtl_single for params memsize: `{memsize}`, design_name: `{design_name}`, check_pc_spike_again: `{check_pc_spike_again}`, randseed: `{randseed}`, nmax_bbs: `{nmax_bbs}`, authorize_privileges: `{authorize_privileges}` -- ({memsize}, {design_name}, {randseed}, {nmax_bbs}, {authorize_privileges})\n{e}"
+
+###
+# Pipelined fuzzing
+###
+
+# The two functions below split fuzz_single_from_descriptor into a generation stage and a simulation stage, which run in different processes of a TwoStagePipeline (see common/pipeline.py).
+# The generation stage sends the bytes of the RTL ELF, and the simulation stage writes them back to its own scratch space.
+# As fuzz_single_from_descriptor, they print the failing tests. They re-raise the exception, so that the pipeline counts the failures.
+
+# @return a pair (ELF bytes, (SimTestDescriptor, expected_regvals, check_pc_spike_again, gathered times of the generation)).
+def gen_test_for_pipeline(memsize: int, design_name: str, randseed: int, nmax_bbs: int, authorize_privileges: bool, check_pc_spike_again: bool = False):
+    try:
+        fuzzerstate, rtl_elfpath, expected_regvals, time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf = gen_fuzzerstate_elf_expectedvals(memsize, design_name, randseed, nmax_bbs, authorize_privileges, check_pc_spike_again)
+    except Exception as e:
+        print(_gen_failed_test_message(memsize, design_name, randseed, nmax_bbs, authorize_privileges, check_pc_spike_again, e))
+        raise
+    with open(rtl_elfpath, 'rb') as f:
+        elf_bytes = f.read()
+    if not NO_REMOVE_TMPFILES:
+        release_scratch_file(rtl_elfpath)
+    return elf_bytes, (gen_sim_test_descriptor(fuzzerstate), expected_regvals, check_pc_spike_again, (time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf))
+
+# @param metadata see gen_test_for_pipeline.
+# @return the gathered times, as run_rtl.
+def run_test_for_pipeline(elf_bytes: bytes, metadata, simulator=SimulatorEnum.VERILATOR):
+    sim_descriptor, expected_regvals, check_pc_spike_again, gathered_gen_times = metadata
+    rtl_elfpath = get_scratch_path(f"rtl{sim_descriptor.memsize}_{sim_descriptor.design_name}_{sim_descriptor.randseed}_{sim_descriptor.nmax_bbs}.elf", None, len(elf_bytes))
+    with open(rtl_elfpath, 'wb') as f:
+        f.write(elf_bytes)
+
+    start = time.time()
+    try:
+        is_success, rtl_msg = runtest_simulator_from_descriptor(sim_descriptor, rtl_elfpath, expected_regvals, simulator)
+    except Exception as e:
+        is_success, rtl_msg = False, str(e)
+    time_seconds_spent_in_rtl_sim = time.time() - start
+
+    if NO_REMOVE_TMPFILES:
+        print('rtl elfpath', rtl_elfpath)
+    else:
+        if not is_success:
+            keep_failing_artifact(rtl_elfpath)
+        release_scratch_file(rtl_elfpath)
+
+    if not is_success:
+        print(_gen_failed_test_message(sim_descriptor.memsize, sim_descriptor.design_name, sim_descriptor.randseed, sim_descriptor.nmax_bbs, sim_descriptor.authorize_privileges, check_pc_spike_again, rtl_msg))
+        raise Exception(rtl_msg)
+    return gathered_gen_times + (time_seconds_spent_in_rtl_sim,)
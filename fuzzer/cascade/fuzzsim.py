@@ -9,11 +9,16 @@ from cascade.util import IntRegIndivState
 from common.sim.modelsim import get_next_worker_id
 from params.runparams import DO_ASSERT, PATH_TO_TMP
 from common.sim.commonsim import setup_sim_env
+from common.designcontext import get_design_context, get_verilator_sim_kind
 from common import designcfgs
+from collections import namedtuple
 import itertools
 import os
+import selectors
+import signal
 import subprocess
 import sys
+import time
 from enum import Enum
 
 # Either Verilator or Modelsim
@@ -25,63 +30,155 @@ class SimulatorEnum(Enum):
 MAX_CYCLES_PER_INSTR = 30
 SETUP_CYCLES = 1000 # Without this, we had issues with BOOM with very short programs (typically <20 instructions) not being able to finish in time.
 
+# Wall-clock limit of a Verilator simulation, in addition to the cycle limit enforced by the testbench: VERILATOR_TIMEOUT_BASE_SECONDS + VERILATOR_TIMEOUT_SECONDS_PER_CYCLE * simlen.
+VERILATOR_TIMEOUT_BASE_SECONDS = 60
+VERILATOR_TIMEOUT_SECONDS_PER_CYCLE = 0.01
+
+# If True, the simulation processes are stopped as soon as their output contains everything that we parse, instead of waiting for them to exit. Never applies to coverage runs, whose coverage is written on exit.
+STOP_SIM_ON_COMPLETE_OUTPUT = True
+
+SIM_STOP_MARKER = 'Found a stop request.'
+
+# @brief extracts the register values (or the rfuzz coverage mask) from the output of a simulation, block by block, as the output arrives.
+# The dumps are looked up in order: first the integer registers, then the floating registers, then the rfuzz coverage mask. The other lines, typically the ELF loading messages, are skipped.
+class SimOutputParser:
+    # @param line_prefix_len the number of characters that the simulator prepends to each line, e.g., 2 for the `# ` of Modelsim.
+    # @param accept_padded_reg_ids if True, then also accept register ids padded with a space instead of a zero, as printed by Modelsim.
+    def __init__(self, num_int_regs: int, num_float_regs: int, has_float_support: bool, get_rfuzz_coverage_mask: bool, line_prefix_len: int = 0, accept_padded_reg_ids: bool = False):
+        self.get_rfuzz_coverage_mask = get_rfuzz_coverage_mask
+        # The prefixes of the expected dump lines, in order. Each entry is a tuple of accepted prefixes, all of the same length.
+        self.expected_prefixes = [(f"Dump of reg x{reg_id:02}: 0x", f"Dump of reg x{reg_id: 2}: 0x") if accept_padded_reg_ids else (f"Dump of reg x{reg_id:02}: 0x",) for reg_id in range(1, num_int_regs+1)]
+        self.num_int_regs = num_int_regs
+        if has_float_support:
+            self.expected_prefixes += [(f"Dump of reg f{fp_reg_id:02}: 0x", f"Dump of reg f{fp_reg_id: 2}: 0x") if accept_padded_reg_ids else (f"Dump of reg f{fp_reg_id:02}: 0x",) for fp_reg_id in range(num_float_regs)]
+        self.dumped_vals = []
+        self.rfuzz_coverage_mask = None
+        self.is_stop_found = False
+        self.line_prefix_len = line_prefix_len
+
+    # @return the relevant lines of the block, without their prefix. The other lines are skipped at the speed of a substring search.
+    def _gen_relevant_lines(self, outblock: str):
+        # Only search for the markers of the lines that are still expected.
+        markers = []
+        if len(self.dumped_vals) < len(self.expected_prefixes):
+            markers.append('Dump of reg ')
+        if self.get_rfuzz_coverage_mask and self.rfuzz_coverage_mask is None:
+            markers.append('RFUZZ coverage mask: ')
+        marker_poss = []
+        for marker in markers:
+            marker_pos = outblock.find(marker)
+            while marker_pos != -1:
+                marker_poss.append(marker_pos)
+                marker_pos = outblock.find(marker, marker_pos + len(marker))
+        for marker_pos in sorted(marker_poss):
+            # The marker must start the line, after the prefix.
+            if marker_pos - (outblock.rfind('\n', 0, marker_pos) + 1) != self.line_prefix_len:
+                continue
+            line_end_pos = outblock.find('\n', marker_pos)
+            yield outblock[marker_pos:] if line_end_pos == -1 else outblock[marker_pos:line_end_pos]
+
+    # @param outblock some complete lines of the output.
+    # @return True iff the output is complete, i.e., the following lines are irrelevant.
+    def feed(self, outblock: str) -> bool:
+        if not self.is_stop_found and SIM_STOP_MARKER in outblock:
+            self.is_stop_found = True
+        for curr_line in self._gen_relevant_lines(outblock):
+            if len(self.dumped_vals) < len(self.expected_prefixes):
+                if curr_line[:19] in self.expected_prefixes[len(self.dumped_vals)]:
+                    self.dumped_vals.append(int(curr_line[19:35], 16))
+            elif self.get_rfuzz_coverage_mask and self.rfuzz_coverage_mask is None:
+                if curr_line[:21] == "RFUZZ coverage mask: ":
+                    self.rfuzz_coverage_mask = int(curr_line[22:], 16)
+        return self.is_complete()
+
+    def is_complete(self) -> bool:
+        return self.is_stop_found and len(self.dumped_vals) == len(self.expected_prefixes) and (not self.get_rfuzz_coverage_mask or self.rfuzz_coverage_mask is not None)
+
+    # @brief must be called once the whole relevant output has been fed.
+    # @return a pair (is_stop_successful: bool, reg_vals: pair of int lists or None if is_stop_successful is False), or (is_stop_successful, rfuzz_coverage_mask) if get_rfuzz_coverage_mask.
+    def get_result(self):
+        if not self.is_stop_found:
+            return False, None
+        if len(self.dumped_vals) < self.num_int_regs:
+            raise Exception(f"Could not find the dump of register x{len(self.dumped_vals)+1}.")
+        if self.get_rfuzz_coverage_mask:
+            if self.rfuzz_coverage_mask is None:
+                raise Exception("Could not find the RFUZZ coverage mask.")
+            return True, self.rfuzz_coverage_mask
+        # Missing floating registers happen if the FPU is disabled in the final block and the final permission level does not permit enabling it.
+        ret_floatregs = self.dumped_vals[self.num_int_regs:] + [None] * (len(self.expected_prefixes) - len(self.dumped_vals))
+        return True, (self.dumped_vals[:self.num_int_regs], ret_floatregs)
+
+# @brief extracts the register values (or the rfuzz coverage mask) from the Verilator output.
+# Return a pair (is_stop_successful: bool, reg_vals: int list of length <= MAX_NUM_PICKABLE_REGS-1 or None if is_stop_successful is False)
+def _parse_verilator_out(design_name, exec_stdout: str, num_int_regs: int, num_float_regs: int, get_rfuzz_coverage_mask: bool):
+    sim_output_parser = SimOutputParser(num_int_regs, num_float_regs, designcfgs.design_has_float_support(design_name), get_rfuzz_coverage_mask)
+    sim_output_parser.feed(exec_stdout)
+    return sim_output_parser.get_result()
+
+# @brief runs a simulation process and feeds its output to the parser as it arrives, without any helper thread.
+# @param stop_on_complete if True, then stop the process as soon as the parser has received everything it needs.
+# @param timeout_seconds the process is stopped and subprocess.TimeoutExpired is raised after this duration.
+# @return the result of the parser.
+def _run_sim_streaming(cmdline: list, my_env: dict, sim_output_parser: SimOutputParser, timeout_seconds: float, stop_on_complete: bool, cwd: str = None):
+    # Own session, so that stopping the process also stops its children, e.g., Modelsim below make.
+    process = subprocess.Popen(cmdline, cwd=cwd, env=my_env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.time() + timeout_seconds
+    is_stopped_early = False
+    partial_line = b''
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(process.stdout, selectors.EVENT_READ)
+            while True:
+                remaining_seconds = deadline - time.time()
+                if remaining_seconds <= 0 or not selector.select(remaining_seconds):
+                    raise subprocess.TimeoutExpired(cmdline, timeout_seconds)
+                outchunk = os.read(process.stdout.fileno(), 1 << 16)
+                if not outchunk:
+                    # The process may close its output slightly before exiting.
+                    process.wait(max(deadline - time.time(), 0))
+                    break
+                # Only feed complete lines.
+                last_newline_pos = outchunk.rfind(b'\n')
+                if last_newline_pos == -1:
+                    partial_line += outchunk
+                    continue
+                outblock = partial_line + outchunk[:last_newline_pos+1]
+                partial_line = outchunk[last_newline_pos+1:]
+                if sim_output_parser.feed(outblock.decode(errors='replace')) and stop_on_complete:
+                    is_stopped_early = True
+                    break
+        if partial_line and not is_stopped_early:
+            sim_output_parser.feed(partial_line.decode(errors='replace'))
+    finally:
+        if process.poll() is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        process.wait()
+        process.stdout.close()
+    if process.returncode and not is_stopped_early:
+        raise subprocess.CalledProcessError(process.returncode, cmdline)
+    return sim_output_parser.get_result()
+
+# @return the path to the Verilator executable of the design.
+def _get_verilator_executable_path(design_name, coveragepath, get_rfuzz_coverage_mask: bool):
+    return get_design_context(design_name).verilator_executable_paths[get_verilator_sim_kind(coveragepath, get_rfuzz_coverage_mask)]
+
 # @param get_rfuzz_coverage_mask if True, then return a pair (is_stop_successful: bool, rfuzz_coverage_mask: int)
 # Return a pair (is_stop_successful: bool, reg_vals: int list of length <= MAX_NUM_PICKABLE_REGS-1 or None if is_stop_successful is False)
 def runsim_verilator(design_name, simlen, elfpath, num_int_regs: int = MAX_NUM_PICKABLE_REGS-1, num_float_regs: int = MAX_NUM_PICKABLE_FLOATING_REGS, coveragepath = None, get_rfuzz_coverage_mask = False):
     if DO_ASSERT:
         assert coveragepath is None or not get_rfuzz_coverage_mask
 
-    design_cfg       = designcfgs.get_design_cfg(design_name)
-    cascadedir       = designcfgs.get_design_cascade_path(design_name)
-    builddir         = os.path.join(cascadedir,'build')
-
-    my_env = setup_sim_env(elfpath, '/dev/null', '/dev/null', simlen, cascadedir, coveragepath, False)
-
-    simdir               = f"run_{'coverage' if coveragepath else 'rfuzz' if get_rfuzz_coverage_mask else 'vanilla'}_notrace_0.1"
-    verilatordir         = 'default-verilator'
-    verilator_executable = 'V%s' % design_cfg['toplevel']
-    sim_executable_path  = os.path.abspath(os.path.join(builddir, simdir, verilatordir, verilator_executable))
+    design_context = get_design_context(design_name)
+    my_env = setup_sim_env(elfpath, '/dev/null', '/dev/null', simlen, design_context.cascadedir, coveragepath, False, design_context.sim_base_env)
+    sim_executable_path = design_context.verilator_executable_paths[get_verilator_sim_kind(coveragepath, get_rfuzz_coverage_mask)]
 
     # Run Verilator
-    exec_out = subprocess.run([sim_executable_path], check=True, text=True, capture_output=True, env=my_env)
-    outlines = list(filter(lambda l: 'Writing ELF word to' not in l, exec_out.stdout.split('\n')))
-
-    # Check stop success
-    is_stop_successful = 'Found a stop request.' in exec_out.stdout
-    if not is_stop_successful:
-        return False, None
-
-    # Retrieve the register values
-    ret_intregs = []
-    ret_floatregs = []
-    curr_index = 0
-    for reg_id in range(1, num_int_regs+1):
-        for row_id in itertools.count(curr_index):
-            if len(outlines[row_id]) >= 19 and outlines[row_id][:19] == f"Dump of reg x{reg_id:02}: 0x":
-                ret_intregs.append(int(outlines[row_id][19:35], 16))
-                curr_index = row_id + 1
-                break
-    if designcfgs.design_has_float_support(design_name):
-        for fp_reg_id in range(num_float_regs):
-            for row_id in itertools.count(curr_index):
-                if row_id >= len(outlines):
-                    # This happens if the FPU is disabled in the final block and the final permission level does not permit enabling it.
-                    ret_floatregs.append(None)
-                    curr_index = row_id + 1
-                    break
-                if len(outlines[row_id]) >= 19 and outlines[row_id][:19] == f"Dump of reg f{fp_reg_id:02}: 0x":
-                    ret_floatregs.append(int(outlines[row_id][19:35], 16))
-                    curr_index = row_id + 1
-                    break
-    if get_rfuzz_coverage_mask:
-        for row_id in range(curr_index, len(outlines)):
-            # print('outlines[row_id]', outlines[row_id])
-            if len(outlines[row_id]) >= 21 and outlines[row_id][:21] == f"RFUZZ coverage mask: ":
-                rfuzz_coverage_mask = int(outlines[row_id][22:], 16)
-                return True, rfuzz_coverage_mask
-        raise Exception("Could not find the RFUZZ coverage mask.")
-    return True, (ret_intregs, ret_floatregs)
-
+    sim_output_parser = SimOutputParser(num_int_regs, num_float_regs, design_context.has_float_support, get_rfuzz_coverage_mask)
+    return _run_sim_streaming([sim_executable_path], my_env, sim_output_parser, VERILATOR_TIMEOUT_BASE_SECONDS + VERILATOR_TIMEOUT_SECONDS_PER_CYCLE * simlen, STOP_SIM_ON_COMPLETE_OUTPUT and coveragepath is None)
 
 # Return a pair (is_stop_successful: bool, reg_vals: int list of length <= MAX_NUM_PICKABLE_REGS-1 or None if is_stop_successful is False)
 def runsim_modelsim(design_name, simlen, elfpath, num_int_regs: int = MAX_NUM_PICKABLE_REGS-1, num_float_regs: int = MAX_NUM_PICKABLE_FLOATING_REGS, coveragepath = None):
@@ -104,84 +201,64 @@ def runsim_modelsim(design_name, simlen, elfpath, num_int_regs: int = MAX_NUM_PI
     cmdline=['make', '-C', cascadedir, f"rerun_vanilla_{tracestr}_modelsim"]
 
     # We expect the simulation to take at most 4*simlen + 20 seconds.
-    exec_out = subprocess.run(cmdline, cwd=workdir, check=True, text=True, capture_output=True, env=my_env, timeout=min(4*simlen + 20, 1800))
-
-    outlines = exec_out.stdout.split('\n')
-    outlines = list(map(lambda l: l[2:], filter(lambda l: 'Writing ELF word to SRAM addr' not in l, outlines))) # Remove the initial `# ` from Modelsim
+    sim_output_parser = SimOutputParser(num_int_regs, num_float_regs, designcfgs.design_has_float_support(design_name), False, 2, True) # Modelsim prepends `# ` to the lines.
+    is_stop_successful, received_regvals = _run_sim_streaming(cmdline, my_env, sim_output_parser, min(4*simlen + 20, 1800), STOP_SIM_ON_COMPLETE_OUTPUT and coveragepath is None, workdir)
 
-    # Check stop success
-    is_stop_successful = 'Found a stop request.' in exec_out.stdout
     if not is_stop_successful:
-        # print('Stop not successful in runsim_modelsim', exec_out.stdout)
         return False, None
-
     if num_int_regs == 0 and num_float_regs == 0:
         return True, None
+    return True, received_regvals
 
-    # Retrieve the register values
-    ret_intregs = []
-    ret_floatregs = []
-    curr_index = 0
-    for reg_id in range(1, num_int_regs+1):
-        for row_id in itertools.count(curr_index):
-            if len(outlines[row_id]) >= 19 and outlines[row_id][:19] == f"Dump of reg x{reg_id:02}: 0x" or outlines[row_id][:19] == f"Dump of reg x{reg_id: 2}: 0x":
-                ret_intregs.append(int(outlines[row_id][19:35], 16))
-                curr_index = row_id + 1
-                break
-
-    if designcfgs.design_has_float_support(design_name):
-        for fp_reg_id in range(num_float_regs):
-            # print('Curr index', curr_index)
-            # print('fp_reg_id', fp_reg_id)
-            for row_id in itertools.count(curr_index):
-                # print('Candidate:', outlines[row_id])
-                if row_id >= len(outlines):
-                    # This happens if the FPU is disabled in the final block and the final permission level does not permit enabling it.
-                    ret_floatregs.append(None)
-                    curr_index = row_id + 1
-                    break
-                if len(outlines[row_id]) >= 19 and outlines[row_id][:19] == f"Dump of reg f{fp_reg_id:02}: 0x" or outlines[row_id][:19] == f"Dump of reg f{fp_reg_id: 2}: 0x":
-                    # print('Floating outline found:', outlines[row_id])
-                    ret_floatregs.append(int(outlines[row_id][19:35], 16))
-                    curr_index = row_id + 1
-                    break
-    return True, (ret_intregs, ret_floatregs)
+# The subset of a fuzzerstate that is needed to run and check a test, which is cheap to send to another process.
+# int_regstates[reg_id] is the state of the register x{reg_id+1} at the end of the program.
+SimTestDescriptor = namedtuple('SimTestDescriptor', ['memsize', 'design_name', 'randseed', 'nmax_bbs', 'authorize_privileges', 'num_instrs', 'num_pickable_regs', 'num_pickable_floating_regs', 'design_has_fpu', 'int_regstates'])
+
+# @param override_num_instrs if not None, then use this value instead of the number of instructions in fuzzerstate.instr_objs_seq.
+def gen_sim_test_descriptor(fuzzerstate, override_num_instrs: int = None) -> SimTestDescriptor:
+    num_instrs = override_num_instrs if override_num_instrs is not None else sum(map(len, fuzzerstate.instr_objs_seq))
+    int_regstates = tuple(fuzzerstate.intregpickstate.get_regstate(reg_id+1) for reg_id in range(fuzzerstate.num_pickable_regs-1))
+    return SimTestDescriptor(fuzzerstate.memsize, fuzzerstate.design_name, fuzzerstate.randseed, fuzzerstate.nmax_bbs, fuzzerstate.authorize_privileges, num_instrs, fuzzerstate.num_pickable_regs, fuzzerstate.num_pickable_floating_regs, fuzzerstate.design_has_fpu, int_regstates)
 
 # Runs the test and checks for matching.
 # @param expected_regvals a pair of iterables of expected int regvals, and float regvals.
 # @param override_num_instrs if not None, then use this value instead of the number of instructions in fuzzerstate.instr_objs_seq. Used when pruning to shorten a bit the timeout.
 # @return (is_success: bool, msg: str)
 def runtest_simulator(fuzzerstate, elfpath: str, expected_regvals: tuple, override_num_instrs: int = None, simulator=SimulatorEnum.VERILATOR):
+    return runtest_simulator_from_descriptor(gen_sim_test_descriptor(fuzzerstate, override_num_instrs), elfpath, expected_regvals, simulator)
+
+# @brief same as runtest_simulator, from a SimTestDescriptor instead of a fuzzerstate.
+def runtest_simulator_from_descriptor(sim_descriptor: SimTestDescriptor, elfpath: str, expected_regvals: tuple, simulator=SimulatorEnum.VERILATOR):
     expected_intregvals, expected_floatregvals = expected_regvals
     del expected_regvals
 
     if DO_ASSERT:
-        assert len(expected_intregvals) >= fuzzerstate.num_pickable_regs-1
-        if fuzzerstate.design_has_fpu:
-            assert len(expected_floatregvals) == fuzzerstate.num_pickable_floating_regs
-    num_instrs = override_num_instrs if override_num_instrs is not None else len(list(itertools.chain.from_iterable(fuzzerstate.instr_objs_seq)))
+        assert len(expected_intregvals) >= sim_descriptor.num_pickable_regs-1
+        if sim_descriptor.design_has_fpu:
+            assert len(expected_floatregvals) == sim_descriptor.num_pickable_floating_regs
+    num_instrs = sim_descriptor.num_instrs
     if simulator == SimulatorEnum.VERILATOR:
-        is_stop_successful, received_regvals = runsim_verilator(fuzzerstate.design_name, num_instrs*MAX_CYCLES_PER_INSTR + SETUP_CYCLES, elfpath, fuzzerstate.num_pickable_regs-1, fuzzerstate.num_pickable_floating_regs)
+        is_stop_successful, received_regvals = runsim_verilator(sim_descriptor.design_name, num_instrs*MAX_CYCLES_PER_INSTR + SETUP_CYCLES, elfpath, sim_descriptor.num_pickable_regs-1, sim_descriptor.num_pickable_floating_regs)
     elif simulator == SimulatorEnum.MODELSIM:
-        is_stop_successful, received_regvals = runsim_modelsim(fuzzerstate.design_name, num_instrs*MAX_CYCLES_PER_INSTR + SETUP_CYCLES, elfpath, fuzzerstate.num_pickable_regs-1, fuzzerstate.num_pickable_floating_regs)
+        is_stop_successful, received_regvals = runsim_modelsim(sim_descriptor.design_name, num_instrs*MAX_CYCLES_PER_INSTR + SETUP_CYCLES, elfpath, sim_descriptor.num_pickable_regs-1, sim_descriptor.num_pickable_floating_regs)
     else:
         raise NotImplementedError(f"Unknown simulator {simulator}")
 
     # Check successful stop
     if not is_stop_successful:
-        return False, f"Timeout for params: memsize: `{fuzzerstate.memsize}`, design_name: `{fuzzerstate.design_name}`, randseed: `{fuzzerstate.randseed}`, nmax_bbs: `{fuzzerstate.nmax_bbs}`, authorize_privileges: `{fuzzerstate.authorize_privileges}` -- ({fuzzerstate.memsize}, {fuzzerstate.design_name}, {fuzzerstate.randseed}, {fuzzerstate.nmax_bbs}, {fuzzerstate.authorize_privileges})"
+        return False, f"Timeout for params: memsize: `{sim_descriptor.memsize}`, design_name: `{sim_descriptor.design_name}`, randseed: `{sim_descriptor.randseed}`, nmax_bbs: `{sim_descriptor.nmax_bbs}`, authorize_privileges: `{sim_descriptor.authorize_privileges}` -- ({sim_descriptor.memsize}, {sim_descriptor.design_name}, {sim_descriptor.randseed}, {sim_descriptor.nmax_bbs}, {sim_descriptor.authorize_privileges})"
 
     # Check that we retrieved the regs correctly
     if received_regvals is None:
-        raise Exception(f"Missing all regs for params: memsize: `{fuzzerstate.memsize}`, design_name: `{fuzzerstate.design_name}`, randseed: `{fuzzerstate.randseed}`, nmax_bbs: `{fuzzerstate.nmax_bbs}`, authorize_privileges: `{fuzzerstate.authorize_privileges}` -- ({fuzzerstate.memsize}, {fuzzerstate.design_name}, {fuzzerstate.randseed}, {fuzzerstate.nmax_bbs}, {fuzzerstate.authorize_privileges})")
+        raise Exception(f"Missing all regs for params: memsize: `{sim_descriptor.memsize}`, design_name: `{sim_descriptor.design_name}`, randseed: `{sim_descriptor.randseed}`, nmax_bbs: `{sim_descriptor.nmax_bbs}`, authorize_privileges: `{sim_descriptor.authorize_privileges}` -- ({sim_descriptor.memsize}, {sim_descriptor.design_name}, {sim_descriptor.randseed}, {sim_descriptor.nmax_bbs}, {sim_descriptor.authorize_privileges})")
 
     received_intregvals, received_floatregvals = received_regvals
     del received_regvals
 
     if DO_ASSERT:
-        assert len(received_intregvals) >= fuzzerstate.num_pickable_regs-1
-        if fuzzerstate.design_has_fpu:
-            assert len(received_floatregvals) == fuzzerstate.num_pickable_floating_regs, f"Wanted {fuzzerstate.num_pickable_floating_regs} floating regs. Got {len(received_floatregvals)}."
+        assert len(received_intregvals) >= sim_descriptor.num_pickable_regs-1
+        if sim_descriptor.design_has_fpu:
+            assert len(received_floatregvals) == sim_descriptor.num_pickable_floating_regs, f"Wanted {sim_descriptor.num_pickable_floating_regs} floating regs. Got {len(received_floatregvals)}."
 
     # Compare the expected vs. received registers
     reg_mismatch = False
@@ -195,10 +272,10 @@ def runtest_simulator(fuzzerstate, elfpath: str, expected_regvals: tuple, overri
                     "a6", "a7", "s2", "s3", "s4", "s5", "s6", "s7", \
                     "s8", "s9", "s10", "s11", "t3", "t4", "t5", "t6"]
 
-    for reg_id in range(fuzzerstate.num_pickable_regs-1):
-        if expected_intregvals[reg_id] != received_intregvals[reg_id] and fuzzerstate.intregpickstate.get_regstate(reg_id+1) in (IntRegIndivState.FREE, IntRegIndivState.CONSUMED):
+    for reg_id in range(sim_descriptor.num_pickable_regs-1):
+        if expected_intregvals[reg_id] != received_intregvals[reg_id] and sim_descriptor.int_regstates[reg_id] in (IntRegIndivState.FREE, IntRegIndivState.CONSUMED):
             reg_mismatch = True
-            ret_str_list_regmismatch.append(f"Register mismatch (x{reg_id+1}) for params: memsize: `{fuzzerstate.memsize}`, design_name: `{fuzzerstate.design_name}`, randseed: `{fuzzerstate.randseed}`, nmax_bbs: `{fuzzerstate.nmax_bbs}`, authorize_privileges: `{fuzzerstate.authorize_privileges}`. State: {fuzzerstate.intregpickstate.get_regstate(reg_id+1)}. Expected `{hex(expected_intregvals[reg_id])}`, got `{hex(received_intregvals[reg_id])}`.")
+            ret_str_list_regmismatch.append(f"Register mismatch (x{reg_id+1}) for params: memsize: `{sim_descriptor.memsize}`, design_name: `{sim_descriptor.design_name}`, randseed: `{sim_descriptor.randseed}`, nmax_bbs: `{sim_descriptor.nmax_bbs}`, authorize_privileges: `{sim_descriptor.authorize_privileges}`. State: {sim_descriptor.int_regstates[reg_id]}. Expected `{hex(expected_intregvals[reg_id])}`, got `{hex(received_intregvals[reg_id])}`.")
         
         # Debug
         debug_regs_info.append(
@@ -214,12 +291,12 @@ def runtest_simulator(fuzzerstate, elfpath: str, expected_regvals: tuple, overri
                    "fa6", "fa7", "fs2", "fs3", "fs4", "fs5", "fs6", "fs7", \
                    "fs8", "fs9", "fs10", "fs11", "ft8", "ft9", "ft10", "ft11"]
 
-    if fuzzerstate.design_has_fpu:
-        for fp_reg_id in range(fuzzerstate.num_pickable_floating_regs):
+    if sim_descriptor.design_has_fpu:
+        for fp_reg_id in range(sim_descriptor.num_pickable_floating_regs):
             # received_floatregvals[fp_reg_id] can be None if the FPU is disabled in the final block and the final permission level does not permit enabling it.
             if expected_floatregvals[fp_reg_id] != received_floatregvals[fp_reg_id] and received_floatregvals[fp_reg_id] is not None:
                 freg_mismatch = True
-                ret_str_list_regmismatch.append(f"Register mismatch (f{fp_reg_id}) for params: memsize: `{fuzzerstate.memsize}`, design_name: `{fuzzerstate.design_name}`, randseed: `{fuzzerstate.randseed}`, nmax_bbs: `{fuzzerstate.nmax_bbs}`, authorize_privileges: `{fuzzerstate.authorize_privileges}`. Expected `{hex(expected_floatregvals[fp_reg_id])}`, got `{hex(received_floatregvals[fp_reg_id])}`.")
+                ret_str_list_regmismatch.append(f"Register mismatch (f{fp_reg_id}) for params: memsize: `{sim_descriptor.memsize}`, design_name: `{sim_descriptor.design_name}`, randseed: `{sim_descriptor.randseed}`, nmax_bbs: `{sim_descriptor.nmax_bbs}`, authorize_privileges: `{sim_descriptor.authorize_privileges}`. Expected `{hex(expected_floatregvals[fp_reg_id])}`, got `{hex(received_floatregvals[fp_reg_id])}`.")
         
             # Debug
             if received_floatregvals[fp_reg_id] is not None:
@@ -6,80 +6,74 @@
 
 from params.runparams import DO_ASSERT, PATH_TO_TMP
 from common.bytestoelf import gen_elf
+from common.scratch import get_scratch_path
 from cascade.finalblock import finalblock_spike_resolution
+from cascade.cfinstructionclasses import gen_bytecode_array
+from cascade.memview import MemoryView
 
-from collections import defaultdict
+import numpy as np
 import os
 
-# From a fuzzerstate, generates an ELF, may it be for spike resolution or for RTL simulation
+# @brief writes an array of little-endian words into the program image.
+# @param image_memview a MemoryView of the image, in which the written ranges are allocated to detect overlaps.
+def _write_words_into_image(image: np.ndarray, image_memview: MemoryView, addr: int, words: np.ndarray):
+    words_bytes = words.view(np.uint8)
+    if not len(words_bytes):
+        return
+    if DO_ASSERT:
+        assert image_memview.is_mem_range_free(addr, addr + len(words_bytes)), f"Trying to write twice to the same address, or outside of the memory, in range [{hex(addr)}, {hex(addr + len(words_bytes))})."
+        image_memview.alloc_mem_range(addr, len(words_bytes))
+    image[addr:addr + len(words_bytes)] = words_bytes
+
+# From a fuzzerstate, generates the memory content of the program, may it be for spike resolution or for RTL simulation
 # Also integrates the final block.
-# @param instr_objs an iterable (one per basic block) of iterables of CFInstructions or placeholders
-# @param test_identifier typically the random seed, mem size, design name, max number of bbs
-# @return the generated elf path
-def gen_elf_from_bbs(fuzzerstate, is_spike_resolution, prefixname: str, test_identifier: str, start_addr: int):
+# @return a zero-initialized numpy array of memsize bytes, into which the encoded instructions and the data are written directly.
+def gen_program_image(fuzzerstate, is_spike_resolution: bool) -> np.ndarray:
     if DO_ASSERT:
         assert len(fuzzerstate.instr_objs_seq) == len(fuzzerstate.bb_start_addr_seq)
 
-    # Create the bytecode for the ELF file
-    addr_instrs = defaultdict(bytes) # addr_instrs[addr] = single byte
+    image = np.zeros(fuzzerstate.memsize, dtype=np.uint8)
+    image_memview = MemoryView(fuzzerstate.memsize) if DO_ASSERT else None
+
+    # Create the bytecode of the basic blocks
     for bb_start_addr, bb_instrs in zip(fuzzerstate.bb_start_addr_seq, fuzzerstate.instr_objs_seq):
-        for instr_id_in_bb, instr_obj in enumerate(bb_instrs):
-            curr_bytecode = instr_obj.gen_bytecode_int(is_spike_resolution=is_spike_resolution).to_bytes(4, 'little')
-            for curr_byte_id, curr_byte in enumerate(curr_bytecode):
-                curr_addr = bb_start_addr + 4*instr_id_in_bb + curr_byte_id # NO_COMPRESSED
-                if DO_ASSERT:
-                    assert curr_addr not in addr_instrs, f"Trying to write twice to the same address: {hex(curr_addr)}"
-                addr_instrs[curr_addr] = curr_byte
+        _write_words_into_image(image, image_memview, bb_start_addr, gen_bytecode_array(bb_instrs, is_spike_resolution)) # NO_COMPRESSED
 
     for instr_id_in_bb, instr_obj in enumerate(fuzzerstate.ctxsv_bb):
         if instr_obj is None:
             raise ValueError(f"instrobj is None for ctxsv_bb at index {instr_id_in_bb}")
-        curr_bytecode = instr_obj.gen_bytecode_int(is_spike_resolution=is_spike_resolution).to_bytes(4, 'little')
-        for curr_byte_id, curr_byte in enumerate(curr_bytecode):
-            curr_addr = fuzzerstate.ctxsv_bb_base_addr + 4*instr_id_in_bb + curr_byte_id # NO_COMPRESSED
-            if DO_ASSERT:
-                assert curr_addr not in addr_instrs, f"Trying to write twice to the same address: {hex(curr_addr)}"
-            addr_instrs[curr_addr] = curr_byte
+    _write_words_into_image(image, image_memview, fuzzerstate.ctxsv_bb_base_addr, gen_bytecode_array(fuzzerstate.ctxsv_bb, is_spike_resolution)) # NO_COMPRESSED
 
-    # Add the initial register values
-    for reg_data_id, reg_data_doubleword in enumerate(fuzzerstate.initial_reg_data_content):
-        curr_bytecode = reg_data_doubleword.to_bytes(8, 'little')
-        for curr_byte_id, curr_byte in enumerate(curr_bytecode):
-            curr_addr = fuzzerstate.initial_reg_data_addr + 8*reg_data_id + curr_byte_id # doublewords therefore 8
-            if DO_ASSERT:
-                assert curr_addr not in addr_instrs, f"Trying to write twice to the same address: {hex(curr_addr)}"
-            addr_instrs[curr_addr] = curr_byte
+    # Add the initial register values, as doublewords
+    _write_words_into_image(image, image_memview, fuzzerstate.initial_reg_data_addr, np.array(fuzzerstate.initial_reg_data_content, dtype='<u8'))
 
     # Add the final basic block
     if is_spike_resolution:
         final_block = finalblock_spike_resolution()
     else:
         final_block = fuzzerstate.final_bb
-    for instr_id_in_bb, instr_obj in enumerate(final_block):
-        curr_bytecode = instr_obj.gen_bytecode_int(is_spike_resolution=is_spike_resolution).to_bytes(4, 'little')
-        for curr_byte_id, curr_byte in enumerate(curr_bytecode):
-            curr_addr = fuzzerstate.final_bb_base_addr + 4*instr_id_in_bb + curr_byte_id # NO_COMPRESSED
-            if DO_ASSERT:
-                assert curr_addr not in addr_instrs, f"Trying to write twice to the same address: {hex(curr_addr)}"
-            addr_instrs[curr_addr] = curr_byte
+    _write_words_into_image(image, image_memview, fuzzerstate.final_bb_base_addr, gen_bytecode_array(final_block, is_spike_resolution)) # NO_COMPRESSED
 
-    # Add the random data block
-    for word_id, word_content in enumerate(fuzzerstate.random_block_content4by4bytes):
-        curr_bytecode = word_content.to_bytes(4, 'little')
-        for curr_byte_id, curr_byte in enumerate(curr_bytecode):
-            curr_addr = fuzzerstate.random_data_block_start_addr + 4*word_id + curr_byte_id # NO_COMPRESSED
-            if DO_ASSERT:
-                assert curr_addr not in addr_instrs, f"Trying to write twice to the same address: {hex(curr_addr)}"
-            addr_instrs[curr_addr] = curr_byte
+    # Add the random data block, if any. The profiling programs have none and do not set its address.
+    if fuzzerstate.random_block_content4by4bytes:
+        _write_words_into_image(image, image_memview, fuzzerstate.random_data_block_start_addr, np.array(fuzzerstate.random_block_content4by4bytes, dtype='<u4')) # NO_COMPRESSED
 
-    # Generate a bytes object
-    curr_bytearray = bytearray(fuzzerstate.memsize) # Zero-filled
-    for curr_addr, curr_byte in addr_instrs.items():
-        curr_bytearray[curr_addr] = curr_byte
-    curr_bytes = bytes(curr_bytearray)
+    return image
+
+# From a fuzzerstate, generates an ELF, may it be for spike resolution or for RTL simulation
+# Also integrates the final block.
+# @param instr_objs an iterable (one per basic block) of iterables of CFInstructions or placeholders
+# @param test_identifier typically the random seed, mem size, design name, max number of bbs
+# @param image the program image if it was already generated by gen_program_image with the same is_spike_resolution, else None.
+# @return the generated elf path
+def gen_elf_from_bbs(fuzzerstate, is_spike_resolution, prefixname: str, test_identifier: str, start_addr: int, image: np.ndarray = None):
+    if image is None:
+        image = gen_program_image(fuzzerstate, is_spike_resolution)
 
-    elfpath = os.path.join(PATH_TO_TMP, f"{prefixname}{test_identifier}.elf")
+    elfpath = get_scratch_path(f"{prefixname}{test_identifier}.elf", None, fuzzerstate.memsize + 4096)
 
-    # Generate the ELF object
-    gen_elf(curr_bytes, start_addr=fuzzerstate.bb_start_addr_seq[0], section_addr=start_addr, destination_path=elfpath, is_64bit=fuzzerstate.is_design_64bit)
+    # Generate the ELF object. The image is written without being copied.
+    # Only the RTL ELFs get the `_start` and `write_tohost` symbols, for inspecting them with nm or objdump. The spike resolution ELFs have none, so that Spike never interleaves `core 0: >>>>  <symbol>` lines with its outputs.
+    elf_symbols = None if is_spike_resolution else {'_start': start_addr + fuzzerstate.bb_start_addr_seq[0], 'write_tohost': start_addr + fuzzerstate.final_bb_base_addr}
+    gen_elf(image.data, start_addr=fuzzerstate.bb_start_addr_seq[0], section_addr=start_addr, destination_path=elfpath, is_64bit=fuzzerstate.is_design_64bit, symbols=elf_symbols)
     return elfpath
@@ -0,0 +1,365 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module is a reference interpreter for the integer subset of the generated programs: RV32I/RV64I and M arithmetic, loads and stores into the program image, branches and jumps.
+# The instructions of fuzzerstate.instr_objs_seq are executed in program order, as encoded in the spike resolution image. The whole program is decoded at once with numpy, and then interpreted in a single loop.
+# Register values are unsigned integers on xlen bits, None if unknown, or any other marker that the caller injects, for values that are only known after Spike (see cascade/regdumpanalysis).
+# Any instruction that it does not model (CSR reads, floating-point to integer, exceptions, etc.) makes its destination register unknown, and may make the memory unknown.
+# The spike resolution uses the interpreter instead of Spike when a program contains only supported instruction classes. Spike is still used for the CSR, FPU, privilege and exception paths.
+# It relies on the same assumption as the spike resolution itself: the instructions are executed in the order of fuzzerstate.instr_objs_seq, and no store writes into them.
+
+from params.runparams import DO_ASSERT
+from common.spike import SPIKE_STARTADDR
+from cascade.cfinstructionclasses import R12DInstruction, ImmRdInstruction, RegImmInstruction, BranchInstruction, JALInstruction, JALRInstruction, SpecialInstruction, IntLoadInstruction, IntStoreInstruction, PlaceholderProducerInstr0, PlaceholderProducerInstr1, PlaceholderPreConsumerInstr, PlaceholderConsumerInstr, ExceptionInstruction
+
+import itertools
+import numpy as np
+
+# If True, spike_resolution uses the interpreter instead of Spike for the supported programs.
+# Also gates MINIMIZE_REGDUMP_REQS, which runs the same interpreter.
+# Disabled by default until `do_intinterpreterperf.py <design> N check` has compared the interpreter against Spike.
+USE_INT_INTERPRETER = False
+
+# The instruction classes that the interpreter supports. Subclasses, typically of ExceptionInstruction, are not supported.
+SUPPORTED_INSTR_CLASSES = frozenset((R12DInstruction, ImmRdInstruction, RegImmInstruction, BranchInstruction, JALInstruction, JALRInstruction, SpecialInstruction, IntLoadInstruction, IntStoreInstruction, PlaceholderProducerInstr0, PlaceholderProducerInstr1, PlaceholderPreConsumerInstr, PlaceholderConsumerInstr))
+
+###
+# Arithmetic
+###
+
+def _sext(val: int, num_bits: int) -> int:
+    val &= (1 << num_bits) - 1
+    return val - (1 << num_bits) if val >> (num_bits - 1) else val
+
+def _to_w(val: int, xlen: int) -> int:
+    return _sext(val, 32) & ((1 << xlen) - 1)
+
+# @brief signed division truncated towards zero, as specified by the M extension, including the division by zero and the overflow.
+def _div_trunc(dividend: int, divisor: int) -> int:
+    if divisor == 0:
+        return -1
+    quotient = abs(dividend) // abs(divisor)
+    return -quotient if (dividend < 0) != (divisor < 0) else quotient
+
+def _rem_trunc(dividend: int, divisor: int) -> int:
+    if divisor == 0:
+        return dividend
+    remainder = abs(dividend) % abs(divisor)
+    return -remainder if dividend < 0 else remainder
+
+# Each operation takes two unsigned xlen operands (the second one may be an immediate) and returns an unsigned xlen result.
+INT_ALU_OPS = {
+    'add':    lambda a, b, xlen: (a + b) & ((1 << xlen) - 1),
+    'sub':    lambda a, b, xlen: (a - b) & ((1 << xlen) - 1),
+    'sll':    lambda a, b, xlen: (a << (b & (xlen - 1))) & ((1 << xlen) - 1),
+    'slt':    lambda a, b, xlen: int(_sext(a, xlen) < _sext(b, xlen)),
+    'sltu':   lambda a, b, xlen: int(a < b),
+    'xor':    lambda a, b, xlen: a ^ b,
+    'srl':    lambda a, b, xlen: a >> (b & (xlen - 1)),
+    'sra':    lambda a, b, xlen: (_sext(a, xlen) >> (b & (xlen - 1))) & ((1 << xlen) - 1),
+    'or':     lambda a, b, xlen: a | b,
+    'and':    lambda a, b, xlen: a & b,
+    'mul':    lambda a, b, xlen: (a * b) & ((1 << xlen) - 1),
+    'mulh':   lambda a, b, xlen: ((_sext(a, xlen) * _sext(b, xlen)) >> xlen) & ((1 << xlen) - 1),
+    'mulhsu': lambda a, b, xlen: ((_sext(a, xlen) * b) >> xlen) & ((1 << xlen) - 1),
+    'mulhu':  lambda a, b, xlen: (a * b) >> xlen,
+    'div':    lambda a, b, xlen: _div_trunc(_sext(a, xlen), _sext(b, xlen)) & ((1 << xlen) - 1),
+    'divu':   lambda a, b, xlen: a // b if b else (1 << xlen) - 1,
+    'rem':    lambda a, b, xlen: _rem_trunc(_sext(a, xlen), _sext(b, xlen)) & ((1 << xlen) - 1),
+    'remu':   lambda a, b, xlen: a % b if b else a,
+    # 64-bit only
+    'addw':   lambda a, b, xlen: _to_w(a + b, xlen),
+    'subw':   lambda a, b, xlen: _to_w(a - b, xlen),
+    'sllw':   lambda a, b, xlen: _to_w(a << (b & 31), xlen),
+    'srlw':   lambda a, b, xlen: _to_w((a & 0xffffffff) >> (b & 31), xlen),
+    'sraw':   lambda a, b, xlen: _to_w(_sext(a, 32) >> (b & 31), xlen),
+    'mulw':   lambda a, b, xlen: _to_w(a * b, xlen),
+    'divw':   lambda a, b, xlen: _to_w(_div_trunc(_sext(a, 32), _sext(b, 32)), xlen),
+    'divuw':  lambda a, b, xlen: _to_w((a & 0xffffffff) // (b & 0xffffffff) if b & 0xffffffff else -1, xlen),
+    'remw':   lambda a, b, xlen: _to_w(_rem_trunc(_sext(a, 32), _sext(b, 32)), xlen),
+    'remuw':  lambda a, b, xlen: _to_w((a & 0xffffffff) % (b & 0xffffffff) if b & 0xffffffff else a, xlen),
+}
+_INT_ALU_OP_NAMES = tuple(INT_ALU_OPS)
+_INT_ALU_OP_FNS = tuple(INT_ALU_OPS.values())
+_INT_ALU_OP_IDS = {op_name: op_id for op_id, op_name in enumerate(_INT_ALU_OP_NAMES)}
+
+###
+# Decoding
+###
+
+# The kinds of the decoded instructions, and the columns of DecodedProgram that they use.
+KIND_NONE        = 0 # Does not modify the integer registers nor the memory.
+KIND_CLOBBER_RD  = 1 # rd becomes unknown.
+KIND_CLOBBER_ALL = 2 # rd and the whole memory become unknown.
+KIND_CONST       = 3 # rd = imm
+KIND_ALU_IMM     = 4 # rd = op(rs1, imm)
+KIND_ALU_REG     = 5 # rd = op(rs1, rs2)
+KIND_LOAD        = 6 # rd = mem[rs1 + imm], on size bytes, sign-extended iff op is 1.
+KIND_STORE       = 7 # mem[rs1 + imm] = rs2, on size bytes. rs2 is -1 if the stored value is not an integer register.
+
+# The lookup tables are indexed by funct7*8 + funct3, and give the operation id, or -1.
+def _gen_funct_lookup_table(functs_to_op_names: dict) -> np.ndarray:
+    ret = np.full(128*8, -1, dtype=np.int64)
+    for (funct7, funct3), op_name in functs_to_op_names.items():
+        ret[funct7*8 + funct3] = _INT_ALU_OP_IDS[op_name]
+    return ret
+
+_OP_LOOKUP_TABLE = _gen_funct_lookup_table({
+    (0x00, 0): 'add', (0x20, 0): 'sub', (0x00, 1): 'sll', (0x00, 2): 'slt', (0x00, 3): 'sltu', (0x00, 4): 'xor', (0x00, 5): 'srl', (0x20, 5): 'sra', (0x00, 6): 'or', (0x00, 7): 'and',
+    (0x01, 0): 'mul', (0x01, 1): 'mulh', (0x01, 2): 'mulhsu', (0x01, 3): 'mulhu', (0x01, 4): 'div', (0x01, 5): 'divu', (0x01, 6): 'rem', (0x01, 7): 'remu',
+})
+_OP_32_LOOKUP_TABLE = _gen_funct_lookup_table({
+    (0x00, 0): 'addw', (0x20, 0): 'subw', (0x00, 1): 'sllw', (0x00, 5): 'srlw', (0x20, 5): 'sraw',
+    (0x01, 0): 'mulw', (0x01, 4): 'divw', (0x01, 5): 'divuw', (0x01, 6): 'remw', (0x01, 7): 'remuw',
+})
+# Indexed by funct3, -1 if the funct3 is not an operation with an immediate.
+_OP_IMM_OP_IDS = np.array([_INT_ALU_OP_IDS['add'], -1, _INT_ALU_OP_IDS['slt'], _INT_ALU_OP_IDS['sltu'], _INT_ALU_OP_IDS['xor'], -1, _INT_ALU_OP_IDS['or'], _INT_ALU_OP_IDS['and']], dtype=np.int64)
+# Indexed by funct3: the access size in bytes, and whether the load is sign-extended. The size is 0 for invalid funct3.
+_LOAD_SIZES     = np.array([1, 2, 4, 8, 1, 2, 4, 0], dtype=np.int64)
+_LOAD_IS_SIGNED = np.array([1, 1, 1, 1, 0, 0, 0, 0], dtype=np.int64)
+# The funct5 of the floating-point instructions that write an integer register: comparisons, conversions to integers, and fmv.x/fclass.
+_OP_FP_INTRD_FUNCT5S = (0x14, 0x18, 0x1c)
+_OPCODES_FP_NO_INTRD = (0x07, 0x43, 0x47, 0x4b, 0x4f)
+
+# The decoded instructions of a program, as columns. The columns are lists, which are faster than numpy arrays to index from Python.
+class DecodedProgram:
+    __slots__ = ('num_instrs', 'kinds', 'rds', 'rs1s', 'rs2s', 'imms', 'ops', 'sizes')
+    def __init__(self, kinds, rds, rs1s, rs2s, imms, ops, sizes):
+        self.num_instrs = len(kinds)
+        self.kinds = kinds.tolist()
+        self.rds   = rds.tolist()
+        self.rs1s  = rs1s.tolist()
+        self.rs2s  = rs2s.tolist()
+        self.imms  = imms.tolist()
+        self.ops   = ops.tolist()
+        self.sizes = sizes.tolist()
+
+# @param words a numpy array of the instruction words.
+# @param pcs a numpy uint64 array of the addresses of the instructions, used by auipc, jal and jalr.
+# @param is_exception a numpy bool array, True for the instructions that are expected to trap. Those must not be trusted to write their destination register, nor the stored value.
+# @return a DecodedProgram.
+def decode_words(words: np.ndarray, pcs: np.ndarray, is_exception: np.ndarray, is_design_64bit: bool) -> DecodedProgram:
+    xlen = 64 if is_design_64bit else 32
+    mask = np.uint64((1 << xlen) - 1)
+    w = words.astype(np.int64)
+    opcode = w & 0x7f
+    rd     = (w >> 7) & 0x1f
+    funct3 = (w >> 12) & 0x7
+    rs1    = (w >> 15) & 0x1f
+    rs2    = (w >> 20) & 0x1f
+    funct7 = w >> 25
+    imm_i  = ((w >> 20) ^ 0x800) - 0x800
+    imm_s  = (((funct7 << 5) | rd) ^ 0x800) - 0x800
+    imm_u  = ((w & 0xfffff000) ^ 0x80000000) - 0x80000000
+
+    num_instrs = len(w)
+    kinds = np.full(num_instrs, KIND_CLOBBER_ALL, dtype=np.int64) # Atomics and anything else that is not modeled.
+    imms  = np.zeros(num_instrs, dtype=np.uint64)
+    ops   = np.zeros(num_instrs, dtype=np.int64)
+    sizes = np.zeros(num_instrs, dtype=np.int64)
+    rs2s  = rs2.copy()
+    def assign(cond, kind, imm=None, op=None, size=None):
+        kinds[cond] = kind
+        if imm is not None:
+            imms[cond] = (imm[cond].astype(np.uint64) if isinstance(imm, np.ndarray) else np.uint64(imm)) & mask
+        if op is not None:
+            ops[cond] = op[cond] if isinstance(op, np.ndarray) else op
+        if size is not None:
+            sizes[cond] = size[cond] if isinstance(size, np.ndarray) else size
+
+    # The opcodes are exclusive, hence the order of the assignments does not matter.
+    assign(opcode == 0x37, KIND_CONST, imm_u) # lui
+    assign(opcode == 0x17, KIND_CONST, pcs + imm_u.astype(np.uint64)) # auipc
+    assign((opcode == 0x6f) | ((opcode == 0x67) & (funct3 == 0)), KIND_CONST, pcs + np.uint64(4)) # jal, jalr
+    assign((opcode == 0x63) & (funct3 != 2) & (funct3 != 3), KIND_NONE) # branches
+    is_valid_funct3 = (funct3 != 7) if is_design_64bit else (funct3 != 7) & (funct3 != 3) & (funct3 != 6)
+    assign((opcode == 0x03) & is_valid_funct3, KIND_LOAD, imm_i, _LOAD_IS_SIGNED[funct3], _LOAD_SIZES[funct3])
+    assign((opcode == 0x23) & (funct3 <= (3 if is_design_64bit else 2)), KIND_STORE, imm_s, None, 1 << funct3)
+
+    op_imm_op_ids = _OP_IMM_OP_IDS[funct3]
+    assign((opcode == 0x13) & (op_imm_op_ids >= 0), KIND_ALU_IMM, imm_i, op_imm_op_ids)
+    # The shift amount has 6 bits in RV64 and 5 bits in RV32.
+    shamt_bits = 6 if is_design_64bit else 5
+    shift_funct = w >> (20 + shamt_bits)
+    shamt = (w >> 20) & (xlen - 1)
+    assign((opcode == 0x13) & (funct3 == 1) & (shift_funct == 0), KIND_ALU_IMM, shamt, _INT_ALU_OP_IDS['sll'])
+    assign((opcode == 0x13) & (funct3 == 5) & (shift_funct == 0), KIND_ALU_IMM, shamt, _INT_ALU_OP_IDS['srl'])
+    assign((opcode == 0x13) & (funct3 == 5) & (shift_funct == 0x400 >> shamt_bits), KIND_ALU_IMM, shamt, _INT_ALU_OP_IDS['sra'])
+    if is_design_64bit:
+        assign((opcode == 0x1b) & (funct3 == 0), KIND_ALU_IMM, imm_i, _INT_ALU_OP_IDS['addw'])
+        assign((opcode == 0x1b) & (funct3 == 1) & (funct7 == 0), KIND_ALU_IMM, rs2, _INT_ALU_OP_IDS['sllw'])
+        assign((opcode == 0x1b) & (funct3 == 5) & (funct7 == 0), KIND_ALU_IMM, rs2, _INT_ALU_OP_IDS['srlw'])
+        assign((opcode == 0x1b) & (funct3 == 5) & (funct7 == 0x20), KIND_ALU_IMM, rs2, _INT_ALU_OP_IDS['sraw'])
+
+    op_op_ids = _OP_LOOKUP_TABLE[funct7*8 + funct3]
+    assign((opcode == 0x33) & (op_op_ids >= 0), KIND_ALU_REG, None, op_op_ids)
+    if is_design_64bit:
+        op_32_op_ids = _OP_32_LOOKUP_TABLE[funct7*8 + funct3]
+        assign((opcode == 0x3b) & (op_32_op_ids >= 0), KIND_ALU_REG, None, op_32_op_ids)
+
+    assign(opcode == 0x0f, KIND_NONE) # fence, fence.i
+    # Environment calls, xret, wfi and sfence.vma do not write any integer register. CSR instructions write an unknown value.
+    assign((opcode == 0x73) & (funct3 == 0), KIND_NONE)
+    assign((opcode == 0x73) & (funct3 != 0) & (funct3 != 4), KIND_CLOBBER_RD)
+    assign(np.isin(opcode, _OPCODES_FP_NO_INTRD), KIND_NONE)
+    is_op_fp_intrd = np.isin(w >> 27, _OP_FP_INTRD_FUNCT5S)
+    assign((opcode == 0x53) & is_op_fp_intrd, KIND_CLOBBER_RD)
+    assign((opcode == 0x53) & ~is_op_fp_intrd, KIND_NONE)
+    is_store_fp = (opcode == 0x27) & ((funct3 == 2) | (funct3 == 3))
+    assign(is_store_fp, KIND_STORE, imm_s, None, 1 << funct3)
+    rs2s[is_store_fp] = -1
+    # The designs are fuzzed without the C extension, so any compressed encoding is an illegal instruction.
+    assign((w & 0b11) != 0b11, KIND_NONE)
+
+    if is_exception.any():
+        kinds[is_exception & ((kinds == KIND_CONST) | (kinds == KIND_ALU_IMM) | (kinds == KIND_ALU_REG) | (kinds == KIND_LOAD))] = KIND_CLOBBER_RD
+        rs2s[is_exception & (kinds == KIND_STORE)] = -1
+
+    return DecodedProgram(kinds, rd, rs1, rs2s, imms, ops, sizes)
+
+# @return the DecodedProgram of fuzzerstate.instr_objs_seq, in execution order, as it is in the spike resolution image.
+def decode_program(fuzzerstate, image: np.ndarray) -> DecodedProgram:
+    words = np.concatenate([image[bb_start_addr:bb_start_addr + 4*len(bb_instrs)].view('<u4') for bb_start_addr, bb_instrs in zip(fuzzerstate.bb_start_addr_seq, fuzzerstate.instr_objs_seq)]) # NO_COMPRESSED
+    pcs = np.concatenate([SPIKE_STARTADDR + bb_start_addr + 4*np.arange(len(bb_instrs), dtype=np.uint64) for bb_start_addr, bb_instrs in zip(fuzzerstate.bb_start_addr_seq, fuzzerstate.instr_objs_seq)]) # NO_COMPRESSED
+    is_exception = np.fromiter((isinstance(instr_obj, ExceptionInstruction) for instr_obj in itertools.chain.from_iterable(fuzzerstate.instr_objs_seq)), dtype=bool, count=len(words))
+    return decode_words(words, pcs, is_exception, fuzzerstate.is_design_64bit)
+
+# @return for each register dump request, the index in the DecodedProgram of the instruction before which it is dumped.
+def gen_req_instr_ids(fuzzerstate, regdump_reqs) -> list:
+    instr_id_per_addr = dict()
+    instr_id = 0
+    for bb_start_addr, bb_instrs in zip(fuzzerstate.bb_start_addr_seq, fuzzerstate.instr_objs_seq):
+        for bb_instr_id in range(len(bb_instrs)):
+            instr_id_per_addr[bb_start_addr + 4*bb_instr_id] = instr_id # NO_COMPRESSED
+            instr_id += 1
+    return [instr_id_per_addr[req_addr] for req_addr, _, _ in regdump_reqs]
+
+###
+# Execution
+###
+
+class IntMachine:
+    # @param image the spike resolution image, as returned by gen_program_image(fuzzerstate, True). It is not modified.
+    def __init__(self, program: DecodedProgram, image: np.ndarray, is_design_64bit: bool):
+        self.program = program
+        self.xlen = 64 if is_design_64bit else 32
+        self.mask = (1 << self.xlen) - 1
+        # The initial values come from the bootrom, which we do not model.
+        self.regs = [0] + [None] * 31
+        self.mem = bytearray(image.tobytes())
+        # The offsets of the memory bytes that are unknown.
+        self.unknown_mem_offsets = set()
+        self.is_mem_unknown = False
+
+    # @return the offset in self.mem of the access, or None if it is misaligned or out of the image.
+    def _get_mem_offset(self, addr: int, size: int):
+        offset = addr - SPIKE_STARTADDR
+        if addr % size or offset < 0 or offset + size > len(self.mem):
+            return None
+        return offset
+
+    def _load(self, addr: int, size: int, is_signed: int):
+        offset = self._get_mem_offset(addr, size)
+        if offset is None or self.is_mem_unknown:
+            return None
+        if self.unknown_mem_offsets and any(byte_offset in self.unknown_mem_offsets for byte_offset in range(offset, offset + size)):
+            return None
+        ret = int.from_bytes(self.mem[offset:offset + size], 'little')
+        return _sext(ret, 8*size) & self.mask if is_signed else ret
+
+    def _store(self, addr: int, val, size: int):
+        if self.is_mem_unknown:
+            return
+        offset = self._get_mem_offset(addr, size)
+        if offset is None:
+            # Misaligned stores may trap or not. Stores outside of the image are not tracked.
+            offset = addr - SPIKE_STARTADDR
+            self.unknown_mem_offsets.update(range(max(offset, 0), min(offset + size, len(self.mem))))
+        elif type(val) is int:
+            self.mem[offset:offset + size] = (val & ((1 << (8*size)) - 1)).to_bytes(size, 'little')
+            if self.unknown_mem_offsets:
+                self.unknown_mem_offsets.difference_update(range(offset, offset + size))
+        else:
+            self.unknown_mem_offsets.update(range(offset, offset + size))
+
+    # @brief executes the instructions of ids [begin, end).
+    def run(self, begin: int, end: int):
+        program = self.program
+        kinds, rds, rs1s, rs2s, imms, ops, sizes = program.kinds, program.rds, program.rs1s, program.rs2s, program.imms, program.ops, program.sizes
+        regs, xlen, mask = self.regs, self.xlen, self.mask
+        for instr_id in range(begin, end):
+            kind = kinds[instr_id]
+            if kind == KIND_NONE:
+                continue
+            if kind == KIND_ALU_IMM:
+                src = regs[rs1s[instr_id]]
+                ret = _INT_ALU_OP_FNS[ops[instr_id]](src, imms[instr_id], xlen) if type(src) is int else src
+            elif kind == KIND_ALU_REG:
+                src1, src2 = regs[rs1s[instr_id]], regs[rs2s[instr_id]]
+                if type(src1) is int and type(src2) is int:
+                    ret = _INT_ALU_OP_FNS[ops[instr_id]](src1, src2, xlen)
+                elif src1 is None or src2 is None:
+                    ret = None
+                else:
+                    # At least one of the operands is a marker of the caller.
+                    ret = src2 if type(src1) is int else src1
+            elif kind == KIND_CONST:
+                ret = imms[instr_id]
+            elif kind == KIND_LOAD:
+                # The loaded bytes are only known if the address is known.
+                base = regs[rs1s[instr_id]]
+                ret = self._load((base + imms[instr_id]) & mask, sizes[instr_id], ops[instr_id]) if type(base) is int else None
+            elif kind == KIND_STORE:
+                base = regs[rs1s[instr_id]]
+                if type(base) is int:
+                    self._store((base + imms[instr_id]) & mask, None if rs2s[instr_id] < 0 else regs[rs2s[instr_id]], sizes[instr_id])
+                else:
+                    self.is_mem_unknown = True
+                continue
+            else:
+                if kind == KIND_CLOBBER_ALL:
+                    self.is_mem_unknown = True
+                ret = None
+            rd = rds[instr_id]
+            if rd:
+                regs[rd] = ret
+
+    # @brief executes the whole program, and calls handle_req(req_id, regs) before the instruction of each request.
+    # @param req_instr_ids see gen_req_instr_ids.
+    def run_with_reqs(self, req_instr_ids: list, handle_req):
+        curr_instr_id = 0
+        for req_id, req_instr_id in enumerate(req_instr_ids):
+            if DO_ASSERT:
+                assert req_instr_id >= curr_instr_id, "The register dump requests must be in program order."
+            self.run(curr_instr_id, req_instr_id)
+            curr_instr_id = req_instr_id
+            handle_req(req_id, self.regs)
+        self.run(curr_instr_id, self.program.num_instrs)
+
+###
+# Spike resolution
+###
+
+# @return True iff all the instructions of the program are of a class supported by the interpreter.
+def is_program_supported(fuzzerstate) -> bool:
+    return all(type(instr_obj) in SUPPORTED_INSTR_CLASSES for instr_obj in itertools.chain.from_iterable(fuzzerstate.instr_objs_seq))
+
+# @brief computes what Spike would dump for the spike resolution, without Spike.
+# @param image the spike resolution image, as returned by gen_program_image(fuzzerstate, True).
+# @param regdump_reqs the register dump requests, as returned by gen_regdump_reqs.
+# @return None if the interpreter cannot compute all the values, else a pair (the dumped register values, the list of the 32 final integer register values).
+#         The final value of a register outside of the pickable ones is None if the program does not write it.
+def interpret_spike_resolution(fuzzerstate, image: np.ndarray, regdump_reqs):
+    # The final floating-point register values would require Spike.
+    if fuzzerstate.design_has_fpu or not is_program_supported(fuzzerstate):
+        return None
+    if any(is_float_req or type(reg_to_dump) is not int for _, is_float_req, reg_to_dump in regdump_reqs):
+        return None
+
+    machine = IntMachine(decode_program(fuzzerstate, image), image, fuzzerstate.is_design_64bit)
+    regvals = []
+    machine.run_with_reqs(gen_req_instr_ids(fuzzerstate, regdump_reqs), lambda req_id, regs: regvals.append(regs[regdump_reqs[req_id][2]]))
+    if any(type(regval) is not int for regval in regvals) or any(type(regval) is not int for regval in machine.regs[:fuzzerstate.num_pickable_regs]):
+        return None
+    return regvals, machine.regs
@@ -10,49 +10,68 @@
 
 # A design assumption is that we will use the available memory very sparsely.
 
-# Internally, MemoryView is implemented as a sorted iterable of pairs (free_start_addr, free_end_addr_plus_one)
-# Internally, it offers the guarantee that if (a, b) and (c, d) are in the iterable in this order, then b < c (i.e., no superposition and no juxtaposition)
+# Internally, MemoryView is implemented as two sorted lists free_starts and free_ends, such that the i-th free interval is [free_starts[i], free_ends[i]).
+# Internally, it offers the guarantee that if (a, b) and (c, d) are two consecutive intervals, then b < c (i.e., no superposition and no juxtaposition)
+# The intervals are looked up by bisection, and the number of free bytes is maintained incrementally.
 
+import bisect
+from copy import copy
 import random
 # from params.runparams import DO_ASSERT
 DO_ASSERT = True
 
 MEMVIEW_ALLOC_MAX_ATTEMPTS = 1000
 
+# If True, gen_random_free_addr samples uniformly among all the suitable aligned addresses, and returns None only if there is none.
+# Else, it performs random attempts, which preserves the random streams, and hence the programs generated from a given seed.
+# The random attempts are kept by default on purpose: since the memory is used sparsely, an attempt succeeds with high probability, and each attempt is a bisection.
+# The exact sampling is linear in the number of free intervals between the bounds, since the candidates of an interval depend on the alignment and on min_space of each query.
+MEMVIEW_EXACT_SAMPLING = False
+
 class MemoryView:
     # @param memsize should be at least 4, typically much higher. It is also typically a power of 2.
     def __init__(self, memsize: int):
-        self.freepairs = [(0, memsize)]
+        self.free_starts = [0]
+        self.free_ends = [memsize]
+        self.num_free_addrs = memsize
         self.memsize = memsize
         self.occupied_addrs = 0 # Follow the number of occupied addresses.
 
+    # @return a copy that can be modified independently.
+    def fork(self):
+        ret = copy(self)
+        ret.free_starts = list(self.free_starts)
+        ret.free_ends = list(self.free_ends)
+        return ret
+
+    # @return the list of pairs (free_start_addr, free_end_addr_plus_one).
+    @property
+    def freepairs(self):
+        return list(zip(self.free_starts, self.free_ends))
+
+    # @return the index of the first free interval that ends strictly after addr. May be equal to the number of intervals.
+    def _find_interval(self, addr: int):
+        return bisect.bisect_right(self.free_ends, addr)
+
     # In particular, returns False if it goes beyond the memory boundaries.
     def is_mem_free(self, addr: int):
-        for curr_pair in self.freepairs:
-            if addr < curr_pair[1]:
-                return curr_pair[0] <= addr
-        return False
+        interval_id = self._find_interval(addr)
+        return interval_id < len(self.free_starts) and self.free_starts[interval_id] <= addr
 
     # @param start: first address of the range
     # @param end:   last address of the range, excluded
     # In particular, returns False if it goes beyond the memory boundaries.
     def is_mem_range_free(self, start: int, end: int):
         # Find the pair to which `start` belongs, and then check that `end` is still in the same pair.
-        for curr_pair in self.freepairs:
-            if start < curr_pair[1]:
-                return start >= curr_pair[0] and end <= curr_pair[1]
-        return False
+        interval_id = self._find_interval(start)
+        return interval_id < len(self.free_starts) and start >= self.free_starts[interval_id] and end <= self.free_ends[interval_id]
 
     # @param addr: the current address
     # @return: the number of addresses, including addr, that are free until the next allocated address (or until the end of the memory).
     def get_available_contig_space(self, addr: int):
-        # Find the pair to which `start` belongs, and then check that `end` is still in the same pair.
-        for curr_pair in self.freepairs:
-            if addr < curr_pair[1]:
-                if (addr >= curr_pair[0]):
-                    return curr_pair[1] - addr
-                else:
-                    return 0
+        interval_id = self._find_interval(addr)
+        if interval_id < len(self.free_starts) and addr >= self.free_starts[interval_id]:
+            return self.free_ends[interval_id] - addr
         return 0
 
     # @param start:         first address of the range.
@@ -61,55 +80,29 @@ class MemoryView:
         end = start + alloc_size
         if DO_ASSERT:
             assert end > start, f"Expected start ({start}) > end ({end}) in alloc_mem_range."
+        interval_id = self._find_interval(start)
+        if interval_id == len(self.free_starts):
+            raise ValueError("Trying to allocate a memory range that was already not free.")
+        interval_start, interval_end = self.free_starts[interval_id], self.free_ends[interval_id]
+        # Check that the range is initially free.
+        if DO_ASSERT:
+            assert start >= interval_start and end <= interval_end, "The memory range to allocate is not free."
         self.occupied_addrs += end-start
-        for curr_pair_id, curr_pair in enumerate(self.freepairs):
-            if start < curr_pair[1]:
-                # Check that the range is initially free.
-                if DO_ASSERT:
-                    assert start >= curr_pair[0] and end <= curr_pair[1], "The memory range to allocate is not free."
-                # Remove the tuple and replace it with at most two smaller tuples. This will automatically coalesce.
-                if start == curr_pair[0] and end == curr_pair[1]:
-                    self.freepairs = self.freepairs[:curr_pair_id] + self.freepairs[curr_pair_id+1:]
-                    break
-                elif start == curr_pair[0]:
-                    self.freepairs = self.freepairs[:curr_pair_id] + [(end, curr_pair[1])] + self.freepairs[curr_pair_id+1:]
-                    break
-                elif end == curr_pair[1]:
-                    self.freepairs = self.freepairs[:curr_pair_id] + [(curr_pair[0], start)] + self.freepairs[curr_pair_id+1:]
-                    break
-                else:
-                    self.freepairs = self.freepairs[:curr_pair_id] + [(curr_pair[0], start)] + [(end, curr_pair[1])] + self.freepairs[curr_pair_id+1:]
-                    break
+        self.num_free_addrs -= end-start
+        # Remove the interval and replace it with at most two smaller intervals. This will automatically coalesce.
+        if start == interval_start and end == interval_end:
+            del self.free_starts[interval_id]
+            del self.free_ends[interval_id]
+        elif start == interval_start:
+            self.free_starts[interval_id] = end
+        elif end == interval_end:
+            self.free_ends[interval_id] = start
         else:
-            raise ValueError("Trying to allocate a memory range that was already not free.")
+            self.free_ends[interval_id] = start
+            self.free_starts.insert(interval_id+1, end)
+            self.free_ends.insert(interval_id+1, interval_end)
         # print(self.to_string())
 
-    # @param store_instr_str: for example `sw`.
-    # @param addr may be outside of memview
-    def alloc_from_store_instruction(self, store_instr_str: str, addr: int):
-        # Get the width from the opcode
-        if store_instr_str == "sb":
-            opwidth = 1
-        elif store_instr_str == "sh":
-            opwidth = 2
-        elif store_instr_str in ("sw", "fsw"):
-            opwidth = 4
-        elif store_instr_str in ("sd", "fsd"):
-            opwidth = 8
-        else:
-            raise ValueError(f"Unexpected store instruction string: `{store_instr_str}`")
-
-        # Cap to the memory bounds
-        left_bound = max(addr, 0) # Included
-        right_bound = min(addr+opwidth, self.memsize) # Excluded
-
-        if DO_ASSERT:
-            assert left_bound <= right_bound
-
-        if right_bound == left_bound:
-            return
-        self.alloc_mem_range(left_bound, right_bound)
-
     # @param alignment_bits: bits of alignment. For example, 0 for no specific alignment, 1 for 2-byte alignment, 2 for 4-byte, etc. 
     # @param min_space:      the minimal number of memory addresses that are free, starting from the returned address 
     # @param left_bound:     byte address. Included. May exceed memory bounds, in which case will be brought back to memory boundaries.
@@ -128,6 +121,9 @@ class MemoryView:
             # The bounds must be sufficiently spaced. In our use case, this is not at all a problem.
             assert ((left_bound+(1 << alignment_bits)-1) >> alignment_bits) < ((right_bound-min_space) >> alignment_bits)
 
+        if MEMVIEW_EXACT_SAMPLING:
+            return self.gen_random_free_addr_exact(alignment_bits, min_space, left_bound, right_bound)
+
         for _ in range(max_attempts):
             picked_addr = random.randrange((left_bound+(1 << alignment_bits)-1) >> alignment_bits, ((right_bound-min_space) >> alignment_bits)) << alignment_bits
             if min_space == 0 or self.is_mem_range_free(picked_addr, picked_addr+min_space): # is_mem_range_free returns False if it goes beyond the memory boundaries.
@@ -138,10 +134,51 @@ class MemoryView:
                 return picked_addr
         return None
 
+    # @brief Samples uniformly among the aligned addresses that satisfy the constraints of gen_random_free_addr.
+    # The cost is linear in the number of free intervals between the bounds, and independent of the memory occupation. Not used by default, see MEMVIEW_EXACT_SAMPLING.
+    # @return None if no such address exists. Else, return the address
+    def gen_random_free_addr_exact(self, alignment_bits: int, min_space: int, left_bound: int, right_bound: int):
+        left_bound  = max(left_bound, 0)
+        right_bound = min(right_bound, self.memsize)
+        # Same candidate indices as gen_random_free_addr: [first_candidate_id, last_candidate_id]
+        first_candidate_id = (left_bound+(1 << alignment_bits)-1) >> alignment_bits
+        last_candidate_id = ((right_bound-min_space) >> alignment_bits) - 1
+        if last_candidate_id < first_candidate_id:
+            return None
+        if min_space == 0:
+            return random.randint(first_candidate_id, last_candidate_id) << alignment_bits
+
+        # Count the candidates in each overlapping free interval.
+        interval_first_candidate_ids = []
+        cumul_num_candidates = []
+        num_candidates = 0
+        for interval_id in range(self._find_interval(first_candidate_id << alignment_bits), len(self.free_starts)):
+            interval_first_candidate_id = max(first_candidate_id, (self.free_starts[interval_id]+(1 << alignment_bits)-1) >> alignment_bits)
+            if interval_first_candidate_id > last_candidate_id:
+                break
+            interval_last_candidate_id = min(last_candidate_id, (self.free_ends[interval_id]-min_space) >> alignment_bits)
+            if interval_last_candidate_id < interval_first_candidate_id:
+                continue
+            num_candidates += interval_last_candidate_id - interval_first_candidate_id + 1
+            interval_first_candidate_ids.append(interval_first_candidate_id)
+            cumul_num_candidates.append(num_candidates)
+        if not num_candidates:
+            return None
+
+        picked_candidate_rank = random.randrange(num_candidates)
+        picked_interval_id = bisect.bisect_right(cumul_num_candidates, picked_candidate_rank)
+        num_candidates_before = cumul_num_candidates[picked_interval_id-1] if picked_interval_id else 0
+        picked_addr = (interval_first_candidate_ids[picked_interval_id] + picked_candidate_rank - num_candidates_before) << alignment_bits
+        if DO_ASSERT:
+            assert picked_addr >= left_bound
+            assert picked_addr + min_space <= right_bound
+            assert picked_addr % (1 << alignment_bits) == 0
+            assert self.is_mem_range_free(picked_addr, picked_addr+min_space)
+        return picked_addr
+
     # @brief Computes the percentage of the memory that is allocated
     def get_allocated_ratio(self):
-        free_sum = sum(map(lambda p: p[1] - p[0], self.freepairs))
-        return (self.memsize - free_sum)/self.memsize
+        return (self.memsize - self.num_free_addrs)/self.memsize
 
     def to_string(self):
         return str(self.freepairs)
@@ -0,0 +1,151 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module provides the differential multi-design mode: a single program is generated and resolved by Spike once for a group of designs, and the same RTL ELF is simulated on each design of the group.
+# Two designs are compatible iff the generation gives the same program for both, i.e., iff their generation properties below are equal.
+# This is typically the case for the variants of a design, for example `vexriscv` and `vexriscv-v1-7`.
+
+from params.runparams import DO_ASSERT, NO_REMOVE_TMPFILES
+from common import profiledesign
+from common.designcfgs import get_design_cfg, design_has_pmp
+from common.scratch import keep_failing_artifact, release_scratch_file
+from common.timeout import timeout
+from cascade.fuzzsim import SimulatorEnum, gen_sim_test_descriptor, runtest_simulator_from_descriptor
+from cascade.fuzzfromdescriptor import gen_fuzzerstate_elf_expectedvals, _gen_failed_test_message
+
+from collections import defaultdict
+import time
+
+# The fields of the design configurations that the generation and the Spike resolution depend on.
+DESIGN_GENERATION_CFG_FIELDS = ('bootaddr', 'marchflags', 'stopsigaddr', 'regdumpaddr', 'fpregdumpaddr', 'misaligned_data_supported', 'privlvs', 'mmu')
+
+# The generation also depends on the design name, through the checks below. They must be kept in sync with the design name checks in cascade/randomize and cascade/fuzzerstate.
+DESIGN_NAME_SUBSTRING_CHECKS = ('picorv32', 'vexriscv', 'kronos', 'cva6', 'boom', 'rocket')
+DESIGN_NAME_EXACT_CHECKS = ('picorv32', 'cva6')
+
+###
+# Grouping
+###
+
+# @brief profiles the medeleg mask of each design. The profiled mask of the process is the one of the last design.
+# @return a dict design_name: medeleg mask.
+def profile_get_medeleg_masks(design_names) -> dict:
+    ret = dict()
+    for design_name in design_names:
+        profiledesign.profile_get_medeleg_mask(design_name)
+        # profile_get_medeleg_mask does not profile picorv32, which does not support medeleg.
+        ret[design_name] = 0 if "picorv32" in design_name else profiledesign.PROFILED_MEDELEG_MASK
+    return ret
+
+# @param medeleg_mask the profiled medeleg mask of the design, see profile_get_medeleg_masks.
+# @return a dict of all the properties of the design that the generation depends on.
+def get_design_generation_properties(design_name: str, medeleg_mask: int) -> dict:
+    design_cfg = get_design_cfg(design_name)
+    ret = {field: design_cfg.get(field) for field in DESIGN_GENERATION_CFG_FIELDS}
+    ret['pmp'] = design_has_pmp(design_name)
+    ret['medeleg_mask'] = medeleg_mask
+    ret['name_substrings'] = tuple(substring for substring in DESIGN_NAME_SUBSTRING_CHECKS if substring in design_name)
+    ret['name_exact'] = design_name if design_name in DESIGN_NAME_EXACT_CHECKS else None
+    return ret
+
+# @param medeleg_masks a dict design_name: medeleg mask, see profile_get_medeleg_masks.
+# @return the list of the groups of compatible designs, each being a list of design names, in the order of their first design in design_names.
+def group_compatible_designs(design_names, medeleg_masks: dict) -> list:
+    groups = dict()
+    for design_name in design_names:
+        key = tuple(get_design_generation_properties(design_name, medeleg_masks[design_name]).items())
+        groups.setdefault(key, []).append(design_name)
+    return list(groups.values())
+
+# @brief raises a ValueError that names the differing properties if the designs are not all compatible.
+def check_designs_compatible(design_names, medeleg_masks: dict):
+    if DO_ASSERT:
+        assert len(design_names) > 0
+    ref_properties = get_design_generation_properties(design_names[0], medeleg_masks[design_names[0]])
+    for design_name in design_names[1:]:
+        properties = get_design_generation_properties(design_name, medeleg_masks[design_name])
+        differing_fields = [field for field in ref_properties if properties[field] != ref_properties[field]]
+        if differing_fields:
+            raise ValueError(f"Designs `{design_names[0]}` and `{design_name}` are not compatible for the multi-design mode. Differing properties: " + ', '.join(f"{field} (`{ref_properties[field]}` vs. `{properties[field]}`)" for field in differing_fields))
+
+###
+# Fuzzing
+###
+
+# @brief generates and resolves a single program with the first design of design_names, and simulates its RTL ELF on each design. The designs must be compatible, see check_designs_compatible.
+# As fuzz_single_from_descriptor, prints the failing tests. A generation failure is re-raised, a simulation failure is reported in the result of its design.
+# @return a pair (gathered times of the generation: (gen_bbs, spike_resol, gen_elf), dict design_name: (is_success, time spent in the RTL simulation)).
+@timeout(seconds=60*60*2)
+def fuzz_single_from_descriptor_multidesign(memsize: int, design_names: tuple, randseed: int, nmax_bbs: int, authorize_privileges: bool, check_pc_spike_again: bool = False, simulator=SimulatorEnum.VERILATOR):
+    try:
+        fuzzerstate, rtl_elfpath, expected_regvals, time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf = gen_fuzzerstate_elf_expectedvals(memsize, design_names[0], randseed, nmax_bbs, authorize_privileges, check_pc_spike_again)
+    except Exception as e:
+        print(_gen_failed_test_message(memsize, design_names[0], randseed, nmax_bbs, authorize_privileges, check_pc_spike_again, e))
+        raise
+    sim_descriptor = gen_sim_test_descriptor(fuzzerstate)
+    del fuzzerstate
+
+    per_design_results = dict()
+    is_any_failure = False
+    for design_name in design_names:
+        start = time.time()
+        try:
+            is_success, rtl_msg = runtest_simulator_from_descriptor(sim_descriptor._replace(design_name=design_name), rtl_elfpath, expected_regvals, simulator)
+        except Exception as e:
+            is_success, rtl_msg = False, str(e)
+        per_design_results[design_name] = (is_success, time.time() - start)
+        if not is_success:
+            is_any_failure = True
+            print(_gen_failed_test_message(memsize, design_name, randseed, nmax_bbs, authorize_privileges, check_pc_spike_again, rtl_msg))
+
+    if NO_REMOVE_TMPFILES:
+        print('rtl elfpath', rtl_elfpath)
+    else:
+        if is_any_failure:
+            keep_failing_artifact(rtl_elfpath)
+        release_scratch_file(rtl_elfpath)
+    return (time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf), per_design_results
+
+# The per-design bookkeeping of the results of fuzz_single_from_descriptor_multidesign, in the parent process.
+class MultiDesignStats:
+    def __init__(self, design_names):
+        self.design_names = tuple(design_names)
+        self.num_programs = 0
+        self.num_failed_generations = 0
+        self.gen_seconds = 0
+        self.spike_seconds = 0
+        # design_name: number of simulated tests
+        self.num_simulated = defaultdict(int)
+        # design_name: number of failed simulated tests
+        self.num_failed = defaultdict(int)
+        # design_name: time spent in the RTL simulations
+        self.sim_seconds = defaultdict(float)
+
+    # @param ret the return value of fuzz_single_from_descriptor_multidesign, or None if the job did not complete.
+    def add_result(self, ret):
+        self.num_programs += 1
+        if ret is None:
+            self.num_failed_generations += 1
+            return
+        (time_seconds_spent_in_gen_bbs, time_seconds_spent_in_spike_resol, time_seconds_spent_in_gen_elf), per_design_results = ret
+        self.gen_seconds += time_seconds_spent_in_gen_bbs + time_seconds_spent_in_gen_elf
+        self.spike_seconds += time_seconds_spent_in_spike_resol
+        for design_name, (is_success, time_seconds_spent_in_rtl_sim) in per_design_results.items():
+            self.num_simulated[design_name] += 1
+            self.num_failed[design_name] += not is_success
+            self.sim_seconds[design_name] += time_seconds_spent_in_rtl_sim
+
+    def get_num_simulated(self) -> int:
+        return sum(self.num_simulated.values())
+
+    def __str__(self):
+        num_simulated = self.get_num_simulated()
+        ret = f"{self.num_programs} programs ({self.num_failed_generations} failed generations), {num_simulated} simulated tests"
+        if num_simulated:
+            ret += f", {(self.gen_seconds + self.spike_seconds) / num_simulated:.3f}s of generation and Spike per simulated test"
+        for design_name in self.design_names:
+            ret += f"\n  {design_name}: {self.num_failed[design_name]}/{self.num_simulated[design_name]} failed"
+            if self.num_simulated[design_name]:
+                ret += f", {self.sim_seconds[design_name] / self.num_simulated[design_name]:.3f}s per simulation"
+        return ret
@@ -2,13 +2,15 @@
 # Licensed under the General Public License, Version 3.0, see LICENSE for details.
 # SPDX-License-Identifier: GPL-3.0-only
 
-from params.runparams import DO_ASSERT
+from params.runparams import DO_ASSERT, DO_EXPENSIVE_ASSERT
 from cascade.toleratebugs import is_tolerate_kronos_fence, is_tolerate_picorv32_fence, is_forbid_vexriscv_csrs, is_tolerate_picorv32_missingmandatorycsrs, is_tolerate_picorv32_readnonimplcsr, is_tolerate_picorv32_writehpm, is_tolerate_picorv32_readhpm_nocsrrs
 from cascade.util import ISAInstrClass, IntRegIndivState
 from params.fuzzparams import NUM_MIN_FREE_INTREGS, MAX_NUM_FENCES_PER_EXECUTION
 from cascade.privilegestate import PrivilegeStateEnum, is_ready_to_descend_privileges
 import random
+from bisect import bisect
 from copy import copy
+from itertools import accumulate
 
 # This module helps picking an ISAInstrClass.
 # This is the first step of generating a random instruction without a specific structure.
@@ -44,6 +46,10 @@ ISAINSTRCLASS_INITIAL_BOOSTERS = {
     ISAInstrClass.SPECIAL:     0.0001
 }
 
+# If True, the filtered weights are compiled into cumulative tables, memoized per generator state. Else, they are recomputed for each instruction.
+# Both options consume the random stream identically and hence generate the same programs.
+USE_COMPILED_ISAINSTRCLASS_TABLES = True
+
 ###
 # Helper functions
 ###
@@ -167,14 +173,62 @@ def _filter_sensitive_instr_weights(fuzzerstate, filtered_weights: list):
         filtered_weights[ISAInstrClass.MEMFPU]  = 0
         filtered_weights[ISAInstrClass.MEMFPUD] = 0
 
+# @return the fully filtered weights, as used for picking the next instruction class.
+def _get_isainstrclass_weights(fuzzerstate):
+    filtered_weights = _get_isainstrclass_filtered_weights(fuzzerstate)
+    _filter_regfsm_weight(fuzzerstate, filtered_weights)
+    _filter_sensitive_instr_weights(fuzzerstate, filtered_weights)
+    return filtered_weights
+
+# @brief packs the parts of the generator state on which the filtered weights depend into an int.
+# The other parts (design capabilities, design name, pick weights, etc.) are fixed for a given fuzzerstate.
+def _get_isainstrclass_state_bitvector(fuzzerstate) -> int:
+    privilegestate = fuzzerstate.privilegestate
+    # Same condition as in _filter_regfsm_weight
+    is_regfsm_possible = fuzzerstate.intregpickstate.get_num_regs_in_state(IntRegIndivState.FREE) > NUM_MIN_FREE_INTREGS or \
+        fuzzerstate.intregpickstate.exists_reg_in_state(IntRegIndivState.PRODUCED0) or \
+        fuzzerstate.intregpickstate.exists_reg_in_state(IntRegIndivState.PRODUCED1)
+    return int(fuzzerstate.design_has_fpu and fuzzerstate.is_fpu_activated) \
+        | int(privilegestate.privstate) << 1 \
+        | int(privilegestate.curr_mstatus_mpp) << 3 \
+        | int(privilegestate.is_mtvec_populated) << 5 \
+        | int(privilegestate.is_stvec_populated) << 6 \
+        | int(privilegestate.is_mepc_populated) << 7 \
+        | int(privilegestate.is_sepc_populated) << 8 \
+        | int(bool(is_regfsm_possible)) << 9 \
+        | int(bool(fuzzerstate.intregpickstate.exists_reg_in_state(IntRegIndivState.CONSUMED))) << 10 \
+        | int(MAX_NUM_FENCES_PER_EXECUTION is not None and fuzzerstate.special_instrs_count > MAX_NUM_FENCES_PER_EXECUTION) << 11 \
+        | privilegestate.medeleg_val << 12
+
+# @brief compiles the weights for the current generator state into a triple (instruction classes, cumulative weights, weights).
+def _compile_isainstrclass_table(fuzzerstate):
+    weights = _get_isainstrclass_weights(fuzzerstate)
+    return list(weights.keys()), list(accumulate(weights.values())), weights
+
 ###
 # Exposed function
 ###
 
 # Do NOT @cache this function, as it is a random function.
 def gen_next_isainstrclass(fuzzerstate) -> ISAInstrClass:
-    filtered_weights = _get_isainstrclass_filtered_weights(fuzzerstate)
-    _filter_regfsm_weight(fuzzerstate, filtered_weights)
-    _filter_sensitive_instr_weights(fuzzerstate, filtered_weights)
+    if not USE_COMPILED_ISAINSTRCLASS_TABLES:
+        return _gen_next_isainstrclass_from_weights(_get_isainstrclass_weights(fuzzerstate))
 
-    return _gen_next_isainstrclass_from_weights(filtered_weights)
+    state_bitvector = _get_isainstrclass_state_bitvector(fuzzerstate)
+    try:
+        isainstrclasses, cum_weights, weights = fuzzerstate.isainstrclass_tables[state_bitvector]
+    except KeyError:
+        isainstrclasses, cum_weights, weights = fuzzerstate.isainstrclass_tables[state_bitvector] = _compile_isainstrclass_table(fuzzerstate)
+        # Tables are built rarely, hence these checks are cheap. The weights of the filters that the key packs directly must agree with the key.
+        if DO_ASSERT:
+            assert fuzzerstate.isapickweights == fuzzerstate.isainstrclass_tables_pickweights, "The pick weights changed after the isainstrclass tables were built."
+            assert bool(weights[ISAInstrClass.FPU])    == bool(state_bitvector & (1 << 0)),  "The isainstrclass table key does not match the FPU weight."
+            assert bool(weights[ISAInstrClass.REGFSM]) == bool(state_bitvector & (1 << 9)),  "The isainstrclass table key does not match the REGFSM weight."
+            assert bool(weights[ISAInstrClass.JAL])    == bool(state_bitvector & (1 << 10)), "The isainstrclass table key does not match the JAL weight."
+    if DO_EXPENSIVE_ASSERT:
+        assert weights == _get_isainstrclass_weights(fuzzerstate), "The compiled isainstrclass table does not match the current state."
+
+    # Same computation as random.choices, to consume the random stream identically.
+    ret = isainstrclasses[bisect(cum_weights, random.random() * (cum_weights[-1] + 0.0), 0, len(cum_weights) - 1)]
+    assert weights[ret] != 0
+    return ret
@@ -7,11 +7,23 @@ from params.fuzzparams import REGPICK_PROTUBERANCE_RATIO, NUM_MIN_FREE_INTREGS
 from cascade.randomize.createcfinstr import create_targeted_producer0_instrobj, create_targeted_producer1_instrobj, create_targeted_consumer_instrobj
 from cascade.util import IntRegIndivState
 
-from copy import copy, deepcopy
+from copy import copy
+from functools import lru_cache
 import math
 import numpy as np
 import random
 
+# @brief converts a bitmask of registers into a onehot vector, used as weights when picking registers.
+# The returned array is shared and must not be modified.
+@lru_cache(maxsize=4096)
+def _mask_to_onehot(mask: int, num_regs: int):
+    ret = np.array([(mask >> reg_id) & 1 for reg_id in range(num_regs)], np.int8)
+    ret.flags.writeable = False
+    return ret
+
+# Internally, the state of each register is represented by one bitmask per IntRegIndivState, where bit i is set iff register i is in this state.
+# The bitmasks are ints and the reg weights are never modified in place, so saving a state does not copy them.
+# The producer ids and coordinates are copied lazily, on the first modification after a save or a restore.
 class IntRegPickState:
     # no_dependency_bias: only to evaluate the impact of the dependency bias
     def __init__(self, num_pickable_regs: int, no_dependency_bias: bool):
@@ -24,22 +36,24 @@ class IntRegPickState:
         self.__last_producer_ids = np.zeros(self.num_pickable_regs)
         # For each register, a pair of (basic block id, instr in basic block) that produced the register
         self.__last_producer_coords = [[[None, None], [None, None]] for _ in range(self.num_pickable_regs)]
+        # True iff the producer ids and coords are shared with some saved state, and hence must be copied before being modified.
+        self.__are_producers_shared = False
         if DO_ASSERT:
             self.__last_producer_ids.fill(None) # To avoid luckily having offset 0
-        # Mnemonic list for speeding up searches
-        self.__regs_in_state_onehot = {curr_indiv_state: np.ones(self.num_pickable_regs, np.int8) if (curr_indiv_state == IntRegIndivState.FREE) else np.zeros(self.num_pickable_regs, np.int8) for curr_indiv_state in IntRegIndivState}
+        # Bitmasks for speeding up searches
+        self.__regs_in_state_mask = {curr_indiv_state: (1 << self.num_pickable_regs) - 1 if (curr_indiv_state == IntRegIndivState.FREE) else 0 for curr_indiv_state in IntRegIndivState}
         # Will ignore x0 if line below is uncommented. This is a design decision.
         # self.__reg_weights[0] = 0
     def get_free_regs_onehot(self):
-        ret = [int(self.__reg_states[reg_id] == IntRegIndivState.FREE) for reg_id in range(self.num_pickable_regs)]
+        ret = _mask_to_onehot(self.__regs_in_state_mask[IntRegIndivState.FREE], self.num_pickable_regs)
         if DO_ASSERT:
-            assert sum(ret) >= NUM_MIN_FREE_INTREGS
+            assert self.__regs_in_state_mask[IntRegIndivState.FREE].bit_count() >= NUM_MIN_FREE_INTREGS
         return ret
     def get_free_or_relocused_regs_onehot(self): # WARNING: Use those only for outputs, not for inputs.
-        ret = [int(self.__reg_states[reg_id] == IntRegIndivState.FREE) for reg_id in range(self.num_pickable_regs)]
-        if DO_ASSERT:
-            assert sum(ret) >= NUM_MIN_FREE_INTREGS
-        return ret
+        return self.get_free_regs_onehot()
+    # Same as get_free_regs_onehot, but excludes the zero register.
+    def _get_free_nonzero_regs_onehot(self):
+        return _mask_to_onehot(self.__regs_in_state_mask[IntRegIndivState.FREE] & ~1, self.num_pickable_regs)
     # Weights after deducting the forbidden registers
     def get_effective_weights(self, authorized_regs_onehot):
         if DO_ASSERT:
@@ -52,12 +66,7 @@ class IntRegPickState:
         return random.choices(range(self.num_pickable_regs), self.get_effective_weights(self.get_free_regs_onehot()))[0]
     # Excludes the zero register
     def pick_int_inputreg_nonzero(self, authorize_sideeffects: bool = True):
-        authorized_regs_onehot = self.get_free_regs_onehot()
-        was_zero_authorized = authorized_regs_onehot[0]
-        authorized_regs_onehot[0] = 0
-        ret = random.choices(range(self.num_pickable_regs), self.get_effective_weights(authorized_regs_onehot))[0]
-        authorized_regs_onehot[0] = was_zero_authorized
-        return ret
+        return random.choices(range(self.num_pickable_regs), self.get_effective_weights(self._get_free_nonzero_regs_onehot()))[0]
     # Consuming multiple input registers in one go.
     def pick_int_inputregs(self, n: int):
         authorized_regs_onehot = self.get_free_regs_onehot()
@@ -67,8 +76,6 @@ class IntRegPickState:
     # This updates the intregstate.
     def pick_int_outputreg(self, authorize_sideeffects: bool = True):
         authorized_regs_onehot = self.get_free_or_relocused_regs_onehot() # We could use any, but let's not waste the generated ones
-        if DO_ASSERT:
-            assert np.max(authorized_regs_onehot) == 1, "Unexpectedly, some register was registered in two states at a time."
         rd = random.choices(range(self.num_pickable_regs), self.get_effective_weights(authorized_regs_onehot))[0]
         if authorize_sideeffects:
             self._update_probaweights(rd)
@@ -76,17 +83,12 @@ class IntRegPickState:
                 self.set_regstate(rd, IntRegIndivState.FREE)
         return rd
     def pick_int_outputreg_nonzero(self, authorize_sideeffects: bool = True):
-        authorized_regs_onehot = self.get_free_or_relocused_regs_onehot() # We could use any, but let's not waste the generated ones
-        was_zero_authorized = authorized_regs_onehot[0]
-        authorized_regs_onehot[0] = 0
-        if DO_ASSERT:
-            assert np.max(authorized_regs_onehot) == 1, "Unexpectedly, some register was registered in two states at a time."
+        authorized_regs_onehot = self._get_free_nonzero_regs_onehot() # We could use any, but let's not waste the generated ones
         rd = random.choices(range(self.num_pickable_regs), self.get_effective_weights(authorized_regs_onehot))[0]
         if authorize_sideeffects:
             self._update_probaweights(rd)
             if rd:
                 self.set_regstate(rd, IntRegIndivState.FREE)
-        authorized_regs_onehot[0] = was_zero_authorized
         return rd
     # @param outreg the produced register.
     def _update_probaweights(self, outreg: int):
@@ -99,9 +101,9 @@ class IntRegPickState:
         #     return
         # The lines here below are a heuristic algorithm to favor more recently produced registers
         sum_of_others = np.sum(self.__reg_weights) - self.__reg_weights[outreg]
-        for reg_id in range(self.num_pickable_regs):
-            # We also do it (for performance) for outreg and we overwrite it later
-            self.__reg_weights[reg_id] = self.__reg_weights[reg_id] * (1-REGPICK_PROTUBERANCE_RATIO) / sum_of_others
+        # A new array is created, because the previous one may be shared with saved states.
+        # We also do it (for performance) for outreg and we overwrite it later
+        self.__reg_weights = self.__reg_weights * (1-REGPICK_PROTUBERANCE_RATIO) / sum_of_others
         self.__reg_weights[outreg] = REGPICK_PROTUBERANCE_RATIO
     # Getter and setter for register states
     def get_regstate(self, reg_id: int):
@@ -127,11 +129,11 @@ class IntRegPickState:
                 if DO_EXPENSIVE_ASSERT:
                     # Check that the register is registered in exactly one state
                     for s in IntRegIndivState:
-                        assert self.__regs_in_state_onehot[s][reg_id] == int(s == self.__reg_states[reg_id])
+                        assert (self.__regs_in_state_mask[s] >> reg_id) & 1 == int(s == self.__reg_states[reg_id])
                 else:
-                    assert self.__regs_in_state_onehot[self.__reg_states[reg_id]][reg_id]
-        self.__regs_in_state_onehot[self.__reg_states[reg_id]][reg_id] = 0
-        self.__regs_in_state_onehot[new_state][reg_id] = 1
+                    assert (self.__regs_in_state_mask[self.__reg_states[reg_id]] >> reg_id) & 1
+        self.__regs_in_state_mask[self.__reg_states[reg_id]] &= ~(1 << reg_id)
+        self.__regs_in_state_mask[new_state] |= 1 << reg_id
         self.__reg_states[reg_id] = new_state
     # Brings iteratively a register to the requested state, as fast as possible
     # @return nothing, but guarantees that a register will be in the target state
@@ -158,44 +160,69 @@ class IntRegPickState:
             raise ValueError('Unexpected state.')
 
     # Save at the end of basic blocks, and restore if popping basic blocks from the end.
+    # Does not copy anything.
     def save_curr_state(self):
-        return copy(self.__reg_weights), copy(self.__reg_states), copy(self.__last_producer_ids), deepcopy(self.__last_producer_coords)
+        self.__are_producers_shared = True
+        return self.__reg_weights, tuple(self.__regs_in_state_mask.items()), self.__last_producer_ids, self.__last_producer_coords
     # Rarely called.
     def restore_state(self, saved_state: tuple):
         if DO_ASSERT:
             assert len(saved_state) == 4
         # Restore the reg weights (this is not so important)
-        self.__reg_weights = copy(saved_state[0])
-        # Restore the reg states. Be careful to also restore the internal matrix. Therefore, use the API function.
-        for reg_id in range(1, self.num_pickable_regs):
-            self.set_regstate(reg_id, saved_state[1][reg_id], force=True)
-        self.__last_producer_ids = copy(saved_state[2])
-        self.__last_producer_coords = deepcopy(saved_state[3])
+        self.__reg_weights = saved_state[0]
+        # Restore the reg states, except for the zero register, which always stays free.
+        self.__regs_in_state_mask = dict(saved_state[1])
+        for curr_indiv_state, curr_mask in saved_state[1]:
+            self.__regs_in_state_mask[curr_indiv_state] = (curr_mask & ~1) | (int(curr_indiv_state == IntRegIndivState.FREE))
+            for reg_id in range(1, self.num_pickable_regs):
+                if (curr_mask >> reg_id) & 1:
+                    self.__reg_states[reg_id] = curr_indiv_state
+        self.__last_producer_ids = saved_state[2]
+        self.__last_producer_coords = saved_state[3]
+        self.__are_producers_shared = True
+    # @return a copy that can be modified independently. As for saved states, the reg weights are shared and the producers are copied lazily.
+    def fork(self):
+        ret = copy(self)
+        ret.__reg_states = list(self.__reg_states)
+        ret.__regs_in_state_mask = dict(self.__regs_in_state_mask)
+        self.__are_producers_shared = True
+        ret.__are_producers_shared = True
+        return ret
+    # @brief copies the producer ids and coordinates if they are shared with some saved state.
+    def _unshare_producers(self):
+        if self.__are_producers_shared:
+            self.__last_producer_ids = copy(self.__last_producer_ids)
+            # The innermost elements are never modified in place.
+            self.__last_producer_coords = [copy(curr_coords) for curr_coords in self.__last_producer_coords]
+            self.__are_producers_shared = False
 
     # Getters and setters for producer ids 
     def get_producer_id(self, reg_id: int):
         return self.__last_producer_ids[reg_id]
     def set_producer_id(self, reg_id: int, producer_id: int):
+        self._unshare_producers()
         self.__last_producer_ids[reg_id] = producer_id
     def set_producer0_location(self, reg_id: int, bb_id: int, instr_id_in_bb: int):
+        self._unshare_producers()
         self.__last_producer_coords[reg_id][0] = (bb_id, instr_id_in_bb)
     def set_producer1_location(self, reg_id: int, bb_id: int, instr_id_in_bb: int):
+        self._unshare_producers()
         self.__last_producer_coords[reg_id][1] = (bb_id, instr_id_in_bb)
 
     # Getters for registers in a certain state
     def exists_reg_in_state(self, req_state: IntRegIndivState) -> bool:
-        return np.any(self.__regs_in_state_onehot[req_state])
+        return self.__regs_in_state_mask[req_state] != 0
     def get_num_regs_in_state(self, req_state: IntRegIndivState) -> bool:
-        return np.sum(self.__regs_in_state_onehot[req_state])
+        return self.__regs_in_state_mask[req_state].bit_count()
     def pick_int_reg_in_state(self, req_state: IntRegIndivState):
         if DO_ASSERT:
             assert self.exists_reg_in_state(req_state), f"No reg in state `{req_state}`"
         ret = None
-        while ret is None or not self.__regs_in_state_onehot[req_state][ret]:
-            ret = random.choices(range(self.num_pickable_regs), self.__regs_in_state_onehot[req_state], k=1)[0]
+        while ret is None or not (self.__regs_in_state_mask[req_state] >> ret) & 1:
+            ret = random.choices(range(self.num_pickable_regs), _mask_to_onehot(self.__regs_in_state_mask[req_state], self.num_pickable_regs), k=1)[0]
         return ret
     def display(self):
-        print('pickreg', self.__regs_in_state_onehot)
+        print('pickreg', {curr_indiv_state: _mask_to_onehot(curr_mask, self.num_pickable_regs) for curr_indiv_state, curr_mask in self.__regs_in_state_mask.items()})
 
 # Float registers are never forbidden, therefore this is simpler than integer registers.
 class FloatRegPickState:
@@ -225,7 +252,6 @@ class FloatRegPickState:
         # The lines here below are a heuristic algorithm to favor more recently produced registers
         if self.num_pickable_floating_regs > 1: # If there is a single one, we do not want to zero its weight
             sum_of_others = np.sum(self.__reg_weights) - self.__reg_weights[outreg]
-            for reg_id in range(self.num_pickable_floating_regs):
-                # We also do it (for performance) for outreg and we overwrite it later
-                self.__reg_weights[reg_id] = self.__reg_weights[reg_id] * (1-REGPICK_PROTUBERANCE_RATIO) / sum_of_others
+            # We also do it (for performance) for outreg and we overwrite it later
+            self.__reg_weights = self.__reg_weights * (1-REGPICK_PROTUBERANCE_RATIO) / sum_of_others
             self.__reg_weights[outreg] = REGPICK_PROTUBERANCE_RATIO
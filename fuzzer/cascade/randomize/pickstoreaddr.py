@@ -8,6 +8,7 @@
 from params.runparams import DO_ASSERT
 from cascade.memview import MemoryView
 
+from copy import copy
 import numpy as np
 import random
 
@@ -35,6 +36,14 @@ class MemStoreState:
         # Remember the last store operation address
         self.last_store_addr = self.store_locations[0]
 
+    # @return a copy that can be modified independently.
+    def fork(self):
+        ret = copy(self)
+        ret.store_locations = list(self.store_locations)
+        if hasattr(self, 'location_weights'):
+            ret.location_weights = self.location_weights.copy()
+        return ret
+
     # Modifies the weights in place.
     # @param alignment_bits is equal to the requested size. This means we do not support misaligned mem reqs.
     # @return the picked location, in addition to updating the state.
@@ -6,15 +6,18 @@
 
 from common.designcfgs import get_design_march_flags_nocompressed, get_design_boot_addr, get_design_cascade_path
 from common.spike import SPIKE_STARTADDR
+from common.scratch import release_scratch_file
 from cascade.basicblock import gen_basicblocks
 from cascade.cfinstructionclasses import JALInstruction, RegImmInstruction
 from cascade.fuzzsim import SimulatorEnum, runtest_simulator
 from cascade.spikeresolution import gen_elf_from_bbs, gen_regdump_reqs_reduced, gen_ctx_regdump_reqs, run_trace_regs_at_pc_locs, spike_resolution
 from cascade.contextreplay import SavedContext, gen_context_setter
 from cascade.privilegestate import PrivilegeStateEnum
+from cascade.reduceprobecache import get_reduction_probe_cache, gen_probe_key, gen_outcome_key
+from common.scheduler import JobPool, JOB_STATUS_DONE
 from params.runparams import DO_ASSERT, NO_REMOVE_TMPFILES
 
-from copy import deepcopy
+from collections import deque
 import itertools
 import os
 import random
@@ -26,6 +29,7 @@ from pathlib import Path
 REDUCTION_SIMULATOR = SimulatorEnum.VERILATOR
 NOPIZE_SANDWICH_INSTRUCTIONS = False # Not fully implemented & tested, hence do not yet set to True
 FLATTEN_SANDWICH_INSTRUCTIONS = False # Not fully implemented & tested, hence do not yet set to True
+REDUCTION_NUM_PARALLEL_PROBES = 1 # Number of is_mismatch probes run in parallel by the searches. 1 corresponds to the sequential binary search.
 
 # Used for removing the first BBs and instructions.
 def _save_ctx_and_jump_to_pillar_specific_instr(fuzzerstate, index_first_bb_to_consider: int, index_first_instr_to_consider: int):
@@ -39,7 +43,7 @@ def _save_ctx_and_jump_to_pillar_specific_instr(fuzzerstate, index_first_bb_to_c
 
     # Remove the ELF
     if not NO_REMOVE_TMPFILES:
-        os.remove(spikereduce_elfpath)
+        release_scratch_file(spikereduce_elfpath)
         del spikereduce_elfpath
 
     # Generate the context setter
@@ -159,6 +163,35 @@ def _save_ctx_and_jump_to_pillar_specific_instr(fuzzerstate, index_first_bb_to_c
 
     return fuzzerstate
 
+# @brief forks the fuzzerstate and cuts the program after the given instruction, by jumping from there to the final block.
+# Only the basic block `max_bb_id_to_consider` and the initial one, which may later jump to the context setter, are copied. The fuzzerstate is not modified.
+# @return the forked fuzzerstate.
+def _gen_reduced_fuzzerstate_tail(fuzzerstate, max_bb_id_to_consider: int, max_instr_id_except_cf: int):
+    ###
+    # Remove the last basic blocks
+    ###
+
+    test_fuzzerstate = fuzzerstate.fork((0, max_bb_id_to_consider))
+
+    test_fuzzerstate.intregpickstate.restore_state(test_fuzzerstate.saved_reg_states[max_bb_id_to_consider])
+    if DO_ASSERT:
+        if isinstance(test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider][-1], JALInstruction):
+            assert test_fuzzerstate.memsize <= 1 << 20, "The whole memory cannot be addressed with JAL."
+
+    ###
+    # Remove the last instructions in the last basic block
+    ###
+
+    # Pop intermediate instructions if required
+    if max_instr_id_except_cf < len(test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider]):
+        curr_addr = test_fuzzerstate.bb_start_addr_seq[max_bb_id_to_consider] + (max_instr_id_except_cf+1) * 4 # NO_COMPRESSED
+        test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider][max_instr_id_except_cf+1] = JALInstruction("jal", 0, test_fuzzerstate.final_bb_base_addr-curr_addr)
+    else:
+        curr_addr = test_fuzzerstate.bb_start_addr_seq[max_bb_id_to_consider] + (len(test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider])-1) * 4 # NO_COMPRESSED
+        test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider][-1] = JALInstruction("jal", 0, test_fuzzerstate.final_bb_base_addr-curr_addr)
+
+    return test_fuzzerstate
+
 # @param max_bb_id_to_consider: the number of BBs to consider, hence from 0 to len(fuzzerstate.instr_objs_seq)-1.
 # @param max_instr_id_except_cf: the number of instructions in the bb `max_bb_id_to_consider` to consider in total, including the cf instruction that may be added (equivalently, the max instruction index to consider in the bb `max_bb_id_to_consider` when ignoring the cf instruction). -1 means that we only want the CF instruction. None means that we do not expect to do any replacement.
 # @param index_first_bb_to_consider: the index of the first BB to consider. 1 if we remove no bb on the left side.
@@ -185,31 +218,9 @@ def gen_reduced_elf(fuzzerstate, max_bb_id_to_consider: int, max_instr_id_except
             assert max_instr_id_except_cf+1 >= index_first_instr_to_consider, f"Expected max_instr_id_except_cf+1 `{max_instr_id_except_cf+1}` >= index_first_instr_to_consider `{index_first_instr_to_consider}`"
             assert index_first_instr_to_consider <= len(fuzzerstate.instr_objs_seq[index_first_bb_to_consider])-1, f"Expected `{index_first_instr_to_consider}` <= `{len(fuzzerstate.instr_objs_seq[index_first_bb_to_consider])-1}`"
 
-    ###
-    # Remove the last basic blocks
-    ###
-
-    # Copy the fuzzerstate. Maybe it is an overkill.
-    test_fuzzerstate = deepcopy(fuzzerstate)
+    test_fuzzerstate = _gen_reduced_fuzzerstate_tail(fuzzerstate, max_bb_id_to_consider, max_instr_id_except_cf)
     del fuzzerstate # Just for safety. We will not need fuzzerstate anymore in this function
 
-    test_fuzzerstate.intregpickstate.restore_state(test_fuzzerstate.saved_reg_states[max_bb_id_to_consider])
-    if DO_ASSERT:
-        if isinstance(test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider][-1], JALInstruction):
-            assert test_fuzzerstate.memsize <= 1 << 20, "The whole memory cannot be addressed with JAL."
-
-    ###
-    # Remove the last instructions in the last basic block
-    ###
-
-    # Pop intermediate instructions if required
-    if max_instr_id_except_cf < len(test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider]):
-        curr_addr = test_fuzzerstate.bb_start_addr_seq[max_bb_id_to_consider] + (max_instr_id_except_cf+1) * 4 # NO_COMPRESSED
-        test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider][max_instr_id_except_cf+1] = JALInstruction("jal", 0, test_fuzzerstate.final_bb_base_addr-curr_addr)
-    else:
-        curr_addr = test_fuzzerstate.bb_start_addr_seq[max_bb_id_to_consider] + (len(test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider])-1) * 4 # NO_COMPRESSED
-        test_fuzzerstate.instr_objs_seq[max_bb_id_to_consider][-1] = JALInstruction("jal", 0, test_fuzzerstate.final_bb_base_addr-curr_addr)
-
     ###
     # Remove the first basic blocks and instructions
     ###
@@ -245,6 +256,17 @@ def gen_reduced_elf(fuzzerstate, max_bb_id_to_consider: int, max_instr_id_except
 # @param failing_instr_id the index of the first instruction in the bb `failing_bb_id` that causes trouble, in the sense that when it is removed (and all the following instructions and bbs), the test case does not fail anymore. It is None if the failing instruction is actually the last one in the previous bb. Only used in the second step.
 # @param index_first_bb_to_consider: only used in the second step
 def is_mismatch(fuzzerstate, max_bb_id_to_consider: int, failing_instr_id: int = None, index_first_bb_to_consider: int = 1, index_first_instr_to_consider: int = 0, quiet: bool = False):
+    probe_start_time = time.time()
+    probe_cache = get_reduction_probe_cache()
+    if probe_cache is not None:
+        probe_key = gen_probe_key(fuzzerstate, (max_bb_id_to_consider, failing_instr_id, index_first_bb_to_consider, index_first_instr_to_consider), REDUCTION_SIMULATOR)
+        cached_outcome = probe_cache.lookup_probe(probe_key)
+        if cached_outcome is not None:
+            probe_cache.record_probe('num_probe_hits', probe_start_time)
+            if quiet and cached_outcome[0]:
+                print(cached_outcome[1])
+            return cached_outcome[0]
+
     # try:
     test_fuzzerstate, rtl_elfpath, expected_regvals_pair, numinstrs = gen_reduced_elf(fuzzerstate, max_bb_id_to_consider, failing_instr_id, index_first_bb_to_consider, index_first_instr_to_consider)
     # except Exception as e:
@@ -254,7 +276,29 @@ def is_mismatch(fuzzerstate, max_bb_id_to_consider: int, failing_instr_id: int =
         print(f"Generated RTL elf: {rtl_elfpath}")
 
     del fuzzerstate
-    is_success, rtl_msg = runtest_simulator(test_fuzzerstate, rtl_elfpath, expected_regvals_pair, numinstrs, REDUCTION_SIMULATOR)
+
+    if probe_cache is not None:
+        outcome_key = gen_outcome_key(test_fuzzerstate, rtl_elfpath, expected_regvals_pair, numinstrs, REDUCTION_SIMULATOR)
+        cached_outcome = probe_cache.lookup_outcome(outcome_key)
+        if cached_outcome is not None:
+            probe_cache.store_probe(probe_key, outcome_key)
+            probe_cache.record_probe('num_outcome_hits', probe_start_time)
+            if not NO_REMOVE_TMPFILES:
+                release_scratch_file(rtl_elfpath)
+            if quiet and cached_outcome[0]:
+                print(cached_outcome[1])
+            return cached_outcome[0]
+
+    try:
+        is_success, rtl_msg = runtest_simulator(test_fuzzerstate, rtl_elfpath, expected_regvals_pair, numinstrs, REDUCTION_SIMULATOR)
+    finally:
+        if not NO_REMOVE_TMPFILES:
+            release_scratch_file(rtl_elfpath)
+
+    if probe_cache is not None:
+        probe_cache.store_outcome(outcome_key, not is_success, rtl_msg)
+        probe_cache.store_probe(probe_key, outcome_key)
+        probe_cache.record_probe(None, probe_start_time)
 
     if quiet and not is_success:
         print(rtl_msg)
@@ -262,7 +306,8 @@ def is_mismatch(fuzzerstate, max_bb_id_to_consider: int, failing_instr_id: int =
 
 # Flattens the control flow except for the initial block, the context setter and the final block.
 def _try_flatten_cf(fuzzerstate):
-    flat_fuzzerstate = deepcopy(fuzzerstate)
+    # Only the memory view and the context setter are modified in place, and fork copies them.
+    flat_fuzzerstate = fuzzerstate.fork()
     orig_fuzzerstate = fuzzerstate # Renaming to prevent accidental use of fuzzerstate
     del fuzzerstate
 
@@ -285,6 +330,7 @@ def _try_flatten_cf(fuzzerstate):
 
     flat_fuzzerstate.instr_objs_seq = [flat_fuzzerstate.instr_objs_seq[0], new_flat_instrs]
     flat_fuzzerstate.bb_start_addr_seq = [flat_fuzzerstate.bb_start_addr_seq[0], addr_flat_instrs]
+    flat_fuzzerstate.recount_fuzzing_instructions()
     # flat_fuzzerstate.instr_objs_seq[-1][-1] = JALInstruction("jal", 0, flat_fuzzerstate.bb_start_addr_seq[1] - 4*(len(flat_fuzzerstate.instr_objs_seq[0])-1))
     # print('Base addr guessed', hex(flat_fuzzerstate.ctxsv_bb_base_addr + 4*flat_fuzzerstate.ctxsv_bb_jal_instr_id))
     # print('Tgt addr', hex(flat_fuzzerstate.bb_start_addr_seq[1]))
@@ -299,11 +345,88 @@ def _try_flatten_cf(fuzzerstate):
     return fuzzerstate, is_flattening_success
 
 
+# @brief finds the bounds as the sequential binary search on the candidates (left_bound+right_bound)//2 does.
+# With more than one probe, the probes speculatively evaluate the candidates that the binary search may need next, i.e., the top of its decision tree below the current interval. The probes that fall out of this tree are cancelled.
+# Each round hence narrows the interval up to num_parallel_probes+1 ways, and the final bounds are those of the sequential search, even if the probe outcomes are not monotonic.
+# @param probe_fn a function candidate_bound -> bool, typically a call to is_mismatch.
+# @param probe_true_moves_right_bound True if the candidate becomes the right bound when probe_fn returns True, False if it becomes the left bound.
+# @param log_strs a pair of strings printed with each candidate, when probe_fn returns True and False respectively.
+# @param num_parallel_probes if None, then REDUCTION_NUM_PARALLEL_PROBES.
+# @return the final pair (left_bound, right_bound).
+def _search_bounds(probe_fn, left_bound: int, right_bound: int, probe_true_moves_right_bound: bool, log_strs: tuple, num_parallel_probes: int = None):
+    def narrow(left, right, candidate, outcome):
+        if outcome == probe_true_moves_right_bound:
+            return left, candidate
+        return candidate, right
+
+    if num_parallel_probes is None:
+        num_parallel_probes = REDUCTION_NUM_PARALLEL_PROBES
+
+    if num_parallel_probes <= 1:
+        while right_bound - left_bound > 1:
+            if DO_ASSERT:
+                assert right_bound > left_bound
+            candidate_bound = (right_bound + left_bound) // 2
+            outcome = probe_fn(candidate_bound)
+            print(candidate_bound, log_strs[0] if outcome else log_strs[1])
+            left_bound, right_bound = narrow(left_bound, right_bound, candidate_bound, outcome)
+        return left_bound, right_bound
+
+    # The candidates of the decision tree are pairwise distinct, hence they identify the probes.
+    outcomes = dict()
+    failed_probes = dict() # candidate: error string
+
+    # @return at most num_parallel_probes candidates of the decision tree below the given interval, whose outcome is still unknown, in breadth-first order.
+    def get_speculative_candidates(left, right):
+        ret = []
+        intervals = deque([(left, right)])
+        while intervals and len(ret) < num_parallel_probes:
+            left, right = intervals.popleft()
+            if right - left <= 1:
+                continue
+            candidate = (left + right) // 2
+            if candidate in outcomes:
+                intervals.append(narrow(left, right, candidate, outcomes[candidate]))
+            elif candidate not in failed_probes:
+                ret.append(candidate)
+                intervals.append((left, candidate))
+                intervals.append((candidate, right))
+        return ret
+
+    with JobPool(probe_fn, num_parallel_probes) as probe_pool:
+        while right_bound - left_bound > 1:
+            if DO_ASSERT:
+                assert right_bound > left_bound
+            candidate_bound = (right_bound + left_bound) // 2
+            if candidate_bound in failed_probes:
+                raise Exception(f"Failed probe for candidate bound {candidate_bound}: {failed_probes[candidate_bound]}")
+            if candidate_bound in outcomes:
+                print(candidate_bound, log_strs[0] if outcomes[candidate_bound] else log_strs[1])
+                left_bound, right_bound = narrow(left_bound, right_bound, candidate_bound, outcomes[candidate_bound])
+                continue
+
+            # Cancel the probes that are not needed anymore, and refill the probes.
+            speculative_candidates = get_speculative_candidates(left_bound, right_bound)
+            for candidate in probe_pool.get_job_ids_in_flight():
+                if candidate not in speculative_candidates:
+                    probe_pool.cancel(candidate)
+            candidates_in_flight = probe_pool.get_job_ids_in_flight()
+            for candidate in speculative_candidates:
+                if candidate not in candidates_in_flight:
+                    probe_pool.submit(candidate, (candidate,))
+
+            job_result = probe_pool.wait_result()
+            if job_result.status == JOB_STATUS_DONE:
+                outcomes[job_result.job_id] = job_result.ret
+            else:
+                failed_probes[job_result.job_id] = job_result.error_str
+    return left_bound, right_bound
+
 # Returns the index of the first bb that fails.
 # hint_left_bound_bb: when the bb with id `hint_left_bound_bb` is removed and all the subsequent bbs are removed, the bug should disappear.
 # hint_right_bound_bb: when the bb with id `hint_right_bound_bb` is removed and all the subsequent bbs are removed, the bug should still be here.
 # @return failing_bb_id is the index of the first bb that, when removed as well as the subsequent ones, makes the bug disappear.
-def _find_failing_bb(fuzzerstate, hint_left_bound_bb: int = None, hint_right_bound_bb: int = None):
+def _find_failing_bb(fuzzerstate, hint_left_bound_bb: int = None, hint_right_bound_bb: int = None, num_parallel_probes: int = None):
     # Take the hints
     if hint_left_bound_bb is not None:
         if DO_ASSERT:
@@ -324,16 +447,7 @@ def _find_failing_bb(fuzzerstate, hint_left_bound_bb: int = None, hint_right_bou
     # Invariant:
     #   is_mismatch(fuzzerstate, left_bound)  always False
     #   is_mismatch(fuzzerstate, right_bound) always True
-    while right_bound - left_bound > 1:
-        if DO_ASSERT:
-            assert right_bound > left_bound
-        candidate_bound = (right_bound + left_bound) // 2
-        if is_mismatch(fuzzerstate, candidate_bound):
-            print(candidate_bound, 'bb mismatch')
-            right_bound = candidate_bound
-        else:
-            print(candidate_bound, 'bb match')
-            left_bound = candidate_bound
+    left_bound, right_bound = _search_bounds(lambda candidate_bound: is_mismatch(fuzzerstate, candidate_bound), left_bound, right_bound, True, ('bb mismatch', 'bb match'), num_parallel_probes)
 
     if DO_ASSERT:
         assert left_bound + 1 == right_bound
@@ -347,7 +461,7 @@ def _find_failing_bb(fuzzerstate, hint_left_bound_bb: int = None, hint_right_bou
 # @param failing_bb_id is the index of the first bb that, when removed as well as the subsequent ones, makes the bug disappear.
 # @param failing_instr_id is the index of the first instruction in the bb `failing_bb_id` that causes trouble, in the sense that when it is removed (and all the following instructions and bbs), the test case does not fail anymore. It is None if the failing instruction is actually the last one in the previous bb.
 # @param pillar_bb_id is the index of the last bb such as the test case still succeeds when the bb `pillar_bb_id` is removed (and all the preceding instructions and bbs).
-def _find_pillar_bb(fuzzerstate, failing_bb_id: int, failing_instr_id: int, fault_from_prev_bb: bool, hint_left_bound_pillar_bb: int = None, hint_right_bound_pillar_bb: int = None):
+def _find_pillar_bb(fuzzerstate, failing_bb_id: int, failing_instr_id: int, fault_from_prev_bb: bool, hint_left_bound_pillar_bb: int = None, hint_right_bound_pillar_bb: int = None, num_parallel_probes: int = None):
     if DO_ASSERT:
         assert failing_bb_id > 0, f"In _find_pillar_bb, we assume that the initial block does not fail."
         assert failing_bb_id < len(fuzzerstate.instr_objs_seq)
@@ -375,16 +489,7 @@ def _find_pillar_bb(fuzzerstate, failing_bb_id: int, failing_instr_id: int, faul
     # Invariant:
     #   is_mismatch(fuzzerstate, left_bound)  always False
     #   is_mismatch(fuzzerstate, right_bound) always True
-    while right_bound - left_bound > 1:
-        if DO_ASSERT:
-            assert right_bound > left_bound
-        candidate_bound = (right_bound + left_bound) // 2
-        if is_mismatch(fuzzerstate, failing_bb_id, failing_instr_id, candidate_bound):
-            print(candidate_bound, 'pillar bb mismatch')
-            left_bound = candidate_bound
-        else:
-            print(candidate_bound, 'pillar bb match')
-            right_bound = candidate_bound
+    left_bound, right_bound = _search_bounds(lambda candidate_bound: is_mismatch(fuzzerstate, failing_bb_id, failing_instr_id, candidate_bound), left_bound, right_bound, False, ('pillar bb mismatch', 'pillar bb match'), num_parallel_probes)
 
     if DO_ASSERT:
         assert left_bound + 1 == right_bound
@@ -398,7 +503,7 @@ def _find_pillar_bb(fuzzerstate, failing_bb_id: int, failing_instr_id: int, faul
 
 # @param failing_bb_id is the index of the first bb that, when removed as well as the subsequent ones, makes the bug disappear.
 # @return failing_instr_id is the index of the first instruction in the bb `failing_bb_id` that causes trouble, in the sense that when it is removed (and all the following instructions and bbs), the test case does not fail anymore. It is None if the failing instruction is actually the last one in the previous bb.
-def _find_failing_instr_in_bb(fuzzerstate, failing_bb_id: int, hint_left_bound_instr: int = None, hint_right_bound_instr: int = None):
+def _find_failing_instr_in_bb(fuzzerstate, failing_bb_id: int, hint_left_bound_instr: int = None, hint_right_bound_instr: int = None, num_parallel_probes: int = None):
     if DO_ASSERT:
         assert failing_bb_id > 0
         assert failing_bb_id < len(fuzzerstate.instr_objs_seq)
@@ -433,16 +538,7 @@ def _find_failing_instr_in_bb(fuzzerstate, failing_bb_id: int, hint_left_bound_i
     # Invariant:
     #   is_mismatch(fuzzerstate, failing_bb_id, left_bound)  always False
     #   is_mismatch(fuzzerstate, failing_bb_id, right_bound) always True
-    while right_bound - left_bound > 1:
-        if DO_ASSERT:
-            assert right_bound > left_bound
-        candidate_bound = (right_bound + left_bound) // 2
-        if is_mismatch(fuzzerstate, failing_bb_id, candidate_bound):
-            print(candidate_bound, 'instr mismatch')
-            right_bound = candidate_bound
-        else:
-            print(candidate_bound, 'instr match')
-            left_bound = candidate_bound
+    left_bound, right_bound = _search_bounds(lambda candidate_bound: is_mismatch(fuzzerstate, failing_bb_id, candidate_bound), left_bound, right_bound, True, ('instr mismatch', 'instr match'), num_parallel_probes)
 
     if DO_ASSERT:
         assert left_bound + 1 == right_bound, f"{left_bound}, {right_bound}"
@@ -455,7 +551,7 @@ def _find_failing_instr_in_bb(fuzzerstate, failing_bb_id: int, hint_left_bound_i
 # @param failing_bb_id is the index of the first bb that, when removed as well as the subsequent ones, makes the bug disappear.
 # @param failing_instr_id is the index of the first instruction in the bb `failing_bb_id` that causes trouble, in the sense that when it is removed (and all the following instructions and bbs), the test case does not fail anymore. It is None if the failing instruction is actually the last one in the previous bb.
 # @return similarly to find_pillar_bb: returns the index of the first instruction in first_pillar_bb that, when removed, makes the bug disappear.
-def _find_pillar_instr(fuzzerstate, failing_bb_id: int, failing_instr_id: int, pillar_bb_id: int, fault_from_prev_bb: bool, hint_left_pillar_instr: int = None, hint_right_pillar_instr: int = None):
+def _find_pillar_instr(fuzzerstate, failing_bb_id: int, failing_instr_id: int, pillar_bb_id: int, fault_from_prev_bb: bool, hint_left_pillar_instr: int = None, hint_right_pillar_instr: int = None, num_parallel_probes: int = None):
     if DO_ASSERT:
         assert pillar_bb_id <= failing_bb_id + 1
 
@@ -491,16 +587,7 @@ def _find_pillar_instr(fuzzerstate, failing_bb_id: int, failing_instr_id: int, p
     #   is_mismatch(fuzzerstate, failing_bb_id, left_bound)  always False
     #   is_mismatch(fuzzerstate, failing_bb_id, right_bound) always True
 
-    while right_bound - left_bound > 1:
-        if DO_ASSERT:
-            assert right_bound > left_bound
-        candidate_bound = (right_bound + left_bound) // 2
-        if is_mismatch(fuzzerstate, failing_bb_id, failing_instr_id, pillar_bb_id, candidate_bound):
-            print(candidate_bound, 'pillar instr mismatch')
-            left_bound = candidate_bound
-        else:
-            print(candidate_bound, 'pillar instr match')
-            right_bound = candidate_bound
+    left_bound, right_bound = _search_bounds(lambda candidate_bound: is_mismatch(fuzzerstate, failing_bb_id, failing_instr_id, pillar_bb_id, candidate_bound), left_bound, right_bound, False, ('pillar instr mismatch', 'pillar instr match'), num_parallel_probes)
 
     if DO_ASSERT:
         assert left_bound + 1 == right_bound, f"{left_bound}, {right_bound}"
@@ -629,8 +716,9 @@ def _turn_sandwich_instructions_into_nops(fuzzerstate, failing_bb_id: int, faili
 # Fourth, reduce some initial instructions in the first problematic bb.
 # @param target_dir: If not None, the directory where to save the generated files. Else, will be saved in the design's directory
 # @param find_pillars: If false, the front of the test case will not be reduced.
+# @param num_parallel_probes: the number of is_mismatch probes run in parallel by the searches. If None, then REDUCTION_NUM_PARALLEL_PROBES. The result does not depend on it.
 # @return a boolean indicating whether the reduction was successful, a float measuring the elapesd time (in seconds), and the number of instructions in the test case.
-def reduce_program(memsize: int, design_name: str, randseed: int, nmax_bbs: int, authorize_privileges: bool, find_pillars: bool, quiet: bool = False, target_dir: str = None, hint_left_bound_bb: int = None, hint_right_bound_bb: int = None, hint_left_bound_instr: int = None, hint_right_bound_instr: int = None, hint_left_bound_pillar_bb: int = None, hint_right_bound_pillar_bb: int = None, hint_left_bound_pillar_instr: int = None, hint_right_bound_pillar_instr: int = None, check_pc_spike_again: bool = False):
+def reduce_program(memsize: int, design_name: str, randseed: int, nmax_bbs: int, authorize_privileges: bool, find_pillars: bool, quiet: bool = False, target_dir: str = None, hint_left_bound_bb: int = None, hint_right_bound_bb: int = None, hint_left_bound_instr: int = None, hint_right_bound_instr: int = None, hint_left_bound_pillar_bb: int = None, hint_right_bound_pillar_bb: int = None, hint_left_bound_pillar_instr: int = None, hint_right_bound_pillar_instr: int = None, check_pc_spike_again: bool = False, num_parallel_probes: int = None):
     from cascade.fuzzerstate import FuzzerState
 
     ###
@@ -669,7 +757,7 @@ def reduce_program(memsize: int, design_name: str, randseed: int, nmax_bbs: int,
     ###
 
     # failing_bb_id is the index of the first basic block that causes trouble, in the sense that when it is removed (and all the following ones), the test case does not fail anymore.
-    failing_bb_id = _find_failing_bb(fuzzerstate, hint_left_bound_bb, hint_right_bound_bb)
+    failing_bb_id = _find_failing_bb(fuzzerstate, hint_left_bound_bb, hint_right_bound_bb, num_parallel_probes)
 
     # If fail even just with the initial block
     if failing_bb_id == 0:
@@ -697,7 +785,7 @@ def reduce_program(memsize: int, design_name: str, randseed: int, nmax_bbs: int,
 
     # failing_instr_id is the index of the first instruction in the bb `failing_bb_id` that causes trouble, in the sense that when it is removed (and all the following instructions and bbs), the test case does not fail anymore.
     # It is None if the failing instruction is actually the last one in the previous bb.
-    failing_instr_id = _find_failing_instr_in_bb(fuzzerstate, failing_bb_id, hint_left_bound_instr, hint_right_bound_instr)
+    failing_instr_id = _find_failing_instr_in_bb(fuzzerstate, failing_bb_id, hint_left_bound_instr, hint_right_bound_instr, num_parallel_probes)
 
     # Regularize the case where the faulty instruction was a cf instruction at the end of a bb.
     # If the fault comes from the prev bb, by definition we keep failing_bb_id untouched, and we set failing_instr_id to -1.
@@ -721,7 +809,7 @@ def reduce_program(memsize: int, design_name: str, randseed: int, nmax_bbs: int,
     # pillar_bb_id: the index of the last bb such as the test case still succeeds when the bb `pillar_bb_id` is removed (and all the preceding instructions and bbs).
     # We have as an invariane: pillar_bb_id <= failing_bb_id
     if find_pillars:
-        pillar_bb_id = _find_pillar_bb(fuzzerstate, failing_bb_id, failing_instr_id, fault_from_prev_bb, hint_left_bound_pillar_bb, hint_right_bound_pillar_bb)
+        pillar_bb_id = _find_pillar_bb(fuzzerstate, failing_bb_id, failing_instr_id, fault_from_prev_bb, hint_left_bound_pillar_bb, hint_right_bound_pillar_bb, num_parallel_probes)
     else:
         pillar_bb_id = 1
 
@@ -730,7 +818,7 @@ def reduce_program(memsize: int, design_name: str, randseed: int, nmax_bbs: int,
     ###
 
     if find_pillars:
-        pillar_instr = _find_pillar_instr(fuzzerstate, failing_bb_id, failing_instr_id, pillar_bb_id, fault_from_prev_bb, hint_left_bound_pillar_instr, hint_right_bound_pillar_instr)
+        pillar_instr = _find_pillar_instr(fuzzerstate, failing_bb_id, failing_instr_id, pillar_bb_id, fault_from_prev_bb, hint_left_bound_pillar_instr, hint_right_bound_pillar_instr, num_parallel_probes)
     else:
         pillar_instr = 0
 
@@ -796,10 +884,11 @@ def reduce_program(memsize: int, design_name: str, randseed: int, nmax_bbs: int,
             pillar_bb_id = 2
             fault_from_prev_bb = False
 
-            failing_instr_id = _find_failing_instr_in_bb(fuzzerstate, failing_bb_id)
-            pillar_instr = _find_pillar_instr(fuzzerstate, failing_bb_id, failing_instr_id, pillar_bb_id, fault_from_prev_bb)
+            failing_instr_id = _find_failing_instr_in_bb(fuzzerstate, failing_bb_id, num_parallel_probes=num_parallel_probes)
+            pillar_instr = _find_pillar_instr(fuzzerstate, failing_bb_id, failing_instr_id, pillar_bb_id, fault_from_prev_bb, num_parallel_probes=num_parallel_probes)
             # Remove the instructions after and before
             fuzzerstate.instr_objs_seq[-1] = fuzzerstate.instr_objs_seq[-1][:failing_instr_id+2]
+            fuzzerstate.recount_fuzzing_instructions()
             fuzzerstate.ctxsv_bb[fuzzerstate.ctxsv_bb_jal_instr_id] = JALInstruction("jal", 0, fuzzerstate.bb_start_addr_seq[1] + 4*(pillar_instr) - (fuzzerstate.ctxsv_bb_base_addr + 4*fuzzerstate.ctxsv_bb_jal_instr_id))
             for instr_id in range(pillar_instr):
                 fuzzerstate.instr_objs_seq[1][instr_id] = RegImmInstruction("addi", 0, 0, 0, is_design_64bit=fuzzerstate.is_design_64bit) # RawDataWord(0)
@@ -858,4 +947,9 @@ def reduce_program(memsize: int, design_name: str, randseed: int, nmax_bbs: int,
     with open(os.path.join(target_dir, 'err.log'), 'w') as f:
         f.write(rtl_msg_larger)
 
+    probe_cache = get_reduction_probe_cache()
+    if probe_cache is not None and not quiet:
+        probe_cache_stats = probe_cache.get_stats()
+        print(f"Reduction probe cache: {probe_cache_stats['num_probes']} probes in this process, hit rate {100*probe_cache_stats['hit_rate']:.1f}% ({probe_cache_stats['num_probe_hits']} before and {probe_cache_stats['num_outcome_hits']} after generating the ELF), {probe_cache_stats['mean_hit_seconds']:.3f} s per hit, {probe_cache_stats['mean_miss_seconds']:.3f} s per miss.")
+
     return is_success_smaller and not is_success_larger, time.time() - start_time, numinstrs
@@ -0,0 +1,131 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module memoizes the outcomes of the reduction probes (is_mismatch) in an SQLite file, so that they are reused within a reduction and across runs.
+# The cache has two levels:
+#   - a probe key, made of the program descriptor, the cut tuple, a digest of the program before the cut and the fingerprint of the simulator, gives the outcome key without generating the reduced ELF.
+#   - an outcome key, made of the SHA-256 of the reduced ELF and of everything else the RTL check depends on, gives the outcome without running the RTL simulation.
+
+from params.runparams import PATH_TO_TMP
+from cascade.genelf import gen_program_image
+
+import hashlib
+import os
+import sqlite3
+import time
+
+USE_REDUCTION_PROBE_CACHE = True
+REDUCTION_PROBE_CACHE_PATH = os.path.join(PATH_TO_TMP, 'reduceprobecache.sqlite')
+
+###
+# Keys
+###
+
+# @brief digest of everything in the fuzzerstate that the reduced ELF depends on, except for the cut.
+def _gen_program_digest(fuzzerstate) -> str:
+    h = hashlib.sha256()
+    h.update(gen_program_image(fuzzerstate, False).tobytes())
+    h.update(repr((fuzzerstate.memsize, fuzzerstate.bb_start_addr_seq, list(map(len, fuzzerstate.instr_objs_seq)), fuzzerstate.ctxsv_bb_base_addr, fuzzerstate.ctxsv_bb_jal_instr_id, fuzzerstate.final_bb_base_addr)).encode())
+    return h.hexdigest()
+
+# @brief the size and modification time of the simulator executable, so that rebuilding the design invalidates the outcomes.
+def _get_simulator_fingerprint(design_name: str, simulator) -> tuple:
+    from cascade.fuzzsim import SimulatorEnum, _get_verilator_executable_path
+    if simulator != SimulatorEnum.VERILATOR:
+        return (str(simulator),)
+    sim_executable_path = _get_verilator_executable_path(design_name, None, False)
+    if not os.path.exists(sim_executable_path):
+        return (str(simulator), sim_executable_path)
+    sim_executable_stat = os.stat(sim_executable_path)
+    return (str(simulator), sim_executable_path, sim_executable_stat.st_size, sim_executable_stat.st_mtime_ns)
+
+# @param cut_tuple the arguments of is_mismatch that define the cut.
+# @param simulator the simulator of the RTL check. Its fingerprint is part of the key, so that a probe hit never returns an outcome of a previous build of the design.
+def gen_probe_key(fuzzerstate, cut_tuple: tuple, simulator) -> str:
+    descriptor = (fuzzerstate.memsize, fuzzerstate.design_name, fuzzerstate.randseed, fuzzerstate.nmax_bbs, fuzzerstate.authorize_privileges)
+    return hashlib.sha256(repr((descriptor, cut_tuple, _gen_program_digest(fuzzerstate), _get_simulator_fingerprint(fuzzerstate.design_name, simulator))).encode()).hexdigest()
+
+# @param test_fuzzerstate, rtl_elfpath, expected_regvals_pair, numinstrs as returned by gen_reduced_elf.
+def gen_outcome_key(test_fuzzerstate, rtl_elfpath: str, expected_regvals_pair: tuple, numinstrs: int, simulator) -> str:
+    with open(rtl_elfpath, 'rb') as f:
+        elf_sha256 = hashlib.sha256(f.read()).hexdigest()
+    # The registers are only compared if they are free or consumed.
+    regstates = [str(test_fuzzerstate.intregpickstate.get_regstate(reg_id)) for reg_id in range(1, test_fuzzerstate.num_pickable_regs)]
+    return hashlib.sha256(repr((test_fuzzerstate.design_name, _get_simulator_fingerprint(test_fuzzerstate.design_name, simulator), elf_sha256, numinstrs, expected_regvals_pair, regstates, test_fuzzerstate.num_pickable_floating_regs)).encode()).hexdigest()
+
+###
+# Cache
+###
+
+class ReductionProbeCache:
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = os.getpid()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Several reductions and probes may access the cache concurrently.
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS probes (probe_key TEXT PRIMARY KEY, outcome_key TEXT NOT NULL)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS outcomes (outcome_key TEXT PRIMARY KEY, is_mismatch INTEGER NOT NULL, rtl_msg TEXT NOT NULL)')
+
+        # Instrumentation, for the probes of the current process
+        self.num_probe_hits = 0   # Found from the probe key
+        self.num_outcome_hits = 0 # Found from the outcome key, after generating the reduced ELF
+        self.num_misses = 0
+        self.cumul_hit_seconds = 0.0
+        self.cumul_miss_seconds = 0.0
+
+    # @return a pair (is_mismatch, rtl_msg), or None if the probe is unknown.
+    def lookup_probe(self, probe_key: str):
+        row = self.conn.execute('SELECT outcomes.is_mismatch, outcomes.rtl_msg FROM probes JOIN outcomes ON probes.outcome_key = outcomes.outcome_key WHERE probes.probe_key = ?', (probe_key,)).fetchone()
+        return None if row is None else (bool(row[0]), row[1])
+
+    # @return a pair (is_mismatch, rtl_msg), or None if the outcome is unknown.
+    def lookup_outcome(self, outcome_key: str):
+        row = self.conn.execute('SELECT is_mismatch, rtl_msg FROM outcomes WHERE outcome_key = ?', (outcome_key,)).fetchone()
+        return None if row is None else (bool(row[0]), row[1])
+
+    def store_probe(self, probe_key: str, outcome_key: str):
+        self.conn.execute('INSERT OR REPLACE INTO probes VALUES (?, ?)', (probe_key, outcome_key))
+
+    def store_outcome(self, outcome_key: str, is_mismatch: bool, rtl_msg: str):
+        self.conn.execute('INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?)', (outcome_key, int(is_mismatch), rtl_msg))
+
+    # @param num_hits_attr_name the name of the counter to increment, or None for a miss.
+    def record_probe(self, num_hits_attr_name: str, start_time: float):
+        if num_hits_attr_name is None:
+            self.num_misses += 1
+            self.cumul_miss_seconds += time.time() - start_time
+        else:
+            setattr(self, num_hits_attr_name, getattr(self, num_hits_attr_name) + 1)
+            self.cumul_hit_seconds += time.time() - start_time
+
+    def get_stats(self) -> dict:
+        num_hits = self.num_probe_hits + self.num_outcome_hits
+        num_probes = num_hits + self.num_misses
+        return {
+            'num_probes': num_probes,
+            'num_probe_hits': self.num_probe_hits,
+            'num_outcome_hits': self.num_outcome_hits,
+            'num_misses': self.num_misses,
+            'hit_rate': num_hits / num_probes if num_probes else 0.0,
+            'mean_hit_seconds': self.cumul_hit_seconds / num_hits if num_hits else 0.0,
+            'mean_miss_seconds': self.cumul_miss_seconds / self.num_misses if self.num_misses else 0.0,
+        }
+
+    def reset_stats(self):
+        self.num_probe_hits, self.num_outcome_hits, self.num_misses = 0, 0, 0
+        self.cumul_hit_seconds, self.cumul_miss_seconds = 0.0, 0.0
+
+__reduction_probe_cache = None
+
+# @return the cache of the current process, or None if USE_REDUCTION_PROBE_CACHE is False.
+def get_reduction_probe_cache():
+    global __reduction_probe_cache
+    if not USE_REDUCTION_PROBE_CACHE:
+        return None
+    # SQLite connections must not be shared with forked processes.
+    if __reduction_probe_cache is None or __reduction_probe_cache.pid != os.getpid() or __reduction_probe_cache.path != REDUCTION_PROBE_CACHE_PATH:
+        __reduction_probe_cache = ReductionProbeCache(REDUCTION_PROBE_CACHE_PATH)
+    return __reduction_probe_cache
@@ -0,0 +1,101 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module minimizes the register dump requests of the spike resolution.
+# Most of the dumped registers are computed from immediates, from the initial register values and from memory content that are all known statically, typically through li_into_reg sequences, producers and consumers.
+# The instructions are executed abstractly in program order by the integer interpreter (cascade/intinterpreter), on the spike resolution image. A register value is either known, dumped (known after Spike) or unknown.
+#   1. Only the requests whose register is unknown are sent to Spike. These form the irreducible set.
+#   2. After Spike, the instructions are re-executed concretely, injecting the dumped values, and the other requests are read from the register state.
+# The analysis is as conservative as the interpreter, which makes unknown the destination registers of the instructions that it does not model.
+
+from params.runparams import DO_ASSERT
+from common.spike import SPIKE_STARTADDR
+from cascade.intinterpreter import IntMachine, decode_program, gen_req_instr_ids
+
+import itertools
+
+# If True, spike_resolution only requests the irreducible register dumps from Spike. Only applies if USE_INT_INTERPRETER is also True, as the analysis runs the integer interpreter.
+# Disabled by default until do_regdumpminperf.py has compared every reconstructed value against the full Spike dumps over a large sweep of seeds.
+MINIMIZE_REGDUMP_REQS = False
+# With MINIMIZE_REGDUMP_REQS, the programs whose seed is a multiple of REGDUMP_RECONSTRUCTION_CHECK_PERIOD still request all their register dumps from Spike, and every value reconstructed from the irreducible dumps is compared against them.
+REGDUMP_RECONSTRUCTION_CHECK_PERIOD = 16
+
+# The value of a register that will be known after Spike, because it is dumped or computed from dumped values.
+_DUMPED = 'dumped'
+
+###
+# Minimization
+###
+
+class RegdumpMinimizer:
+    # @param image the spike resolution image, as returned by gen_program_image(fuzzerstate, True).
+    # @param regdump_reqs the full register dump requests, as returned by gen_regdump_reqs.
+    def __init__(self, fuzzerstate, image, regdump_reqs):
+        self.image = image
+        self.is_design_64bit = fuzzerstate.is_design_64bit
+        self.program = decode_program(fuzzerstate, image)
+        self.regdump_reqs = list(regdump_reqs)
+        self.req_instr_ids = gen_req_instr_ids(fuzzerstate, self.regdump_reqs)
+
+        self.is_req_kept = [False] * len(self.regdump_reqs)
+        self.is_checked_against_full_dump = False
+        IntMachine(self.program, self.image, self.is_design_64bit).run_with_reqs(self.req_instr_ids, self._analyze_req)
+
+    def _analyze_req(self, req_id: int, regs: list):
+        _, is_float_req, reg_to_dump = self.regdump_reqs[req_id]
+        if is_float_req or type(reg_to_dump) is not int:
+            self.is_req_kept[req_id] = True
+        elif regs[reg_to_dump] is None:
+            self.is_req_kept[req_id] = True
+            regs[reg_to_dump] = _DUMPED
+
+    # @return the register dump requests to send to Spike, in program order.
+    def get_irreducible_reqs(self) -> list:
+        return list(itertools.compress(self.regdump_reqs, self.is_req_kept))
+
+    def get_num_irreducible_reqs(self) -> int:
+        return sum(self.is_req_kept)
+
+    # @param check_against_full_dump if True, then all the requests are sent to Spike, and reconstruct_spike_regdumps checks the reconstruction against the full dump.
+    # @return the register dump requests to send to Spike, in program order.
+    def get_spike_reqs(self, check_against_full_dump: bool) -> list:
+        self.is_checked_against_full_dump = check_against_full_dump
+        return list(self.regdump_reqs) if check_against_full_dump else self.get_irreducible_reqs()
+
+    # @param spike_regvals the register values dumped by Spike for get_spike_reqs().
+    # @return the register values of all the requests.
+    def reconstruct_spike_regdumps(self, spike_regvals) -> list:
+        if not self.is_checked_against_full_dump:
+            return self.reconstruct_regdumps(spike_regvals)
+        reconstructed_regvals = self.reconstruct_regdumps(list(itertools.compress(spike_regvals, self.is_req_kept)))
+        for req_id, (reconstructed_regval, spike_regval) in enumerate(zip(reconstructed_regvals, spike_regvals)):
+            if reconstructed_regval != spike_regval:
+                raise Exception(f"Register dump reconstruction mismatch for request {req_id} at address {hex(SPIKE_STARTADDR + self.regdump_reqs[req_id][0])}: reconstructed `{reconstructed_regval}`, Spike dumped `{spike_regval}`.")
+        return spike_regvals
+
+    # @param irreducible_regvals the register values dumped by Spike for get_irreducible_reqs().
+    # @return the register values of all the requests, as if Spike had dumped all of them.
+    def reconstruct_regdumps(self, irreducible_regvals) -> list:
+        if DO_ASSERT:
+            assert len(irreducible_regvals) == self.get_num_irreducible_reqs()
+        ret = [None] * len(self.regdump_reqs)
+        irreducible_regvals_iter = iter(irreducible_regvals)
+
+        def reconstruct_req(req_id: int, regs: list):
+            _, is_float_req, reg_to_dump = self.regdump_reqs[req_id]
+            is_int_req = not is_float_req and type(reg_to_dump) is int
+            if self.is_req_kept[req_id]:
+                ret[req_id] = next(irreducible_regvals_iter)
+                if is_int_req and reg_to_dump:
+                    # Consistency check of the analysis. It does not cover the values that are not dumped, see reconstruct_spike_regdumps.
+                    if regs[reg_to_dump] is not None and regs[reg_to_dump] != ret[req_id]:
+                        raise Exception(f"Register dump analysis mismatch for x{reg_to_dump} at address {hex(SPIKE_STARTADDR + self.regdump_reqs[req_id][0])}: computed `{hex(regs[reg_to_dump])}`, Spike dumped `{hex(ret[req_id])}`.")
+                    regs[reg_to_dump] = ret[req_id]
+            else:
+                ret[req_id] = regs[reg_to_dump]
+                if type(ret[req_id]) is not int:
+                    raise Exception(f"Could not reconstruct x{reg_to_dump} at address {hex(SPIKE_STARTADDR + self.regdump_reqs[req_id][0])}.")
+
+        IntMachine(self.program, self.image, self.is_design_64bit).run_with_reqs(self.req_instr_ids, reconstruct_req)
+        return ret
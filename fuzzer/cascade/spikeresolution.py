@@ -4,12 +4,16 @@
 
 from params.runparams import DO_ASSERT, NO_REMOVE_TMPFILES
 from common.designcfgs import get_design_march_flags_nocompressed
-from common.spike import run_trace_all_pcs, run_trace_regs_at_pc_locs, SPIKE_STARTADDR, FPREG_ABINAMES
+from common.scratch import release_scratch_file
+from common.spike import run_trace_all_pcs, run_trace_regs_at_pc_locs, run_trace_regs_at_pc_locs_batch, SPIKE_STARTADDR, FPREG_ABINAMES
 
 from cascade.cfinstructionclasses import PlaceholderConsumerInstr, BranchInstruction, PlaceholderProducerInstr0, PlaceholderProducerInstr1, JALRInstruction, PlaceholderPreConsumerInstr, IntStoreInstruction, FloatStoreInstruction
-from cascade.genelf import gen_elf_from_bbs
+from cascade.genelf import gen_elf_from_bbs, gen_program_image
+from cascade.regdumpanalysis import RegdumpMinimizer, MINIMIZE_REGDUMP_REQS, REGDUMP_RECONSTRUCTION_CHECK_PERIOD
+from cascade.intinterpreter import interpret_spike_resolution, USE_INT_INTERPRETER
 from cascade.util import IntRegIndivState
 
+import numpy as np
 import os
 import random
 import itertools
@@ -208,8 +212,21 @@ def _transmit_addrs_to_producers_for_spike_resolution(fuzzerstate):
                 # print('Determ for prod id', bb_instr.producer_id, hex(fuzzerstate.producer_id_to_tgtaddr[bb_instr.producer_id]))
                 bb_instr.spike_resolution_offset = fuzzerstate.producer_id_to_tgtaddr[bb_instr.producer_id]
 
+# @return a numpy uint64 array of the expected PCs of the instructions in fuzzerstate.instr_objs_seq, in execution order.
+def _gen_expected_pc_seq(fuzzerstate):
+    if not fuzzerstate.instr_objs_seq:
+        return np.empty(0, dtype=np.uint64)
+    return np.concatenate([SPIKE_STARTADDR + fuzzerstate.bb_start_addr_seq[bb_id] + 4*np.arange(len(bb_instrlist), dtype=np.uint64) for bb_id, bb_instrlist in enumerate(fuzzerstate.instr_objs_seq)]) # NO_COMPRESSED
+
 # Check that the PC trace from spike matches with the expected PC trace
+# @param spike_pc_seq a sequence of PCs, for example the numpy array returned by run_trace_all_pcs.
 def _check_pc_trace_from_spike(fuzzerstate, spike_pc_seq):
+    # Fast path: the traces are compared at once. The instruction-wise check below reports the first mismatch.
+    expected_pc_seq = _gen_expected_pc_seq(fuzzerstate)
+    if len(spike_pc_seq) > len(expected_pc_seq) and np.array_equal(np.asarray(spike_pc_seq[:len(expected_pc_seq)], dtype=np.uint64), expected_pc_seq) and int(spike_pc_seq[len(expected_pc_seq)]) == SPIKE_STARTADDR + fuzzerstate.final_bb_base_addr:
+        return
+    spike_pc_seq = list(map(int, spike_pc_seq))
+
     # Check that the PC sequence corresponds to the expected addresses
     curr_id_in_spike_pc_seq = 0
     prev_pc = -1
@@ -229,23 +246,56 @@ def _check_pc_trace_from_spike(fuzzerstate, spike_pc_seq):
     assert(spike_pc_seq[id_in_spike_pc_seq] == SPIKE_STARTADDR + fuzzerstate.final_bb_base_addr), f"spike_pc_seq[id_in_spike_pc_seq]: `{hex(spike_pc_seq[id_in_spike_pc_seq])}`, fuzzerstate.final_bb_base_addr: {hex(SPIKE_STARTADDR + fuzzerstate.final_bb_base_addr)}"
 
 
-# Takes a fuzzerstate after its basic blocks were generated.
-# Does the address resolution in place in the fuzzerstate, and returns the list of expected register values.
-# @return a list of fuzzerstate.num_pickable_regs
-# 1 (does not contain the zero register)
-def spike_resolution(fuzzerstate, check_pc_spike_again: bool = False):
-    design_name = fuzzerstate.design_name
+# @brief writes the spike resolution ELF and selects the register dump requests to send to Spike.
+# @return a pair (the arguments of run_trace_regs_at_pc_locs, the RegdumpMinimizer or None).
+def _gen_spike_resolution_run(fuzzerstate, spike_resolution_image, regdump_reqs):
+    spike_resolution_elfpath = gen_elf_from_bbs(fuzzerstate, True, 'spikeresol', fuzzerstate.instance_to_str(), SPIKE_STARTADDR, spike_resolution_image)
+    # print('Spike resolution elfpath:', spike_resolution_elfpath)
+    # Only request from Spike the register values that cannot be computed statically.
+    # The minimization runs the integer interpreter, hence it is only used when the interpreter is enabled.
+    if MINIMIZE_REGDUMP_REQS and USE_INT_INTERPRETER:
+        regdump_minimizer = RegdumpMinimizer(fuzzerstate, spike_resolution_image, regdump_reqs)
+        # The sampled programs request all the dumps, against which the reconstruction is checked.
+        spike_regdump_reqs = regdump_minimizer.get_spike_reqs(fuzzerstate.randseed % REGDUMP_RECONSTRUCTION_CHECK_PERIOD == 0)
+    else:
+        regdump_minimizer = None
+        spike_regdump_reqs = regdump_reqs
+    return (fuzzerstate.instance_to_str(), spike_resolution_elfpath, get_design_march_flags_nocompressed(fuzzerstate.design_name), SPIKE_STARTADDR, spike_regdump_reqs, True, fuzzerstate.final_bb_base_addr+SPIKE_STARTADDR, fuzzerstate.num_pickable_floating_regs if fuzzerstate.design_has_fpu else 0, fuzzerstate.design_has_fpud), regdump_minimizer
+
+# @brief post-processes the output of run_trace_regs_at_pc_locs for the arguments generated by _gen_spike_resolution_run. The ELF is released in any case.
+# @param spike_out the return value of run_trace_regs_at_pc_locs, or the exception that it raised, which is then re-raised.
+# @return a pair (the register values of regdump_reqs, a pair (final int register values, final float register values)).
+def _end_spike_resolution_run(spike_args: tuple, regdump_minimizer, spike_out):
+    try:
+        if isinstance(spike_out, Exception):
+            raise spike_out
+        regvals, finalregvals = spike_out
+        if regdump_minimizer is not None:
+            regvals = regdump_minimizer.reconstruct_spike_regdumps(regvals)
+        return regvals, finalregvals
+    finally:
+        if not NO_REMOVE_TMPFILES:
+            release_scratch_file(spike_args[1])
+
+# @brief the part of the spike resolution that precedes Spike. As it consumes randomness, it must directly follow the generation of the basic blocks.
+# @return a pending resolution, for spike_resolution_batch: a tuple (fuzzerstate, the interpreted resolution or None, the arguments of run_trace_regs_at_pc_locs or None, the RegdumpMinimizer or None).
+def prepare_spike_resolution(fuzzerstate):
     _transmit_addrs_to_producers_for_spike_resolution(fuzzerstate)
     # print('start addrs', list(map(hex, fuzzerstate.bb_start_addr_seq)))
-    spike_resolution_elfpath = gen_elf_from_bbs(fuzzerstate, True, 'spikeresol', fuzzerstate.instance_to_str(), SPIKE_STARTADDR)
-    # print('Spike resolution elfpath:', spike_resolution_elfpath)
+    spike_resolution_image = gen_program_image(fuzzerstate, True)
     regdump_reqs = gen_regdump_reqs(fuzzerstate)
+    # Programs of the integer subset are resolved without Spike.
+    interpreted_resolution = interpret_spike_resolution(fuzzerstate, spike_resolution_image, regdump_reqs) if USE_INT_INTERPRETER else None
+    if interpreted_resolution is not None:
+        return fuzzerstate, interpreted_resolution, None, None
+    return (fuzzerstate, None) + _gen_spike_resolution_run(fuzzerstate, spike_resolution_image, regdump_reqs)
+
+# @brief the part of the spike resolution that follows Spike.
+# @return see spike_resolution.
+def _finish_spike_resolution(fuzzerstate, regvals: list, finalintregvals_spikeresol: list, finalfpuregvals_spikeresol: list, check_pc_spike_again: bool):
+    design_name = fuzzerstate.design_name
     flat_instr_objs = list(itertools.chain.from_iterable(fuzzerstate.instr_objs_seq))
     # len(flat_instr_objs)+1: the +1 is to reach the final basic block and thereby overwrite the potential destination register of a jal/jalr
-    regvals, (finalintregvals_spikeresol, finalfpuregvals_spikeresol) = run_trace_regs_at_pc_locs(fuzzerstate.instance_to_str(), spike_resolution_elfpath, get_design_march_flags_nocompressed(design_name), SPIKE_STARTADDR, regdump_reqs, True, fuzzerstate.final_bb_base_addr+SPIKE_STARTADDR, fuzzerstate.num_pickable_floating_regs if fuzzerstate.design_has_fpu else 0, fuzzerstate.design_has_fpud)
-    if not NO_REMOVE_TMPFILES:
-        os.remove(spike_resolution_elfpath)
-        del spike_resolution_elfpath
 
     # IMPORTANT: We reset the randomness here to have deterministic branch instructions.
     # (Rare) example where it matters: assume we need to pop the last bb, say with id 20. Then we could have a bug with request size 19 but not with request size 20, or vice versa.
@@ -258,10 +308,11 @@ def spike_resolution(fuzzerstate, check_pc_spike_again: bool = False):
         rtl_spike_elfpath = gen_elf_from_bbs(fuzzerstate, False, 'spikedoublecheck', fuzzerstate.instance_to_str(), SPIKE_STARTADDR)
         if NO_REMOVE_TMPFILES:
             print('rtl_spike_elfpath:', rtl_spike_elfpath)
-        rtl_spike_pc_seq, (finalintregvals_spikecheck, finalfpuregvals_spikecheck) = run_trace_all_pcs(fuzzerstate.instance_to_str(), rtl_spike_elfpath, get_design_march_flags_nocompressed(design_name), len(flat_instr_objs)+1, SPIKE_STARTADDR, True,  fuzzerstate.num_pickable_floating_regs if fuzzerstate.design_has_fpu else 0, fuzzerstate.design_has_fpud, fuzzerstate)
-        if not NO_REMOVE_TMPFILES:
-            os.remove(rtl_spike_elfpath)
-            del rtl_spike_elfpath
+        try:
+            rtl_spike_pc_seq, (finalintregvals_spikecheck, finalfpuregvals_spikecheck) = run_trace_all_pcs(fuzzerstate.instance_to_str(), rtl_spike_elfpath, get_design_march_flags_nocompressed(design_name), len(flat_instr_objs)+1, SPIKE_STARTADDR, True,  fuzzerstate.num_pickable_floating_regs if fuzzerstate.design_has_fpu else 0, fuzzerstate.design_has_fpud, fuzzerstate)
+        finally:
+            if not NO_REMOVE_TMPFILES:
+                release_scratch_file(rtl_spike_elfpath)
 
         # Check PC sequence
         _check_pc_trace_from_spike(fuzzerstate, rtl_spike_pc_seq)
@@ -275,3 +326,38 @@ def spike_resolution(fuzzerstate, check_pc_spike_again: bool = False):
                 assert finalfpuregvals_spikeresol[reg_id] == finalfpuregvals_spikecheck[reg_id], f"Mismatch in f{reg_id} value. Resolution: `{hex(finalfpuregvals_spikeresol[reg_id])}`, check: `{hex(finalintregvals_spikecheck[reg_id])}`."
 
     return finalintregvals_spikeresol[1:], finalfpuregvals_spikeresol
+
+# Takes a fuzzerstate after its basic blocks were generated.
+# Does the address resolution in place in the fuzzerstate, and returns the list of expected register values.
+# @return a list of fuzzerstate.num_pickable_regs
+# 1 (does not contain the zero register)
+def spike_resolution(fuzzerstate, check_pc_spike_again: bool = False):
+    fuzzerstate, interpreted_resolution, spike_args, regdump_minimizer = prepare_spike_resolution(fuzzerstate)
+    if interpreted_resolution is not None:
+        regvals, finalintregvals_spikeresol = interpreted_resolution
+        finalfpuregvals_spikeresol = []
+    else:
+        try:
+            spike_out = run_trace_regs_at_pc_locs(*spike_args)
+        except Exception as e:
+            spike_out = e
+        regvals, (finalintregvals_spikeresol, finalfpuregvals_spikeresol) = _end_spike_resolution_run(spike_args, regdump_minimizer, spike_out)
+    return _finish_spike_resolution(fuzzerstate, regvals, finalintregvals_spikeresol, finalfpuregvals_spikeresol, check_pc_spike_again)
+
+# @brief resolves several programs, whose Spike instances run as one batch (see run_trace_regs_at_pc_locs_batch).
+# @param pending_resolutions the return values of prepare_spike_resolution, one per program.
+# @return a list with, for each program, the return value of spike_resolution, or the exception that it would raise.
+def spike_resolution_batch(pending_resolutions: list, check_pc_spike_again: bool = False, max_num_inflight: int = None) -> list:
+    spike_outs = iter(run_trace_regs_at_pc_locs_batch([spike_args for _, interpreted_resolution, spike_args, _ in pending_resolutions if interpreted_resolution is None], max_num_inflight))
+    ret = []
+    for fuzzerstate, interpreted_resolution, spike_args, regdump_minimizer in pending_resolutions:
+        try:
+            if interpreted_resolution is not None:
+                regvals, finalintregvals_spikeresol = interpreted_resolution
+                finalfpuregvals_spikeresol = []
+            else:
+                regvals, (finalintregvals_spikeresol, finalfpuregvals_spikeresol) = _end_spike_resolution_run(spike_args, regdump_minimizer, next(spike_outs))
+            ret.append(_finish_spike_resolution(fuzzerstate, regvals, finalintregvals_spikeresol, finalfpuregvals_spikeresol, check_pc_spike_again))
+        except Exception as e:
+            ret.append(e)
+    return ret
@@ -3,43 +3,128 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 # This module is dedicated to transforming bytes to ELF files.
-# The script is not super robust, but sufficient for Cascade.
-# It may be a performance bottleneck of Cascade, so it will be worth optimizing it at some point.
+# The ELF files are written directly in their final form (ELF32 or ELF64, relocated section), without going through makeelf and objcopy.
+# The layout is: ELF header, single program header, section content, section name table, optional symbol and string tables, section headers.
 
 from params.runparams import DO_ASSERT
-from makeelf.elf import *
-import os
-import subprocess
+import struct
 
-# @param inbytes the bytes to put into the ELF file. Be careful that they must be in little endian format already.
-# @param section_addr may be None
+ELF_EM_RISCV = 243
+ELF_ET_EXEC = 2
+ELF_EV_CURRENT = 1
+ELF_PT_LOAD = 1
+ELF_PF_RWX = 0x7
+ELF_SHT_PROGBITS = 1
+ELF_SHT_SYMTAB = 2
+ELF_SHT_STRTAB = 3
+ELF_STB_GLOBAL_STT_NOTYPE = 0x10
+ELF_TEXT_SH_FLAGS = 0x6 # Loadable and executable
+ELF_TEXT_OFFSET_ALIGN = 16
+
+# Struct formats, indexed by is_64bit
+__ELF_EHDR_FMT = {False: '<16sHHIIIIIHHHHHH', True: '<16sHHIQQQIHHHHHH'}
+__ELF_PHDR_FMT = {False: '<IIIIIIII', True: '<IIQQQQQQ'}
+__ELF_SHDR_FMT = {False: '<IIIIIIIIII', True: '<IIQQQQIIQQ'}
+__ELF_SYM_FMT  = {False: '<IIIBBH', True: '<IBBHQQ'}
+
+# @brief packs a single symbol entry.
+def __pack_elf_sym(is_64bit: bool, st_name: int, st_value: int, st_shndx: int) -> bytes:
+    if is_64bit:
+        return struct.pack(__ELF_SYM_FMT[True], st_name, ELF_STB_GLOBAL_STT_NOTYPE, 0, st_shndx, st_value, 0)
+    return struct.pack(__ELF_SYM_FMT[False], st_name, st_value, 0, ELF_STB_GLOBAL_STT_NOTYPE, 0, st_shndx)
+
+# @param inbytes the bytes to put into the ELF file. Be careful that they must be in little endian format already. May be any bytes-like object, for example a memoryview, and is not copied.
+# @param section_addr may be None, in which case the section is located at start_addr.
+# @param symbols None, or a dict symbol_name: absolute address, to populate a symbol table.
 # @return None
-def gen_elf(inbytes: bytes, start_addr: int, section_addr: int, destination_path: str, is_64bit: bool) -> None:
+def gen_elf(inbytes: bytes, start_addr: int, section_addr: int, destination_path: str, is_64bit: bool, symbols: dict = None) -> None:
     if DO_ASSERT:
         assert destination_path
+    if section_addr is None:
+        section_addr = start_addr
+
+    ehdr_size = struct.calcsize(__ELF_EHDR_FMT[is_64bit])
+    phdr_size = struct.calcsize(__ELF_PHDR_FMT[is_64bit])
+    shdr_size = struct.calcsize(__ELF_SHDR_FMT[is_64bit])
+    sym_size  = struct.calcsize(__ELF_SYM_FMT[is_64bit])
+    inbytes_len = len(inbytes)
+
+    # Section name table
+    if symbols:
+        shstrtab = b'\0.text.init\0.shstrtab\0.symtab\0.strtab\0'
+    else:
+        shstrtab = b'\0.text.init\0.shstrtab\0'
+    shstrtab_name_text, shstrtab_name_shstrtab = 1, 12
 
-    elf = ELF(e_machine=EM.EM_RISCV, e_data=ELFDATA.ELFDATA2LSB, e_entry=start_addr)
+    # Symbol and string tables
+    if symbols:
+        strtab = bytearray(b'\0')
+        symtab = bytearray(sym_size) # The first symbol is the null symbol
+        for symbol_name, symbol_addr in symbols.items():
+            symtab += __pack_elf_sym(is_64bit, len(strtab), symbol_addr, 1)
+            strtab += symbol_name.encode('ascii') + b'\0'
 
-    # Create the section
-    SH_FLAGS = 0x6 # Loadable and executable
-    section_id = elf.append_section('.text.init', inbytes, start_addr, sh_flags=SH_FLAGS, sh_addralign=4)
-    elf.append_segment(section_id, addr=start_addr, p_offset=0xe2) # Very hacky, we hardcode the section offset.
-    elf_bytes = bytes(elf) # We first cast to bytes, since casting to bytes has side-effects (such as offset computation) on the ELF object, that are taken into account just before the bytes are generated.
+    # Offsets
+    text_offset = (ehdr_size + phdr_size + ELF_TEXT_OFFSET_ALIGN - 1) & ~(ELF_TEXT_OFFSET_ALIGN - 1)
+    shstrtab_offset = text_offset + inbytes_len
+    curr_offset = shstrtab_offset + len(shstrtab)
+    if symbols:
+        symtab_offset = (curr_offset + 7) & ~7
+        strtab_offset = symtab_offset + len(symtab)
+        curr_offset = strtab_offset + len(strtab)
+    shdrs_offset = (curr_offset + 7) & ~7
+    num_sections = 5 if symbols else 3
+    shstrndx = 2
 
-    # Check that the offsets in the program header and in the section header match
-    assert len(elf.Elf.Phdr_table) == 1, "Expected only a single program header"
-    assert elf.Elf.Phdr_table[0].p_offset == elf.Elf.Shdr_table[-1].sh_offset, "In ELF: offset mismatch between Phdr and Shdr. Maybe the hack with makeelf did not work this time."
+    # Headers
+    ehdr = struct.pack(__ELF_EHDR_FMT[is_64bit], b'\x7fELF' + bytes([2 if is_64bit else 1, 1, ELF_EV_CURRENT]) + bytes(9), ELF_ET_EXEC, ELF_EM_RISCV, ELF_EV_CURRENT, start_addr, ehdr_size, shdrs_offset, 0, ehdr_size, phdr_size, 1, shdr_size, num_sections, shstrndx)
+    if is_64bit:
+        phdr = struct.pack(__ELF_PHDR_FMT[True], ELF_PT_LOAD, ELF_PF_RWX, text_offset, section_addr, section_addr, inbytes_len, inbytes_len, 4)
+    else:
+        phdr = struct.pack(__ELF_PHDR_FMT[False], ELF_PT_LOAD, text_offset, section_addr, section_addr, inbytes_len, inbytes_len, ELF_PF_RWX, 4)
+
+    shdrs = bytearray(shdr_size) # Null section
+    shdrs += struct.pack(__ELF_SHDR_FMT[is_64bit], shstrtab_name_text, ELF_SHT_PROGBITS, ELF_TEXT_SH_FLAGS, section_addr, text_offset, inbytes_len, 0, 0, 4, 0)
+    shdrs += struct.pack(__ELF_SHDR_FMT[is_64bit], shstrtab_name_shstrtab, ELF_SHT_STRTAB, 0, 0, shstrtab_offset, len(shstrtab), 0, 0, 1, 0)
+    if symbols:
+        # sh_link of the symbol table points to the string table, sh_info is the index of the first non-local symbol
+        shdrs += struct.pack(__ELF_SHDR_FMT[is_64bit], 22, ELF_SHT_SYMTAB, 0, 0, symtab_offset, len(symtab), 4, 1, 8 if is_64bit else 4, sym_size)
+        shdrs += struct.pack(__ELF_SHDR_FMT[is_64bit], 30, ELF_SHT_STRTAB, 0, 0, strtab_offset, len(strtab), 0, 0, 1, 0)
 
-    # Finally, write the bytes into the ELF object
+    # Write the file. The section content is written as is, to avoid copying it.
     with open(destination_path, 'wb') as f:
-        f.write(elf_bytes)
+        f.write(ehdr)
+        f.write(phdr)
+        f.write(bytes(text_offset - ehdr_size - phdr_size))
+        f.write(inbytes)
+        f.write(shstrtab)
+        if symbols:
+            f.write(bytes(symtab_offset - shstrtab_offset - len(shstrtab)))
+            f.write(symtab)
+            f.write(strtab)
+        f.write(bytes(shdrs_offset - curr_offset))
+        f.write(shdrs)
 
-    # Relocate the section
-    if section_addr is not None:
+# @brief parses the ELF files written by gen_elf or by the toolchain.
+# @return a triple (is_64bit, entry, list of pairs (paddr, segment bytes) for the PT_LOAD segments).
+def parse_elf_load_segments(elf_bytes: bytes):
+    if DO_ASSERT:
+        assert elf_bytes[:4] == b'\x7fELF', "Not an ELF file."
+    is_64bit = elf_bytes[4] == 2
+    ehdr = struct.unpack_from(__ELF_EHDR_FMT[is_64bit], elf_bytes, 0)
+    e_entry, e_phoff, e_phentsize, e_phnum = ehdr[4], ehdr[5], ehdr[9], ehdr[10]
+    segments = []
+    for phdr_id in range(e_phnum):
+        phdr = struct.unpack_from(__ELF_PHDR_FMT[is_64bit], elf_bytes, e_phoff + phdr_id*e_phentsize)
         if is_64bit:
-            subprocess.run([f"riscv{os.environ['CASCADE_RISCV_BITWIDTH']}-unknown-elf-objcopy", '--change-section-address', f".text.init={hex(section_addr)}", '-I', 'elf32-littleriscv', '-O', 'elf64-littleriscv', destination_path])
+            p_type, _, p_offset, _, p_paddr, p_filesz, _, _ = phdr
         else:
-            subprocess.run([f"riscv{os.environ['CASCADE_RISCV_BITWIDTH']}-unknown-elf-objcopy", '--change-section-address', f".text.init={hex(section_addr)}", destination_path])
-    else:
-        if is_64bit:
-            subprocess.run([f"riscv{os.environ['CASCADE_RISCV_BITWIDTH']}-unknown-elf-objcopy", '-I', 'elf32-littleriscv', '-O', 'elf64-littleriscv', destination_path])
+            p_type, p_offset, _, p_paddr, p_filesz, _, _, _ = phdr
+        if p_type == ELF_PT_LOAD:
+            segments.append((p_paddr, elf_bytes[p_offset:p_offset+p_filesz]))
+    return is_64bit, e_entry, segments
+
+# @return see parse_elf_load_segments.
+def read_elf_load_segments(elfpath: str):
+    with open(elfpath, 'rb') as f:
+        return parse_elf_load_segments(f.read())
@@ -8,6 +8,8 @@ from functools import cache
 
 DESIGN_REPOS_JSON_NAME = "design_repos.json"
 
+# The design paths do not change during a run.
+@cache
 def get_design_cascade_path(design_name):
     # 1. Find the designs folder.
     designs_folder = os.getenv("CASCADE_DESIGN_PROCESSING_ROOT")
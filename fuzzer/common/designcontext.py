@@ -0,0 +1,125 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module builds, once per process, the immutable context of a design that every test needs: its paths, the constants derived from its configuration and the environment of its simulations.
+# It also provides a factory of job schedulers whose workers start warm for a given design:
+#   - the heavy modules are imported and the design context is built in the parent, before the workers are forked, so that every worker inherits them.
+#   - each worker runs an initializer that prepares its own resources before its first job.
+#   - the workers are replaced after a number of jobs, to bound their memory growth.
+# It similarly provides a factory of pipelines, whose producers generate the tests and whose consumers simulate them, and a factory of job schedulers for a group of designs, whose workers simulate each test on every design of the group.
+
+from params.runparams import DO_ASSERT
+from common import designcfgs
+from common.scheduler import JobScheduler
+from common.pipeline import TwoStagePipeline
+
+from collections import namedtuple
+from functools import cache
+from types import MappingProxyType
+import importlib
+import os
+
+# The modules imported in the parent before the workers are forked.
+WORKER_PRELOAD_MODULES = [
+    'common.spike',
+    'common.profiledesign',
+    'cascade.fuzzsim',
+    'cascade.fuzzfromdescriptor',
+]
+
+# The number of jobs after which a worker is replaced. None to never replace the workers.
+DESIGN_WORKER_MAX_JOBS = 1000
+
+# By default, the capacity of the queue of a pipeline, per consumer.
+DESIGN_PIPELINE_SLOTS_PER_CONSUMER = 2
+# The deadline of a test in each stage of a pipeline, as the timeout of fuzz_single_from_descriptor.
+DESIGN_PIPELINE_STAGE_TIMEOUT_SECONDS = 60*60*2
+
+VERILATOR_SIM_KINDS = ('vanilla', 'rfuzz', 'coverage')
+
+# verilator_executable_paths maps each of VERILATOR_SIM_KINDS to the Verilator executable of this kind of simulation.
+# sim_base_env is a snapshot of the OS environment, from which the simulation environments are derived.
+DesignContext = namedtuple('DesignContext', ['design_name', 'cascadedir', 'boot_addr', 'is_32bit', 'has_float_support', 'has_double_support', 'verilator_executable_paths', 'sim_base_env'])
+
+# @return the kind of Verilator simulation, among VERILATOR_SIM_KINDS.
+def get_verilator_sim_kind(coveragepath, get_rfuzz_coverage_mask: bool) -> str:
+    return 'coverage' if coveragepath else 'rfuzz' if get_rfuzz_coverage_mask else 'vanilla'
+
+def _gen_verilator_executable_path(design_name: str, cascadedir: str, sim_kind: str) -> str:
+    builddir = os.path.join(cascadedir, 'build')
+    simdir = f"run_{sim_kind}_notrace_0.1"
+    verilatordir = 'default-verilator'
+    verilator_executable = 'V%s' % designcfgs.get_design_cfg(design_name)['toplevel']
+    return os.path.abspath(os.path.join(builddir, simdir, verilatordir, verilator_executable))
+
+# @return the DesignContext of the design, built at the first call in the process.
+@cache
+def get_design_context(design_name: str) -> DesignContext:
+    cascadedir = designcfgs.get_design_cascade_path(design_name)
+    return DesignContext(
+        design_name,
+        cascadedir,
+        designcfgs.get_design_boot_addr(design_name),
+        designcfgs.is_design_32bit(design_name),
+        designcfgs.design_has_float_support(design_name),
+        designcfgs.design_has_double_support(design_name),
+        MappingProxyType({sim_kind: _gen_verilator_executable_path(design_name, cascadedir, sim_kind) for sim_kind in VERILATOR_SIM_KINDS}),
+        MappingProxyType(os.environ.copy()),
+    )
+
+###
+# Workers
+###
+
+# @brief the initializer of the workers of gen_design_job_scheduler.
+def init_design_worker(design_name: str):
+    get_design_context(design_name)
+
+# @brief the initializer of the producers of gen_design_pipeline, which only run Spike.
+def init_design_producer(design_name: str):
+    get_design_context(design_name)
+
+# @brief the initializer of the consumers of gen_design_pipeline, which only run the simulator.
+def init_design_consumer(design_name: str):
+    get_design_context(design_name)
+
+# @brief the initializer of the workers of gen_multidesign_job_scheduler.
+def init_multidesign_worker(design_names: tuple):
+    for design_name in design_names:
+        get_design_context(design_name)
+
+# @brief a job scheduler for the jobs of a campaign on a single design. Must be called after the startup probes, e.g., calibrate_spikespeed and profile_get_medeleg_mask, so that the workers inherit their results.
+# @param max_jobs_per_worker see JobScheduler. By default, DESIGN_WORKER_MAX_JOBS.
+def gen_design_job_scheduler(job_fn, design_name: str, num_workers: int, job_timeout_seconds: float = None, max_jobs_per_worker: int = DESIGN_WORKER_MAX_JOBS) -> JobScheduler:
+    if DO_ASSERT:
+        assert num_workers > 0
+    for module_name in WORKER_PRELOAD_MODULES:
+        importlib.import_module(module_name)
+    get_design_context(design_name)
+    return JobScheduler(job_fn, num_workers, job_timeout_seconds, max_jobs_per_worker, init_design_worker, (design_name,))
+
+# @brief a pipeline for the jobs of a campaign on a single design, see TwoStagePipeline. Must be called after the startup probes, as gen_design_job_scheduler.
+# @param num_slots the capacity of the queue between the stages. By default, DESIGN_PIPELINE_SLOTS_PER_CONSUMER per consumer.
+# @param stage_timeout_seconds see TwoStagePipeline.
+def gen_design_pipeline(producer_fn, consumer_fn, design_name: str, num_producers: int, num_consumers: int, slot_size_bytes: int, num_slots: int = None, stage_timeout_seconds: float = DESIGN_PIPELINE_STAGE_TIMEOUT_SECONDS) -> TwoStagePipeline:
+    if DO_ASSERT:
+        assert num_producers > 0
+        assert num_consumers > 0
+    for module_name in WORKER_PRELOAD_MODULES:
+        importlib.import_module(module_name)
+    get_design_context(design_name)
+    if num_slots is None:
+        num_slots = DESIGN_PIPELINE_SLOTS_PER_CONSUMER * num_consumers
+    return TwoStagePipeline(producer_fn, consumer_fn, num_producers, num_consumers, num_slots, slot_size_bytes, init_design_producer, init_design_consumer, (design_name,), stage_timeout_seconds)
+
+# @brief a job scheduler for the jobs of a campaign on a group of compatible designs, see cascade/multidesign.py. Must be called after the startup probes, as gen_design_job_scheduler.
+def gen_multidesign_job_scheduler(job_fn, design_names: tuple, num_workers: int, job_timeout_seconds: float = None, max_jobs_per_worker: int = DESIGN_WORKER_MAX_JOBS) -> JobScheduler:
+    if DO_ASSERT:
+        assert num_workers > 0
+        assert len(design_names) > 0
+    for module_name in WORKER_PRELOAD_MODULES + ['cascade.multidesign']:
+        importlib.import_module(module_name)
+    for design_name in design_names:
+        get_design_context(design_name)
+    return JobScheduler(job_fn, num_workers, job_timeout_seconds, max_jobs_per_worker, init_multidesign_worker, (tuple(design_names),))
@@ -0,0 +1,414 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module provides a pipeline of two stages of processes, for example a test generation stage and a simulation stage.
+# - The producers run producer_fn on the job arguments given by the parent, and push a byte payload and some small metadata into a bounded queue.
+# - The consumers pop from the queue and run consumer_fn on the payload and the metadata.
+# The payloads are written into the slots of a memory mapping shared by all the forked processes, and only the slot ids and the metadata go through pipes.
+# When all the slots are taken, the producers block until a consumer frees a slot, which bounds the memory and throttles the producers.
+# As in the scheduler, each stage process sends its results to the parent through its own pipe, so that a process that dies does not disturb the others. Its job is reported as crashed and the process is replaced.
+# As in the scheduler, a job that exceeds its deadline in a stage is stopped by killing its stage process, which is then replaced. The deadline only covers producer_fn and consumer_fn, not the time blocked on the queue.
+# The parent measures the occupancy of each stage: the time spent working, and the time spent blocked on the queue.
+
+from params.runparams import DO_ASSERT
+from common.scheduler import JobResult, JOB_STATUS_DONE, JOB_STATUS_FAILED, JOB_STATUS_TIMEOUT, JOB_STATUS_CRASHED, _MP_CONTEXT
+
+from multiprocessing.connection import wait
+import mmap
+import os
+import signal
+import time
+
+PIPELINE_STAGE_PRODUCER = 'producer'
+PIPELINE_STAGE_CONSUMER = 'consumer'
+
+# The period at which the parent samples the occupancy of the queue when no result arrives.
+_SAMPLE_PERIOD_SECONDS = 1.0
+
+###
+# Shared slot queue
+###
+
+# The states of a slot, other than the pid of the process that currently writes or reads it.
+_SLOT_FREE  = 0
+_SLOT_READY = -1
+
+# A bounded queue of byte payloads, shared by forked processes.
+# The slot ids go through SimpleQueues, whose put is synchronous, so that a slot is never lost in the buffer of a process that dies.
+class SharedSlotQueue:
+    def __init__(self, num_slots: int, slot_size_bytes: int):
+        if DO_ASSERT:
+            assert num_slots > 0
+            assert slot_size_bytes > 0
+        self.num_slots = num_slots
+        self.slot_size_bytes = slot_size_bytes
+        # An anonymous mapping is shared with the forked processes.
+        self.slots = mmap.mmap(-1, num_slots * slot_size_bytes)
+        self.free_slot_ids = _MP_CONTEXT.SimpleQueue()
+        for slot_id in range(num_slots):
+            self.free_slot_ids.put(slot_id)
+        # Items (slot_id, payload_size, metadata), or None to stop a consumer.
+        self.ready_items = _MP_CONTEXT.SimpleQueue()
+        self.slot_states = _MP_CONTEXT.Array('i', num_slots, lock=False)
+
+    # @brief copies the payload into a free slot, and blocks until a slot is free.
+    # @return the number of seconds spent waiting for a free slot.
+    def put(self, payload: bytes, metadata) -> float:
+        if len(payload) > self.slot_size_bytes:
+            raise ValueError(f"Payload of {len(payload)} bytes does not fit in a slot of {self.slot_size_bytes} bytes.")
+        start_time = time.time()
+        slot_id = self.free_slot_ids.get()
+        blocked_seconds = time.time() - start_time
+        self.slot_states[slot_id] = os.getpid()
+        slot_start = slot_id * self.slot_size_bytes
+        self.slots[slot_start:slot_start + len(payload)] = payload
+        self.slot_states[slot_id] = _SLOT_READY
+        self.ready_items.put((slot_id, len(payload), metadata))
+        return blocked_seconds
+
+    # @brief blocks until an item is ready, copies its payload out and frees its slot.
+    # @return a triple (payload, metadata, number of seconds spent waiting), or None if the consumer must stop.
+    def get(self):
+        start_time = time.time()
+        item = self.ready_items.get()
+        blocked_seconds = time.time() - start_time
+        if item is None:
+            return None
+        slot_id, payload_size, metadata = item
+        self.slot_states[slot_id] = os.getpid()
+        slot_start = slot_id * self.slot_size_bytes
+        payload = self.slots[slot_start:slot_start + payload_size]
+        self.slot_states[slot_id] = _SLOT_FREE
+        self.free_slot_ids.put(slot_id)
+        return payload, metadata, blocked_seconds
+
+    # @brief requests a consumer to stop.
+    def put_stop(self):
+        self.ready_items.put(None)
+
+    # @brief frees the slots held by a process that died.
+    # @return the number of freed slots.
+    def reclaim_slots(self, pid: int) -> int:
+        num_reclaimed = 0
+        for slot_id in range(self.num_slots):
+            if self.slot_states[slot_id] == pid:
+                self.slot_states[slot_id] = _SLOT_FREE
+                self.free_slot_ids.put(slot_id)
+                num_reclaimed += 1
+        return num_reclaimed
+
+    # @return the number of items ready to be consumed.
+    def get_num_ready(self) -> int:
+        return sum(slot_state == _SLOT_READY for slot_state in self.slot_states)
+
+###
+# Stage processes
+###
+
+# @return None, or a string describing the failure of the initializer.
+def _run_stage_initializer(initializer, initargs: tuple, stage: str):
+    # Own process group, so that killing the stage process also kills the simulators that it spawned.
+    os.setpgrp()
+    if initializer is None:
+        return None
+    try:
+        initializer(*initargs)
+    except Exception as e:
+        return f"{stage.capitalize()} initializer failed: {type(e).__name__}: {e}"
+    return None
+
+# @brief the main loop of a producer. A None job request stops the producer.
+# @param start_times shared array of the time at which each producer started its current producer_fn call, or 0. Used to enforce the deadlines.
+# Responses to the parent: (job_id, status, error_str, busy_seconds, blocked_seconds), sent once the payload is in the queue, or if producer_fn failed.
+def _producer_loop(producer_fn, conn, slot_queue: SharedSlotQueue, start_times, producer_id: int, initializer, initargs: tuple):
+    initializer_error_str = _run_stage_initializer(initializer, initargs, PIPELINE_STAGE_PRODUCER)
+    while True:
+        try:
+            job_request = conn.recv()
+        except EOFError:
+            return
+        if job_request is None:
+            return
+        job_id, args = job_request
+        if initializer_error_str is not None:
+            conn.send((job_id, JOB_STATUS_FAILED, initializer_error_str, 0.0, 0.0))
+            continue
+        start_time = time.time()
+        start_times[producer_id] = start_time
+        try:
+            payload, metadata = producer_fn(*args)
+        except Exception as e:
+            start_times[producer_id] = 0.0
+            conn.send((job_id, JOB_STATUS_FAILED, f"{type(e).__name__}: {e}", time.time() - start_time, 0.0))
+            continue
+        start_times[producer_id] = 0.0
+        busy_seconds = time.time() - start_time
+        blocked_seconds = slot_queue.put(payload, (job_id, busy_seconds, metadata))
+        conn.send((job_id, JOB_STATUS_DONE, None, busy_seconds, blocked_seconds))
+
+# @brief the main loop of a consumer, until it pops a stop request.
+# @param curr_job_ids shared array of the job id currently run by each consumer, or -1. Used to report the job of a consumer that died.
+# @param start_times shared array of the time at which each consumer started its current job, or 0. Used to enforce the deadlines.
+# Responses to the parent: (job_id, status, ret, error_str, busy_seconds, blocked_seconds, producer_busy_seconds).
+# producer_busy_seconds is forwarded by the consumer, because the response of the producer may arrive after the response of the consumer.
+def _consumer_loop(consumer_fn, conn, slot_queue: SharedSlotQueue, curr_job_ids, start_times, consumer_id: int, initializer, initargs: tuple):
+    initializer_error_str = _run_stage_initializer(initializer, initargs, PIPELINE_STAGE_CONSUMER)
+    while True:
+        item = slot_queue.get()
+        if item is None:
+            return
+        payload, (job_id, producer_busy_seconds, metadata), blocked_seconds = item
+        if initializer_error_str is not None:
+            conn.send((job_id, JOB_STATUS_FAILED, None, initializer_error_str, 0.0, blocked_seconds, producer_busy_seconds))
+            continue
+        start_time = time.time()
+        start_times[consumer_id] = start_time
+        curr_job_ids[consumer_id] = job_id
+        try:
+            ret = consumer_fn(payload, metadata)
+            job_response = (job_id, JOB_STATUS_DONE, ret, None, time.time() - start_time, blocked_seconds, producer_busy_seconds)
+        except Exception as e:
+            job_response = (job_id, JOB_STATUS_FAILED, None, f"{type(e).__name__}: {e}", time.time() - start_time, blocked_seconds, producer_busy_seconds)
+        curr_job_ids[consumer_id] = -1
+        start_times[consumer_id] = 0.0
+        try:
+            conn.send(job_response)
+        except Exception as e:
+            # Typically, the return value cannot be pickled.
+            conn.send((job_id, JOB_STATUS_FAILED, None, f"Could not send the result: {type(e).__name__}: {e}", job_response[4], blocked_seconds, producer_busy_seconds))
+
+class _StageProcess:
+    # @param args the arguments of target, except its connection to the parent, which is inserted as the second argument.
+    def __init__(self, target, args: tuple):
+        self.conn, process_conn = _MP_CONTEXT.Pipe()
+        self.process = _MP_CONTEXT.Process(target=target, args=(args[0], process_conn) + args[1:], daemon=True)
+        self.process.start()
+        process_conn.close()
+        # For a producer, the job that it currently runs: (job_id, args), or None if it is free.
+        self.curr_job = None
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            # The process may not have created its process group yet.
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+###
+# Pipeline
+###
+
+class TwoStagePipeline:
+    # @param producer_fn a function of the job arguments, which returns a pair (payload: bytes, metadata). The metadata must be picklable.
+    # @param consumer_fn a function (payload: bytes, metadata) -> ret. Its return value must be picklable.
+    # @param num_slots the capacity of the queue between the stages.
+    # @param slot_size_bytes the maximal size of a payload.
+    # @param producer_initializer, consumer_initializer None, or a function called with initargs in each process of the stage, including the replacing ones, before its first job.
+    # @param stage_timeout_seconds None, or the deadline of each job in each stage, after which its stage process is killed.
+    def __init__(self, producer_fn, consumer_fn, num_producers: int, num_consumers: int, num_slots: int, slot_size_bytes: int, producer_initializer = None, consumer_initializer = None, initargs: tuple = (), stage_timeout_seconds: float = None):
+        if DO_ASSERT:
+            assert num_producers > 0
+            assert num_consumers > 0
+            assert num_slots > 0
+            assert stage_timeout_seconds is None or stage_timeout_seconds > 0
+        self.producer_fn = producer_fn
+        self.consumer_fn = consumer_fn
+        self.num_producers = num_producers
+        self.num_consumers = num_consumers
+        self.num_slots = num_slots
+        self.slot_size_bytes = slot_size_bytes
+        self.producer_initializer = producer_initializer
+        self.consumer_initializer = consumer_initializer
+        self.initargs = initargs
+        self.stage_timeout_seconds = stage_timeout_seconds
+        # Statistics
+        self.num_jobs_per_status = {JOB_STATUS_DONE: 0, JOB_STATUS_FAILED: 0, JOB_STATUS_TIMEOUT: 0, JOB_STATUS_CRASHED: 0}
+        self.num_restarted_processes = 0
+        self.stage_busy_seconds = {PIPELINE_STAGE_PRODUCER: 0.0, PIPELINE_STAGE_CONSUMER: 0.0}
+        self.stage_blocked_seconds = {PIPELINE_STAGE_PRODUCER: 0.0, PIPELINE_STAGE_CONSUMER: 0.0}
+        # The integral of the number of ready items over time.
+        self.queue_item_seconds = 0.0
+        self.run_seconds = 0.0
+
+    # @return a dict of the occupancy of the stages and of the queue, since the start of the runs.
+    # - busy: fraction of the time of the stage processes spent in producer_fn or consumer_fn.
+    # - blocked: fraction of the time of the stage processes spent waiting on a full queue for the producers, or on an empty queue for the consumers.
+    def get_occupancy_stats(self) -> dict:
+        if self.run_seconds == 0:
+            return dict()
+        ret = {'queue_mean_num_ready': self.queue_item_seconds / self.run_seconds, 'queue_num_slots': self.num_slots}
+        for stage, num_processes in ((PIPELINE_STAGE_PRODUCER, self.num_producers), (PIPELINE_STAGE_CONSUMER, self.num_consumers)):
+            ret[f"{stage}_busy"] = self.stage_busy_seconds[stage] / (num_processes * self.run_seconds)
+            ret[f"{stage}_blocked"] = self.stage_blocked_seconds[stage] / (num_processes * self.run_seconds)
+        return ret
+
+    def get_occupancy_str(self) -> str:
+        stats = self.get_occupancy_stats()
+        if not stats:
+            return "No occupancy statistics yet."
+        return f"Producers: {100*stats['producer_busy']:.1f}% busy, {100*stats['producer_blocked']:.1f}% blocked on a full queue. Consumers: {100*stats['consumer_busy']:.1f}% busy, {100*stats['consumer_blocked']:.1f}% starved. Queue: {stats['queue_mean_num_ready']:.2f}/{stats['queue_num_slots']} ready items on average."
+
+    # @brief runs jobs until gen_job_args has no more job and all submitted jobs are complete, or until on_result requests to stop. At most num_producers jobs are being produced at any time.
+    # @param gen_job_args a function job_id -> tuple of arguments of producer_fn, or None if no more job should be submitted. It is called in the parent process, in the order of the job ids.
+    # @param on_result a function JobResult -> bool, called in the parent process when a job fails in any stage or completes the consumer stage. If it returns True, then the pipeline is stopped. The duration of the JobResult is the sum of the durations of both stages.
+    # @param first_job_id the id of the first job. The job ids are consecutive.
+    # @param print_stats_period_seconds None, or the period at which the occupancy statistics are printed.
+    # @return the number of jobs whose result was given to on_result.
+    def run(self, gen_job_args, on_result, first_job_id: int = 0, print_stats_period_seconds: float = None) -> int:
+        slot_queue = SharedSlotQueue(self.num_slots, self.slot_size_bytes)
+        consumer_job_ids = _MP_CONTEXT.Array('q', [-1] * self.num_consumers, lock=False)
+        producer_start_times = _MP_CONTEXT.Array('d', self.num_producers, lock=False)
+        consumer_start_times = _MP_CONTEXT.Array('d', self.num_consumers, lock=False)
+
+        gen_producer = lambda producer_id: _StageProcess(_producer_loop, (self.producer_fn, slot_queue, producer_start_times, producer_id, self.producer_initializer, self.initargs))
+        gen_consumer = lambda consumer_id: _StageProcess(_consumer_loop, (self.consumer_fn, slot_queue, consumer_job_ids, consumer_start_times, consumer_id, self.consumer_initializer, self.initargs))
+        producers = [gen_producer(producer_id) for producer_id in range(self.num_producers)]
+        consumers = [gen_consumer(consumer_id) for consumer_id in range(self.num_consumers)]
+
+        # job_id: args, for the jobs that have not been given to on_result yet.
+        jobs_in_flight = dict()
+        next_job_id = first_job_id
+        no_more_jobs = False
+        num_results = 0
+        last_sample_time = time.time()
+        last_stats_print_time = last_sample_time
+        is_complete = False
+
+        try:
+            # @return True iff a job has been submitted to the producer.
+            def submit_next_job(producer) -> bool:
+                nonlocal next_job_id, no_more_jobs
+                if no_more_jobs:
+                    return False
+                args = gen_job_args(next_job_id)
+                if args is None:
+                    no_more_jobs = True
+                    return False
+                producer.curr_job = (next_job_id, args)
+                producer.conn.send(producer.curr_job)
+                jobs_in_flight[next_job_id] = args
+                next_job_id += 1
+                return True
+
+            # @return True iff on_result requests to stop.
+            def report(job_id: int, status: str, ret, error_str: str, duration_seconds: float) -> bool:
+                nonlocal num_results
+                args = jobs_in_flight.pop(job_id)
+                self.num_jobs_per_status[status] += 1
+                num_results += 1
+                return on_result(JobResult(job_id, args, status, ret, error_str, duration_seconds))
+
+            for producer in producers:
+                submit_next_job(producer)
+
+            while True:
+                if no_more_jobs and not jobs_in_flight:
+                    is_complete = True
+                    return num_results
+
+                # Wait for the first response, for the nearest deadline, or for the next sample.
+                wait_timeout = _SAMPLE_PERIOD_SECONDS
+                if self.stage_timeout_seconds is not None:
+                    start_times = [start_time for start_time in list(producer_start_times) + list(consumer_start_times) if start_time]
+                    if start_times:
+                        wait_timeout = min(wait_timeout, max(min(start_times) + self.stage_timeout_seconds - time.time(), 0))
+                ready_conns = set(wait([producer.conn for producer in producers if producer.curr_job is not None] + [consumer.conn for consumer in consumers], timeout=wait_timeout))
+
+                curr_time = time.time()
+                self.queue_item_seconds += slot_queue.get_num_ready() * (curr_time - last_sample_time)
+                self.run_seconds += curr_time - last_sample_time
+                last_sample_time = curr_time
+
+                for producer_id, producer in enumerate(producers):
+                    if producer.conn not in ready_conns:
+                        continue
+                    try:
+                        job_id, status, error_str, busy_seconds, blocked_seconds = producer.conn.recv()
+                        self.stage_busy_seconds[PIPELINE_STAGE_PRODUCER] += busy_seconds
+                        self.stage_blocked_seconds[PIPELINE_STAGE_PRODUCER] += blocked_seconds
+                    except EOFError:
+                        producer.process.join()
+                        job_id, status, error_str, busy_seconds = producer.curr_job[0], JOB_STATUS_CRASHED, f"Producer exited with code {producer.process.exitcode}.", 0.0
+                        producer.conn.close()
+                        slot_queue.reclaim_slots(producer.process.pid)
+                        producer_start_times[producer_id] = 0.0
+                        producer = gen_producer(producer_id)
+                        producers[producer_id] = producer
+                        self.num_restarted_processes += 1
+                    producer.curr_job = None
+                    # A job that is done in the producer stage is reported by its consumer.
+                    if status != JOB_STATUS_DONE and job_id in jobs_in_flight and report(job_id, status, None, error_str, busy_seconds):
+                        return num_results
+                    submit_next_job(producer)
+
+                for consumer_id, consumer in enumerate(consumers):
+                    if consumer.conn not in ready_conns:
+                        continue
+                    try:
+                        job_id, status, ret, error_str, busy_seconds, blocked_seconds, producer_busy_seconds = consumer.conn.recv()
+                        self.stage_busy_seconds[PIPELINE_STAGE_CONSUMER] += busy_seconds
+                        self.stage_blocked_seconds[PIPELINE_STAGE_CONSUMER] += blocked_seconds
+                        duration_seconds = producer_busy_seconds + busy_seconds
+                    except EOFError:
+                        consumer.process.join()
+                        job_id, status, ret, error_str, duration_seconds = consumer_job_ids[consumer_id], JOB_STATUS_CRASHED, None, f"Consumer exited with code {consumer.process.exitcode}.", 0.0
+                        consumer_job_ids[consumer_id] = -1
+                        consumer_start_times[consumer_id] = 0.0
+                        consumer.conn.close()
+                        slot_queue.reclaim_slots(consumer.process.pid)
+                        consumers[consumer_id] = gen_consumer(consumer_id)
+                        self.num_restarted_processes += 1
+                    if job_id in jobs_in_flight and report(job_id, status, ret, error_str, duration_seconds):
+                        return num_results
+
+                # Stop the jobs that exceeded their deadline in their stage. Their stage process is killed, hence the slots that it holds are reclaimed.
+                if self.stage_timeout_seconds is not None:
+                    curr_time = time.time()
+                    timeout_error_str = f"Job exceeded its deadline of {self.stage_timeout_seconds} seconds in the {{}} stage."
+                    for producer_id, producer in enumerate(producers):
+                        start_time = producer_start_times[producer_id]
+                        if producer.curr_job is None or producer.conn in ready_conns or not start_time or curr_time < start_time + self.stage_timeout_seconds:
+                            continue
+                        job_id = producer.curr_job[0]
+                        producer.kill()
+                        slot_queue.reclaim_slots(producer.process.pid)
+                        producer_start_times[producer_id] = 0.0
+                        producer = gen_producer(producer_id)
+                        producers[producer_id] = producer
+                        self.num_restarted_processes += 1
+                        if job_id in jobs_in_flight and report(job_id, JOB_STATUS_TIMEOUT, None, timeout_error_str.format(PIPELINE_STAGE_PRODUCER), curr_time - start_time):
+                            return num_results
+                        submit_next_job(producer)
+                    for consumer_id, consumer in enumerate(consumers):
+                        job_id, start_time = consumer_job_ids[consumer_id], consumer_start_times[consumer_id]
+                        if job_id == -1 or consumer.conn in ready_conns or not start_time or curr_time < start_time + self.stage_timeout_seconds:
+                            continue
+                        consumer.kill()
+                        slot_queue.reclaim_slots(consumer.process.pid)
+                        consumer_job_ids[consumer_id] = -1
+                        consumer_start_times[consumer_id] = 0.0
+                        consumers[consumer_id] = gen_consumer(consumer_id)
+                        self.num_restarted_processes += 1
+                        if job_id in jobs_in_flight and report(job_id, JOB_STATUS_TIMEOUT, None, timeout_error_str.format(PIPELINE_STAGE_CONSUMER), curr_time - start_time):
+                            return num_results
+
+                if print_stats_period_seconds is not None and curr_time - last_stats_print_time >= print_stats_period_seconds:
+                    print(self.get_occupancy_str())
+                    last_stats_print_time = curr_time
+        finally:
+            # After a complete run, the stage processes are idle and exit normally, so that their resources are cleaned up.
+            if is_complete:
+                for producer in producers:
+                    producer.conn.send(None)
+                for _ in consumers:
+                    slot_queue.put_stop()
+                for stage_process in producers + consumers:
+                    stage_process.process.join(timeout=1)
+            for stage_process in producers + consumers:
+                if stage_process.process.exitcode is None:
+                    stage_process.kill()
+                else:
+                    stage_process.conn.close()
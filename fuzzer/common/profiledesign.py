@@ -14,7 +14,8 @@ from params.fuzzparams import RDEP_MASK_REGISTER_ID
 from cascade.cfinstructionclasses import ImmRdInstruction, RegImmInstruction, IntStoreInstruction, CSRImmInstruction, CSRRegInstruction, SpecialInstruction
 from cascade.fuzzerstate import FuzzerState
 from cascade.genelf import gen_elf_from_bbs
-from cascade.fuzzsim import runtest_verilator_forprofiling
+from cascade.fuzzsim import runtest_verilator_forprofiling, _get_verilator_executable_path
+from common.profilingcache import get_or_run_probe, get_file_sha256
 
 ###
 # Internal functions
@@ -89,7 +90,9 @@ def profile_get_medeleg_mask(design_name: str):
     if "picorv32" in design_name:
         return 0 # This design does not support medeleg
     global PROFILED_MEDELEG_MASK
-    PROFILED_MEDELEG_MASK = __get_medeleg_mask(design_name)
+    # The mask only depends on the built design.
+    fingerprint = (design_name, get_file_sha256(_get_verilator_executable_path(design_name, None, False)))
+    PROFILED_MEDELEG_MASK = get_or_run_probe('medeleg_mask', fingerprint, lambda: __get_medeleg_mask(design_name))
 
 # @return the mask of medeleg bits that are supported by the design
 def get_medeleg_mask(design_name: str):
@@ -0,0 +1,125 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module persists the results of the startup probes, such as the medeleg profiling of a design and the Spike speed calibration, in an SQLite file.
+# Each result is keyed by the probe name and by a fingerprint of everything it depends on, typically the hash of the simulator binary, so that rebuilding a design or Spike invalidates its results.
+# The pool workers and concurrent campaigns may access the cache simultaneously. A probe that is missing from the cache is run by a single process at a time, the others wait for its result.
+
+from params.runparams import PATH_TO_TMP
+
+import fcntl
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sqlite3
+
+USE_PROFILING_CACHE = True
+PROFILING_CACHE_PATH = os.path.join(PATH_TO_TMP, 'profilingcache.sqlite')
+# Increment when a probe changes, to invalidate its stored results.
+PROFILING_CACHE_VERSION = 1
+
+###
+# Fingerprints
+###
+
+# @return the SHA-256 of the file, or None if the file does not exist. The hashes are memoized in the cache, keyed by the file metadata.
+def get_file_sha256(path: str):
+    try:
+        file_stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    file_metadata = (os.path.abspath(path), file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+    profiling_cache = get_profiling_cache()
+    if profiling_cache is not None:
+        file_sha256 = profiling_cache.lookup_file_sha256(file_metadata)
+        if file_sha256 is not None:
+            return file_sha256
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for file_chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(file_chunk)
+    file_sha256 = h.hexdigest()
+    if profiling_cache is not None:
+        profiling_cache.store_file_sha256(file_metadata, file_sha256)
+    return file_sha256
+
+# @return the fingerprint of the Spike binary in the PATH, or None if Spike is not found.
+def get_spike_fingerprint():
+    spike_path = shutil.which('spike')
+    if spike_path is None:
+        return None
+    spike_sha256 = get_file_sha256(spike_path)
+    return None if spike_sha256 is None else ('spike', spike_sha256)
+
+# @return a fingerprint of the machine, for the probes that measure durations.
+def get_host_fingerprint() -> tuple:
+    return (platform.node(), platform.machine(), os.cpu_count())
+
+###
+# Cache
+###
+
+class ProfilingCache:
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = os.getpid()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS results (probe_key TEXT PRIMARY KEY, result TEXT NOT NULL)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS file_hashes (file_key TEXT PRIMARY KEY, sha256 TEXT NOT NULL)')
+
+    # @brief the key of a probe result. The fingerprint is made of the values that the result depends on.
+    @staticmethod
+    def _gen_probe_key(probe_name: str, fingerprint: tuple) -> str:
+        return hashlib.sha256(repr((PROFILING_CACHE_VERSION, probe_name, fingerprint)).encode()).hexdigest()
+
+    # @return the stored result, or None if the probe is unknown.
+    def lookup(self, probe_name: str, fingerprint: tuple):
+        row = self.conn.execute('SELECT result FROM results WHERE probe_key = ?', (self._gen_probe_key(probe_name, fingerprint),)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    # @param result a json-serializable value, not None.
+    def store(self, probe_name: str, fingerprint: tuple, result):
+        self.conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?)', (self._gen_probe_key(probe_name, fingerprint), json.dumps(result)))
+
+    def lookup_file_sha256(self, file_metadata: tuple):
+        row = self.conn.execute('SELECT sha256 FROM file_hashes WHERE file_key = ?', (repr(file_metadata),)).fetchone()
+        return None if row is None else row[0]
+
+    def store_file_sha256(self, file_metadata: tuple, file_sha256: str):
+        self.conn.execute('INSERT OR REPLACE INTO file_hashes VALUES (?, ?)', (repr(file_metadata), file_sha256))
+
+__profiling_cache = None
+
+# @return the cache of the current process, or None if USE_PROFILING_CACHE is False.
+def get_profiling_cache():
+    global __profiling_cache
+    if not USE_PROFILING_CACHE:
+        return None
+    # SQLite connections must not be shared with forked processes.
+    if __profiling_cache is None or __profiling_cache.pid != os.getpid() or __profiling_cache.path != PROFILING_CACHE_PATH:
+        __profiling_cache = ProfilingCache(PROFILING_CACHE_PATH)
+    return __profiling_cache
+
+# @brief returns the stored result of the probe, or runs the probe and stores its result.
+# @param fingerprint a tuple, or None if the dependencies of the probe are unknown. If the fingerprint is or contains None, then the probe is run and its result is not stored.
+# @param probe_fn a function without arguments that returns a json-serializable value.
+def get_or_run_probe(probe_name: str, fingerprint: tuple, probe_fn):
+    profiling_cache = get_profiling_cache()
+    if profiling_cache is None or fingerprint is None or None in fingerprint:
+        return probe_fn()
+    result = profiling_cache.lookup(probe_name, fingerprint)
+    if result is not None:
+        return result
+    with open(f"{PROFILING_CACHE_PATH}.{ProfilingCache._gen_probe_key(probe_name, fingerprint)[:16]}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        # Another process may have run the probe in the meantime.
+        result = profiling_cache.lookup(probe_name, fingerprint)
+        if result is None:
+            result = probe_fn()
+            profiling_cache.store(probe_name, fingerprint, result)
+    return result
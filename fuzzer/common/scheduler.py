@@ -0,0 +1,276 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module provides an event-driven job scheduler over a fixed number of worker processes.
+# Each worker is a forked process that receives its jobs through a pipe and sends back one result per job.
+# The scheduler blocks on the result pipes, so that a new job is submitted as soon as a worker becomes free, instead of polling periodically.
+# A job that exceeds its deadline is stopped by killing its worker, which is then replaced. Workers can also be replaced after a given number of jobs, to bound their memory growth.
+# Each worker may run an initializer once, before its first job.
+# JobPool is a lower-level interface, for callers that decide themselves which jobs to submit and cancel.
+
+from params.runparams import DO_ASSERT
+
+from collections import namedtuple
+import multiprocessing as mp
+from multiprocessing.connection import wait
+import os
+import signal
+import time
+
+# The workers are forked, so that they inherit the state of the parent, for example the calibrated Spike speed and the profiled medeleg mask. Hence, job_fn does not need to be picklable.
+_MP_CONTEXT = mp.get_context('fork')
+
+JOB_STATUS_DONE    = 'done'    # The job function returned
+JOB_STATUS_FAILED  = 'failed'  # The job function raised an exception
+JOB_STATUS_TIMEOUT = 'timeout' # The job exceeded its deadline
+JOB_STATUS_CRASHED = 'crashed' # The worker process died during the job
+
+# @brief the result of a job, given to the on_result function of the scheduler.
+# ret is the return value of the job function if status is JOB_STATUS_DONE, and None otherwise.
+# error_str describes the failure if status is not JOB_STATUS_DONE, and is None otherwise.
+JobResult = namedtuple('JobResult', ['job_id', 'args', 'status', 'ret', 'error_str', 'duration_seconds'])
+
+# @brief the main loop of a worker process. A None job request stops the worker.
+# @param initializer None, or a function called with initargs before the first job. If it raises, then all the jobs of the worker fail.
+def _worker_loop(job_fn, conn, initializer, initargs: tuple):
+    # Own process group, so that killing the worker also kills the simulators that it spawned.
+    os.setpgrp()
+    initializer_error_str = None
+    if initializer is not None:
+        try:
+            initializer(*initargs)
+        except Exception as e:
+            initializer_error_str = f"Worker initializer failed: {type(e).__name__}: {e}"
+    while True:
+        try:
+            job_request = conn.recv()
+        except EOFError:
+            return
+        if job_request is None:
+            return
+        job_id, args = job_request
+        if initializer_error_str is not None:
+            conn.send((job_id, JOB_STATUS_FAILED, None, initializer_error_str, 0.0))
+            continue
+        start_time = time.time()
+        try:
+            ret = job_fn(*args)
+            job_response = (job_id, JOB_STATUS_DONE, ret, None, time.time() - start_time)
+        except Exception as e:
+            job_response = (job_id, JOB_STATUS_FAILED, None, f"{type(e).__name__}: {e}", time.time() - start_time)
+        try:
+            conn.send(job_response)
+        except Exception as e:
+            # Typically, the return value cannot be pickled.
+            conn.send((job_id, JOB_STATUS_FAILED, None, f"Could not send the result: {type(e).__name__}: {e}", job_response[-1]))
+
+class _SchedulerWorker:
+    def __init__(self, job_fn, initializer = None, initargs: tuple = ()):
+        self.conn, worker_conn = _MP_CONTEXT.Pipe()
+        self.process = _MP_CONTEXT.Process(target=_worker_loop, args=(job_fn, worker_conn, initializer, initargs), daemon=True)
+        self.process.start()
+        worker_conn.close()
+        self.num_jobs_done = 0
+        # The job currently run by the worker: (job_id, args, start_time, deadline), or None if the worker is free.
+        self.curr_job = None
+
+    def submit(self, job_id: int, args: tuple, job_timeout_seconds: float):
+        start_time = time.time()
+        self.curr_job = (job_id, args, start_time, None if job_timeout_seconds is None else start_time + job_timeout_seconds)
+        self.conn.send((job_id, args))
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.conn.close()
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            # The worker may not have created its process group yet.
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class JobScheduler:
+    # @param job_fn the function run by the workers. Its return value must be picklable.
+    # @param job_timeout_seconds None, or the deadline of each job, after which its worker is killed.
+    # @param max_jobs_per_worker None, or the number of jobs after which a worker is replaced by a fresh one.
+    # @param initializer None, or a function called with initargs in each worker, including the replacing ones, before its first job.
+    def __init__(self, job_fn, num_workers: int, job_timeout_seconds: float = None, max_jobs_per_worker: int = None, initializer = None, initargs: tuple = ()):
+        if DO_ASSERT:
+            assert num_workers > 0
+            assert job_timeout_seconds is None or job_timeout_seconds > 0
+            assert max_jobs_per_worker is None or max_jobs_per_worker > 0
+        self.job_fn = job_fn
+        self.num_workers = num_workers
+        self.job_timeout_seconds = job_timeout_seconds
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.initializer = initializer
+        self.initargs = initargs
+        # Statistics
+        self.num_jobs_per_status = {JOB_STATUS_DONE: 0, JOB_STATUS_FAILED: 0, JOB_STATUS_TIMEOUT: 0, JOB_STATUS_CRASHED: 0}
+        self.num_recycled_workers = 0
+
+    # @brief runs jobs until gen_job_args has no more job and all submitted jobs are complete, or until on_result requests to stop. At most num_workers jobs are in flight at any time.
+    # @param gen_job_args a function job_id -> tuple of arguments of job_fn, or None if no more job should be submitted. It is called in the parent process, in the order of the job ids.
+    # @param on_result a function JobResult -> bool, called in the parent process as soon as a job completes, in the order of completion. If it returns True, then the scheduler kills the workers and returns.
+    # @param first_job_id the id of the first job. The job ids are consecutive.
+    # @return the number of jobs whose result was given to on_result.
+    def run(self, gen_job_args, on_result, first_job_id: int = 0) -> int:
+        workers = [_SchedulerWorker(self.job_fn, self.initializer, self.initargs) for _ in range(self.num_workers)]
+        next_job_id = first_job_id
+        no_more_jobs = False
+        num_results = 0
+
+        try:
+            # @return True iff a job has been submitted to the worker.
+            def submit_next_job(worker) -> bool:
+                nonlocal next_job_id, no_more_jobs
+                if no_more_jobs:
+                    return False
+                args = gen_job_args(next_job_id)
+                if args is None:
+                    no_more_jobs = True
+                    return False
+                worker.submit(next_job_id, args, self.job_timeout_seconds)
+                next_job_id += 1
+                return True
+
+            for worker in workers:
+                submit_next_job(worker)
+
+            while True:
+                busy_workers = [worker for worker in workers if worker.curr_job is not None]
+                if not busy_workers:
+                    return num_results
+
+                # Wait for the first completion, or for the nearest deadline.
+                deadlines = [worker.curr_job[3] for worker in busy_workers if worker.curr_job[3] is not None]
+                wait_timeout = max(min(deadlines) - time.time(), 0) if deadlines else None
+                ready_conns = set(wait([worker.conn for worker in busy_workers], timeout=wait_timeout))
+
+                curr_time = time.time()
+                for worker_id, worker in enumerate(workers):
+                    if worker.curr_job is None:
+                        continue
+                    job_id, args, start_time, deadline = worker.curr_job
+                    needs_new_worker = False
+                    if worker.conn in ready_conns:
+                        try:
+                            response_job_id, status, ret, error_str, duration_seconds = worker.conn.recv()
+                            if DO_ASSERT:
+                                assert response_job_id == job_id
+                            worker.num_jobs_done += 1
+                            job_result = JobResult(job_id, args, status, ret, error_str, duration_seconds)
+                            needs_new_worker = self.max_jobs_per_worker is not None and worker.num_jobs_done >= self.max_jobs_per_worker
+                        except EOFError:
+                            worker.process.join()
+                            job_result = JobResult(job_id, args, JOB_STATUS_CRASHED, None, f"Worker exited with code {worker.process.exitcode}.", curr_time - start_time)
+                            needs_new_worker = True
+                    elif deadline is not None and curr_time >= deadline:
+                        job_result = JobResult(job_id, args, JOB_STATUS_TIMEOUT, None, f"Job exceeded its deadline of {self.job_timeout_seconds} seconds.", curr_time - start_time)
+                        worker.kill()
+                        needs_new_worker = True
+                    else:
+                        continue
+
+                    worker.curr_job = None
+                    if needs_new_worker:
+                        if job_result.status == JOB_STATUS_DONE or job_result.status == JOB_STATUS_FAILED:
+                            worker.stop()
+                            self.num_recycled_workers += 1
+                        elif job_result.status == JOB_STATUS_CRASHED:
+                            worker.conn.close()
+                        worker = _SchedulerWorker(self.job_fn, self.initializer, self.initargs)
+                        workers[worker_id] = worker
+
+                    self.num_jobs_per_status[job_result.status] += 1
+                    num_results += 1
+                    if on_result(job_result):
+                        return num_results
+                    # Refill the slot immediately
+                    submit_next_job(worker)
+        finally:
+            for worker in workers:
+                if worker.curr_job is None:
+                    worker.stop()
+                else:
+                    worker.kill()
+            for worker in workers:
+                worker.process.join(timeout=1)
+
+# @brief a fixed number of workers to which the caller submits jobs individually, and from which it can cancel any job in flight.
+class JobPool:
+    # @param initializer see JobScheduler.
+    def __init__(self, job_fn, num_workers: int, initializer = None, initargs: tuple = ()):
+        if DO_ASSERT:
+            assert num_workers > 0
+        self.job_fn = job_fn
+        self.initializer = initializer
+        self.initargs = initargs
+        self.workers = [_SchedulerWorker(job_fn, initializer, initargs) for _ in range(num_workers)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # @return the ids of the jobs in flight.
+    def get_job_ids_in_flight(self) -> list:
+        return [worker.curr_job[0] for worker in self.workers if worker.curr_job is not None]
+
+    def get_num_free_workers(self) -> int:
+        return sum(worker.curr_job is None for worker in self.workers)
+
+    # @brief submits a job to a free worker. There must be a free worker.
+    def submit(self, job_id, args: tuple):
+        for worker in self.workers:
+            if worker.curr_job is None:
+                worker.submit(job_id, args, None)
+                return
+        raise ValueError("No free worker in the job pool.")
+
+    # @brief stops the given job by replacing its worker.
+    def cancel(self, job_id):
+        for worker_id, worker in enumerate(self.workers):
+            if worker.curr_job is not None and worker.curr_job[0] == job_id:
+                worker.kill()
+                self.workers[worker_id] = _SchedulerWorker(self.job_fn, self.initializer, self.initargs)
+                return
+        raise ValueError(f"Job `{job_id}` is not in flight.")
+
+    # @brief waits for the next job to complete.
+    # @return a JobResult, or None if no job is in flight or if the timeout expired.
+    def wait_result(self, timeout_seconds: float = None):
+        busy_workers = [worker for worker in self.workers if worker.curr_job is not None]
+        if not busy_workers:
+            return None
+        ready_conns = wait([worker.conn for worker in busy_workers], timeout=timeout_seconds)
+        if not ready_conns:
+            return None
+        worker_id, worker = next(filter(lambda worker_pair: worker_pair[1].conn is ready_conns[0], enumerate(self.workers)))
+        job_id, args, start_time, _ = worker.curr_job
+        worker.curr_job = None
+        try:
+            _, status, ret, error_str, duration_seconds = worker.conn.recv()
+            return JobResult(job_id, args, status, ret, error_str, duration_seconds)
+        except EOFError:
+            worker.process.join()
+            worker.conn.close()
+            self.workers[worker_id] = _SchedulerWorker(self.job_fn, self.initializer, self.initargs)
+            return JobResult(job_id, args, JOB_STATUS_CRASHED, None, f"Worker exited with code {worker.process.exitcode}.", time.time() - start_time)
+
+    def close(self):
+        for worker in self.workers:
+            if worker.curr_job is None:
+                worker.stop()
+            else:
+                worker.kill()
+        for worker in self.workers:
+            worker.process.join(timeout=1)
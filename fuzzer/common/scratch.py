@@ -0,0 +1,145 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module manages the scratch space of the per-test temporary artifacts, such as the ELFs, the Spike debug command files and the register dumps.
+# The scratch space lives in RAM, under /dev/shm, instead of PATH_TO_TMP, which may be on a shared filesystem.
+# - Each process has its own scratch directory, so that the workers never contend on the same directory.
+# - The bytes in the scratch directory of each process are bounded by a quota. Beyond it, the new artifacts are written to PATH_TO_TMP.
+# - The scratch directory is removed when its process exits normally. The directories of the processes that were killed are removed by the next process that creates its scratch directory.
+# - If KEEP_FAILING_ARTIFACTS is True, then the artifacts of the failing tests are copied to PATH_TO_KEPT_ARTIFACTS before being released.
+# If NO_REMOVE_TMPFILES is True, then the artifacts are written to PATH_TO_TMP as before, so that they survive the run.
+
+from params.runparams import PATH_TO_TMP, NO_REMOVE_TMPFILES
+
+import multiprocessing.util
+import os
+import shutil
+
+USE_RAM_SCRATCH = True
+RAM_SCRATCH_ROOT = '/dev/shm'
+# The maximal number of bytes in the scratch directory of each process.
+SCRATCH_QUOTA_BYTES_PER_PROCESS = 256 * (1 << 20)
+
+KEEP_FAILING_ARTIFACTS = False
+PATH_TO_KEPT_ARTIFACTS = os.path.join(PATH_TO_TMP, 'keptartifacts')
+
+_SCRATCH_DIR_PREFIX = f"cascade_scratch_{os.getuid()}_"
+
+# @return True iff the process exists.
+def _is_pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+# @brief removes the scratch directories of the processes that do not exist anymore.
+def _remove_stale_scratch_dirs():
+    for dirname in os.listdir(RAM_SCRATCH_ROOT):
+        if not dirname.startswith(_SCRATCH_DIR_PREFIX):
+            continue
+        try:
+            owner_pid = int(dirname[len(_SCRATCH_DIR_PREFIX):])
+        except ValueError:
+            continue
+        if not _is_pid_alive(owner_pid):
+            shutil.rmtree(os.path.join(RAM_SCRATCH_ROOT, dirname), ignore_errors=True)
+
+class ScratchSpace:
+    def __init__(self):
+        self.pid = os.getpid()
+        self.scratch_dir = None
+        if USE_RAM_SCRATCH and not NO_REMOVE_TMPFILES and os.access(RAM_SCRATCH_ROOT, os.W_OK):
+            _remove_stale_scratch_dirs()
+            self.scratch_dir = os.path.join(RAM_SCRATCH_ROOT, f"{_SCRATCH_DIR_PREFIX}{self.pid}")
+            os.makedirs(self.scratch_dir, exist_ok=True)
+            # The forked children inherit the finalizer, hence it checks the pid.
+            multiprocessing.util.Finalize(None, self.cleanup, exitpriority=0)
+        # The subdirectories that already exist.
+        self.existing_subdirs = set()
+        # path: number of bytes reserved in the scratch directory
+        self.reserved_bytes = dict()
+        self.num_reserved_bytes = 0
+        # Instrumentation
+        self.num_spilled_files = 0
+
+    # @param size_hint_bytes an upper bound of the size of the file, for the quota.
+    # @return a path for the artifact, in the scratch directory if the quota permits, else in PATH_TO_TMP.
+    def get_path(self, filename: str, subdir: str = None, size_hint_bytes: int = 0) -> str:
+        is_in_scratch_dir = self.scratch_dir is not None and self.num_reserved_bytes + size_hint_bytes <= SCRATCH_QUOTA_BYTES_PER_PROCESS
+        if self.scratch_dir is not None and not is_in_scratch_dir:
+            self.num_spilled_files += 1
+        base_dir = self.scratch_dir if is_in_scratch_dir else PATH_TO_TMP
+        if subdir is not None:
+            base_dir = os.path.join(base_dir, subdir)
+        if base_dir not in self.existing_subdirs:
+            os.makedirs(base_dir, exist_ok=True)
+            self.existing_subdirs.add(base_dir)
+        ret = os.path.join(base_dir, filename)
+        if is_in_scratch_dir:
+            self.num_reserved_bytes += size_hint_bytes - self.reserved_bytes.get(ret, 0)
+            self.reserved_bytes[ret] = size_hint_bytes
+        return ret
+
+    # @brief removes the artifact and frees its quota.
+    def release(self, path: str):
+        os.remove(path)
+        self.num_reserved_bytes -= self.reserved_bytes.pop(path, 0)
+
+    def cleanup(self):
+        if self.pid == os.getpid() and self.scratch_dir is not None:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+__scratch_space = None
+
+# @return the scratch space of the current process. A new one is created after a fork.
+def get_scratch_space() -> ScratchSpace:
+    global __scratch_space
+    if __scratch_space is None or __scratch_space.pid != os.getpid():
+        __scratch_space = ScratchSpace()
+    return __scratch_space
+
+###
+# Exposed functions
+###
+
+# @param subdir None, or a subdirectory of the scratch directory, e.g., `dbgcmds`.
+# @param size_hint_bytes an upper bound of the size of the file, for the quota.
+# @return the path of a temporary artifact.
+def get_scratch_path(filename: str, subdir: str = None, size_hint_bytes: int = 0) -> str:
+    return get_scratch_space().get_path(filename, subdir, size_hint_bytes)
+
+# @brief removes a temporary artifact obtained from get_scratch_path. Does nothing if NO_REMOVE_TMPFILES is True.
+def release_scratch_file(path: str):
+    if NO_REMOVE_TMPFILES:
+        return
+    get_scratch_space().release(path)
+
+# @brief copies an artifact of a failing test to PATH_TO_KEPT_ARTIFACTS, if KEEP_FAILING_ARTIFACTS is True.
+# @return the path of the kept copy, or None.
+def keep_failing_artifact(path: str):
+    if not KEEP_FAILING_ARTIFACTS:
+        return None
+    os.makedirs(PATH_TO_KEPT_ARTIFACTS, exist_ok=True)
+    kept_path = os.path.join(PATH_TO_KEPT_ARTIFACTS, os.path.basename(path))
+    shutil.copyfile(path, kept_path)
+    return kept_path
+
+# @brief creates an anonymous in-memory file, for the programs that only need a path to read from.
+# @return a pair (fd, path). The path is only valid in the processes that inherit fd, e.g., through the pass_fds argument of subprocess. The caller must close fd.
+def gen_memfd_path(name: str, content: bytes):
+    fd = os.memfd_create(name)
+    try:
+        num_written_bytes = 0
+        while num_written_bytes < len(content):
+            num_written_bytes += os.write(fd, content[num_written_bytes:])
+    except:
+        os.close(fd)
+        raise
+    return fd, f"/proc/self/fd/{fd}"
+
+# True iff gen_memfd_path is supported.
+HAS_MEMFD = hasattr(os, 'memfd_create')
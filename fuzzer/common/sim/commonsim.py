@@ -8,7 +8,8 @@ from params.runparams import DO_ASSERT
 # Replace the environment with new values.
 # sram_taintfile: path relative to cascadedir
 # bootrom_elf: path relative to cascadedir
-def setup_sim_env(sram_elf, bootrom_elf, tracefile, simtime, cascadedir, coveragefile, verbose: bool = True):
+# base_env: if not None, a snapshot of the OS environment to start from, typically from the design context, instead of copying the OS environment.
+def setup_sim_env(sram_elf, bootrom_elf, tracefile, simtime, cascadedir, coveragefile, verbose: bool = True, base_env = None):
     if DO_ASSERT:
         assert isinstance(sram_elf, str)
         assert isinstance(bootrom_elf, str) or bootrom_elf is None
@@ -21,7 +22,7 @@ def setup_sim_env(sram_elf, bootrom_elf, tracefile, simtime, cascadedir, coverag
         bootrom_elf = os.path.join(cascadedir, bootrom_elf)
 
     # Copy the OS environment.
-    my_env = os.environ.copy()
+    my_env = os.environ.copy() if base_env is None else dict(base_env)
 
     # Replace the environment simlen.
     my_env["SIMLEN"] = str(simtime)
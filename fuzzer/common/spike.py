@@ -5,15 +5,32 @@
 # This script is a helper for interacting with spike.
 
 import itertools
+import numpy as np
 import os
+import re
+import selectors
 import subprocess
+import time
 from pathlib import Path
 from params.runparams import DO_ASSERT, PATH_TO_TMP, NO_REMOVE_TMPFILES
 from functools import cache
+from multiprocessing.pool import ThreadPool
+from common.scratch import HAS_MEMFD, gen_memfd_path, get_scratch_path, release_scratch_file
 
 SPIKE_STARTADDR = 0x80000000
 SPIKE_MEDELEG_MASK = 0xb3ff
 
+# If True, the debug command files of the Spike subprocesses are anonymous in-memory files instead of files in the scratch space.
+USE_MEMFD_FOR_DBGCMDS = True
+# If True, run_trace_all_pcs reads the PCs from the instruction log of a single Spike run command instead of issuing one debug command per instruction.
+USE_INSTR_LOG_PC_TRACE = True
+# If True, the register dumps are parsed from the raw output of Spike with numpy (see parse_trace_regs_at_pc_locs_out_arrays) instead of line by line.
+USE_VECTORIZED_SPIKE_OUT_PARSER = True
+# Below this number of register dump requests, the fixed cost of the vectorized parser exceeds the cost of the scalar parser (see benchmarking/spikeoutparseperf).
+VECTORIZED_SPIKE_OUT_PARSER_MIN_NUM_REQS = 400
+# By default, the maximal number of Spike subprocesses that run_trace_regs_at_pc_locs_batch runs concurrently.
+SPIKE_BATCH_MAX_NUM_INFLIGHT = 8
+
 ###
 # Helper functions
 ###
@@ -32,7 +49,7 @@ FPREG_ABINAMES = [
 #   s8: 0x0000000000000000  s9: 0x0000000000000000 s10: 0x0000000000000000 s11: 0x0000000000000000
 #   t3: 0x0000000000000000  t4: 0x0000000000000000  t5: 0x0000000000000000  t6: 0x0000000000000000
 # extracts all the register values. This can be preceded by text, but by no occurrence of `zero: 0x`.
-def __get_all_regs_from_spike_out(spike_out: str, is_design_64bit: bool):
+def _get_all_regs_from_spike_out_scalar(spike_out: bytes, is_design_64bit: bool):
     ret = [0 for i in range(32)]
     zero_index = spike_out.index(b'zero: 0x')+8
     # First row (ignore 0)
@@ -50,15 +67,21 @@ def __get_all_regs_from_spike_out(spike_out: str, is_design_64bit: bool):
             ret[curr_index_in_ret] = int(spike_out[curr_index_in_spikeout:curr_index_in_spikeout+8+8*int(is_design_64bit)].decode('ascii'), base=16)
     return ret
 
-# @brief Generate the spike debug command file (as understood by spike --debug-cmd) and returns its path.
-# This command file will prompt the required registers at the required pc locations
+# @brief same as _get_all_regs_from_spike_out_scalar, with the vectorized parser if enabled.
+def __get_all_regs_from_spike_out(spike_out: bytes, is_design_64bit: bool):
+    if USE_VECTORIZED_SPIKE_OUT_PARSER:
+        ret = get_all_regs_array_from_spike_out(spike_out, is_design_64bit)
+        if ret is not None:
+            return ret.tolist()
+    return _get_all_regs_from_spike_out_scalar(spike_out, is_design_64bit)
+
+# @brief Generate the spike debug commands (as understood by spike --debug-cmd or by the interactive debug console).
+# These commands will prompt the required registers at the required pc locations
 # @param regdump_reqs: an ordered (in program order, NOT necessarily in increasing PC order) list of tuples (pc_to_req, tuple of registers to prompt). The register is dumped before the instruction at that PC is executed. Note: we currently do not use producer/consumer instructions for branches. If the third element of the tuple is 'priv', then we do not dump a register value or a CSR value, but the privilege mode.
 # @param dump_freg_format either '' or 'd' for 'fregd' or 's' for 'fregs'.
-def __gen_spike_dbgcmd_file_for_trace_regs_at_pc_locs(identifier_str: str, startpc: int, regdump_reqs, dump_final_reg_vals: bool, final_addr: int, num_fp_regs: int, dump_freg_format: str = ''):
+# @return a list of command strings, terminated by the quit command.
+def _gen_spike_dbgcmds_for_trace_regs_at_pc_locs(startpc: int, regdump_reqs, dump_final_reg_vals: bool, final_addr: int, num_fp_regs: int, dump_freg_format: str = ''):
     assert not dump_freg_format # This assertion is to check whether we actually can remove dump_freg_format.
-    path_to_debug_file = os.path.join(PATH_TO_TMP, 'dbgcmds', f"cmds_trace_regs_at_pc_locs_{identifier_str}")
-    # if not os.path.exists(path_to_debug_file):
-    Path(os.path.dirname(path_to_debug_file)).mkdir(parents=True, exist_ok=True)
     spike_debug_commands = [
         f"until pc 0 0x{startpc:x}"
     ]
@@ -83,7 +106,14 @@ def __gen_spike_dbgcmd_file_for_trace_regs_at_pc_locs(identifier_str: str, start
             for fp_reg_id in range(num_fp_regs):
                 spike_debug_commands.append(f"freg{dump_freg_format} 0 {FPREG_ABINAMES[fp_reg_id]}")
     spike_debug_commands.append('q\n')
-    spike_debug_commands_str = '\n'.join(spike_debug_commands)
+    return spike_debug_commands
+
+# @brief Generate the spike debug command file (as understood by spike --debug-cmd) and returns its path.
+# This command file will prompt the required registers at the required pc locations
+# @param regdump_reqs: see _gen_spike_dbgcmds_for_trace_regs_at_pc_locs.
+def __gen_spike_dbgcmd_file_for_trace_regs_at_pc_locs(identifier_str: str, startpc: int, regdump_reqs, dump_final_reg_vals: bool, final_addr: int, num_fp_regs: int, dump_freg_format: str = ''):
+    path_to_debug_file = get_scratch_path(f"cmds_trace_regs_at_pc_locs_{identifier_str}", 'dbgcmds')
+    spike_debug_commands_str = '\n'.join(_gen_spike_dbgcmds_for_trace_regs_at_pc_locs(startpc, regdump_reqs, dump_final_reg_vals, final_addr, num_fp_regs, dump_freg_format))
 
     with open(path_to_debug_file, 'w') as f:
         f.write(spike_debug_commands_str)
@@ -93,9 +123,7 @@ def __gen_spike_dbgcmd_file_for_trace_regs_at_pc_locs(identifier_str: str, start
 # @brief Generate the spike debug command file (as understood by spike --debug-cmd) and returns its path.
 # This command file will prompt the PC at every cycle
 def __gen_spike_dbgcmd_file_for_trace_pcs(identifier_str: str, numinstrs: int, startpc: int, dump_final_reg_vals: bool, num_fp_regs: int):
-    path_to_debug_file = os.path.join(PATH_TO_TMP, 'dbgcmds', f"cmds_trace_pcs_{identifier_str}")
-    # if not os.path.exists(path_to_debug_file):
-    Path(os.path.dirname(path_to_debug_file)).mkdir(parents=True, exist_ok=True)
+    path_to_debug_file = get_scratch_path(f"cmds_trace_pcs_{identifier_str}", 'dbgcmds')
     spike_debug_commands = [
         f"until pc 0 0x{startpc:x}"
     ]
@@ -120,35 +148,27 @@ def __gen_spike_dbgcmd_file_for_trace_pcs(identifier_str: str, numinstrs: int, s
 # Exposed functions
 ###
 
-# @brief runs and traces every PC location.
-# @param regdump_reqs: see __gen_spike_dbgcmd_file_for_trace_regs_at_pc_locs
-# @param dump_freg_format either '' or 'd' for 'fregd' or 's' for 'fregs'
-# @return a list of register values. If dump_final_reg_vals is True, then the output is a pair, whose second element is a pair of array of final register values, for int and float registers
-def run_trace_regs_at_pc_locs(identifier_str: str, elfpath: str, rvflags: str, startpc: int, regdump_reqs, dump_final_reg_vals: bool, final_addr: int, num_fp_regs: int, has_fpdouble_support: bool, dump_freg_format: str = '') -> list:
-    if DO_ASSERT:
-        assert '32' in rvflags or '64' in rvflags
-
-    # First, create the file that contains the commands, if it does not already exist
-    path_to_debug_file = __gen_spike_dbgcmd_file_for_trace_regs_at_pc_locs(identifier_str, startpc, regdump_reqs, dump_final_reg_vals, final_addr, num_fp_regs, dump_freg_format)
-
-    # Second, run the Spike command
-    spike_shell_command = (
-        "spike",
-        "-d",
-        f"--debug-cmd={path_to_debug_file}",
-        f"--isa={rvflags}",
-        f"--pc={startpc}",
-        elfpath
-    )
-
-    try:
-        spike_out = subprocess.run(spike_shell_command, capture_output=True, timeout=get_spike_timeout_seconds()).stderr
-    except Exception as e:
-        raise Exception(f"Spike timeout (A) for identifier str: {identifier_str}. Command: {' '.join(filter(lambda s: '--debug-cmd' not in s, spike_shell_command))}  Debug file: {path_to_debug_file}")
-    if not NO_REMOVE_TMPFILES:
-        os.remove(path_to_debug_file)
-        del path_to_debug_file
-
+# @brief parses the stderr output of spike for the commands generated by _gen_spike_dbgcmds_for_trace_regs_at_pc_locs.
+# @return see run_trace_regs_at_pc_locs.
+def _parse_trace_regs_at_pc_locs_out(spike_out: bytes, rvflags: str, regdump_reqs, dump_final_reg_vals: bool, num_fp_regs: int, has_fpdouble_support: bool, dump_freg_format: str = ''):
+    if USE_VECTORIZED_SPIKE_OUT_PARSER and not dump_freg_format and len(regdump_reqs) >= VECTORIZED_SPIKE_OUT_PARSER_MIN_NUM_REQS:
+        parsed_arrays = parse_trace_regs_at_pc_locs_out_arrays(spike_out, '64' in rvflags, len(regdump_reqs), dump_final_reg_vals, num_fp_regs, has_fpdouble_support)
+        if parsed_arrays is not None:
+            regvals_low, regvals_high, is_priv_dump, final_intreg_vals, final_fpureg_vals = parsed_arrays
+            ret = regvals_low.tolist()
+            for dumpreq_id in np.flatnonzero(regvals_high).tolist():
+                ret[dumpreq_id] |= int(regvals_high[dumpreq_id]) << 64
+            for dumpreq_id in np.flatnonzero(is_priv_dump).tolist():
+                ret[dumpreq_id] = chr(ret[dumpreq_id])
+            if dump_final_reg_vals:
+                return ret, (final_intreg_vals.tolist(), final_fpureg_vals.tolist())
+            return ret
+    # The scalar parser also raises the errors for the unexpected outputs.
+    return _parse_trace_regs_at_pc_locs_out_scalar(spike_out, rvflags, regdump_reqs, dump_final_reg_vals, num_fp_regs, has_fpdouble_support, dump_freg_format)
+
+# @brief parses the output line by line. This is the historical parser, kept as a reference and for the outputs that the vectorized parser does not expect.
+# @return see run_trace_regs_at_pc_locs.
+def _parse_trace_regs_at_pc_locs_out_scalar(spike_out: bytes, rvflags: str, regdump_reqs, dump_final_reg_vals: bool, num_fp_regs: int, has_fpdouble_support: bool, dump_freg_format: str = ''):
     addr_str_splitted = spike_out.split(b"\n")
     addr_str_splitted = list(filter(lambda s: b'exception' not in s, addr_str_splitted))
     ret = []
@@ -165,7 +185,7 @@ def run_trace_regs_at_pc_locs(identifier_str: str, elfpath: str, rvflags: str, s
 
     # Potentially get the final register values
     if dump_final_reg_vals:
-        final_intreg_vals = __get_all_regs_from_spike_out(spike_out, '64' in rvflags)
+        final_intreg_vals = _get_all_regs_from_spike_out_scalar(spike_out, '64' in rvflags)
         final_fpureg_vals = []
         # Get the FPU regs
         if num_fp_regs:
@@ -185,13 +205,19 @@ def run_trace_regs_at_pc_locs(identifier_str: str, elfpath: str, rvflags: str, s
     else:
         return ret
 
-# Only used for debugging purposes
-# @brief runs and traces every PC location.
-# @return a list of PCs. If dump_final_reg_vals is True, then the output is a pair, whose second element is an array of final register values
-def run_trace_all_pcs(identifier_str: str, elfpath: str, rvflags: str, numinstrs: int, startpc: int, dump_final_reg_vals: bool, num_fp_regs: int, has_fpdouble_support: bool, fuzzerstate_for_debug: list) -> list:
-    # First, create the file that contains the commands, if it does not already exist
-    path_to_debug_file = __gen_spike_dbgcmd_file_for_trace_pcs(identifier_str, numinstrs, startpc, dump_final_reg_vals, num_fp_regs)
-    
+# @brief runs spike once, communicating through a debug command file.
+# @param regdump_reqs: see _gen_spike_dbgcmds_for_trace_regs_at_pc_locs
+# @return the stderr output of spike, to be parsed by _parse_trace_regs_at_pc_locs_out.
+def _run_spike_for_trace_regs_at_pc_locs(identifier_str: str, elfpath: str, rvflags: str, startpc: int, regdump_reqs, dump_final_reg_vals: bool, final_addr: int, num_fp_regs: int, dump_freg_format: str = '') -> bytes:
+    if DO_ASSERT:
+        assert '32' in rvflags or '64' in rvflags
+
+    # First, create the file that contains the commands, in memory if possible
+    if USE_MEMFD_FOR_DBGCMDS and HAS_MEMFD and not NO_REMOVE_TMPFILES:
+        debug_fd, path_to_debug_file = gen_memfd_path(f"cmds_trace_regs_at_pc_locs_{identifier_str}", '\n'.join(_gen_spike_dbgcmds_for_trace_regs_at_pc_locs(startpc, regdump_reqs, dump_final_reg_vals, final_addr, num_fp_regs, dump_freg_format)).encode())
+    else:
+        debug_fd, path_to_debug_file = None, __gen_spike_dbgcmd_file_for_trace_regs_at_pc_locs(identifier_str, startpc, regdump_reqs, dump_final_reg_vals, final_addr, num_fp_regs, dump_freg_format)
+
     # Second, run the Spike command
     spike_shell_command = (
         "spike",
@@ -203,16 +229,55 @@ def run_trace_all_pcs(identifier_str: str, elfpath: str, rvflags: str, numinstrs
     )
 
     try:
-        spike_out = subprocess.run(spike_shell_command, capture_output=True, timeout=get_spike_timeout_seconds()).stderr
+        spike_out = subprocess.run(spike_shell_command, capture_output=True, timeout=get_spike_timeout_seconds(), pass_fds=() if debug_fd is None else (debug_fd,)).stderr
     except Exception as e:
-        raise Exception(f"Spike timeout (B) for identifier str: {identifier_str}.\nCommand: {' '.join(spike_shell_command)}")
-
-    if not NO_REMOVE_TMPFILES:
-        os.remove(path_to_debug_file)
+        raise Exception(f"Spike timeout (A) for identifier str: {identifier_str}. Command: {' '.join(filter(lambda s: '--debug-cmd' not in s, spike_shell_command))}  Debug file: {path_to_debug_file}")
+    finally:
+        if debug_fd is not None:
+            os.close(debug_fd)
+    if debug_fd is None and not NO_REMOVE_TMPFILES:
+        release_scratch_file(path_to_debug_file)
         del path_to_debug_file
 
+    return spike_out
+
+# @brief runs and traces every PC location.
+# @param regdump_reqs: see _gen_spike_dbgcmds_for_trace_regs_at_pc_locs
+# @param dump_freg_format either '' or 'd' for 'fregd' or 's' for 'fregs'
+# @return a list of register values. If dump_final_reg_vals is True, then the output is a pair, whose second element is a pair of array of final register values, for int and float registers
+def run_trace_regs_at_pc_locs(identifier_str: str, elfpath: str, rvflags: str, startpc: int, regdump_reqs, dump_final_reg_vals: bool, final_addr: int, num_fp_regs: int, has_fpdouble_support: bool, dump_freg_format: str = '') -> list:
+    spike_out = _run_spike_for_trace_regs_at_pc_locs(identifier_str, elfpath, rvflags, startpc, regdump_reqs, dump_final_reg_vals, final_addr, num_fp_regs, dump_freg_format)
+    return _parse_trace_regs_at_pc_locs_out(spike_out, rvflags, regdump_reqs, dump_final_reg_vals, num_fp_regs, has_fpdouble_support, dump_freg_format)
+
+# @return the return value of run_trace_regs_at_pc_locs, or the exception that it raised.
+def _run_trace_regs_at_pc_locs_or_exception(curr_args: tuple):
+    try:
+        return run_trace_regs_at_pc_locs(*curr_args)
+    except Exception as e:
+        return e
+
+# @brief runs the register traces of several ELFs. The Spike subprocesses run concurrently, at most max_num_inflight at a time.
+# @param batch_args a list of argument tuples of run_trace_regs_at_pc_locs, one per ELF.
+# @param max_num_inflight the maximal number of Spike subprocesses that run concurrently. By default, SPIKE_BATCH_MAX_NUM_INFLIGHT.
+# @return a list with, for each ELF, the return value of run_trace_regs_at_pc_locs, or the exception that it would raise.
+def run_trace_regs_at_pc_locs_batch(batch_args: list, max_num_inflight: int = None) -> list:
+    if max_num_inflight is None:
+        max_num_inflight = SPIKE_BATCH_MAX_NUM_INFLIGHT
+    if DO_ASSERT:
+        assert max_num_inflight > 0
+    num_threads = min(max_num_inflight, len(batch_args))
+    if num_threads <= 1:
+        return list(map(_run_trace_regs_at_pc_locs_or_exception, batch_args))
+    # The threads only wait for their Spike subprocess, and the debug command files are private to each run.
+    with ThreadPool(processes=num_threads) as pool:
+        return pool.map(_run_trace_regs_at_pc_locs_or_exception, batch_args, chunksize=1)
+
+# @brief parses the stderr output of spike for the commands generated by __gen_spike_dbgcmd_file_for_trace_pcs.
+# @return see run_trace_all_pcs.
+def _parse_trace_all_pcs_out(spike_out: bytes, rvflags: str, numinstrs: int, dump_final_reg_vals: bool, num_fp_regs: int, has_fpdouble_support: bool):
     addr_str_splitted = spike_out.split(b"\n")
-    addr_str_splitted = list(filter(lambda s: b'exception' not in s and b'tval 0x' not in s, addr_str_splitted))
+    # The `core 0: >>>>  <symbol>` lines are printed by noisy steps when the ELF has a symbol at the PC, e.g., for the RTL ELFs.
+    addr_str_splitted = list(filter(lambda s: b'exception' not in s and b'tval 0x' not in s and b'>>>>' not in s, addr_str_splitted))
     ret = []
     for instr_id in range(numinstrs):
         # If there is no exception.
@@ -239,6 +304,344 @@ def run_trace_all_pcs(identifier_str: str, elfpath: str, rvflags: str, numinstrs
     else:
         return ret
 
+# @brief runs and traces every PC location, with one debug command per instruction. This is the historical path, kept as a reference and for the benchmarks.
+# @return see run_trace_all_pcs.
+def run_trace_all_pcs_per_step(identifier_str: str, elfpath: str, rvflags: str, numinstrs: int, startpc: int, dump_final_reg_vals: bool, num_fp_regs: int, has_fpdouble_support: bool, fuzzerstate_for_debug: list) -> list:
+    # First, create the file that contains the commands, if it does not already exist
+    path_to_debug_file = __gen_spike_dbgcmd_file_for_trace_pcs(identifier_str, numinstrs, startpc, dump_final_reg_vals, num_fp_regs)
+    
+    # Second, run the Spike command
+    spike_shell_command = (
+        "spike",
+        "-d",
+        f"--debug-cmd={path_to_debug_file}",
+        f"--isa={rvflags}",
+        f"--pc={startpc}",
+        elfpath
+    )
+
+    try:
+        spike_out = subprocess.run(spike_shell_command, capture_output=True, timeout=get_spike_timeout_seconds()).stderr
+    except Exception as e:
+        raise Exception(f"Spike timeout (B) for identifier str: {identifier_str}.\nCommand: {' '.join(spike_shell_command)}")
+
+    if not NO_REMOVE_TMPFILES:
+        release_scratch_file(path_to_debug_file)
+        del path_to_debug_file
+
+    return _parse_trace_all_pcs_out(spike_out, rvflags, numinstrs, dump_final_reg_vals, num_fp_regs, has_fpdouble_support)
+
+###
+# Vectorized parsing of the register dumps
+###
+
+# The output of the debug console is parsed from its raw bytes, viewed as a numpy uint8 array, without splitting it into lines or converting the values one by one.
+# The lines are located from the positions of the newlines, and the hexadecimal values are decoded by groups of fields of the same width.
+# The parsers return None if the output does not have the expected layout, in which case the callers fall back to the scalar parsers.
+
+# Maps each ASCII lowercase hexadecimal digit to its value.
+_HEX_DIGIT_VALUES = np.zeros(256, dtype=np.uint64)
+_HEX_DIGIT_VALUES[np.frombuffer(b'0123456789abcdef', dtype=np.uint8)] = np.arange(16, dtype=np.uint64)
+
+# @param hex_strs a list of hexadecimal strings, all of num_digits digits.
+# @return a numpy uint64 array of their values.
+def _hex_strs_to_uint64(hex_strs: list, num_digits: int):
+    digits = _HEX_DIGIT_VALUES[np.frombuffer(b''.join(hex_strs), dtype=np.uint8).reshape(-1, num_digits)]
+    ret = np.zeros(len(hex_strs), dtype=np.uint64)
+    for digit_id in range(num_digits):
+        ret = (ret << np.uint64(4)) | digits[:, digit_id]
+    return ret
+
+_IS_HEX_DIGIT = np.zeros(256, dtype=bool)
+_IS_HEX_DIGIT[np.frombuffer(b'0123456789abcdef', dtype=np.uint8)] = True
+
+_EXCEPTION_REGEX = re.compile(rb'exception')
+_FPREG_DUMP_PREFIX = np.frombuffer(b'0xffffffff', dtype=np.uint8)
+
+# The offsets of the register values in the output of the `reg 0` command, relative to the first value (see _get_all_regs_from_spike_out_scalar).
+_ALL_REGS_DUMP_OFFSETS = {
+    is_design_64bit: np.array([(65+32*int(is_design_64bit))*(reg_id >> 2) + (16+8*int(is_design_64bit))*(reg_id & 3) for reg_id in range(32)], dtype=np.int64) for is_design_64bit in (False, True)
+}
+
+# @param offsets a numpy int64 array of offsets in spike_out_arr.
+# @return a numpy uint64 array of the values of the fields of num_digits (at most 16) hexadecimal digits at the offsets, or None if a field contains another character.
+def _decode_hex_fields(spike_out_arr, offsets, num_digits: int):
+    chars = spike_out_arr[offsets[:, np.newaxis] + np.arange(num_digits)]
+    if not _IS_HEX_DIGIT[chars].all():
+        return None
+    digits = _HEX_DIGIT_VALUES[chars]
+    ret = np.zeros(len(offsets), dtype=np.uint64)
+    for digit_id in range(num_digits):
+        ret = (ret << np.uint64(4)) | digits[:, digit_id]
+    return ret
+
+# @param widths a numpy int64 array of the numbers of digits of the fields, between 1 and 16.
+# @return see _decode_hex_fields.
+def _decode_var_width_hex_fields(spike_out_arr, offsets, widths):
+    ret = np.zeros(len(offsets), dtype=np.uint64)
+    for num_digits in np.unique(widths).tolist():
+        field_ids = np.flatnonzero(widths == num_digits)
+        field_vals = _decode_hex_fields(spike_out_arr, offsets[field_ids], num_digits)
+        if field_vals is None:
+            return None
+        ret[field_ids] = field_vals
+    return ret
+
+# @return a pair of numpy int64 arrays (start offsets, end offsets) of the lines of the output that do not contain `exception`, as the scalar parser filters them.
+def _get_spike_out_line_bounds(spike_out: bytes, spike_out_arr):
+    newline_offsets = np.flatnonzero(spike_out_arr == ord('\n'))
+    line_starts = np.concatenate((np.zeros(1, dtype=np.int64), newline_offsets + 1))
+    line_ends = np.concatenate((newline_offsets, np.full(1, len(spike_out), dtype=np.int64)))
+    exception_offsets = [exception_match.start() for exception_match in _EXCEPTION_REGEX.finditer(spike_out)]
+    if exception_offsets:
+        is_line_kept = np.ones(len(line_starts), dtype=bool)
+        is_line_kept[np.searchsorted(newline_offsets, exception_offsets)] = False
+        line_starts, line_ends = line_starts[is_line_kept], line_ends[is_line_kept]
+    return line_starts, line_ends
+
+# @brief vectorized counterpart of _get_all_regs_from_spike_out_scalar.
+# @return a numpy uint64 array of the 32 integer register values, or None.
+def get_all_regs_array_from_spike_out(spike_out: bytes, is_design_64bit: bool):
+    zero_index = spike_out.find(b'zero: 0x')
+    if zero_index == -1:
+        return None
+    offsets = zero_index + 8 + _ALL_REGS_DUMP_OFFSETS[is_design_64bit]
+    num_digits = 8+8*int(is_design_64bit)
+    if offsets[-1] + num_digits > len(spike_out):
+        return None
+    return _decode_hex_fields(np.frombuffer(spike_out, dtype=np.uint8), offsets, num_digits)
+
+# @brief vectorized counterpart of _parse_trace_regs_at_pc_locs_out_scalar, without dump_freg_format.
+# @param num_reqs the number of register dump requests.
+# @return None, or a tuple of numpy arrays (low 64 bits of the dumped values, upper 64 bits of the dumped values, which are only non-zero for the 128-bit floating-point dumps, whether each request dumps the privilege, in which case its low bits are the ASCII code of the privilege letter, final int reg values, final fpu reg values). The last two are None if dump_final_reg_vals is False.
+def parse_trace_regs_at_pc_locs_out_arrays(spike_out: bytes, is_design_64bit: bool, num_reqs: int, dump_final_reg_vals: bool, num_fp_regs: int, has_fpdouble_support: bool):
+    spike_out_arr = np.frombuffer(spike_out, dtype=np.uint8)
+    line_starts, line_ends = _get_spike_out_line_bounds(spike_out, spike_out_arr)
+    # As in the scalar parser, the first line precedes the dumps.
+    if len(line_starts) < num_reqs + 1:
+        return None
+
+    # The dumps of the requests, one per line: either 0x followed by the value, or the privilege letter.
+    dump_starts = line_starts[1:num_reqs+1]
+    dump_lens = line_ends[1:num_reqs+1] - dump_starts
+    is_priv_dump = dump_lens == 1
+    is_value_dump = dump_lens > 2
+    is_value_dump[is_value_dump] = (spike_out_arr[dump_starts[is_value_dump]] == ord('0')) & (spike_out_arr[dump_starts[is_value_dump]+1] == ord('x'))
+    if not (is_priv_dump | is_value_dump).all():
+        return None
+    if DO_ASSERT and not np.isin(spike_out_arr[dump_starts[is_priv_dump]], np.frombuffer(b'MSU', dtype=np.uint8)).all():
+        return None
+
+    regvals_low = np.zeros(num_reqs, dtype=np.uint64)
+    regvals_high = np.zeros(num_reqs, dtype=np.uint64)
+    regvals_low[is_priv_dump] = spike_out_arr[dump_starts[is_priv_dump]]
+    value_dump_ids = np.flatnonzero(is_value_dump)
+    value_starts = dump_starts[value_dump_ids] + 2
+    value_widths = dump_lens[value_dump_ids] - 2
+    if len(value_dump_ids):
+        if value_widths.max() > 32:
+            return None
+        # The floating-point dumps may have up to 128 bits.
+        high_widths = np.maximum(value_widths - 16, 0)
+        low_values = _decode_var_width_hex_fields(spike_out_arr, value_starts + high_widths, value_widths - high_widths)
+        if low_values is None:
+            return None
+        regvals_low[value_dump_ids] = low_values
+        high_ids = np.flatnonzero(high_widths)
+        if len(high_ids):
+            high_values = _decode_var_width_hex_fields(spike_out_arr, value_starts[high_ids], high_widths[high_ids])
+            if high_values is None:
+                return None
+            regvals_high[value_dump_ids[high_ids]] = high_values
+
+    if not dump_final_reg_vals:
+        return regvals_low, regvals_high, is_priv_dump, None, None
+
+    final_intreg_vals = get_all_regs_array_from_spike_out(spike_out, is_design_64bit)
+    if final_intreg_vals is None:
+        return None
+    final_fpureg_vals = np.zeros(0, dtype=np.uint64)
+    if num_fp_regs:
+        # Find the base for the FPU reg dumps, which start with 0xffffffff.
+        candidate_starts = line_starts[num_reqs+8:]
+        is_candidate = line_ends[num_reqs+8:] - candidate_starts >= len(_FPREG_DUMP_PREFIX)
+        candidate_chars = spike_out_arr[np.minimum(candidate_starts[:, np.newaxis] + np.arange(len(_FPREG_DUMP_PREFIX)), len(spike_out_arr)-1)]
+        fp_base_row_candidates = np.flatnonzero(is_candidate & (candidate_chars == _FPREG_DUMP_PREFIX).all(axis=1))
+        if not len(fp_base_row_candidates) or num_reqs + 8 + fp_base_row_candidates[0] + num_fp_regs > len(line_starts):
+            return None
+        fp_base_row_addr = num_reqs + 8 + fp_base_row_candidates[0]
+        fp_value_starts = line_starts[fp_base_row_addr:fp_base_row_addr+num_fp_regs] + 18+8*int(not has_fpdouble_support)
+        fp_value_widths = line_ends[fp_base_row_addr:fp_base_row_addr+num_fp_regs] - fp_value_starts
+        if fp_value_widths.min() < 1 or fp_value_widths.max() > 16:
+            return None
+        final_fpureg_vals = _decode_var_width_hex_fields(spike_out_arr, fp_value_starts, fp_value_widths)
+        if final_fpureg_vals is None:
+            return None
+    return regvals_low, regvals_high, is_priv_dump, final_intreg_vals, final_fpureg_vals
+
+###
+# PC tracing through the instruction log
+###
+
+# The instruction log of Spike, i.e., the output of its `-l` option, has one line per executed instruction, including the instructions that trap, for example:
+# core   0: 0x0000000080000000 (0x00000297) auipc   t0, 0x0
+# It is enabled over the whole traced range by a single `r <numinstrs>` debug command, instead of one `r 1` command per instruction.
+# The commit log (`--log-commits`) is not suitable, because it omits the instructions that trap, whereas _check_pc_trace_from_spike expects them.
+# The log is streamed from a pipe into a numpy array of PCs, so that the memory footprint is 8 bytes per instruction plus a bounded read buffer, instead of the whole log.
+
+TRACE_PCS_READ_CHUNK_BYTES = 1 << 16
+
+# The log lines of the instructions. The exception lines (`core   0: exception ...`) and the trap value lines (`core   0:           tval 0x...`) do not match.
+_INSTR_LOG_PC_REGEXES = {
+    num_digits: re.compile(rb'^core +\d+: 0x([0-9a-f]{%d}) \(' % num_digits, re.MULTILINE) for num_digits in (8, 16)
+}
+
+# @brief accumulates the PCs of the instruction log, then the remainder of the output, which contains the final register dumps.
+class _InstrLogPcTraceParser:
+    def __init__(self, numinstrs: int, is_design_64bit: bool):
+        self.num_digits = 16 if is_design_64bit else 8
+        self.pc_regex = _INSTR_LOG_PC_REGEXES[self.num_digits]
+        self.pcs = np.empty(numinstrs, dtype=np.uint64)
+        self.num_pcs = 0
+        self.partial_line = b''
+        self.tail_chunks = []
+
+    def feed(self, outchunk: bytes):
+        if self.num_pcs == len(self.pcs):
+            self.tail_chunks.append(outchunk)
+            return
+        # Only parse complete lines.
+        last_newline_pos = outchunk.rfind(b'\n')
+        if last_newline_pos == -1:
+            self.partial_line += outchunk
+            return
+        outblock = self.partial_line + outchunk[:last_newline_pos+1]
+        self.partial_line = outchunk[last_newline_pos+1:]
+        hex_strs = self.pc_regex.findall(outblock)
+        num_missing_pcs = len(self.pcs) - self.num_pcs
+        if len(hex_strs) < num_missing_pcs:
+            if hex_strs:
+                self.pcs[self.num_pcs:self.num_pcs+len(hex_strs)] = _hex_strs_to_uint64(hex_strs, self.num_digits)
+                self.num_pcs += len(hex_strs)
+            return
+        # The block contains the last PC. Its remainder belongs to the tail.
+        self.pcs[self.num_pcs:] = _hex_strs_to_uint64(hex_strs[:num_missing_pcs], self.num_digits)
+        self.num_pcs = len(self.pcs)
+        last_match = next(itertools.islice(self.pc_regex.finditer(outblock), num_missing_pcs-1, None))
+        self.tail_chunks.append(outblock[last_match.end():])
+        self.tail_chunks.append(self.partial_line)
+        self.partial_line = b''
+
+    def get_pcs(self):
+        if self.num_pcs < len(self.pcs):
+            raise Exception(f"Parsing went wrong: found {self.num_pcs} PCs in the instruction log, expected {len(self.pcs)}.")
+        return self.pcs
+
+    def get_tail(self) -> bytes:
+        return b''.join(self.tail_chunks)
+
+# @param tail the output of Spike after the last traced PC.
+# @return a pair (final int reg values, final fpu reg values), as _parse_trace_all_pcs_out.
+def _parse_trace_pcs_instr_log_tail(tail: bytes, is_design_64bit: bool, num_fp_regs: int, has_fpdouble_support: bool):
+    final_intreg_vals = __get_all_regs_from_spike_out(tail, is_design_64bit)
+    final_fpureg_vals = []
+    if num_fp_regs:
+        tail_rows = list(filter(lambda s: b'exception' not in s and b'tval 0x' not in s, tail.split(b"\n")))
+        # Find the base for the FPU reg dumps, from the 7th row of the integer register dump, as _parse_trace_all_pcs_out.
+        zero_row_id = next(row_id for row_id, row in enumerate(tail_rows) if b'zero: 0x' in row)
+        for row_id in range(zero_row_id + 6, len(tail_rows)):
+            if tail_rows[row_id][:10] == b'0xffffffff':
+                fp_base_row_addr = row_id
+                break
+        else:
+            raise Exception('Parsing went wrong.')
+        for fp_reg_id in range(num_fp_regs):
+            final_fpureg_vals.append(int(tail_rows[fp_base_row_addr+fp_reg_id][18+8*int(not has_fpdouble_support):], 16))
+    return final_intreg_vals, final_fpureg_vals
+
+# @brief the debug commands for run_trace_all_pcs_instr_log. Their number does not depend on numinstrs.
+def _gen_spike_dbgcmds_for_trace_pcs_instr_log(numinstrs: int, startpc: int, dump_final_reg_vals: bool, num_fp_regs: int):
+    spike_debug_commands = [
+        f"until pc 0 0x{startpc:x}",
+        f"r {numinstrs}",
+    ]
+    if dump_final_reg_vals:
+        spike_debug_commands.append('r 1')
+        spike_debug_commands.append('reg 0')
+        for fp_reg_id in range(num_fp_regs):
+            spike_debug_commands.append(f"freg 0 {FPREG_ABINAMES[fp_reg_id]}")
+    spike_debug_commands.append('q\n')
+    return spike_debug_commands
+
+# @brief feeds the output of a process to an _InstrLogPcTraceParser as it arrives.
+# @param pass_fds see subprocess.Popen.
+def _run_trace_pcs_streaming(spike_shell_command: tuple, parser: _InstrLogPcTraceParser, timeout_seconds: float, pass_fds: tuple = ()):
+    spike_process = subprocess.Popen(spike_shell_command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, pass_fds=pass_fds)
+    deadline = time.time() + timeout_seconds
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(spike_process.stderr, selectors.EVENT_READ)
+            while True:
+                remaining_seconds = deadline - time.time()
+                if remaining_seconds <= 0 or not selector.select(remaining_seconds):
+                    raise subprocess.TimeoutExpired(spike_shell_command, timeout_seconds)
+                outchunk = os.read(spike_process.stderr.fileno(), TRACE_PCS_READ_CHUNK_BYTES)
+                if not outchunk:
+                    break
+                parser.feed(outchunk)
+        spike_process.wait(max(deadline - time.time(), 0.1))
+    finally:
+        if spike_process.poll() is None:
+            spike_process.kill()
+        spike_process.wait()
+        spike_process.stderr.close()
+
+# @brief runs and traces every PC location, from the instruction log of Spike.
+# @return see run_trace_all_pcs.
+def run_trace_all_pcs_instr_log(identifier_str: str, elfpath: str, rvflags: str, numinstrs: int, startpc: int, dump_final_reg_vals: bool, num_fp_regs: int, has_fpdouble_support: bool, fuzzerstate_for_debug: list) -> list:
+    if DO_ASSERT:
+        assert '32' in rvflags or '64' in rvflags
+    debug_commands_bytes = '\n'.join(_gen_spike_dbgcmds_for_trace_pcs_instr_log(numinstrs, startpc, dump_final_reg_vals, num_fp_regs)).encode()
+    if USE_MEMFD_FOR_DBGCMDS and HAS_MEMFD and not NO_REMOVE_TMPFILES:
+        debug_fd, path_to_debug_file = gen_memfd_path(f"cmds_trace_pcs_{identifier_str}", debug_commands_bytes)
+    else:
+        debug_fd, path_to_debug_file = None, get_scratch_path(f"cmds_trace_pcs_{identifier_str}", 'dbgcmds')
+        with open(path_to_debug_file, 'wb') as f:
+            f.write(debug_commands_bytes)
+
+    spike_shell_command = (
+        "spike",
+        "-d",
+        f"--debug-cmd={path_to_debug_file}",
+        f"--isa={rvflags}",
+        f"--pc={startpc}",
+        elfpath
+    )
+
+    parser = _InstrLogPcTraceParser(numinstrs, '64' in rvflags)
+    try:
+        _run_trace_pcs_streaming(spike_shell_command, parser, get_spike_timeout_seconds(), () if debug_fd is None else (debug_fd,))
+    except subprocess.TimeoutExpired:
+        raise Exception(f"Spike timeout (B) for identifier str: {identifier_str}.\nCommand: {' '.join(spike_shell_command)}")
+    finally:
+        if debug_fd is not None:
+            os.close(debug_fd)
+    if debug_fd is None and not NO_REMOVE_TMPFILES:
+        release_scratch_file(path_to_debug_file)
+        del path_to_debug_file
+
+    if dump_final_reg_vals:
+        return parser.get_pcs(), _parse_trace_pcs_instr_log_tail(parser.get_tail(), '64' in rvflags, num_fp_regs, has_fpdouble_support)
+    return parser.get_pcs()
+
+# Only used for debugging purposes
+# @brief runs and traces every PC location.
+# @return a sequence of PCs. If dump_final_reg_vals is True, then the output is a pair, whose second element is an array of final register values
+def run_trace_all_pcs(identifier_str: str, elfpath: str, rvflags: str, numinstrs: int, startpc: int, dump_final_reg_vals: bool, num_fp_regs: int, has_fpdouble_support: bool, fuzzerstate_for_debug: list) -> list:
+    if USE_INSTR_LOG_PC_TRACE:
+        return run_trace_all_pcs_instr_log(identifier_str, elfpath, rvflags, numinstrs, startpc, dump_final_reg_vals, num_fp_regs, has_fpdouble_support, fuzzerstate_for_debug)
+    return run_trace_all_pcs_per_step(identifier_str, elfpath, rvflags, numinstrs, startpc, dump_final_reg_vals, num_fp_regs, has_fpdouble_support, fuzzerstate_for_debug)
+
 ###
 # Timeout management
 ###
@@ -255,9 +658,16 @@ def get_spike_timeout_seconds() -> int:
     return max((SPIKE_TIMEOUT_SLACK_FACTOR*_get_spike_ns_per_instr())/1e9, 10)
 
 # @brief Runs a spike instance and returns the average nanoseconds per instruction.
+# The result is persisted per Spike binary and per machine.
 @cache
 def calibrate_spikespeed(numinstrs:int = 10000) -> list:
     global __spike_ns_per_instr
+    from common.profilingcache import get_or_run_probe, get_spike_fingerprint, get_host_fingerprint
+    spike_fingerprint = get_spike_fingerprint()
+    __spike_ns_per_instr = get_or_run_probe('spike_ns_per_instr', None if spike_fingerprint is None else (spike_fingerprint, get_host_fingerprint(), numinstrs), lambda: __measure_spike_ns_per_instr(numinstrs))
+
+# @return the average nanoseconds per instruction of a Spike instance.
+def __measure_spike_ns_per_instr(numinstrs: int) -> float:
     from common.bytestoelf import gen_elf
     from rv.rv32i import rv32i_jal
     from time import time_ns
@@ -266,7 +676,7 @@ def calibrate_spikespeed(numinstrs:int = 10000) -> list:
     path_to_debug_file = __gen_spike_dbgcmd_file_for_trace_pcs('spikespeedcalibration', numinstrs, SPIKE_STARTADDR, True, 16)
 
     # Second, generate a dummy ELF file containing an infinite loop
-    elfpath = os.path.join(PATH_TO_TMP, 'spikespeedcalibration.elf')
+    elfpath = get_scratch_path('spikespeedcalibration.elf')
     gen_elf(rv32i_jal(0, 0).to_bytes(4, 'little'), SPIKE_STARTADDR, SPIKE_STARTADDR, elfpath, False)
 
     # Run the Spike command
@@ -284,9 +694,9 @@ def calibrate_spikespeed(numinstrs:int = 10000) -> list:
     ns_elapsed = time_ns()-ns_before
 
     if not NO_REMOVE_TMPFILES:
-        os.remove(path_to_debug_file)
-        os.remove(elfpath)
+        release_scratch_file(path_to_debug_file)
+        release_scratch_file(elfpath)
         del path_to_debug_file
         del elfpath
 
-    __spike_ns_per_instr = ns_elapsed / numinstrs
+    return ns_elapsed / numinstrs
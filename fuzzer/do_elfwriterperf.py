@@ -0,0 +1,33 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script checks the native ELF writer against the recorded outputs of the makeelf + objcopy path and measures the ELFs written per second.
+
+# sys.argv[1]: number of ELF files (by default 1000), or `record` to record the toolchain outputs again with the objcopy of the host (see record_elf_writer_fixtures)
+# sys.argv[2]: size of the ELF content in bytes (by default 65536)
+
+from benchmarking.elfwriterperf import benchmark_elf_writer, record_elf_writer_fixtures
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'record':
+        record_elf_writer_fixtures()
+        sys.exit(0)
+
+    num_elfs = 1000
+    if len(sys.argv) > 1:
+        num_elfs = int(sys.argv[1])
+    elf_size = 1 << 16
+    if len(sys.argv) > 2:
+        elf_size = int(sys.argv[2])
+
+    benchmark_elf_writer(num_elfs, elf_size)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -4,6 +4,9 @@
 
 # This script evaluates the performance of program reduction.
 
+# sys.argv[1]: number of failing programs to consider per design (by default 10)
+# sys.argv[2]: comma-separated numbers of parallel probes per reduction, to measure the reduction speedup against the number of cores (by default, no speedup measurement)
+
 from benchmarking.timereduction import eval_reduction, plot_eval_reduction
 from benchmarking.findnfailinginstances import find_n_failing_descriptors
 from cascade.toleratebugs import tolerate_bug_for_eval_reduction
@@ -18,6 +21,9 @@ if __name__ == '__main__':
     num_failing_programs_to_consider = 10
     if len(sys.argv) > 1:
         num_failing_programs_to_consider = int(sys.argv[1])
+    nums_parallel_probes = None
+    if len(sys.argv) > 2:
+        nums_parallel_probes = list(map(int, sys.argv[2].split(',')))
     num_cores = max(int(os.getenv('CASCADE_JOBS', 160)) // 4, 1)
 
     design_names = [
@@ -32,7 +38,7 @@ if __name__ == '__main__':
     for design_name in design_names:
         tolerate_bug_for_eval_reduction(design_name, True)
         find_n_failing_descriptors(design_name, num_failing_programs_to_consider*2, num_cores, 0, True)
-        eval_reduction(design_name, num_failing_programs_to_consider, num_cores)
+        eval_reduction(design_name, num_failing_programs_to_consider, num_cores, nums_parallel_probes)
         tolerate_bug_for_eval_reduction(design_name, False)
 
     plot_eval_reduction(design_names, num_failing_programs_to_consider)
@@ -9,6 +9,7 @@
 # sys.argv[3]: offset for seed (to avoid running the fuzzing on the same instances over again)
 # sys.argv[4]: authorize privileges (by default 1)
 # sys.argv[5]: tolerate some bug (by default 0)
+# sys.argv[6]: number of generator processes in the pipelined mode, or 0 to generate and simulate the tests in the same processes (by default 0)
 
 from top.fuzzdesign import fuzzdesign
 from cascade.toleratebugs import tolerate_bug_for_eval_reduction
@@ -22,7 +23,7 @@ if __name__ == '__main__':
         raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
 
     if len(sys.argv) < 4:
-        raise Exception("Usage: python3 do_fuzzdesign.py <design_name> <num_cores> <seed_offset> <authorize_privileges> <tolerate_some_bug>")
+        raise Exception("Usage: python3 do_fuzzdesign.py <design_name> <num_cores> <seed_offset> <authorize_privileges> <tolerate_some_bug> <num_generators>")
 
     print(get_design_cascade_path(sys.argv[1]))
 
@@ -36,10 +37,15 @@ if __name__ == '__main__':
     else:
         tolerate_some_bug = 0
 
+    if len(sys.argv) > 6:
+        num_generators = int(sys.argv[6])
+    else:
+        num_generators = 0
+
     if tolerate_some_bug:
         tolerate_bug_for_eval_reduction(sys.argv[1])
 
-    fuzzdesign(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), authorize_privileges)
+    fuzzdesign(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), authorize_privileges, num_generators)
 
 else:
     raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,37 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script executes the fuzzer on a group of compatible designs to find faulting programs. Each program is generated once and simulated on every design.
+
+# sys.argv[1]: comma-separated design names, for example `vexriscv,vexriscv-v1-7`
+# sys.argv[2]: num of cores allocated to fuzzing
+# sys.argv[3]: offset for seed (to avoid running the fuzzing on the same instances over again)
+# sys.argv[4]: authorize privileges (by default 1)
+
+from top.fuzzmultidesign import fuzzmultidesign
+from common.designcfgs import get_design_cascade_path
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 4:
+        raise Exception("Usage: python3 do_fuzzmultidesign.py <design_name,design_name,...> <num_cores> <seed_offset> <authorize_privileges>")
+
+    design_names = sys.argv[1].split(',')
+    for design_name in design_names:
+        print(get_design_cascade_path(design_name))
+
+    if len(sys.argv) > 4:
+        authorize_privileges = int(sys.argv[4])
+    else:
+        authorize_privileges = 1
+
+    fuzzmultidesign(design_names, int(sys.argv[2]), int(sys.argv[3]), authorize_privileges)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,34 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script measures the tests per hour of fuzzdesign with monolithic workers and in its pipelined mode, at equal core counts.
+
+# sys.argv[1]: design name
+# sys.argv[2]: number of cores
+# sys.argv[3]: number of tests per setup (by default 200)
+# sys.argv[4:]: numbers of generator processes of the pipelined setups (by default a quarter, half and three quarters of the cores)
+
+from benchmarking.fuzzpipelineperf import benchmark_fuzz_pipeline
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 3:
+        raise Exception("Usage: python3 do_fuzzpipelineperf.py <design_name> <num_cores> [num_tests] [num_generators...]")
+
+    num_tests = 200
+    if len(sys.argv) > 3:
+        num_tests = int(sys.argv[3])
+    num_generators_list = None
+    if len(sys.argv) > 4:
+        num_generators_list = list(map(int, sys.argv[4:]))
+
+    benchmark_fuzz_pipeline(sys.argv[1], int(sys.argv[2]), num_tests, num_generators_list)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,30 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script measures how the basic block generation time scales with the maximal number of instructions, with the incremental instruction counter and with the previous full recount.
+# The largest instruction upper bound is taken from the MAX_NUM_INSTRUCTIONS_UPPERBOUND environment variable, or 100000 by default.
+
+# sys.argv[1]: design name
+# sys.argv[2]: number of programs per instruction upper bound (by default 5)
+
+from benchmarking.instrcounterperf import benchmark_instr_counter
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 2:
+        raise Exception("Usage: python3 do_instrcounterperf.py <design_name> [num_programs]")
+
+    num_programs = 5
+    if len(sys.argv) > 2:
+        num_programs = int(sys.argv[2])
+
+    benchmark_instr_counter(sys.argv[1], num_programs)
+
+else:
+    raise Exception("This module must be at the toplevel.")
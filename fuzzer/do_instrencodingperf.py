@@ -0,0 +1,25 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script checks the template-based instruction encoding over all the instruction strings and measures the memory per instruction and the encoding throughput.
+
+# sys.argv[1]: number of encoded instructions (by default 200000)
+
+from benchmarking.instrencodingperf import benchmark_instr_encoding
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    num_instrs = 200000
+    if len(sys.argv) > 1:
+        num_instrs = int(sys.argv[1])
+
+    benchmark_instr_encoding(num_instrs)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,34 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script measures the fraction of programs that the spike resolution resolves with the integer interpreter instead of Spike, and the resolution latency. With `check`, it instead checks the interpreter against Spike.
+
+# sys.argv[1]: design name
+# sys.argv[2]: number of programs (by default 1000, or 10000 with `check`)
+# sys.argv[3]: optional `check`
+
+from benchmarking.intinterpreterperf import benchmark_int_interpreter, check_int_interpreter_equivalence
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 2:
+        raise Exception("Usage: python3 do_intinterpreterperf.py <design_name> [num_programs] [check]")
+
+    do_check = len(sys.argv) > 3 and sys.argv[3] == 'check'
+    num_programs = 10000 if do_check else 1000
+    if len(sys.argv) > 2:
+        num_programs = int(sys.argv[2])
+
+    if do_check:
+        check_int_interpreter_equivalence(sys.argv[1], num_programs)
+    else:
+        benchmark_int_interpreter(sys.argv[1], num_programs)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,29 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script checks the compiled ISA class tables against the per-instruction filtering and measures the per-instruction sampling cost.
+
+# sys.argv[1]: design name
+# sys.argv[2]: number of programs (by default 50)
+
+from benchmarking.isainstrclassperf import benchmark_isainstrclass_tables
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 2:
+        raise Exception("Usage: python3 do_isainstrclassperf.py <design_name> [num_programs]")
+
+    num_programs = 50
+    if len(sys.argv) > 2:
+        num_programs = int(sys.argv[2])
+
+    benchmark_isainstrclass_tables(sys.argv[1], num_programs)
+
+else:
+    raise Exception("This module must be at the toplevel.")
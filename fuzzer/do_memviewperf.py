@@ -0,0 +1,29 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script checks the MemoryView against the previous implementation and measures the allocation cost against fragmentation.
+
+# sys.argv[1]: log2 of the largest memory size (by default 20)
+# sys.argv[2]: number of random equivalence scenarios (by default 200)
+
+from benchmarking.memviewperf import benchmark_memview
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    max_memsize_log2 = 20
+    if len(sys.argv) > 1:
+        max_memsize_log2 = int(sys.argv[1])
+    num_equivalence_scenarios = 200
+    if len(sys.argv) > 2:
+        num_equivalence_scenarios = int(sys.argv[2])
+
+    benchmark_memview(max_memsize_log2, num_equivalence_scenarios)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,30 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script measures the time spent in the generation and in Spike per simulated test, when fuzzing a group of compatible designs separately and in the multi-design mode.
+
+# sys.argv[1]: comma-separated design names, for example `vexriscv,vexriscv-v1-7`
+# sys.argv[2]: number of cores
+# sys.argv[3]: number of tests (by default 100)
+
+from benchmarking.multidesignperf import benchmark_multidesign
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 3:
+        raise Exception("Usage: python3 do_multidesignperf.py <design_name,design_name,...> <num_cores> [num_tests]")
+
+    num_tests = 100
+    if len(sys.argv) > 3:
+        num_tests = int(sys.argv[3])
+
+    benchmark_multidesign(sys.argv[1].split(','), int(sys.argv[2]), num_tests)
+
+else:
+    raise Exception("This module must be at the toplevel.")
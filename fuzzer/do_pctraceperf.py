@@ -0,0 +1,24 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script checks the PC tracing from the instruction log of Spike against the per-step tracing, and measures both from 10^2 to 10^6 instructions.
+
+# sys.argv[1]: optional design name, to also compare both backends with Spike on the programs of this design
+
+from benchmarking.pctraceperf import check_pc_trace_parser_equivalence, check_pc_trace_backend_equivalence, benchmark_pc_trace
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    print(f"Parsers agree on {check_pc_trace_parser_equivalence()} fixtures.")
+    if len(sys.argv) > 1:
+        print(f"Backends agree on {check_pc_trace_backend_equivalence(sys.argv[1])} programs of `{sys.argv[1]}`.")
+    benchmark_pc_trace()
+
+else:
+    raise Exception("This module must be at the toplevel.")
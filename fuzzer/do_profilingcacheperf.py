@@ -0,0 +1,29 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script measures the startup time of do_fuzzdesign.py and do_timetobug.py over repeated invocations, with and without the persistent profiling cache.
+
+# sys.argv[1]: design name
+# sys.argv[2]: number of invocations per setup (by default 5)
+
+from benchmarking.profilingcacheperf import benchmark_profiling_cache
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 2:
+        raise Exception("Usage: python3 do_profilingcacheperf.py <design_name> [num_invocations]")
+
+    num_invocations = 5
+    if len(sys.argv) > 2:
+        num_invocations = int(sys.argv[2])
+
+    benchmark_profiling_cache(sys.argv[1], num_invocations)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,34 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script checks the in-place program image construction against the previous one and measures the image build latency depending on the memory size.
+
+# sys.argv[1]: design name
+# sys.argv[2]: number of seeds for the equivalence check (by default 1000)
+# sys.argv[3]: number of programs per memory size for the benchmark (by default 10)
+
+from benchmarking.programimageperf import check_program_image_equivalence, benchmark_program_image
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 2:
+        raise Exception("Usage: python3 do_programimageperf.py <design_name> [num_seeds] [num_programs_per_memsize]")
+
+    num_seeds = 1000
+    if len(sys.argv) > 2:
+        num_seeds = int(sys.argv[2])
+    num_programs_per_memsize = 10
+    if len(sys.argv) > 3:
+        num_programs_per_memsize = int(sys.argv[3])
+
+    print(f"Program images identical on {check_program_image_equivalence(sys.argv[1], num_seeds)} seeds.")
+    benchmark_program_image(sys.argv[1], num_programs_per_memsize)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,35 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script checks that the reduction probe cache does not change the reduced programs, and measures its hit rate with a cold and a warm cache.
+
+# sys.argv[1]: design name
+# sys.argv[2]: number of failing programs to reduce (by default 5)
+
+from benchmarking.reduceprobecacheperf import check_reduction_probe_cache
+from benchmarking.findnfailinginstances import find_n_failing_descriptors
+from cascade.toleratebugs import tolerate_bug_for_eval_reduction
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 2:
+        raise Exception("Usage: python3 do_reduceprobecacheperf.py <design_name> [num_testcases]")
+
+    num_testcases = 5
+    if len(sys.argv) > 2:
+        num_testcases = int(sys.argv[2])
+    num_cores = max(int(os.getenv('CASCADE_JOBS', 160)) // 4, 1)
+
+    tolerate_bug_for_eval_reduction(sys.argv[1], True)
+    find_n_failing_descriptors(sys.argv[1], num_testcases*2, num_cores, 0, True)
+    check_reduction_probe_cache(sys.argv[1], num_testcases)
+    tolerate_bug_for_eval_reduction(sys.argv[1], False)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,34 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script checks the fuzzerstate forks used by the reduction probes against deep copies, and measures the per-probe preparation time and peak RSS.
+
+# sys.argv[1]: design name
+# sys.argv[2]: number of seeds for the equivalence check (by default 20)
+# sys.argv[3]: number of programs per number of basic blocks for the benchmark (by default 5)
+
+from benchmarking.reducesnapshotperf import check_reduced_fuzzerstate_equivalence, benchmark_reduced_fuzzerstate
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 2:
+        raise Exception("Usage: python3 do_reducesnapshotperf.py <design_name> [num_seeds] [num_programs]")
+
+    num_seeds = 20
+    if len(sys.argv) > 2:
+        num_seeds = int(sys.argv[2])
+    num_programs = 5
+    if len(sys.argv) > 3:
+        num_programs = int(sys.argv[3])
+
+    print(f"Reduced fuzzerstates identical on {check_reduced_fuzzerstate_equivalence(sys.argv[1], num_seeds)} probes.")
+    benchmark_reduced_fuzzerstate(sys.argv[1], num_programs)
+
+else:
+    raise Exception("This module must be at the toplevel.")
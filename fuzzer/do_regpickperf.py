@@ -0,0 +1,44 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script benchmarks the integer register pick state, or records and checks the digests of generated programs.
+
+# sys.argv[1]: `bench`, `record` or `check`
+# For `bench`:
+#   sys.argv[2]: number of register picks (by default 1000000)
+# For `record` and `check`:
+#   sys.argv[2]: design name
+#   sys.argv[3]: number of programs (by default 100)
+
+from benchmarking.regpickperf import benchmark_regpick, record_program_digests, check_program_digests
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('bench', 'record', 'check'):
+        raise Exception("Usage: python3 do_regpickperf.py bench [num_picks] | record <design_name> [num_programs] | check <design_name> [num_programs]")
+
+    if sys.argv[1] == 'bench':
+        num_picks = 1000000
+        if len(sys.argv) > 2:
+            num_picks = int(sys.argv[2])
+        benchmark_regpick(num_picks)
+    else:
+        if len(sys.argv) < 3:
+            raise Exception("Please specify the design name.")
+        num_programs = 100
+        if len(sys.argv) > 3:
+            num_programs = int(sys.argv[3])
+        if sys.argv[1] == 'record':
+            record_program_digests(sys.argv[2], num_programs)
+        else:
+            if check_program_digests(sys.argv[2], num_programs):
+                sys.exit(1)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,33 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script measures the idle core time of the event-driven job scheduler and of the previous polling loop on synthetic short jobs.
+
+# sys.argv[1]: number of workers (by default 8)
+# sys.argv[2]: number of synthetic jobs (by default 200)
+# sys.argv[3]: polling period of the previous loop in seconds (by default 2)
+
+from benchmarking.schedulerperf import benchmark_scheduler
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    num_workers = 8
+    if len(sys.argv) > 1:
+        num_workers = int(sys.argv[1])
+    num_jobs = 200
+    if len(sys.argv) > 2:
+        num_jobs = int(sys.argv[2])
+    poll_period_seconds = 2.0
+    if len(sys.argv) > 3:
+        poll_period_seconds = float(sys.argv[3])
+
+    benchmark_scheduler(num_workers, num_jobs, poll_period_seconds=poll_period_seconds)
+
+else:
+    raise Exception("This module must be at the toplevel.")
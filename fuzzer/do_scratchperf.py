@@ -0,0 +1,33 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script measures the filesystem operations and the latency of the temporary artifacts of each test, in PATH_TO_TMP and in the scratch space in RAM.
+
+# sys.argv[1]: design name
+# sys.argv[2]: number of programs (by default 20)
+# sys.argv[3]: number of repetitions (by default 10)
+
+from benchmarking.scratchperf import benchmark_scratch
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 2:
+        raise Exception("Usage: python3 do_scratchperf.py <design_name> [num_programs] [num_reps]")
+
+    num_programs = 20
+    if len(sys.argv) > 2:
+        num_programs = int(sys.argv[2])
+    num_reps = 10
+    if len(sys.argv) > 3:
+        num_reps = int(sys.argv[3])
+
+    benchmark_scratch(sys.argv[1], num_programs, num_reps)
+
+else:
+    raise Exception("This module must be at the toplevel.")
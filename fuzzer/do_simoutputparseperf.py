@@ -0,0 +1,30 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script checks the streaming parser of the simulation outputs against the previous parsers, and measures the parse time and end-to-end latency on output fixtures of 10^3 to 10^6 lines.
+
+# sys.argv[1]: design name
+# sys.argv[2]: optional directory of recorded Verilator outputs, to use instead of the generated fixtures
+
+from benchmarking.simoutputparseperf import check_sim_output_parser_equivalence, benchmark_sim_output_parser
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 2:
+        raise Exception("Usage: python3 do_simoutputparseperf.py <design_name> [recorded_outputs_dir]")
+
+    fixture_paths = None
+    if len(sys.argv) > 2:
+        fixture_paths = sorted(os.path.join(sys.argv[2], fixture_name) for fixture_name in os.listdir(sys.argv[2]))
+
+    print(f"Parsers agree on {check_sim_output_parser_equivalence(sys.argv[1])} fixtures.")
+    benchmark_sim_output_parser(sys.argv[1], fixture_paths)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,28 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script checks the vectorized parser of the Spike register dumps against the scalar parser, and measures their throughput in MB/s on output fixtures of 10^2 to 10^5 dumps.
+
+# sys.argv[1]: optional design name, to also compare the parsers on the outputs of Spike for the programs of this design, if Spike is installed
+
+from benchmarking.spikeoutparseperf import check_spike_out_parser_equivalence, check_spike_out_parser_on_spike, benchmark_spike_out_parser
+
+import os
+import shutil
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    print(f"Parsers agree on {check_spike_out_parser_equivalence()} fixtures.")
+    if len(sys.argv) > 1:
+        if shutil.which('spike') is None:
+            print("Spike is not installed, skipping the comparison on the outputs of Spike.")
+        else:
+            print(f"Parsers agree on the outputs of Spike for {check_spike_out_parser_on_spike(sys.argv[1])} programs.")
+    benchmark_spike_out_parser()
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -0,0 +1,33 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This script measures the task dispatch overhead and the first-task latency of the worker pools, with and without the warm design workers.
+
+# sys.argv[1]: design name
+# sys.argv[2]: number of workers (by default 8)
+# sys.argv[3]: number of tasks (by default 2000)
+
+from benchmarking.workerpoolperf import benchmark_worker_pool
+
+import os
+import sys
+
+if __name__ == '__main__':
+    if "CASCADE_ENV_SOURCED" not in os.environ:
+        raise Exception("The Cascade environment must be sourced prior to running the Python recipes.")
+
+    if len(sys.argv) < 2:
+        raise Exception("Usage: python3 do_workerpoolperf.py <design_name> [num_workers] [num_tasks]")
+
+    num_workers = 8
+    if len(sys.argv) > 2:
+        num_workers = int(sys.argv[2])
+    num_tasks = 2000
+    if len(sys.argv) > 3:
+        num_tasks = int(sys.argv[3])
+
+    benchmark_worker_pool(sys.argv[1], num_workers, num_tasks)
+
+else:
+    raise Exception("This module must be at the toplevel.")
@@ -4,43 +4,23 @@
 
 # This module runs Cascade and collects multiplexer toggle coverage.
 
-from common.timeout import timeout
 from params.runparams import PATH_TO_TMP
 from common.spike import calibrate_spikespeed
 from common.profiledesign import profile_get_medeleg_mask
+from common.scheduler import JOB_STATUS_DONE
+from common.designcontext import gen_design_job_scheduler
 from cascade.fuzzfromdescriptor import NUM_MAX_BBS_UPPERBOUND, gen_fuzzerstate_elf_expectedvals, gen_new_test_instance
 from cascade.fuzzsim import runtest_verilator_forrfuzz
 
 import json
-import multiprocessing as mp
 import os
-import random
-import threading
 import time
 from tqdm import tqdm
 
-
-# This helps tracking how many new processes to spawn
-rfuzz_coverage_lock = threading.Lock()
-newly_collected_coverages_size = 0
-collected_coverages = []
-collected_durations = []
-
-def callback_collectrfuzz(collected_coverage_time_tuple: str):
-    global collected_coverages
-    global newly_collected_coverages_size
-    global rfuzz_coverage_lock
-    with rfuzz_coverage_lock:
-        if collected_coverage_time_tuple is None:
-            return
-        collected_coverage, collected_duration = collected_coverage_time_tuple
-        if collected_coverage is not None:
-            collected_coverages.append(collected_coverage)
-            collected_durations.append(collected_duration)
-            newly_collected_coverages_size += 1
+# Test instances that last longer are ignored.
+RFUZZ_JOB_TIMEOUT_SECONDS = 60*60
 
 # @return a pair (rfuzz_coverage_mask, duration in seconds)
-@timeout(seconds=60*60)
 def _measure_coverage_rfuzz_worker(memsize: int, design_name: str, randseed: int, nmax_bbs: int, authorize_privileges: bool):
     try:
         start_time = time.time()
@@ -54,13 +34,8 @@ def _measure_coverage_rfuzz_worker(memsize: int, design_name: str, randseed: int
 # Get the rfuzz coverage of Cascade
 def collect_coverage_rfuzz(design_name: str, num_cores: int, num_testcases: int):
     # assert not DO_ASSERT, "Please disable DO_ASSERT for performance measurements"
-    global collected_coverages
-    global newly_collected_coverages_size
-    global collected_durations
-
-    collected_coverages.clear()
-    collected_durations.clear()
-    newly_collected_coverages_size = 0
+    collected_coverages = []
+    collected_durations = []
 
     num_workers = min(num_cores, num_testcases)
     assert num_workers > 0
@@ -70,33 +45,24 @@ def collect_coverage_rfuzz(design_name: str, num_cores: int, num_testcases: int)
 
     print(f"Starting mux select coverage testing of `{design_name}` on {num_workers} processes.")
 
-    pool = mp.Pool(processes=num_workers)
-    process_instance_id = 0
-    # First, apply the function to all the workers.
-    for process_id in range(num_workers):
-        pool.apply_async(_measure_coverage_rfuzz_worker, args=(*gen_new_test_instance(design_name, process_instance_id, True),), callback=callback_collectrfuzz)
-        process_instance_id += 1    
-
     # Respawn processes until we received the desired number of coverage paths
     with tqdm(total=num_testcases) as pbar:
-        while newly_collected_coverages_size < num_testcases:
-            # Yield the execution
-            time.sleep(1)
-            # Check whether we received new coverage paths
-            with rfuzz_coverage_lock:
-                if newly_collected_coverages_size > 0:
-                    pbar.update(newly_collected_coverages_size)
-                    if len(collected_coverages) >= num_testcases:
-                        print(f"Received enough coverages. Stopping.")
-                        break
-                    for new_process_id in range(newly_collected_coverages_size):
-                        pool.apply_async(_measure_coverage_rfuzz_worker, args=(*gen_new_test_instance(design_name, process_instance_id, True),), callback=callback_collectrfuzz)
-                        process_instance_id += 1
-                    newly_collected_coverages_size = 0
-
-    # Kill all remaining processes
-    pool.close()
-    pool.terminate()
+        # @return True iff we received enough coverages.
+        def on_result(job_result):
+            if job_result.status != JOB_STATUS_DONE:
+                return False
+            collected_coverage, collected_duration = job_result.ret
+            if collected_coverage is None:
+                return False
+            collected_coverages.append(collected_coverage)
+            collected_durations.append(collected_duration)
+            pbar.update(1)
+            if len(collected_coverages) >= num_testcases:
+                print(f"Received enough coverages. Stopping.")
+                return True
+            return False
+
+        gen_design_job_scheduler(_measure_coverage_rfuzz_worker, design_name, num_workers, RFUZZ_JOB_TIMEOUT_SECONDS).run(lambda process_instance_id: (*gen_new_test_instance(design_name, process_instance_id, True),), on_result)
 
     print(f"Parallel section complete, proceeding to merging.")
 
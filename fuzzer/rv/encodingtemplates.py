@@ -0,0 +1,83 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# This module precomputes the encoding templates of the instructions, i.e., their opcode, funct fields and other fixed bits.
+# The templates are obtained by calling the encoder functions of the rv modules with all-zero operands.
+# An instruction is then encoded by ORing its operand fields into the template, instead of dispatching on the instruction string.
+
+from params.runparams import DO_ASSERT
+from rv.util import INSTRUCTION_IDS
+import rv.rv32i as rv32i
+import rv.rv32m as rv32m
+import rv.rv32f as rv32f
+import rv.rv32d as rv32d
+import rv.rv64i as rv64i
+import rv.rv64m as rv64m
+import rv.rv64f as rv64f
+import rv.rv64d as rv64d
+import rv.zicsr as zicsr
+import rv.zifencei as zifencei
+import rv.rvprivileged as rvprivileged
+
+import inspect
+
+# The encoder functions are named <module name>_<instruction string without dots>, for example rv32f_fcvtws for fcvt.w.s.
+ENCODER_MODULES = (rv32i, rv64i, rv32m, rv64m, rv32f, rv64f, rv32d, rv64d, zicsr, zifencei, rvprivileged)
+
+# Operand field offsets.
+RD_OFFSET  = 7
+RM_OFFSET  = 12
+RS1_OFFSET = 15
+RS2_OFFSET = 20
+RS3_OFFSET = 27
+IMM_ITYPE_OFFSET = 20
+IMM_UTYPE_OFFSET = 12
+
+# @return the encoder function of the given instruction string, or None if there is none.
+def get_encoder_fn(instr_str: str):
+    encoder_fn_suffix = instr_str.replace('.', '')
+    for encoder_module in ENCODER_MODULES:
+        encoder_fn = getattr(encoder_module, f"{encoder_module.__name__.split('.')[-1]}_{encoder_fn_suffix}", None)
+        if encoder_fn is not None:
+            return encoder_fn
+    return None
+
+def __gen_encoding_templates():
+    ret = dict()
+    for instr_str in INSTRUCTION_IDS:
+        encoder_fn = get_encoder_fn(instr_str)
+        if encoder_fn is None:
+            continue
+        ret[instr_str] = encoder_fn(*([0] * len(inspect.signature(encoder_fn).parameters)))
+    return ret
+
+# ENCODING_TEMPLATES[instr_str] = encoding of the instruction with all its operands set to zero.
+ENCODING_TEMPLATES = __gen_encoding_templates()
+
+# Dictionary that raises the same exception as the historical string dispatch when an instruction string is not supported.
+class EncodingTemplateTable(dict):
+    def __missing__(self, instr_str):
+        raise ValueError(f"Unexpected instruction string: `{instr_str}`.")
+
+# @param instr_strs the instruction strings supported by an instruction class.
+# @return an EncodingTemplateTable restricted to these instruction strings.
+def gen_encoding_template_table(instr_strs) -> EncodingTemplateTable:
+    if DO_ASSERT:
+        for instr_str in instr_strs:
+            assert instr_str in ENCODING_TEMPLATES, f"No encoder found for instruction string `{instr_str}`."
+    return EncodingTemplateTable({instr_str: ENCODING_TEMPLATES[instr_str] for instr_str in instr_strs})
+
+# The immediate layouts. Immediates may be negative, they are truncated to the size of the field.
+
+def imm_itype_bits(imm: int) -> int:
+    return (imm & 0xfff) << IMM_ITYPE_OFFSET
+
+def imm_stype_bits(imm: int) -> int:
+    return ((imm & 0x1f) << 7) | (((imm >> 5) & 0x7f) << 25)
+
+def imm_btype_bits(imm: int) -> int:
+    return (((imm >> 11) & 0x1) << 7) | (((imm >> 1) & 0xf) << 8) | (((imm >> 5) & 0x3f) << 25) | (((imm >> 12) & 0x1) << 31)
+
+def imm_utype_bits(imm: int) -> int:
+    return (imm & 0xfffff) << IMM_UTYPE_OFFSET
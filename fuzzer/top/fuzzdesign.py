@@ -6,64 +6,32 @@
 
 from common.spike import calibrate_spikespeed
 from common.profiledesign import profile_get_medeleg_mask
-from cascade.fuzzfromdescriptor import gen_new_test_instance, fuzz_single_from_descriptor
+from common.designcontext import gen_design_job_scheduler, gen_design_pipeline
+from cascade.fuzzfromdescriptor import gen_new_test_instance, fuzz_single_from_descriptor, gen_test_for_pipeline, run_test_for_pipeline, MAX_RTL_ELF_SIZE_BYTES
 
-import time
-import threading
-
-callback_lock = threading.Lock()
-newly_finished_tests = 0
-curr_round_id = 0
-all_times_to_detection = []
-
-def test_done_callback(arg):
-    global newly_finished_tests
-    global callback_lock
-    global curr_round_id
-    global all_times_to_detection
-    with callback_lock:
-        newly_finished_tests += 1
-
-def fuzzdesign(design_name: str, num_cores: int, seed_offset: int, can_authorize_privileges: bool):
-    global newly_finished_tests
-    global callback_lock
-    global all_times_to_detection
-    global curr_round_id
-
-    newly_finished_tests = 0
-    curr_round_id = 0
-    all_times_to_detection = []
-
-    import multiprocessing as mp
+# The period at which the pipelined mode prints the occupancy of its stages.
+PIPELINE_STATS_PERIOD_SECONDS = 600
 
+# @param num_generators if 0, then each process generates and simulates its tests. Else, the number of processes that generate the tests, the num_cores-num_generators other processes simulating them.
+def fuzzdesign(design_name: str, num_cores: int, seed_offset: int, can_authorize_privileges: bool, num_generators: int = 0):
     num_workers = num_cores
     assert num_workers > 0
+    assert num_generators >= 0 and num_generators < num_workers, f"The pipelined mode needs at least one generator and one simulator process, got {num_generators} generators for {num_workers} processes."
 
     calibrate_spikespeed()
     profile_get_medeleg_mask(design_name)
-    print(f"Starting parallel testing of `{design_name}` on {num_workers} processes.")
 
-    newly_finished_tests = 0
-    pool = mp.Pool(processes=num_workers)
-    process_instance_id = seed_offset
-    # First, apply the function to all the workers.
-    for _ in range(num_workers):
+    # The job id is the seed of the test instance.
+    def gen_job_args(process_instance_id: int):
         memsize, _, _, num_bbs, authorize_privileges = gen_new_test_instance(design_name, process_instance_id, can_authorize_privileges)
-        pool.apply_async(fuzz_single_from_descriptor, args=(memsize, design_name, process_instance_id, num_bbs, authorize_privileges, None, True), callback=test_done_callback)
-        process_instance_id += 1
-
-    while True:
-        time.sleep(2)
-        # Check whether we received new coverage paths
-        with callback_lock:
-            if newly_finished_tests > 0:
-                for _ in range(newly_finished_tests):
-                    memsize, _, _, num_bbs, authorize_privileges = gen_new_test_instance(design_name, process_instance_id, can_authorize_privileges)
-                    pool.apply_async(fuzz_single_from_descriptor, args=(memsize, design_name, process_instance_id, num_bbs, authorize_privileges, None, True), callback=test_done_callback)
-                    process_instance_id += 1
-                newly_finished_tests = 0
-
-    # This code should never be reached.
-    # Kill all remaining processes
-    pool.close()
-    pool.terminate()
+        if num_generators:
+            return (memsize, design_name, process_instance_id, num_bbs, authorize_privileges, True)
+        return (memsize, design_name, process_instance_id, num_bbs, authorize_privileges, None, True)
+
+    # Fuzz indefinitely.
+    if num_generators:
+        print(f"Starting pipelined testing of `{design_name}` on {num_generators} generator and {num_workers - num_generators} simulator processes.")
+        gen_design_pipeline(gen_test_for_pipeline, run_test_for_pipeline, design_name, num_generators, num_workers - num_generators, MAX_RTL_ELF_SIZE_BYTES).run(gen_job_args, lambda job_result: False, seed_offset, PIPELINE_STATS_PERIOD_SECONDS)
+    else:
+        print(f"Starting parallel testing of `{design_name}` on {num_workers} processes.")
+        gen_design_job_scheduler(fuzz_single_from_descriptor, design_name, num_workers).run(gen_job_args, lambda job_result: False, seed_offset)
@@ -5,31 +5,17 @@
 # This module is responsible to measure the time required to find a bug, given some behavior tolerances and a specific design name
 
 from params.runparams import PATH_TO_TMP, PATH_TO_FIGURES
-from common.timeout import timeout
 from common.profiledesign import profile_get_medeleg_mask
+from common.scheduler import JOB_STATUS_DONE
+from common.designcontext import gen_design_job_scheduler
 from common.spike import calibrate_spikespeed
 from cascade.fuzzfromdescriptor import gen_new_test_instance, run_rtl
 
-import threading
 import time
 
-callback_lock = threading.Lock()
-newly_finished_tests = 0
-curr_round_id = 0
-all_times_to_detection = []
-
-def bug_detection_callback(ret):
-    global newly_finished_tests
-    global callback_lock
-    global curr_round_id
-    global all_times_to_detection
-    with callback_lock:
-        newly_finished_tests += 1
-        if ret is not None:
-            if len(all_times_to_detection) <= curr_round_id:
-                all_times_to_detection.append(ret)
-
-@timeout(seconds=60*60*2)
+# Test instances that last longer are abandoned.
+TIMEBUGDETECTION_JOB_TIMEOUT_SECONDS = 60*60*2
+
 def run_rtl_single_for_timebugdetection(memsize: int, design_name: str, randseed: int, nmax_bbs: int, start_time: float, authorize_privileges: bool, nmax_instructions: int, nodependencybias: bool):
     assert type(nmax_instructions) == int or nmax_instructions is None, f"nmax_instructions must be an integer or None, but its type is {type(nmax_instructions)}"
     assert type(nodependencybias) == bool, f"nodependencybias must be a boolean, but its type is {type(nodependencybias)}"
@@ -50,16 +36,7 @@ def measure_time_to_bug(design_name: str, num_cores: int, num_reps: int, nmax_in
     assert type(nmax_instructions) == int or nmax_instructions is None, f"nmax_instructions must be an integer or None, but its type is {type(nmax_instructions)}"
     assert type(nodependencybias) == bool, f"nodependencybias must be a boolean, but its type is {type(nodependencybias)}"
 
-    global newly_finished_tests
-    global callback_lock
-    global all_times_to_detection
-    global curr_round_id
-
-    newly_finished_tests = 0
     all_times_to_detection = []
-    curr_round_id = 0
-
-    import multiprocessing as mp
 
     num_workers = num_cores
     assert num_workers > 0
@@ -71,62 +48,36 @@ def measure_time_to_bug(design_name: str, num_cores: int, num_reps: int, nmax_in
 
     assert num_reps > 0, "num_reps must be > 0, may it be for bug detection timing or just normal fuzzing"
 
+    # Some instances, rarely, seem to be stuck if there are bugs in some of the EDA tools. The scheduler abandons them after the job timeout.
+    scheduler = gen_design_job_scheduler(run_rtl_single_for_timebugdetection, design_name, num_workers, TIMEBUGDETECTION_JOB_TIMEOUT_SECONDS)
     for global_iter_id in range(num_reps):
-        exit_global_loop = False
-        # print(f"Starting global iteration {global_iter_id}.")
-
-        newly_finished_tests = 0
-        exit_curr_global_rep = False
-
         start_time = time.time()
 
-        pool = mp.Pool(processes=num_workers)
-        process_instance_id = 0
-        # First, apply the function to all the workers. We do not use map because some instances, rarely, seem to be stuck if there are bugs in some of the EDA tools.
-        for process_id in range(num_workers):
+        def gen_job_args(process_instance_id: int):
+            # Do not start new instances once the time limit is exceeded.
+            if time_limit_seconds is not None and time.time() - start_time > time_limit_seconds:
+                return None
             memsize, _, _, num_bbs, authorize_privileges = gen_new_test_instance(design_name, process_instance_id, True)
             if nmax_instructions is not None:
                 num_bbs = 10000
-            pool.apply_async(run_rtl_single_for_timebugdetection, args=(memsize, design_name, process_instance_id+50000*global_iter_id, num_bbs, start_time, authorize_privileges, nmax_instructions, nodependencybias), callback=bug_detection_callback)
-            process_instance_id += 1
-
-        while not exit_curr_global_rep:
-            time.sleep(2)
-            # Check whether we received new coverage paths
-            with callback_lock:
-                if newly_finished_tests > 0:
-                    assert len(all_times_to_detection) <= curr_round_id + 1
-                    if len(all_times_to_detection) == curr_round_id + 1 or (time_limit_seconds is not None and time.time() - start_time > time_limit_seconds):
-                        # # If the detection failed, do not try again
-                        # if len(all_times_to_detection) <= curr_round_id:
-                        #     exit_global_loop = True
-                        #     print("Did not find. Abandoning this scenario.")
-                        exit_curr_global_rep = True
-                        curr_round_id += 1
-                        print(f"Curr all times to detection: [{' '.join(map(lambda x: f'{x:2f}', all_times_to_detection))}]")
-                        break
-
-                    for new_process_id in range(newly_finished_tests):
-                        memsize, _, _, num_bbs, authorize_privileges = gen_new_test_instance(design_name, process_instance_id, True)
-                        if nmax_instructions is not None:
-                            num_bbs = 10000
-                        pool.apply_async(run_rtl_single_for_timebugdetection, args=(memsize, design_name, process_instance_id+50000*global_iter_id, num_bbs, start_time, authorize_privileges, nmax_instructions, nodependencybias), callback=bug_detection_callback)
-                        process_instance_id += 1
-                    newly_finished_tests = 0
-
-        if exit_global_loop:
-            break
-
-        # This code is only reached if we are measuring the time to bug detection
-        pool.close()
-        pool.terminate()
+            return (memsize, design_name, process_instance_id+50000*global_iter_id, num_bbs, start_time, authorize_privileges, nmax_instructions, nodependencybias)
+
+        # @return True iff the current repetition is complete.
+        def on_result(job_result):
+            if job_result.status == JOB_STATUS_DONE and job_result.ret is not None:
+                all_times_to_detection.append(job_result.ret)
+                return True
+            return time_limit_seconds is not None and time.time() - start_time > time_limit_seconds
+
+        scheduler.run(gen_job_args, on_result)
+        print(f"Curr all times to detection: [{' '.join(map(lambda x: f'{x:2f}', all_times_to_detection))}]")
 
     # This code is only reached if we are measuring the time to bug detection
     print(f"Times to bug detection (seconds): {all_times_to_detection}")
-    if len(all_times_to_detection) < curr_round_id:
+    if len(all_times_to_detection) < num_reps:
         print(f"WARNING: The time to bug detection was not measured for all the rounds. This is likely due to a timeout that we set to cap the duration dedicated to bug detection.")
         # Fill the rest of times to detection with None
-        for _ in range(curr_round_id - len(all_times_to_detection)):
+        for _ in range(num_reps - len(all_times_to_detection)):
             all_times_to_detection.append(None)
 
     return all_times_to_detection
@@ -0,0 +1,39 @@
+# Copyright 2023 Flavien Solt, ETH Zurich.
+# Licensed under the General Public License, Version 3.0, see LICENSE for details.
+# SPDX-License-Identifier: GPL-3.0-only
+
+# Toplevel for a cycle of program generation and RTL simulation on a group of compatible designs, each program being generated and resolved by Spike once for all the designs.
+
+from common.spike import calibrate_spikespeed
+from common.designcontext import gen_multidesign_job_scheduler
+from common.scheduler import JOB_STATUS_DONE
+from cascade.fuzzfromdescriptor import gen_new_test_instance
+from cascade.multidesign import profile_get_medeleg_masks, check_designs_compatible, fuzz_single_from_descriptor_multidesign, MultiDesignStats
+
+# The number of programs after which the per-design statistics are printed.
+MULTIDESIGN_STATS_PERIOD_PROGRAMS = 1000
+
+# @param design_names the designs, which must be compatible, see cascade/multidesign.py.
+def fuzzmultidesign(design_names: list, num_cores: int, seed_offset: int, can_authorize_privileges: bool):
+    num_workers = num_cores
+    assert num_workers > 0
+    design_names = tuple(design_names)
+
+    calibrate_spikespeed()
+    check_designs_compatible(design_names, profile_get_medeleg_masks(design_names))
+
+    # The job id is the seed of the test instance.
+    def gen_job_args(process_instance_id: int):
+        memsize, _, _, num_bbs, authorize_privileges = gen_new_test_instance(design_names[0], process_instance_id, can_authorize_privileges)
+        return (memsize, design_names, process_instance_id, num_bbs, authorize_privileges, True)
+
+    stats = MultiDesignStats(design_names)
+    def on_result(job_result):
+        stats.add_result(job_result.ret if job_result.status == JOB_STATUS_DONE else None)
+        if stats.num_programs % MULTIDESIGN_STATS_PERIOD_PROGRAMS == 0:
+            print(stats)
+        return False
+
+    # Fuzz indefinitely.
+    print(f"Starting parallel testing of {', '.join(f'`{design_name}`' for design_name in design_names)} on {num_workers} processes.")
+    gen_multidesign_job_scheduler(fuzz_single_from_descriptor_multidesign, design_names, num_workers).run(gen_job_args, on_result, seed_offset)